@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""
+Record the ICAv2 WES status of a pushed WRSC event as the last accepted status of the run
+
+convert_icav2_wes_event_to_wrsc_event claims the run for the event, the claim is only recorded
+as the last accepted status once the state machine has pushed the WRSC event,
+so an event is never marked as seen if its WRSC event was not pushed (see sash_tools.wes_status_guard).
+"""
+
+# Layer imports
+from sash_tools.wes_status_guard import WesStatusGuard
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Accept the status claimed by the execution
+
+    Input:
+      {
+        "portalRunId": "20250101abcd1234",
+        "executionArn": "arn:aws:states:...:execution:..."
+      }
+
+    Output:
+      {
+        "isAccepted": true
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    return {
+        "isAccepted": WesStatusGuard().accept(event['portalRunId'], event['executionArn']),
+    }
+
+
+# if __name__ == "__main__":
+#     import json
+#     from os import environ
+#     environ['STATE_STORE_BACKEND'] = 'local'
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "portalRunId": "20250101abcd1234",
+#                 "executionArn": "arn:aws:states:ap-southeast-2:123456789012:execution:icav2WesEventToWrscEvent:abcd"
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "isAccepted": false
+#     # }
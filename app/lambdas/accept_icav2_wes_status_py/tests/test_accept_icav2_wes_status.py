@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the accept_icav2_wes_status handler
+"""
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.wes_status_guard import WesStatusGuard
+
+# Globals
+PORTAL_RUN_ID = "20250101abcd1234"
+EXECUTION_ARN = "arn:aws:states:local:000000000000:execution:icav2WesEventToWrscEvent:1"
+
+
+@pytest.fixture
+def accept_icav2_wes_status(import_lambda_module):
+    return import_lambda_module("accept_icav2_wes_status")
+
+
+def test_claimed_status_is_accepted(accept_icav2_wes_status):
+    assert WesStatusGuard().claim(PORTAL_RUN_ID, "RUNNING", "analysis", EXECUTION_ARN) is None
+    event = {"portalRunId": PORTAL_RUN_ID, "executionArn": EXECUTION_ARN}
+    assert accept_icav2_wes_status.handler(event, None) == {"isAccepted": True}
+    assert WesStatusGuard().store.get(PORTAL_RUN_ID)["status"] == "RUNNING"
+
+
+def test_unclaimed_status_is_not_accepted(accept_icav2_wes_status):
+    event = {"portalRunId": PORTAL_RUN_ID, "executionArn": EXECUTION_ARN}
+    assert accept_icav2_wes_status.handler(event, None) == {"isAccepted": False}
+    assert WesStatusGuard().store.get(PORTAL_RUN_ID) is None
@@ -15,6 +15,10 @@ from typing import Dict, Any
 
 # Layer imports
 from orcabus_api_tools.workflow import add_comment_to_workflow_run
+from sash_tools.bootstrap import bootstrap
+from sash_tools.comment_ledger import CommentLedger
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 # Globals
 WORKFLOW_NAME_ENV_VAR = "WORKFLOW_NAME"
@@ -32,6 +36,11 @@ COMMENT_TEMPLATES = {
 }
 
 
+bootstrap()
+
+
+@trace_handler
+@profile_handler
 def handler(event: Dict[str, Any], context) -> Dict[str, bool]:
     """
     Add a comment to the workflow run indicating the current populate-draft-data stage.
@@ -46,7 +55,7 @@ def handler(event: Dict[str, Any], context) -> Dict[str, bool]:
 
     Returns:
     {
-        "commentAdded": true
+        "commentAdded": true  // false if the same comment was already added, see sash_tools.comment_ledger
     }
     """
     workflow_run_id = event["workflowRunId"]
@@ -68,6 +77,11 @@ def handler(event: Dict[str, Any], context) -> Dict[str, bool]:
     elif comment_type == "no_change_missing_fields":
         body = body.format(missing_fields_list="\n- (none detected)", repo_url=repo_url)
 
+    # Skip the comment if this run has the same comment already, i.e. a draft stuck in the populate loop
+    comment_ledger = CommentLedger()
+    if comment_ledger.is_suppressed(workflow_run_id, comment_type, body):
+        return {"commentAdded": False}
+
     footer = f"---\nStep Functions Execution: {execution_arn}"
 
     full_comment = f"{body}\n{footer}"
@@ -83,6 +97,7 @@ def handler(event: Dict[str, Any], context) -> Dict[str, bool]:
         comment=full_comment,
         author=author,
     )
+    comment_ledger.record(workflow_run_id, comment_type, body)
 
     return {"commentAdded": True}
 
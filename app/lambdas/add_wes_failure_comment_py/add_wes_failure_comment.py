@@ -11,12 +11,22 @@ from os import environ
 from orcabus_api_tools.workflow import (
     add_comment_to_workflow_run, get_workflow_run_from_portal_run_id
 )
+from sash_tools.bootstrap import bootstrap
+from sash_tools.comment_ledger import CommentLedger
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 # Globals
 WORKFLOW_NAME_ENV_VAR = "WORKFLOW_NAME"
 COMMENT_AUTHOR = "{WORKFLOW_NAME}-workflow-service"
+COMMENT_TYPE = "wes_failure"
 
 
+bootstrap()
+
+
+@trace_handler
+@profile_handler
 def handler(event, context) -> dict:
     """
     Add a comment to the ICA analysis indicating failure.
@@ -34,6 +44,16 @@ def handler(event, context) -> dict:
 
     # Construct the comment body
     body = f"The workflow has failed with error type '{error_type}', full traceback can be found at '{error_message_uri}'"
+
+    # Skip the comment if it has already been added, i.e. on a retried execution
+    comment_ledger = CommentLedger()
+    if comment_ledger.is_suppressed(workflow_run_id, COMMENT_TYPE, body):
+        return {
+            "status": "comment_suppressed",
+            "portalRunId": portal_run_id,
+            "workflowRunId": workflow_run_id
+        }
+
     footer = f"---\nStep Functions Execution: {execution_arn}"
     full_comment = f"{body}\n{footer}"
 
@@ -52,6 +72,7 @@ def handler(event, context) -> dict:
             WORKFLOW_NAME=environ.get(WORKFLOW_NAME_ENV_VAR, "unknown")
         )
     )
+    comment_ledger.record(workflow_run_id, COMMENT_TYPE, body)
 
     return {
         "status": "comment_added",
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the add_wes_failure_comment handler, a retried execution does not comment twice
+"""
+
+# Test imports
+import pytest
+
+# Globals
+EVENT = {
+    "errorType": "States.TaskFailed",
+    "errorMessageUri": "s3://bucket/errors/SBJ00001sash.txt",
+    "portalRunId": "SBJ00001sash",
+    "executionArn": "arn:aws:states:ap-southeast-2:123456789012:execution:sash:first",
+}
+
+
+@pytest.fixture
+def add_wes_failure_comment(import_lambda_module):
+    return import_lambda_module("add_wes_failure_comment")
+
+
+def test_comment_is_added_once(add_wes_failure_comment, orcabus_fixture):
+    response = add_wes_failure_comment.handler(EVENT, None)
+    assert response["status"] == "comment_added"
+    assert len(orcabus_fixture.comments) == 1
+    assert EVENT["executionArn"] in orcabus_fixture.comments[0]["comment"]
+
+    # A retried execution, with its own execution arn
+    response = add_wes_failure_comment.handler(
+        {**EVENT, "executionArn": "arn:aws:states:ap-southeast-2:123456789012:execution:sash:retry"}, None
+    )
+    assert response["status"] == "comment_suppressed"
+    assert response["workflowRunId"] == orcabus_fixture.comments[0]["workflowRunId"]
+    assert len(orcabus_fixture.comments) == 1
+
+
+def test_another_failure_is_commented(add_wes_failure_comment, orcabus_fixture):
+    add_wes_failure_comment.handler(EVENT, None)
+    response = add_wes_failure_comment.handler({**EVENT, "errorType": "States.Timeout"}, None)
+    assert response["status"] == "comment_added"
+    assert len(orcabus_fixture.comments) == 2
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""
+Cache the workflow run and payload of a READY event
+
+Called by the READY state machine as it makes the ICAv2 WES request, so convert_icav2_wes_event_to_wrsc_event
+can build the WRSC events of the run's intermediate statuses without looking up the run and its payload
+(see sash_tools.run_payload_cache).
+"""
+
+# Layer imports
+from sash_tools.run_payload_cache import RunPayloadCache
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Cache the run of the READY event detail
+
+    Input:
+      {
+        "workflowRunStateChangeEvent": {
+          "orcabusId": "wfr.xxx",
+          "portalRunId": "20250101abcd1234",
+          "workflowRunName": "umccr--automated--sash--0-7-0--20250101abcd1234",
+          "workflow": {"name": "sash", "version": "0.7.0"},
+          "libraries": [{"libraryId": "L1234", "orcabusId": "lib.xxx"}],
+          "payload": {"version": "2025.08.05", "data": {...}}
+        }
+      }
+
+    Output:
+      {
+        "isCached": true | false  # false if the payload is too large to cache
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    return {
+        "isCached": RunPayloadCache().put_from_event_detail(event['workflowRunStateChangeEvent'])
+    }
+
+
+# if __name__ == "__main__":
+#     import json
+#     from os import environ
+#     environ['STATE_STORE_BACKEND'] = 'local'
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "workflowRunStateChangeEvent": {
+#                     "orcabusId": "wfr.01JBMVHM2D5GCDT8Z9T5XVD1MS",
+#                     "portalRunId": "20250101abcd1234",
+#                     "workflowRunName": "umccr--automated--sash--0-7-0--20250101abcd1234",
+#                     "workflow": {
+#                         "name": "sash",
+#                         "version": "0.7.0"
+#                     },
+#                     "status": "READY",
+#                     "libraries": [
+#                         {
+#                             "libraryId": "L2401540",
+#                             "orcabusId": "lib.01JBMVHM2D5GCDT8Z9T5XVD1MS"
+#                         }
+#                     ],
+#                     "payload": {
+#                         "version": "2025.08.05",
+#                         "data": {
+#                             "inputs": {
+#                                 "groupId": "SBJ00001"
+#                             }
+#                         }
+#                     }
+#                 }
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "isCached": true
+#     # }
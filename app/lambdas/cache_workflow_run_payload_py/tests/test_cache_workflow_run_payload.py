@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the cache_workflow_run_payload handler
+"""
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import run_payload_cache
+from sash_tools.run_payload_cache import RunPayloadCache
+
+
+@pytest.fixture
+def cache_workflow_run_payload(import_lambda_module):
+    return import_lambda_module("cache_workflow_run_payload")
+
+
+@pytest.fixture
+def ready_event_detail(orcabus_fixture):
+    from tools import local_stand_ins
+
+    return next(filter(
+        lambda event_iter_: event_iter_[1]["status"] == "READY", local_stand_ins.get_subject_events()
+    ))[1]
+
+
+def test_ready_run_is_cached(cache_workflow_run_payload, ready_event_detail):
+    assert cache_workflow_run_payload.handler({"workflowRunStateChangeEvent": ready_event_detail}, None) == {
+        "isCached": True
+    }
+    assert RunPayloadCache().get(ready_event_detail["portalRunId"])["payload"] == ready_event_detail["payload"]
+
+
+def test_large_payload_is_not_cached(cache_workflow_run_payload, ready_event_detail, monkeypatch):
+    monkeypatch.setattr(run_payload_cache, "MAX_CACHED_PAYLOAD_BYTES", 64)
+    assert cache_workflow_run_payload.handler({"workflowRunStateChangeEvent": ready_event_detail}, None) == {
+        "isCached": False
+    }
+    assert RunPayloadCache().get(ready_event_detail["portalRunId"]) is None
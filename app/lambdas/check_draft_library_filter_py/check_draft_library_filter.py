@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Check the libraries of an upstream SUCCEEDED event against the draft library filter
+
+The first step of the glue state machine, events whose libraries are in no open sash draft
+(see sash_tools.draft_library_filter) end the execution before the workflow run object and draft lookups.
+An event that is not a member is checked again, after recheckAfterSeconds, before it is dropped,
+so the libraries of a draft created just before the event have been added to the filter.
+"""
+
+# Layer imports
+from sash_tools.draft_library_filter import DraftLibraryFilter
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+# Globals
+MEMBER_FILTER_STATUS = "member"
+NOT_MEMBER_FILTER_STATUS = "notMember"
+UNAVAILABLE_FILTER_STATUS = "unavailable"
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Check if any library of the SUCCEEDED run may be in an open sash draft
+
+    Input:
+      {
+        "libraries": [{"libraryId": "L1234"}],
+        "isRecheck": true | false  (optional, the check after recheckAfterSeconds)
+      }
+
+    Output:
+      {
+        "isRelevant": true | false,  # false if no open draft has any of the libraries
+        "filterStatus": "member" | "notMember" | "unavailable",  # unavailable if there is no current filter
+        "recheckAfterSeconds": 60  # 0 unless the event is not a member on its first check
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    library_id_list = list(map(
+        lambda library_iter_: library_iter_['libraryId'],
+        event.get('libraries') or []
+    ))
+
+    is_recheck = event.get('isRecheck', False)
+
+    draft_library_filter = DraftLibraryFilter()
+    is_member = draft_library_filter.check(library_id_list, is_recheck=is_recheck)
+
+    if is_member is None:
+        # No filter to check against, the event goes on to the draft lookup
+        return {
+            "isRelevant": True,
+            "filterStatus": UNAVAILABLE_FILTER_STATUS,
+            "recheckAfterSeconds": 0,
+        }
+
+    return {
+        "isRelevant": is_member,
+        "filterStatus": MEMBER_FILTER_STATUS if is_member else NOT_MEMBER_FILTER_STATUS,
+        "recheckAfterSeconds": (
+            int(draft_library_filter.settle_seconds)
+            if draft_library_filter.needs_recheck(is_member, is_recheck) else 0
+        ),
+    }
+
+
+# if __name__ == "__main__":
+#     import json
+#     from os import environ
+#     environ['STATE_STORE_BACKEND'] = 'local'
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "libraries": [
+#                     {
+#                         "libraryId": "L2401540",
+#                         "orcabusId": "lib.01JBMVHM2D5GCDT8Z9T5XVD1MS"
+#                     }
+#                 ]
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "isRelevant": false,
+#     #     "filterStatus": "notMember",
+#     #     "recheckAfterSeconds": 60
+#     # }
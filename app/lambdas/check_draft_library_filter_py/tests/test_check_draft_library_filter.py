@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the check_draft_library_filter handler, and of the glue state machine checking an event
+that is not a member again before dropping it
+"""
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.draft_library_filter import DraftLibraryFilter
+
+# Globals
+STATE_MACHINE_NAME = "glue_succeeded_events_to_draft_update"
+CHECK_LAMBDA_NAME = "check_draft_library_filter"
+
+
+@pytest.fixture
+def check_draft_library_filter(import_lambda_module):
+    return import_lambda_module(CHECK_LAMBDA_NAME)
+
+
+@pytest.fixture
+def rebuilt_filter():
+    # A filter without the libraries of the fixture's sash draft, as if the draft was created since the rebuild
+    DraftLibraryFilter().rebuild(["L9999999"], draft_count=1)
+
+
+def test_member(check_draft_library_filter, rebuilt_filter):
+    assert check_draft_library_filter.handler({"libraries": [{"libraryId": "L9999999"}]}, None) == {
+        "isRelevant": True,
+        "filterStatus": "member",
+        "recheckAfterSeconds": 0,
+    }
+
+
+def test_not_a_member_is_checked_again(check_draft_library_filter, rebuilt_filter):
+    event = {"libraries": [{"libraryId": "L2400001"}]}
+    assert check_draft_library_filter.handler(event, None) == {
+        "isRelevant": False,
+        "filterStatus": "notMember",
+        "recheckAfterSeconds": 60,
+    }
+    assert check_draft_library_filter.handler({**event, "isRecheck": True}, None) == {
+        "isRelevant": False,
+        "filterStatus": "notMember",
+        "recheckAfterSeconds": 0,
+    }
+
+
+def test_no_recheck_without_a_settle_window(check_draft_library_filter, rebuilt_filter, monkeypatch):
+    from sash_tools import draft_library_filter
+    monkeypatch.setenv(draft_library_filter.DRAFT_LIBRARY_FILTER_SETTLE_SECONDS_ENV_VAR, "0")
+    assert check_draft_library_filter.handler({"libraries": [{"libraryId": "L2400001"}]}, None)[
+        "recheckAfterSeconds"
+    ] == 0
+
+
+def test_unavailable_filter(check_draft_library_filter):
+    assert check_draft_library_filter.handler({"libraries": [{"libraryId": "L2400001"}]}, None) == {
+        "isRelevant": True,
+        "filterStatus": "unavailable",
+        "recheckAfterSeconds": 0,
+    }
+
+
+def run_glue_state_machine(add_pending_after_the_first_check: bool):
+    pytest.importorskip("jsonata")
+    pytest.importorskip("requests")
+    from tools import local_stand_ins
+    from tools.asl_executor import LocalStateMachineExecutor, get_template_path, load_definition, load_lambda_handlers
+
+    lambda_handlers = load_lambda_handlers(local_stand_ins)
+    check_handler = lambda_handlers[CHECK_LAMBDA_NAME]
+
+    def _check_handler(event, context):
+        response = check_handler(event, context)
+        if add_pending_after_the_first_check and not event.get("isRecheck"):
+            # The DRAFT event of the subject is indexed while the execution waits
+            DraftLibraryFilter().add_pending(["L2400001", "L2400002"])
+        return response
+
+    lambda_handlers[CHECK_LAMBDA_NAME] = _check_handler
+    _, dragen_succeeded_event = local_stand_ins.get_subject_events()[0]
+    return LocalStateMachineExecutor(
+        load_definition(get_template_path(STATE_MACHINE_NAME)),
+        lambda_handlers,
+        dict(local_stand_ins.SSM_PARAMETERS),
+        STATE_MACHINE_NAME,
+    ).start_execution(dragen_succeeded_event)
+
+
+def test_draft_pending_within_the_settle_window_is_updated(orcabus_fixture, rebuilt_filter):
+    result = run_glue_state_machine(add_pending_after_the_first_check=True)
+    assert result.status == "SUCCEEDED", result.error
+    assert result.stats.lambda_invocations[CHECK_LAMBDA_NAME] == 2
+    assert len(result.put_events) == 1
+
+
+def test_event_still_not_a_member_is_dropped(orcabus_fixture, rebuilt_filter):
+    result = run_glue_state_machine(add_pending_after_the_first_check=False)
+    assert result.status == "SUCCEEDED", result.error
+    assert result.stats.lambda_invocations[CHECK_LAMBDA_NAME] == 2
+    assert result.stats.state_entries["No open sash draft"] == 1
+    assert result.put_events == []
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Check if the payload of an incoming DRAFT event is the payload this service last emitted
+
+The populate draft data state machine records the fingerprint of every fully populated
+payload it emits. When that payload comes back to us as a DRAFT event, re-running the
+population would only query the same upstream services to produce the same payload,
+so we exit early instead.
+
+The schema fields still missing from the payload are recorded with its fingerprint, so a draft that stays
+incomplete is commented on without validating the payload again.
+"""
+
+# Layer imports
+from sash_tools.fingerprint import (
+    get_payload_fingerprint,
+    get_last_emitted_payload
+)
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Compare the incoming payload fingerprint to the last emitted fingerprint for the portal run id
+
+    Input:
+      {
+        "portalRunId": "20250101abcd1234",
+        "payload": {"version": "2025.08.05", "data": {...}}
+      }
+
+    Output:
+      {
+        "isLastEmittedPayload": true | false,
+        "payloadFingerprint": "<sha256>",
+        "missingFields": ["inputs.sequenceData", ...]  # of the last emitted payload, [] if not the last emitted payload
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    portal_run_id = event['portalRunId']
+    payload = event.get('payload', {})
+
+    payload_fingerprint = get_payload_fingerprint(payload)
+    last_emitted_payload = get_last_emitted_payload(portal_run_id)
+    is_last_emitted_payload = (
+        last_emitted_payload is not None and
+        last_emitted_payload['fingerprint'] == payload_fingerprint
+    )
+
+    return {
+        "isLastEmittedPayload": is_last_emitted_payload,
+        "payloadFingerprint": payload_fingerprint,
+        "missingFields": last_emitted_payload['missingFields'] if is_last_emitted_payload else [],
+    }
+
+
+# if __name__ == "__main__":
+#     import json
+#     from os import environ
+#     environ['STATE_STORE_BACKEND'] = 'local'
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "portalRunId": "20250101abcd1234",
+#                 "payload": {
+#                     "version": "2025.08.05",
+#                     "data": {
+#                         "tags": {
+#                             "libraryId": "L2401541"
+#                         }
+#                     }
+#                 }
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "isLastEmittedPayload": false,
+#     #     "payloadFingerprint": "...",
+#     #     "missingFields": []
+#     # }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the check_payload_fingerprint handler, with compare_payload recording the fingerprints
+"""
+
+# Test imports
+import pytest
+
+PORTAL_RUN_ID = "20250101abcd1234"
+PAYLOAD = {"version": "2025.08.05", "data": {"tags": {"libraryId": "L2400001"}}}
+
+
+@pytest.fixture
+def check_payload_fingerprint(import_lambda_module):
+    return import_lambda_module("check_payload_fingerprint")
+
+
+@pytest.fixture
+def compare_payload(import_lambda_module):
+    return import_lambda_module("compare_payload")
+
+
+def test_unseen_payload(check_payload_fingerprint):
+    response = check_payload_fingerprint.handler({"portalRunId": PORTAL_RUN_ID, "payload": PAYLOAD}, None)
+    assert response["isLastEmittedPayload"] is False
+    assert response["missingFields"] == []
+    assert len(response["payloadFingerprint"]) == 64
+
+
+def test_emitted_payload_comes_back(check_payload_fingerprint, compare_payload):
+    assert compare_payload.handler(
+        {
+            "oldPayload": {"version": "2025.08.05", "data": {}},
+            "newPayload": PAYLOAD,
+            "portalRunId": PORTAL_RUN_ID,
+            "recordFingerprint": True,
+        },
+        None
+    ) == {"hasChanged": True}
+
+    # The workflow manager adds its own attributes to the payload of the DRAFT event
+    echoed_payload = {**PAYLOAD, "orcabusId": "pld.01J", "refId": "ref.01J"}
+    assert check_payload_fingerprint.handler(
+        {"portalRunId": PORTAL_RUN_ID, "payload": echoed_payload}, None
+    )["isLastEmittedPayload"] is True
+
+    # Another run with the same payload
+    assert check_payload_fingerprint.handler(
+        {"portalRunId": "20250101efgh5678", "payload": PAYLOAD}, None
+    )["isLastEmittedPayload"] is False
+
+
+def test_unchanged_payload_is_not_recorded(check_payload_fingerprint, compare_payload):
+    assert compare_payload.handler(
+        {"oldPayload": PAYLOAD, "newPayload": PAYLOAD, "portalRunId": PORTAL_RUN_ID, "recordFingerprint": True},
+        None
+    ) == {"hasChanged": False}
+    assert check_payload_fingerprint.handler(
+        {"portalRunId": PORTAL_RUN_ID, "payload": PAYLOAD}, None
+    )["isLastEmittedPayload"] is False
+
+
+def test_fingerprint_is_only_recorded_on_request(check_payload_fingerprint, compare_payload):
+    compare_payload.handler(
+        {"oldPayload": {"data": {}}, "newPayload": PAYLOAD, "portalRunId": PORTAL_RUN_ID}, None
+    )
+    assert check_payload_fingerprint.handler(
+        {"portalRunId": PORTAL_RUN_ID, "payload": PAYLOAD}, None
+    )["isLastEmittedPayload"] is False
+
+
+def test_missing_fields_are_recorded_with_the_fingerprint(check_payload_fingerprint, compare_payload):
+    compare_payload.handler(
+        {
+            "oldPayload": {"version": "2025.08.05", "data": {}},
+            "newPayload": PAYLOAD,
+            "portalRunId": PORTAL_RUN_ID,
+            "recordFingerprint": True,
+            "missingFields": ["inputs.oncoanalyserDnaDir"],
+        },
+        None
+    )
+    assert check_payload_fingerprint.handler(
+        {"portalRunId": PORTAL_RUN_ID, "payload": PAYLOAD}, None
+    )["missingFields"] == ["inputs.oncoanalyserDnaDir"]
+
+    # Not for another payload of the run
+    other_payload = {"version": "2025.08.05", "data": {"tags": {"libraryId": "L2400002"}}}
+    assert check_payload_fingerprint.handler(
+        {"portalRunId": PORTAL_RUN_ID, "payload": other_payload}, None
+    )["missingFields"] == []
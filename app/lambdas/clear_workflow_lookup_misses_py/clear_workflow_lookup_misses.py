@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Clear the cached upstream workflow lookup misses of an upstream SUCCEEDED event
+
+find_latest_workflow caches the SUCCEEDED lookups that found no run (see sash_tools.negative_cache).
+The glue state machine calls this lambda for every upstream SUCCEEDED event, before updating the drafts,
+so the next lookup for the event's libraries queries the Workflow Manager again.
+
+The SUCCEEDED run itself is put in the workflow run index (see sash_tools.workflow_run_index).
+The index_workflow_run_state_change lambda gets the same event from another event rule, in no particular order,
+so a lookup backfilled before the run succeeded would otherwise still find no run, or the run in its earlier state.
+"""
+
+# Layer imports
+from sash_tools.negative_cache import NegativeLookupCache
+from sash_tools.workflow_run_index import (
+    get_workflow_run_from_event_detail,
+    get_workflow_run_index
+)
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Invalidate the lookup misses for the workflow name and libraries of the SUCCEEDED run, and index the run
+
+    Input:
+      {
+        "workflowName": "dragen-wgts-dna",
+        "libraries": [{"libraryId": "L1234"}],
+        "analysisRunId": "anr.xxx"  (optional),
+        "workflowRun": {...}  (optional, the WorkflowRunStateChange event detail of the SUCCEEDED run)
+      }
+
+    Output:
+      {
+        "libraryIdList": ["L1234"],
+        "isIndexed": true | false  # false without a workflowRun, or if the index already has a later state of the run
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    library_id_list = list(map(
+        lambda library_iter_: library_iter_['libraryId'],
+        event.get('libraries') or []
+    ))
+
+    NegativeLookupCache().invalidate(
+        workflow_name=event['workflowName'],
+        library_id_list=library_id_list,
+        analysis_run_id=event.get('analysisRunId'),
+    )
+
+    workflow_run = event.get('workflowRun')
+
+    return {
+        "libraryIdList": library_id_list,
+        "isIndexed": (
+            get_workflow_run_index().put_run(get_workflow_run_from_event_detail(workflow_run))
+            if workflow_run else False
+        ),
+    }
+
+
+# if __name__ == "__main__":
+#     import json
+#     from os import environ
+#     environ['STATE_STORE_BACKEND'] = 'local'
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "workflowName": "dragen-wgts-dna",
+#                 "libraries": [
+#                     {
+#                         "libraryId": "L2401540",
+#                         "orcabusId": "lib.01JBMVHM2D5GCDT8Z9T5XVD1MS"
+#                     }
+#                 ],
+#                 "analysisRunId": None
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "libraryIdList": [
+#     #         "L2401540"
+#     #     ],
+#     #     "isIndexed": false
+#     # }
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the clear_workflow_lookup_misses handler
+"""
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.negative_cache import NegativeLookupCache, get_lookup
+
+# Globals
+WORKFLOW_NAME = "dragen-wgts-dna"
+
+
+@pytest.fixture
+def clear_workflow_lookup_misses(import_lambda_module):
+    return import_lambda_module("clear_workflow_lookup_misses")
+
+
+def test_succeeded_event_clears_the_misses(clear_workflow_lookup_misses, monkeypatch):
+    from sash_tools import negative_cache
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(negative_cache, "time", lambda: now[0])
+
+    lookup = get_lookup(WORKFLOW_NAME, ["L2400001", "L2400002"])
+    NegativeLookupCache().record_miss(lookup, looked_up_at=now[0])
+    assert NegativeLookupCache().is_miss(lookup)
+
+    now[0] += 1
+    assert clear_workflow_lookup_misses.handler(
+        {"workflowName": WORKFLOW_NAME, "libraries": [{"libraryId": "L2400001", "orcabusId": "lib.01J"}]},
+        None
+    ) == {"libraryIdList": ["L2400001"], "isIndexed": False}
+    assert not NegativeLookupCache().is_miss(lookup)
+
+
+def test_event_without_libraries(clear_workflow_lookup_misses):
+    assert clear_workflow_lookup_misses.handler(
+        {"workflowName": WORKFLOW_NAME, "libraries": None, "analysisRunId": "anr.01J"}, None
+    ) == {"libraryIdList": [], "isIndexed": False}
+
+
+def test_succeeded_run_is_indexed(clear_workflow_lookup_misses):
+    from sash_tools.workflow_run_index import get_workflow_run_index
+    lookup = get_lookup(WORKFLOW_NAME, ["L2400001"])
+    get_workflow_run_index().backfill(lookup, [])
+
+    workflow_run = {
+        "orcabusId": "wfr.01J",
+        "portalRunId": "20250101abcd1234",
+        "workflow": {"name": WORKFLOW_NAME, "version": "4.4.4"},
+        "status": "SUCCEEDED",
+        "timestamp": "2025-01-01T00:00:00Z",
+        "libraries": [{"libraryId": "L2400001", "orcabusId": "lib.01J"}],
+    }
+    assert clear_workflow_lookup_misses.handler(
+        {"workflowName": WORKFLOW_NAME, "libraries": workflow_run["libraries"], "workflowRun": workflow_run}, None
+    )["isIndexed"]
+    assert list(map(
+        lambda workflow_run_iter_: workflow_run_iter_["portalRunId"], get_workflow_run_index().find_runs(lookup)
+    )) == ["20250101abcd1234"]
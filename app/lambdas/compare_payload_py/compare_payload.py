@@ -5,13 +5,30 @@ Compare the payload of the original portal run id and that of the new object
 
 We dont want to accidentally end up in an infinite loop, so we only want to push a WRU / WRSC event if
 the payload has changed
+
+Payloads are compared by their canonical json (sorted keys), which treats payloads the same way
+a deep diff would (key order is ignored, list order and value types are not)
+
+If recordFingerprint is set, the fingerprint of a changed new payload is stored against the portal run id,
+with the schema fields still missing from it (missingFields), so that when the payload comes back to us as
+a DRAFT event we can exit early (see check_payload_fingerprint)
+
+The old payload may be a claim check reference (see sash_tools.claim_check)
 """
 
-# Standard library imports
-from deepdiff import DeepDiff
-from typing import Dict, Any
-from requests import HTTPError
+# Layer imports
+from sash_tools.claim_check import resolve_claim_checks
+from sash_tools.fingerprint import (
+    get_payload_fingerprint,
+    set_last_emitted_payload_fingerprint,
+    to_canonical_json
+)
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
 
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Get the latest payload from the portal run id and compare it to the new object payload
@@ -19,13 +36,27 @@ def handler(event, context):
     :param context:
     :return:
     """
+    event = resolve_claim_checks(event, ['oldPayload'])
+
     old_payload = event['oldPayload']
     new_payload = event['newPayload']
+    portal_run_id = event.get('portalRunId', None)
+    record_fingerprint = event.get('recordFingerprint', False)
+    missing_fields = event.get('missingFields', [])
 
-    if not DeepDiff(old_payload, new_payload):
+    if to_canonical_json(old_payload) == to_canonical_json(new_payload):
         return {
             "hasChanged": False
         }
+
+    # The new payload is about to be emitted, record its fingerprint
+    if record_fingerprint and portal_run_id is not None:
+        set_last_emitted_payload_fingerprint(
+            portal_run_id,
+            get_payload_fingerprint(new_payload),
+            missing_fields=missing_fields
+        )
+
     return {
         "hasChanged": True
     }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Shared fixtures of the lambda tests
+
+The handlers run as they do locally (see tools/local_stand_ins), against the in-memory
+orcabus_api_tools stand-ins, installed here before any handler module is imported,
+the memory state store and an empty workflow run index.
+
+    def test_handler(import_lambda_module, orcabus_fixture):
+        check_payload_fingerprint = import_lambda_module("check_payload_fingerprint")
+        ...
+"""
+
+# Standard imports
+import sys
+from importlib import import_module
+from pathlib import Path
+from types import ModuleType
+from typing import Callable
+
+# Test imports
+import pytest
+
+# Globals
+APP_DIR = Path(__file__).parent.parent
+LAMBDAS_DIR = APP_DIR / "lambdas"
+SASH_TOOLS_LAYER_DIR = APP_DIR / "layers" / "sash_tools_layer" / "python"
+
+for path in [APP_DIR, SASH_TOOLS_LAYER_DIR]:
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# Local imports
+from tools import local_stand_ins  # noqa: E402
+
+local_stand_ins.install()
+
+SUBJECT_ID = "SBJ00001"
+NORMAL_LIBRARY_ID = "L2400001"
+TUMOR_LIBRARY_ID = "L2400002"
+
+
+@pytest.fixture(autouse=True)
+def memory_state_store(monkeypatch):
+    from sash_tools import state_store
+
+    monkeypatch.setenv(state_store.STATE_STORE_BACKEND_ENV_VAR, "memory")
+    monkeypatch.delenv(state_store.STATE_TABLE_NAME_ENV_VAR, raising=False)
+    state_store._MEMORY_STORE.clear()
+    yield state_store._MEMORY_STORE
+    state_store._MEMORY_STORE.clear()
+
+
+@pytest.fixture(autouse=True)
+def empty_workflow_run_index(monkeypatch):
+    # The in-memory sqlite index is kept at module level, start each test from an empty index
+    from sash_tools import workflow_run_index
+
+    monkeypatch.delenv(workflow_run_index.WORKFLOW_RUN_INDEX_BACKEND_ENV_VAR, raising=False)
+    monkeypatch.setattr(workflow_run_index, "_WORKFLOW_RUN_INDEXES", {})
+
+
+@pytest.fixture
+def orcabus_fixture() -> local_stand_ins.LocalOrcabusFixture:
+    """
+    A fresh set of OrcaBus records with one subject, its upstream runs and a sash DRAFT run
+    """
+    default_fixture = local_stand_ins.get_fixture()
+    fixture = local_stand_ins.LocalOrcabusFixture()
+    fixture.add_subject(SUBJECT_ID, normal_library_id=NORMAL_LIBRARY_ID, tumor_library_id=TUMOR_LIBRARY_ID)
+    local_stand_ins.set_fixture(fixture)
+    yield fixture
+    local_stand_ins.set_fixture(default_fixture)
+
+
+@pytest.fixture
+def import_lambda_module() -> Callable[[str], ModuleType]:
+    """
+    Import the handler module of a lambda, as the local tools do
+    """
+    def _import_lambda_module(lambda_name: str) -> ModuleType:
+        lambda_dir = LAMBDAS_DIR / f"{lambda_name}_py"
+        if str(lambda_dir) not in sys.path:
+            sys.path.append(str(lambda_dir))
+        is_imported = lambda_name in sys.modules
+        module = import_module(lambda_name)
+        if not is_imported and lambda_name in local_stand_ins.LAMBDA_MODULE_PATCHES:
+            local_stand_ins.LAMBDA_MODULE_PATCHES[lambda_name](module)
+        return module
+
+    return _import_lambda_module
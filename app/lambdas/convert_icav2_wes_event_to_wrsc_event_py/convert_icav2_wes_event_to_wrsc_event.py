@@ -4,26 +4,89 @@
 Given the outputs of an icav2 wes event, convert to a wrsc event
 
 If the workflow has succeeded, we need to generate the sashRelPath
-which is just the groupId from the event inputs.
+which is just the groupId from the event inputs, and the manifest of the key result files
+under the outputUri (see sash_tools.output_manifest), from one paginated Filemanager listing
+read a page at a time.
+
+Duplicate and out of order (i.e. a late RUNNING after SUCCEEDED) events are dropped
+before any Workflow Manager call, otherwise the execution claims the run until its WRSC event is pushed
+(accept_icav2_wes_status) or the execution fails (release_icav2_wes_status), see sash_tools.wes_status_guard.
+
+The workflow run and payload of intermediate statuses are read from the run payload cache, filled
+by the READY state machine (see sash_tools.run_payload_cache). Terminal statuses, and runs missing from
+the cache, look them up from the Workflow Manager.
 """
 
 # Standard imports
 from copy import deepcopy
 from datetime import datetime, timezone
+from typing import Any, Dict, Iterator
+from urllib.parse import urlparse
 
 # Layer helpers
+from orcabus_api_tools.filemanager import get_file_manager_request
 from orcabus_api_tools.workflow import (
     get_latest_payload_from_workflow_run,
     get_workflow_run_from_portal_run_id
 )
+from sash_tools.bootstrap import bootstrap
+from sash_tools.output_manifest import get_output_manifest
+from sash_tools.run_payload_cache import RunPayloadCache
+from sash_tools.wes_status_guard import TERMINAL_STATUSES, WesStatusGuard
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+# Globals
+FILEMANAGER_S3_ENDPOINT = "api/v1/s3"
+FILEMANAGER_ROWS_PER_PAGE = 1000
 
 
+bootstrap()
+
+
+def iter_filemanager_files(bucket: str, key_prefix: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the current file objects under the prefix, requesting the next Filemanager page
+    only once the previous page is consumed, so at most one page is held at a time
+    """
+    page_number = 1
+    while True:
+        response = get_file_manager_request(
+            endpoint=FILEMANAGER_S3_ENDPOINT,
+            params={
+                "bucket": bucket,
+                "key": f"{key_prefix}*",
+                "currentState": "true",
+                "page": page_number,
+                "rowsPerPage": FILEMANAGER_ROWS_PER_PAGE,
+            }
+        )
+        yield from response.get('results', [])
+        if not response.get('results') or not (response.get('links') or {}).get('next'):
+            return
+        page_number += 1
+
+
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Perform the following steps:
     1. Get portal run ID from ICAv2 WES Event Tags
-    2. Look up workflow run / payload using the portal run ID
-    3. Generate the WRSC Event payload based on the existing WRSC Event payload
+    2. Drop the event if it is a duplicate or older than the last accepted status of the run,
+       otherwise claim the run for the event (raises Icav2WesStatusClaimPendingError while another execution holds it)
+    3. Get the workflow run / payload from the run payload cache, or look them up using the portal run ID
+    4. Generate the WRSC Event payload based on the existing WRSC Event payload,
+       with the sashRelPath and output manifest as outputs if the run succeeded
+
+    Dropped events return
+      {
+        "workflowRunStateChangeEvent": null,
+        "errorMessageUri": null,
+        "errorType": null,
+        "isDropped": true,
+        "dropReason": "duplicate" | "regressive"
+      }
     :param event:
     :param context:
     :return:
@@ -38,19 +101,56 @@ def handler(event, context):
     # Get the ICAv2 analysis ID from the WES event
     icav2_analysis_id = icav2_wes_event.get('icav2AnalysisId')
 
-    # Get the workflow run using the portal run ID
-    workflow_run = get_workflow_run_from_portal_run_id(portal_run_id)
+    # Drop duplicate and regressive events before any Workflow Manager call
+    drop_reason = WesStatusGuard().claim(
+        portal_run_id,
+        icav2_wes_event['status'],
+        analysis_id=icav2_analysis_id,
+        execution_arn=event.get('executionArn'),
+    )
+    if drop_reason is not None:
+        return {
+            "workflowRunStateChangeEvent": None,
+            "errorMessageUri": None,
+            "errorType": None,
+            "isDropped": True,
+            "dropReason": drop_reason,
+        }
+
+    # Intermediate statuses are built from the cached run, terminal statuses look up the latest payload
+    run_payload_cache = RunPayloadCache()
+    is_terminal_status = icav2_wes_event['status'] in TERMINAL_STATUSES
+    cached_run = run_payload_cache.get(portal_run_id) if not is_terminal_status else None
+
+    if cached_run is not None:
+        workflow_run = cached_run['workflowRun']
+        latest_payload = cached_run['payload']
+    else:
+        # Get the workflow run using the portal run ID
+        workflow_run = get_workflow_run_from_portal_run_id(portal_run_id)
+
+        # Get the latest payload from the workflow run
+        latest_payload = get_latest_payload_from_workflow_run(workflow_run['orcabusId'])
 
-    # Get the latest payload from the workflow run
-    latest_payload = get_latest_payload_from_workflow_run(workflow_run['orcabusId'])
+    # No more state changes are expected for the run
+    if is_terminal_status:
+        run_payload_cache.invalidate(portal_run_id)
 
     # Check if the status was SUCCEEDED, if so we populate the 'outputs' data payload
     if icav2_wes_event['status'] == 'SUCCEEDED':
         # Get the workflow run inputs
         workflow_run_inputs = latest_payload['data']['inputs']
+        # List the run's outputs once, keeping only the key result files
+        output_uri = urlparse(latest_payload['data']['engineParameters']['outputUri'])
+        output_key_prefix = output_uri.path.lstrip("/")
         # We want to generate the following output dict
         outputs = {
           "sashRelPath": f"{workflow_run_inputs['groupId']}/",
+          "outputManifest": get_output_manifest(
+              bucket=output_uri.netloc,
+              key_prefix=output_key_prefix,
+              file_objects=iter_filemanager_files(output_uri.netloc, output_key_prefix),
+          ),
         }
     else:
         outputs = None
@@ -99,4 +199,6 @@ def handler(event, context):
         },
         "errorMessageUri": error_message_uri,
         "errorType": error_type,
+        "isDropped": False,
+        "dropReason": None,
     }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the convert_icav2_wes_event_to_wrsc_event handler guard and run payload cache, and of the state machine
+recording the accepted status only once the WRSC event is pushed
+"""
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.run_payload_cache import RunPayloadCache
+from sash_tools.wes_status_guard import Icav2WesStatusClaimPendingError, WesStatusGuard
+
+# Globals
+PORTAL_RUN_ID = "SBJ00001sashready"
+STATE_MACHINE_NAME = "icav2_wes_event_to_wrsc_event"
+EXECUTION_ARN = "arn:aws:states:local:000000000000:execution:icav2WesEventToWrscEvent:{}"
+
+
+@pytest.fixture
+def convert_icav2_wes_event_to_wrsc_event(import_lambda_module):
+    return import_lambda_module("convert_icav2_wes_event_to_wrsc_event")
+
+
+def get_event(status: str, execution: str):
+    return {
+        "icav2WesStateChangeEvent": {
+            "id": "iwa.local",
+            "status": status,
+            "tags": {"portalRunId": PORTAL_RUN_ID},
+            "icav2AnalysisId": "00000000-0000-0000-0000-000000000000",
+        },
+        "executionArn": EXECUTION_ARN.format(execution),
+    }
+
+
+def test_event_claims_the_run(convert_icav2_wes_event_to_wrsc_event, orcabus_fixture):
+    response = convert_icav2_wes_event_to_wrsc_event.handler(get_event("RUNNING", "1"), None)
+    assert not response["isDropped"]
+    assert response["workflowRunStateChangeEvent"]["status"] == "RUNNING"
+
+    # Not accepted until the WRSC event is pushed
+    entry = WesStatusGuard().store.get(PORTAL_RUN_ID)
+    assert entry.get("status") is None
+    assert entry["claim"]["executionArn"] == EXECUTION_ARN.format("1")
+
+
+def test_duplicate_waits_on_the_claim_then_is_dropped(convert_icav2_wes_event_to_wrsc_event, orcabus_fixture):
+    convert_icav2_wes_event_to_wrsc_event.handler(get_event("RUNNING", "1"), None)
+    with pytest.raises(Icav2WesStatusClaimPendingError):
+        convert_icav2_wes_event_to_wrsc_event.handler(get_event("RUNNING", "2"), None)
+
+    WesStatusGuard().accept(PORTAL_RUN_ID, EXECUTION_ARN.format("1"))
+    workflow_manager_calls = orcabus_fixture.api_calls["get_workflow_run_from_portal_run_id"]
+    assert convert_icav2_wes_event_to_wrsc_event.handler(get_event("RUNNING", "2"), None) == {
+        "workflowRunStateChangeEvent": None,
+        "errorMessageUri": None,
+        "errorType": None,
+        "isDropped": True,
+        "dropReason": "duplicate",
+    }
+    # Dropped before any Workflow Manager call
+    assert orcabus_fixture.api_calls["get_workflow_run_from_portal_run_id"] == workflow_manager_calls
+
+
+@pytest.fixture
+def executor(orcabus_fixture):
+    pytest.importorskip("jsonata")
+    from tools import local_stand_ins
+    from tools.asl_executor import LocalStateMachineExecutor, get_template_path, load_definition, load_lambda_handlers
+
+    return LocalStateMachineExecutor(
+        load_definition(get_template_path(STATE_MACHINE_NAME)),
+        load_lambda_handlers(local_stand_ins),
+        dict(local_stand_ins.SSM_PARAMETERS),
+        STATE_MACHINE_NAME,
+    )
+
+
+def test_status_is_accepted_after_the_push(executor):
+    event = get_event("RUNNING", "1")["icav2WesStateChangeEvent"]
+    result = executor.start_execution(event)
+    assert result.status == "SUCCEEDED", result.error
+    assert len(result.put_events) == 1
+
+    entry = WesStatusGuard().store.get(PORTAL_RUN_ID)
+    assert (entry["status"], entry["executionArn"], entry["claim"]) == ("RUNNING", result.execution_id, None)
+
+    # The redelivered event is dropped
+    result = executor.start_execution(event)
+    assert result.status == "SUCCEEDED", result.error
+    assert result.put_events == []
+
+
+def test_failed_execution_releases_its_claim(executor, convert_icav2_wes_event_to_wrsc_event, monkeypatch):
+    def _get_workflow_run_from_portal_run_id(portal_run_id: str):
+        raise ConnectionError("The Workflow Manager is unavailable")
+
+    event = get_event("RUNNING", "1")["icav2WesStateChangeEvent"]
+    with monkeypatch.context() as patch:
+        patch.setattr(
+            convert_icav2_wes_event_to_wrsc_event, "get_workflow_run_from_portal_run_id",
+            _get_workflow_run_from_portal_run_id
+        )
+        result = executor.start_execution(event)
+    assert result.status == "FAILED"
+    assert (result.error.error, result.error.cause) == ("ConnectionError", "The Workflow Manager is unavailable")
+    assert WesStatusGuard().store.get(PORTAL_RUN_ID)["claim"] is None
+
+    # The redelivered event is converted rather than taken for a duplicate
+    result = executor.start_execution(event)
+    assert result.status == "SUCCEEDED", result.error
+    assert len(result.put_events) == 1
+
+
+@pytest.fixture
+def cached_ready_run(orcabus_fixture):
+    from tools import local_stand_ins
+
+    ready_event_detail = next(filter(
+        lambda event_iter_: event_iter_[1]["status"] == "READY", local_stand_ins.get_subject_events()
+    ))[1]
+    assert RunPayloadCache().put_from_event_detail(ready_event_detail)
+    return ready_event_detail
+
+
+def test_intermediate_status_is_built_from_the_cached_run(
+        convert_icav2_wes_event_to_wrsc_event, orcabus_fixture, cached_ready_run
+):
+    response = convert_icav2_wes_event_to_wrsc_event.handler(get_event("RUNNING", "1"), None)
+    assert response["workflowRunStateChangeEvent"]["workflowRunName"] == cached_ready_run["workflowRunName"]
+    assert response["workflowRunStateChangeEvent"]["payload"]["data"]["inputs"] == cached_ready_run["payload"]["data"]["inputs"]
+    assert orcabus_fixture.api_calls["get_workflow_run_from_portal_run_id"] == 0
+    assert orcabus_fixture.api_calls["get_latest_payload_from_workflow_run"] == 0
+    assert RunPayloadCache().get(PORTAL_RUN_ID) is not None
+
+
+def test_terminal_status_looks_up_the_run_and_drops_the_cached_run(
+        convert_icav2_wes_event_to_wrsc_event, orcabus_fixture, cached_ready_run
+):
+    response = convert_icav2_wes_event_to_wrsc_event.handler(get_event("SUCCEEDED", "1"), None)
+    assert response["workflowRunStateChangeEvent"]["status"] == "SUCCEEDED"
+    assert orcabus_fixture.api_calls["get_workflow_run_from_portal_run_id"] == 1
+    assert orcabus_fixture.api_calls["get_latest_payload_from_workflow_run"] == 1
+    assert RunPayloadCache().get(PORTAL_RUN_ID) is None
+
+
+def test_succeeded_outputs_carry_the_capped_manifest(
+        convert_icav2_wes_event_to_wrsc_event, orcabus_fixture, monkeypatch
+):
+    from sash_tools import output_manifest
+
+    # The output uri of the READY run holds 9 files, 7 of them result files
+    monkeypatch.setattr(convert_icav2_wes_event_to_wrsc_event, "FILEMANAGER_ROWS_PER_PAGE", 2)
+    monkeypatch.setenv(output_manifest.OUTPUT_MANIFEST_MAX_FILES_ENV_VAR, "3")
+
+    outputs = convert_icav2_wes_event_to_wrsc_event.handler(get_event("SUCCEEDED", "1"), None)[
+        "workflowRunStateChangeEvent"
+    ]["payload"]["data"]["outputs"]
+    assert outputs["sashRelPath"] == "SBJ00001/"
+    assert len(outputs["outputManifest"]["files"]) == 3
+    assert outputs["outputManifest"]["fileCount"] == 9
+    assert outputs["outputManifest"]["isTruncated"]
+    # Read a page at a time
+    assert orcabus_fixture.api_calls["get_file_manager_request"] == 5
@@ -16,6 +16,8 @@ The data payload inputs should look like the following:
     "refDataPath": "s3://path-to-reference-data/sash/sash-ref-data/",
 }
 
+Extra samplesheet rows (i.e. a second tumor sample) may be added with the optional "additionalSamples" input,
+see ADDITIONAL_SAMPLES_INPUT_KEY.
 
 To generate an output like the following
 
@@ -56,9 +58,13 @@ To generate an output like the following
 }
 """
 
-# Typing imports
-from typing import List, Dict, Union, cast
-import pandas as pd
+# Standard imports
+from dataclasses import dataclass
+from typing import List, Dict, Union, Tuple
+
+# Layer imports
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 # Globals
 DEFAULT_MONOCHROME_LOGS = True
@@ -73,40 +79,98 @@ DEFAULT_SAMPLESHEET_COLUMNS = [
     "filepath",
 ]
 
+# Optional list of extra samplesheet rows in the ready event inputs, i.e.
+# "additionalSamples": [
+#     {"sampleName": "L2401542", "filetype": "dragen_somatic_dir", "filepath": "s3://path/to/second/tumor/dir/"}
+# ]
+# id and subject_name default to the groupId and subjectId but may be set with "id" and "subjectName"
+ADDITIONAL_SAMPLES_INPUT_KEY = "additionalSamples"
+
+
+@dataclass(frozen=True)
+class SamplesheetRowSpec:
+    """
+    A samplesheet row generated from the ready event inputs
+    """
+    filetype: str
+    # Ready event input key holding the filepath of the row
+    filepath_input_key: str
+    # Ready event input key holding the sample name of the row
+    sample_name_input_key: str
+
+
+# One row per filetype, in samplesheet order
+SAMPLESHEET_ROW_SPECS: Tuple[SamplesheetRowSpec, ...] = (
+    # Dragen somatic dir
+    SamplesheetRowSpec(
+        filetype="dragen_somatic_dir",
+        filepath_input_key="dragenSomaticDir",
+        sample_name_input_key="tumorDnaSampleId",
+    ),
+    # Dragen germline dir
+    SamplesheetRowSpec(
+        filetype="dragen_germline_dir",
+        filepath_input_key="dragenGermlineDir",
+        sample_name_input_key="normalDnaSampleId",
+    ),
+    # Oncoanalyser DNA dir
+    SamplesheetRowSpec(
+        filetype="oncoanalyser_dir",
+        filepath_input_key="oncoanalyserDnaDir",
+        sample_name_input_key="tumorDnaSampleId",
+    ),
+)
+
+
+def generate_samplesheet_row(
+        sample_id: str,
+        subject_name: str,
+        sample_name: str,
+        filetype: str,
+        filepath: str
+) -> Dict[str, str]:
+    # Keys are in DEFAULT_SAMPLESHEET_COLUMNS order
+    return {
+        "id": sample_id,
+        "subject_name": subject_name,
+        "sample_name": sample_name,
+        "filetype": filetype,
+        "filepath": filepath,
+    }
+
 
 def generate_samplesheet_from_inputs(ready_event_inputs: Dict[str, Union[str, Dict[str, str]]]) -> List[Dict[str, str]]:
-    samplesheet_df = pd.DataFrame(
-        columns=DEFAULT_SAMPLESHEET_COLUMNS,
-        data=[
-            # Dragen somatic dir
-            {
-                "id": ready_event_inputs["groupId"],
-                "subject_name": ready_event_inputs["subjectId"],
-                "sample_name": ready_event_inputs["tumorDnaSampleId"],
-                "filetype": "dragen_somatic_dir",
-                "filepath": ready_event_inputs["dragenSomaticDir"],
-            },
-            # Dragen germline dir
-            {
-                "id": ready_event_inputs["groupId"],
-                "subject_name": ready_event_inputs["subjectId"],
-                "sample_name": ready_event_inputs["normalDnaSampleId"],
-                "filetype": "dragen_germline_dir",
-                "filepath": ready_event_inputs["dragenGermlineDir"],
-            },
-            # Oncoanalyser DNA dir
-            {
-                "id": ready_event_inputs["groupId"],
-                "subject_name": ready_event_inputs["subjectId"],
-                "sample_name": ready_event_inputs["tumorDnaSampleId"],
-                "filetype": "oncoanalyser_dir",
-                "filepath": ready_event_inputs["oncoanalyserDnaDir"],
-            }
-        ]
-    )
+    """
+    Generate the samplesheet rows, one per SAMPLESHEET_ROW_SPECS entry, followed by any additional samples
+    :param ready_event_inputs:
+    :return:
+    """
+    group_id = ready_event_inputs["groupId"]
+    subject_id = ready_event_inputs["subjectId"]
+
+    samplesheet = list(map(
+        lambda row_spec_iter_: generate_samplesheet_row(
+            sample_id=group_id,
+            subject_name=subject_id,
+            sample_name=ready_event_inputs[row_spec_iter_.sample_name_input_key],
+            filetype=row_spec_iter_.filetype,
+            filepath=ready_event_inputs[row_spec_iter_.filepath_input_key],
+        ),
+        SAMPLESHEET_ROW_SPECS
+    ))
+
+    samplesheet.extend(map(
+        lambda additional_sample_iter_: generate_samplesheet_row(
+            sample_id=additional_sample_iter_.get("id", group_id),
+            subject_name=additional_sample_iter_.get("subjectName", subject_id),
+            sample_name=additional_sample_iter_["sampleName"],
+            filetype=additional_sample_iter_["filetype"],
+            filepath=additional_sample_iter_["filepath"],
+        ),
+        ready_event_inputs.get(ADDITIONAL_SAMPLES_INPUT_KEY, [])
+    ))
 
-    # Convert the DataFrame to a list of dictionaries
-    return cast(List[Dict[str, str]], samplesheet_df.to_dict(orient='records'))
+    return samplesheet
 
 
 def genome_keys_to_snake_case(genome: Dict[str, str]) -> Dict[str, str]:
@@ -121,6 +185,8 @@ def genome_keys_to_snake_case(genome: Dict[str, str]) -> Dict[str, str]:
     ))
 
 
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Given the inputs from a ready event, this script generates an ICAV2 WES event inputs for the oncoanalyser workflow.
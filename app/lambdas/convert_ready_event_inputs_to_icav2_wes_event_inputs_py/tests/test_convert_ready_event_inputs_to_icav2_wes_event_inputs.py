@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the samplesheet row builder of the convert_ready_event_inputs_to_icav2_wes_event_inputs handler
+"""
+
+# Test imports
+import pytest
+
+READY_EVENT_INPUTS = {
+    "mode": "wgts",
+    "groupId": "SBJ00001",
+    "subjectId": "SBJ00001",
+    "tumorDnaSampleId": "L2400002",
+    "normalDnaSampleId": "L2400001",
+    "dragenSomaticDir": "s3://bucket/dragen/L2400002__L2400001/",
+    "dragenGermlineDir": "s3://bucket/dragen/L2400001/",
+    "oncoanalyserDnaDir": "s3://bucket/oncoanalyser/SBJ00001/",
+    "refDataPath": "s3://bucket/refdata/sash/",
+}
+
+
+@pytest.fixture
+def convert_ready_event_inputs(import_lambda_module):
+    return import_lambda_module("convert_ready_event_inputs_to_icav2_wes_event_inputs")
+
+
+def test_handler(convert_ready_event_inputs):
+    assert convert_ready_event_inputs.handler({"inputs": READY_EVENT_INPUTS}, None) == {
+        "inputs": {
+            "monochrome_logs": True,
+            "publish_dir_mode": "symlink",
+            "outdir": "out",
+            "samplesheet": [
+                {
+                    "id": "SBJ00001",
+                    "subject_name": "SBJ00001",
+                    "sample_name": "L2400002",
+                    "filetype": "dragen_somatic_dir",
+                    "filepath": "s3://bucket/dragen/L2400002__L2400001/",
+                },
+                {
+                    "id": "SBJ00001",
+                    "subject_name": "SBJ00001",
+                    "sample_name": "L2400001",
+                    "filetype": "dragen_germline_dir",
+                    "filepath": "s3://bucket/dragen/L2400001/",
+                },
+                {
+                    "id": "SBJ00001",
+                    "subject_name": "SBJ00001",
+                    "sample_name": "L2400002",
+                    "filetype": "oncoanalyser_dir",
+                    "filepath": "s3://bucket/oncoanalyser/SBJ00001/",
+                },
+            ],
+            "ref_data_path": "s3://bucket/refdata/sash/",
+        }
+    }
+
+
+def test_samplesheet_columns_are_in_order(convert_ready_event_inputs):
+    for row in convert_ready_event_inputs.generate_samplesheet_from_inputs(READY_EVENT_INPUTS):
+        assert list(row) == convert_ready_event_inputs.DEFAULT_SAMPLESHEET_COLUMNS
+
+
+def test_input_overrides(convert_ready_event_inputs):
+    inputs = convert_ready_event_inputs.handler(
+        {"inputs": {**READY_EVENT_INPUTS, "monochromeLogs": False, "outdir": "results"}}, None
+    )["inputs"]
+    assert inputs["monochrome_logs"] is False
+    assert inputs["outdir"] == "results"
+
+
+def test_additional_samples(convert_ready_event_inputs):
+    samplesheet = convert_ready_event_inputs.generate_samplesheet_from_inputs({
+        **READY_EVENT_INPUTS,
+        "additionalSamples": [
+            {"sampleName": "L2400003", "filetype": "dragen_somatic_dir", "filepath": "s3://bucket/dragen/L2400003/"},
+            {
+                "id": "SBJ00001_2",
+                "subjectName": "SBJ00001",
+                "sampleName": "L2400003",
+                "filetype": "oncoanalyser_dir",
+                "filepath": "s3://bucket/oncoanalyser/SBJ00001_2/",
+            },
+        ],
+    })
+    # The additional samples follow the fixed rows, in input order
+    assert samplesheet[len(convert_ready_event_inputs.SAMPLESHEET_ROW_SPECS):] == [
+        {
+            "id": "SBJ00001",
+            "subject_name": "SBJ00001",
+            "sample_name": "L2400003",
+            "filetype": "dragen_somatic_dir",
+            "filepath": "s3://bucket/dragen/L2400003/",
+        },
+        {
+            "id": "SBJ00001_2",
+            "subject_name": "SBJ00001",
+            "sample_name": "L2400003",
+            "filetype": "oncoanalyser_dir",
+            "filepath": "s3://bucket/oncoanalyser/SBJ00001_2/",
+        },
+    ]
+    for row in samplesheet:
+        assert list(row) == convert_ready_event_inputs.DEFAULT_SAMPLESHEET_COLUMNS
+
+
+@pytest.mark.parametrize("input_key", ["dragenSomaticDir", "normalDnaSampleId", "groupId"])
+def test_missing_input(convert_ready_event_inputs, input_key):
+    inputs = dict(READY_EVENT_INPUTS)
+    del inputs[input_key]
+    with pytest.raises(KeyError):
+        convert_ready_event_inputs.generate_samplesheet_from_inputs(inputs)
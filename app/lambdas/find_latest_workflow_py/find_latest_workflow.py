@@ -8,8 +8,15 @@ Used by:
 - glueSucceededEventsToDraftUpdate: finding existing DRAFT runs for this service to update
 - populateDraftData: finding upstream SUCCEEDED workflows to collect outputs as inputs
 
+SUCCEEDED lookups that find no run are kept in the negative cache (see sash_tools.negative_cache),
+so a draft waiting on its upstream runs does not query the Workflow Manager on every populate loop.
+The misses are invalidated by clear_workflow_lookup_misses when an upstream SUCCEEDED event arrives.
+
+Lookups by library are answered from the workflow run index (see sash_tools.workflow_run_index),
+kept up to date from the WorkflowRunStateChange events, once the lookup has been backfilled from the Workflow Manager.
 """
 # Standard imports
+from time import time
 from typing import List
 
 # Local imports
@@ -17,6 +24,11 @@ from orcabus_api_tools.workflow import (
     get_workflow_runs_from_metadata
 )
 from orcabus_api_tools.workflow.models import WorkflowRunDetail
+from sash_tools.bootstrap import bootstrap
+from sash_tools.negative_cache import NegativeLookupCache, get_lookup
+from sash_tools.workflow_run_index import get_state_timestamp, get_workflow_run_index
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 # Globals
 # Terminal states that indicate a run has been superseded or is no longer relevant
@@ -26,8 +38,14 @@ NON_SUCCEEDED_TERMINATED_STATUS_LIST = [
     'DEPRECATED',
     'RESOLVED'
 ]
+SUCCEEDED_STATUS = 'SUCCEEDED'
+
 
+bootstrap()
 
+
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Query the Workflow Manager API for workflow runs matching the given criteria.
@@ -48,7 +66,7 @@ def handler(event, context):
 
     DRAFT Deduplication Logic:
       When status=SUCCEEDED and multiple runs are found, check if the most recent run
-      (by currentState.orcabusId) is still in-progress (not SUCCEEDED and not in a
+      (by its latest state change) is still in-progress (not SUCCEEDED and not in a
       terminal state like FAILED/ABORTED/RESOLVED). If so, return empty list — the
       newer run supersedes the succeeded one.
 
@@ -80,15 +98,34 @@ def handler(event, context):
         libraries
     )) if libraries else []
 
-    # Query the Workflow Manager API for matching workflow runs
-    workflows_list: List[WorkflowRunDetail]
-    workflows_list = get_workflow_runs_from_metadata(
-        analysis_run_id=analysis_run_id,
+    # Skip upstream lookups that recently found no run
+    negative_cache = NegativeLookupCache() if workflow_status == SUCCEEDED_STATUS else None
+    lookup = get_lookup(
         workflow_name=workflow_name,
-        workflow_version=workflow_version,
         library_id_list=library_id_list,
-        rgid_list=rgid_list
+        rgid_list=rgid_list,
+        workflow_version=workflow_version,
+        analysis_run_id=analysis_run_id,
     )
+    if negative_cache is not None and negative_cache.is_miss(lookup):
+        return {
+            "workflowRunList": []
+        }
+    looked_up_at = time()
+
+    # Answer from the workflow run index, or query the Workflow Manager API on a cold index
+    workflow_run_index = get_workflow_run_index()
+    workflows_list: List[WorkflowRunDetail]
+    workflows_list = workflow_run_index.find_runs(lookup)
+    if workflows_list is None:
+        workflows_list = get_workflow_runs_from_metadata(
+            analysis_run_id=analysis_run_id,
+            workflow_name=workflow_name,
+            workflow_version=workflow_version,
+            library_id_list=library_id_list,
+            rgid_list=rgid_list
+        )
+        workflow_run_index.backfill(lookup, workflows_list)
 
     # Filter to workflow state if provided
     if workflow_status is not None:
@@ -106,10 +143,14 @@ def handler(event, context):
             ))
 
             if active_workflows:
-                # Get the most recent run (by currentState.orcabusId which reflects the latest state change)
+                # Get the most recent run (by the latest state change, indexed runs from events have
+                # the state timestamp but no state orcabusId, which is time ordered in any case)
                 recent_run_status = sorted(
                     active_workflows,
-                    key=lambda workflow_iter_: workflow_iter_['currentState']['orcabusId'],
+                    key=lambda workflow_iter_: (
+                        get_state_timestamp(workflow_iter_),
+                        workflow_iter_['currentState'].get('orcabusId') or ''
+                    ),
                     reverse=True
                 )[0]['currentState']['status']
 
@@ -131,6 +172,10 @@ def handler(event, context):
         ))
 
     if len(workflows_list) == 0:
+        # No SUCCEEDED run yet, the SUCCEEDED event invalidates the miss.
+        # Runs superseded by a newer in-progress run are not cached, the newer run may fail without an event
+        if negative_cache is not None:
+            negative_cache.record_miss(lookup, looked_up_at)
         return {
             "workflowRunList": []
         }
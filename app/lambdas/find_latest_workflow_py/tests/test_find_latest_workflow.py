@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the find_latest_workflow handler, answered from the workflow run index once backfilled,
+with the misses kept in the negative cache
+"""
+
+# Test imports
+import pytest
+
+# Globals
+DRAGEN_WORKFLOW_NAME = "dragen-wgts-dna"
+LIBRARIES = [{"libraryId": "L2400001"}, {"libraryId": "L2400002"}]
+
+
+@pytest.fixture
+def find_latest_workflow(import_lambda_module):
+    return import_lambda_module("find_latest_workflow")
+
+
+@pytest.fixture
+def index_workflow_run_state_change(import_lambda_module):
+    return import_lambda_module("index_workflow_run_state_change")
+
+
+def get_portal_run_ids(response):
+    return list(map(lambda workflow_run_iter_: workflow_run_iter_['portalRunId'], response['workflowRunList']))
+
+
+def test_lookup_is_backfilled_then_answered_from_the_index(find_latest_workflow, orcabus_fixture):
+    event = {"workflowName": DRAGEN_WORKFLOW_NAME, "libraries": LIBRARIES, "status": "SUCCEEDED"}
+
+    assert get_portal_run_ids(find_latest_workflow.handler(event, None)) == ["SBJ00001dragen"]
+    assert orcabus_fixture.api_calls["get_workflow_runs_from_metadata"] == 1
+
+    assert get_portal_run_ids(find_latest_workflow.handler(event, None)) == ["SBJ00001dragen"]
+    assert orcabus_fixture.api_calls["get_workflow_runs_from_metadata"] == 1
+
+
+def test_state_change_events_update_the_index(
+        find_latest_workflow, index_workflow_run_state_change, orcabus_fixture
+):
+    event = {"workflowName": DRAGEN_WORKFLOW_NAME, "libraries": LIBRARIES, "status": "SUCCEEDED"}
+    find_latest_workflow.handler(event, None)
+
+    # A newer run of the same libraries starts, superseding the succeeded run
+    assert index_workflow_run_state_change.handler(
+        {
+            "orcabusId": "wfr.01J0000000000000000000RERUN",
+            "portalRunId": "SBJ00001dragenrerun",
+            "workflow": {"name": DRAGEN_WORKFLOW_NAME, "version": "4.4.4"},
+            "status": "RUNNING",
+            "timestamp": "2025-01-01T00:00:00Z",
+            "libraries": LIBRARIES,
+        },
+        None
+    )["isIndexed"]
+
+    assert find_latest_workflow.handler(event, None) == {"workflowRunList": []}
+    assert orcabus_fixture.api_calls["get_workflow_runs_from_metadata"] == 1
+
+
+def test_succeeded_event_reaches_the_lookup_before_the_index_lambda(
+        find_latest_workflow, import_lambda_module, orcabus_fixture
+):
+    clear_workflow_lookup_misses = import_lambda_module("clear_workflow_lookup_misses")
+    dragen_run = next(filter(
+        lambda workflow_run_iter_: workflow_run_iter_['portalRunId'] == "SBJ00001dragen",
+        orcabus_fixture.workflow_runs
+    ))
+    # The populate lookup backfills the run while it is still running, and caches the miss
+    dragen_run['currentState'] = {"orcabusId": "wfs.01J0000000000000000RUNNING", "status": "RUNNING"}
+    event = {"workflowName": DRAGEN_WORKFLOW_NAME, "libraries": LIBRARIES, "status": "SUCCEEDED"}
+    assert find_latest_workflow.handler(event, None) == {"workflowRunList": []}
+    dragen_run['currentState'] = {"orcabusId": "wfs.01J000000000000000SUCCEEDED", "status": "SUCCEEDED"}
+
+    # The glue state machine gets the SUCCEEDED event before the index lambda does
+    assert clear_workflow_lookup_misses.handler(
+        {
+            "workflowName": DRAGEN_WORKFLOW_NAME,
+            "libraries": dragen_run['libraries'],
+            "analysisRunId": None,
+            "workflowRun": {
+                "orcabusId": dragen_run['orcabusId'],
+                "portalRunId": dragen_run['portalRunId'],
+                "workflow": dragen_run['workflow'],
+                "status": "SUCCEEDED",
+                "timestamp": "2025-01-01T00:00:00Z",
+                "libraries": dragen_run['libraries'],
+            },
+        },
+        None
+    )["isIndexed"]
+
+    assert get_portal_run_ids(find_latest_workflow.handler(event, None)) == ["SBJ00001dragen"]
+    assert orcabus_fixture.api_calls["get_workflow_runs_from_metadata"] == 1
+
+
+def test_miss_is_cached_for_succeeded_lookups(find_latest_workflow, orcabus_fixture, monkeypatch):
+    from sash_tools import workflow_run_index
+    # Without the index, every lookup would query the Workflow Manager
+    monkeypatch.setenv(workflow_run_index.WORKFLOW_RUN_INDEX_TTL_SECONDS_ENV_VAR, "0")
+
+    event = {"workflowName": "umccrise", "libraries": LIBRARIES, "status": "SUCCEEDED"}
+    assert find_latest_workflow.handler(event, None) == {"workflowRunList": []}
+    assert find_latest_workflow.handler(event, None) == {"workflowRunList": []}
+    assert orcabus_fixture.api_calls["get_workflow_runs_from_metadata"] == 1
+
+    # Other statuses are not cached
+    draft_event = {**event, "status": "DRAFT"}
+    find_latest_workflow.handler(draft_event, None)
+    find_latest_workflow.handler(draft_event, None)
+    assert orcabus_fixture.api_calls["get_workflow_runs_from_metadata"] == 3
+
+
+def test_libraries_or_analysis_run_id_are_required(find_latest_workflow):
+    with pytest.raises(ValueError):
+        find_latest_workflow.handler({"workflowName": DRAGEN_WORKFLOW_NAME}, None)
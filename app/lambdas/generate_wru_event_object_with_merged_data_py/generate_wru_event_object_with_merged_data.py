@@ -9,8 +9,17 @@ from typing import Optional
 from orcabus_api_tools.workflow import (
     get_workflow_run_from_portal_run_id
 )
+from sash_tools.claim_check import resolve_claim_checks
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 
+bootstrap()
+
+
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Generate WRU event object with merged data
@@ -19,10 +28,17 @@ def handler(event, context):
     :return:
     """
 
+    # The payload, the libraries and the payload inputs may be claim check references
+    event = resolve_claim_checks(event, ['payload', 'libraries'])
+
     # Get the event inputs
     portal_run_id = event.get("portalRunId", None)
     libraries = event.get("libraries", None)
     sash_payload = event.get("payload", None)
+    sash_payload = {
+        **sash_payload,
+        "data": resolve_claim_checks(sash_payload['data'], ['inputs']),
+    }
     upstream_data = event.get("upstreamData", {})
 
     # Get the dragen draft workflow run object
@@ -7,6 +7,10 @@ If genomes.GRCh38Umccr is a key, we switch it to genomes.GRCh38_umccr
 
 Given a portal run id
 
+Large payloads are returned as a claim check reference (see sash_tools.claim_check),
+the glue state machine only passes the payload on to lambdas that resolve it.
+The state machine branches on hasTumorLibrary instead of reading the payload tags.
+
 """
 # Standard imports
 from typing import Dict
@@ -15,11 +19,32 @@ from requests import HTTPError
 # Local imports
 from orcabus_api_tools.workflow import get_latest_payload_from_portal_run_id
 from orcabus_api_tools.workflow.models import Payload
+from sash_tools.claim_check import check_in
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+
+bootstrap()
 
 
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Get the latest payload from the portal run id
+
+    Input:
+      {
+        "portalRunId": "20250101abcd1234"
+      }
+
+    Output:
+      {
+        "payload": {"version": "2025.08.05", "data": {...}} | {"claimCheckUri": "s3://...", "sizeBytes": 301234},
+        "hasTumorLibrary": true | false
+      }
+
     :param event:
     :param context:
     :return:
@@ -31,6 +56,7 @@ def handler(event, context):
     except HTTPError as e:
         return {
             "payload": {},
+            "hasTumorLibrary": False,
         }
 
     # Make a copy and convert to dict type
@@ -45,5 +71,7 @@ def handler(event, context):
         del payload['payloadRefId']
 
     return {
-        "payload": payload
+        "payload": check_in(payload),
+        # Read before the payload may be checked in
+        "hasTumorLibrary": bool(payload.get("data", {}).get("tags", {}).get("tumorLibraryId")),
     }
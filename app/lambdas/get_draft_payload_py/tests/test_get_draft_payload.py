@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the get_draft_payload handler, and of the glue state machine branching on its output
+when the payload is claim checked
+"""
+
+# Standard imports
+import json
+
+# Test imports
+import pytest
+
+pytest.importorskip("requests")
+
+DRAFT_PORTAL_RUN_ID = "SBJ00001sash"
+DRAFT_PAYLOAD_DATA = {"tags": {"libraryId": "L2400001", "tumorLibraryId": "L2400002"}}
+
+
+@pytest.fixture
+def get_draft_payload(import_lambda_module):
+    return import_lambda_module("get_draft_payload")
+
+
+@pytest.fixture
+def draft_payload(orcabus_fixture):
+    draft = next(filter(
+        lambda workflow_run_iter_: workflow_run_iter_["portalRunId"] == DRAFT_PORTAL_RUN_ID,
+        orcabus_fixture.workflow_runs
+    ))
+    orcabus_fixture.payloads[draft["orcabusId"]]["data"] = json.loads(json.dumps(DRAFT_PAYLOAD_DATA))
+    return orcabus_fixture.payloads[draft["orcabusId"]]
+
+
+@pytest.fixture
+def claim_check_everything(monkeypatch):
+    from sash_tools import claim_check
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_BACKEND_ENV_VAR, "memory")
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_THRESHOLD_BYTES_ENV_VAR, "1")
+
+
+def test_payload(get_draft_payload, draft_payload):
+    assert get_draft_payload.handler({"portalRunId": DRAFT_PORTAL_RUN_ID}, None) == {
+        # Without the workflow manager ids
+        "payload": {"version": draft_payload["version"], "data": DRAFT_PAYLOAD_DATA},
+        "hasTumorLibrary": True,
+    }
+
+
+def test_payload_over_the_claim_check_threshold(get_draft_payload, draft_payload, claim_check_everything):
+    from sash_tools.claim_check import check_out, is_claim_check
+
+    response = get_draft_payload.handler({"portalRunId": DRAFT_PORTAL_RUN_ID}, None)
+    assert is_claim_check(response["payload"])
+    assert check_out(response["payload"]) == {"version": draft_payload["version"], "data": DRAFT_PAYLOAD_DATA}
+    assert response["hasTumorLibrary"] is True
+
+
+def test_germline_only_draft(get_draft_payload, draft_payload):
+    del draft_payload["data"]["tags"]["tumorLibraryId"]
+    assert get_draft_payload.handler({"portalRunId": DRAFT_PORTAL_RUN_ID}, None)["hasTumorLibrary"] is False
+
+
+def test_missing_payload(get_draft_payload, orcabus_fixture):
+    assert get_draft_payload.handler({"portalRunId": "SBJ99999sash"}, None) == {
+        "payload": {},
+        "hasTumorLibrary": False,
+    }
+
+
+def test_glue_merges_the_somatic_dir_of_a_claim_checked_draft(draft_payload, claim_check_everything):
+    pytest.importorskip("jsonata")
+    from tools import local_stand_ins
+    from tools.asl_executor import LocalStateMachineExecutor, get_template_path, load_definition, load_lambda_handlers
+
+    state_machine_name, dragen_succeeded_event = local_stand_ins.get_subject_events()[0]
+    assert dragen_succeeded_event["workflow"]["name"] == local_stand_ins.DRAGEN_WGTS_DNA_WORKFLOW_NAME
+
+    result = LocalStateMachineExecutor(
+        load_definition(get_template_path(state_machine_name)),
+        load_lambda_handlers(local_stand_ins),
+        dict(local_stand_ins.SSM_PARAMETERS),
+        state_machine_name,
+    ).start_execution(dragen_succeeded_event)
+
+    assert result.status == "SUCCEEDED", result.error
+    assert len(result.put_events) == 1
+    draft_inputs = result.put_events[0]["Detail"]["payload"]["data"]["inputs"]
+    assert set(draft_inputs) == {"dragenGermlineDir", "dragenSomaticDir"}
+    assert "L2400002__L2400001" in draft_inputs["dragenSomaticDir"]
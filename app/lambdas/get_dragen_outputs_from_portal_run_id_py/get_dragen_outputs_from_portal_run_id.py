@@ -12,6 +12,9 @@ from pathlib import Path
 # Layer imports
 from orcabus_api_tools.filemanager import get_file_manager_request_response_results
 from orcabus_api_tools.filemanager.models import FileObject
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 # Globals
 DRAGEN_WGTS_DNA_WORKFLOW_RUN_NAME = "dragen-wgts-dna"
@@ -19,6 +22,9 @@ Phenotype = Literal["TUMOR", "NORMAL"]
 PHENOTYPE_LIST: List[Phenotype] = ["TUMOR", "NORMAL"]
 
 
+bootstrap()
+
+
 def get_bam_from_dragen_workflow(portal_run_id: str, phenotype: Phenotype) -> Optional[FileObject]:
     bam_file: FileObject
     if phenotype == 'TUMOR':
@@ -50,6 +56,8 @@ def get_bam_from_dragen_workflow(portal_run_id: str, phenotype: Phenotype) -> Op
     raise ValueError("Phenotype must be either 'TUMOR' or 'NORMAL'")
 
 
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Given a normal and tumor library id, get the latest dragen workflow and return the bam files
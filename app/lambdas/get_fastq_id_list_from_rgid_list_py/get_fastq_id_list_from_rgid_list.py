@@ -6,9 +6,19 @@ Get the fastq ids from the rgid list
 Given the rgid list, return the fastq ids that are associated with these rgids.
 """
 
+# Layer imports
 from orcabus_api_tools.fastq import get_fastq_by_rgid
+from sash_tools.orcabus_client import run_concurrently
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 
+bootstrap()
+
+
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Given a list of fastq RGIDs, return the corresponding fastq IDs.
@@ -18,9 +28,10 @@ def handler(event, context):
     """
     fastq_rgid_list = event.get("fastqRgidList", [])
 
+    # Look up the rgids concurrently
     all_fastq_ids = sorted(list(map(
-        lambda fastq_rgid_iter_: get_fastq_by_rgid(fastq_rgid_iter_)['id'],
-        fastq_rgid_list
+        lambda fastq_obj_iter_: fastq_obj_iter_['id'],
+        run_concurrently(get_fastq_by_rgid, fastq_rgid_list)
     )))
 
     return {
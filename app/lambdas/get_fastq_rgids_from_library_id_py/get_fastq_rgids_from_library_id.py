@@ -11,6 +11,12 @@ Rgids are returned in the format '<index>+<index2>.<lane>.<instrument_run_id>'
 # Layer imports
 from orcabus_api_tools.fastq import get_fastq_sets, get_fastq_list_rows_in_fastq_set
 from orcabus_api_tools.fastq.models import Fastq
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+
+bootstrap()
 
 
 def get_rgid_from_fastq_obj(fastq_obj: Fastq):
@@ -20,6 +26,8 @@ def get_rgid_from_fastq_obj(fastq_obj: Fastq):
         fastq_obj['instrumentRunId']
     ])
 
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Given a library id, get the fastq rgids associated with the library.
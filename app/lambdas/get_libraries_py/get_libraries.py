@@ -10,8 +10,17 @@ from typing import List
 # Layer imports
 from orcabus_api_tools.metadata import get_library_from_library_orcabus_id
 from orcabus_api_tools.metadata.models import LibraryBase
+from sash_tools.orcabus_client import run_concurrently
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 
+bootstrap()
+
+
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Get the libraries from the input, check their metadata,
@@ -33,11 +42,11 @@ def handler(event, context):
             "libraryId": libraries[0]['libraryId']
         }
 
-    # Get library metadata for both libraries
-    library_obj_list = list(map(
-        lambda library_iter_: get_library_from_library_orcabus_id(library_iter_['orcabusId']),
-        libraries
-    ))
+    # Get library metadata for both libraries, concurrently
+    library_obj_list = run_concurrently(
+        get_library_from_library_orcabus_id,
+        list(map(lambda library_iter_: library_iter_['orcabusId'], libraries))
+    )
 
     # Check if both libraries are provided
     try:
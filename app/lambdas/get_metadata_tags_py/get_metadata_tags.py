@@ -8,8 +8,16 @@ Given a library id, collect and return the library object
 
 
 from orcabus_api_tools.metadata import get_library_from_library_id
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 
+bootstrap()
+
+
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Get the library object from a library id
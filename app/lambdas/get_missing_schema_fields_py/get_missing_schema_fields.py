@@ -2,14 +2,36 @@
 
 """
 Given a payload data object, validate it against the schema and return the list of missing/invalid fields.
+
+A stuck draft is validated on every populate loop, usually with one field changed since the last loop.
+The schema is split into validation units, and only the units whose part of the data has changed are validated again
+* an object schema with only type, properties and required keywords (and annotations) is split into
+  a unit for each of its type and required keywords (which only depend on the type and keys of the object),
+  and the units of its properties
+* any other schema is a single unit, validated as a whole against its part of the data
+Each unit records a fingerprint of its part of the data (the keys of an object unit, the value of any other unit),
+and the missing fields it found. The units and the schema fingerprint are returned as the validation result,
+and can be passed back in as previousValidation, or are kept in the state store per portalRunId.
+Units with the same fingerprint reuse their previous missing fields, the missing fields are merged in schema order,
+and match the missing fields of a full validation.
 """
 
+# Standard imports
 import boto3
 import json
 import typing
 import jsonschema
+from hashlib import sha256
+from jsonschema.protocols import Validator
 from os import environ
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Layer imports
+from sash_tools.fingerprint import to_canonical_json
+from sash_tools.state_store import get_state_store
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 if typing.TYPE_CHECKING:
     from mypy_boto3_schemas import SchemasClient
@@ -19,6 +41,19 @@ SSM_REGISTRY_NAME_ENV_VAR = "SSM_REGISTRY_NAME"
 SSM_SCHEMA_PATH_ENV_VAR = "SSM_SCHEMA_PATH"
 DEFAULT_PAYLOAD_VERSION_ENV_VAR = "DEFAULT_PAYLOAD_VERSION"
 
+SCHEMA_VALIDATION_NAMESPACE = "schema-validation"
+# Same as the payload fingerprints, a stuck draft loops for at most a day before it is let through again
+SCHEMA_VALIDATION_TTL_SECONDS = 24 * 60 * 60
+
+# Keywords that do not constrain the data
+ANNOTATION_KEYWORDS = ["$schema", "$id", "$defs", "$comment", "title", "description", "examples", "default"]
+# An object schema with only these keywords (and annotations) is split into units
+SPLIT_KEYWORDS = ["type", "properties", "required"]
+MAX_UNHASHED_FINGERPRINT_LENGTH = 64
+
+# Schema validation units, by unit key, the data path of the unit, i.e. "inputs.refDataPath", or "inputs#required"
+ValidationUnits = Dict[str, Dict[str, Any]]
+
 
 def get_ssm_parameter_value(parameter_name: str) -> str:
     ssm_client: "SSMClient" = boto3.client("ssm")
@@ -32,6 +67,144 @@ def get_schema_from_registry(registry_name: str, schema_name: str) -> str:
     return response["Content"]
 
 
+def get_fingerprint(obj: Any) -> str:
+    # Short values are their own fingerprint, most units are a single string
+    canonical_json = to_canonical_json(obj) if isinstance(obj, (dict, list)) else json.dumps(obj)
+    if len(canonical_json) <= MAX_UNHASHED_FINGERPRINT_LENGTH:
+        return canonical_json
+    return sha256(canonical_json.encode()).hexdigest()
+
+
+def get_missing_fields_from_errors(errors: Iterator[jsonschema.ValidationError], path_prefix: List[Any]) -> List[str]:
+    """
+    Extract the missing field paths from the validation errors
+    :param errors:
+    :param path_prefix: The path of the validated data, error paths are relative to it
+    """
+    missing_fields = []
+    for error in errors:
+        error_path = path_prefix + list(error.absolute_path)
+        path = ".".join(str(p) for p in error_path) if error_path else ""
+        if error.validator == "required":
+            # For required errors, list each missing property
+            for missing_prop in error.validator_value:
+                if missing_prop not in error.instance:
+                    field_path = f"{path}.{missing_prop}" if path else missing_prop
+                    missing_fields.append(field_path)
+        else:
+            # For other errors (type, pattern, etc.)
+            if path:
+                missing_fields.append(f"{path} ({error.message[:50]})")
+    return missing_fields
+
+
+def resolve_schema(validator: Validator, schema: Dict[str, Any]) -> Dict[str, Any]:
+    # Follow a schema that is only a local $ref, i.e. {"$ref": "#/$defs/tags"}
+    while isinstance(schema, dict) and list(schema.keys()) == ["$ref"] and schema["$ref"].startswith("#/"):
+        target: Any = validator.schema
+        for key in schema["$ref"][2:].split("/"):
+            target = target[key]
+        schema = target
+    return schema
+
+
+def is_split_schema(schema: Any) -> bool:
+    return (
+        isinstance(schema, dict) and
+        schema.get("type") == "object" and
+        isinstance(schema.get("properties"), dict) and
+        all(map(lambda keyword_iter_: keyword_iter_ in SPLIT_KEYWORDS + ANNOTATION_KEYWORDS, schema.keys()))
+    )
+
+
+def iter_validation_units(
+        validator: Validator,
+        schema: Dict[str, Any],
+        instance: Any,
+        path: List[Any],
+        resolved_schemas: Dict[int, Tuple[Dict[str, Any], bool]],
+) -> Iterator[Tuple[str, List[Any], Any, Any, str]]:
+    """
+    Get the validation units of the instance, in the order a full validation reports their errors
+    :param resolved_schemas: The resolved schema and whether it is split, by schema id, filled in as schemas are resolved
+    :return: Tuples of unit key, data path, unit schema, unit instance and data fingerprint
+    """
+    unit_path = ".".join(map(str, path))
+    if id(schema) not in resolved_schemas:
+        resolved_schema = resolve_schema(validator, schema)
+        resolved_schemas[id(schema)] = (resolved_schema, is_split_schema(resolved_schema))
+    schema, is_split = resolved_schemas[id(schema)]
+
+    if not is_split:
+        yield unit_path, path, schema, instance, get_fingerprint(instance)
+        return
+
+    # Split in keyword order, the order a full validation reports the errors in
+    for keyword, value in schema.items():
+        if keyword == "properties":
+            # Properties are only validated for objects, and only if present
+            if not isinstance(instance, dict):
+                continue
+            for property_name, property_schema in value.items():
+                if property_name in instance:
+                    yield from iter_validation_units(
+                        validator, property_schema, instance[property_name], path + [property_name],
+                        resolved_schemas
+                    )
+        elif keyword in ["type", "required"]:
+            # Only depend on the type and keys of the instance
+            yield (
+                f"{unit_path}#{keyword}", path, {keyword: value}, instance,
+                get_fingerprint([
+                    type(instance).__name__,
+                    sorted(instance) if isinstance(instance, dict) else None
+                ])
+            )
+
+
+def get_missing_fields(
+        schema: Dict[str, Any],
+        data: Dict[str, Any],
+        previous_validation: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Validate the data against the schema, only validating the units that changed since the previous validation
+    :return: The missing fields, and the validation result
+    """
+    validator = jsonschema.Draft202012Validator(schema)
+    schema_fingerprint = get_fingerprint(schema)
+
+    previous_units: ValidationUnits = {}
+    if previous_validation is not None and previous_validation.get("schemaFingerprint") == schema_fingerprint:
+        previous_units = previous_validation.get("units", {})
+
+    missing_fields: List[str] = []
+    units: ValidationUnits = {}
+    validated_unit_count = 0
+    for unit_key, path, unit_schema, unit_instance, fingerprint in iter_validation_units(
+            validator, schema, data, [], resolved_schemas={}
+    ):
+        previous_unit = previous_units.get(unit_key)
+        if previous_unit is not None and previous_unit["fingerprint"] == fingerprint:
+            unit_missing_fields = previous_unit["missingFields"]
+        else:
+            validated_unit_count += 1
+            unit_missing_fields = get_missing_fields_from_errors(
+                validator.evolve(schema=unit_schema).iter_errors(unit_instance),
+                path_prefix=path
+            )
+        units[unit_key] = {"fingerprint": fingerprint, "missingFields": unit_missing_fields}
+        missing_fields.extend(unit_missing_fields)
+
+    return missing_fields, {
+        "schemaFingerprint": schema_fingerprint,
+        "units": units,
+        "validatedUnitCount": validated_unit_count,
+    }
+
+
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Validate the data against the schema and return missing fields.
@@ -40,15 +213,19 @@ def handler(event, context):
     {
         "data": {...},
         "payloadVersion": "2025.08.05"  (optional)
+        "portalRunId": "20250801abcdef12"  (optional, keeps the validation result in the state store)
+        "previousValidation": {...}  (optional, the validation result of the previous call)
     }
 
     Output:
     {
-        "missingFields": ["inputs.sequenceData", "inputs.reference", ...]
+        "missingFields": ["inputs.sequenceData", "inputs.reference", ...],
+        "validation": {"schemaFingerprint": "...", "units": {...}, "validatedUnitCount": 1}
     }
     """
     data = event.get("data", {})
     payload_version = event.get("payloadVersion", environ.get(DEFAULT_PAYLOAD_VERSION_ENV_VAR, ""))
+    portal_run_id = event.get("portalRunId")
 
     # Get schema
     schema_registry = get_ssm_parameter_value(environ[SSM_REGISTRY_NAME_ENV_VAR])
@@ -58,23 +235,20 @@ def handler(event, context):
     schema_content = get_schema_from_registry(registry_name=schema_registry, schema_name=schema_name)
     schema = json.loads(schema_content)
 
-    # Validate and collect all errors
-    validator = jsonschema.Draft202012Validator(schema)
-    errors = list(validator.iter_errors(data))
+    # Get the previous validation result
+    previous_validation = event.get("previousValidation")
+    if previous_validation is None and portal_run_id is not None:
+        previous_validation = get_state_store(SCHEMA_VALIDATION_NAMESPACE).get(portal_run_id)
 
-    # Extract missing field paths
-    missing_fields = []
-    for error in errors:
-        path = ".".join(str(p) for p in error.absolute_path) if error.absolute_path else ""
-        if error.validator == "required":
-            # For required errors, list each missing property
-            for missing_prop in error.validator_value:
-                if missing_prop not in error.instance:
-                    field_path = f"{path}.{missing_prop}" if path else missing_prop
-                    missing_fields.append(field_path)
-        else:
-            # For other errors (type, pattern, etc.)
-            if path:
-                missing_fields.append(f"{path} ({error.message[:50]})")
+    # Validate the changed units, and collect the missing fields
+    missing_fields, validation = get_missing_fields(schema, data, previous_validation)
 
-    return {"missingFields": missing_fields}
+    if portal_run_id is not None:
+        get_state_store(SCHEMA_VALIDATION_NAMESPACE).put(
+            portal_run_id, validation, ttl_seconds=SCHEMA_VALIDATION_TTL_SECONDS
+        )
+
+    return {
+        "missingFields": missing_fields,
+        "validation": validation,
+    }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the incremental schema validation, a repeated draft only validates its changed units
+and finds the same missing fields as a full validation
+"""
+
+# Standard imports
+import json
+from copy import deepcopy
+from pathlib import Path
+
+# Test imports
+import pytest
+
+jsonschema = pytest.importorskip("jsonschema")
+pytest.importorskip("boto3")
+
+# Globals
+SCHEMA_PATH = next(
+    (Path(__file__).parents[3] / "event-schemas" / "complete-data-draft" / "2025.08.05").glob("*.json")
+)
+PORTAL_RUN_ID = "SBJ00001sashready"
+
+
+@pytest.fixture
+def get_missing_schema_fields(import_lambda_module):
+    return import_lambda_module("get_missing_schema_fields")
+
+
+@pytest.fixture
+def schema():
+    return json.loads(SCHEMA_PATH.read_text())
+
+
+@pytest.fixture
+def complete_data(orcabus_fixture):
+    workflow_run = next(filter(
+        lambda workflow_run_iter_: workflow_run_iter_['portalRunId'] == PORTAL_RUN_ID,
+        orcabus_fixture.workflow_runs
+    ))
+    return deepcopy(orcabus_fixture.payloads[workflow_run['orcabusId']]['data'])
+
+
+def get_full_validation_missing_fields(get_missing_schema_fields, schema, data):
+    return get_missing_schema_fields.get_missing_fields_from_errors(
+        jsonschema.Draft202012Validator(schema).iter_errors(data), path_prefix=[]
+    )
+
+
+def get_drafts(complete_data):
+    """
+    Drafts as the populate loop sees them, from empty to complete
+    """
+    no_tags = {key: value for key, value in complete_data.items() if key != "tags"}
+    no_tumor = deepcopy(complete_data)
+    del no_tumor["tags"]["tumorLibraryId"]
+    bad_output_uri = deepcopy(complete_data)
+    bad_output_uri["engineParameters"]["outputUri"] = "not-a-uri"
+    wrong_type = deepcopy(complete_data)
+    wrong_type["tags"] = "L2400001"
+    return [{}, {"tags": {}}, no_tags, no_tumor, bad_output_uri, wrong_type, complete_data]
+
+
+def test_complete_data_is_valid(get_missing_schema_fields, schema, complete_data):
+    missing_fields, validation = get_missing_schema_fields.get_missing_fields(schema, complete_data)
+    assert missing_fields == []
+    assert validation["validatedUnitCount"] == len(validation["units"])
+
+
+def test_missing_fields_match_a_full_validation(get_missing_schema_fields, schema, complete_data):
+    previous_validation = None
+    for draft in get_drafts(complete_data):
+        missing_fields, previous_validation = get_missing_schema_fields.get_missing_fields(
+            schema, draft, previous_validation
+        )
+        assert missing_fields == get_full_validation_missing_fields(get_missing_schema_fields, schema, draft)
+        # And the same as a validation from scratch
+        assert missing_fields == get_missing_schema_fields.get_missing_fields(schema, draft)[0]
+
+
+def test_only_changed_units_are_validated(get_missing_schema_fields, schema, complete_data):
+    draft = deepcopy(complete_data)
+    del draft["tags"]["tumorLibraryId"]
+    missing_fields, validation = get_missing_schema_fields.get_missing_fields(schema, draft)
+    assert missing_fields == ["tags.tumorLibraryId"]
+
+    # Unchanged, nothing is validated again
+    assert get_missing_schema_fields.get_missing_fields(schema, draft, validation)[1]["validatedUnitCount"] == 0
+
+    # The tags keys and the new value are validated again
+    missing_fields, next_validation = get_missing_schema_fields.get_missing_fields(schema, complete_data, validation)
+    assert missing_fields == []
+    assert 0 < next_validation["validatedUnitCount"] < len(next_validation["units"])
+    assert next_validation["validatedUnitCount"] <= 3
+
+
+def test_schema_change_validates_every_unit(get_missing_schema_fields, schema, complete_data):
+    _, validation = get_missing_schema_fields.get_missing_fields(schema, complete_data)
+    changed_schema = deepcopy(schema)
+    changed_schema["$defs"]["tags"]["required"].append("projectId")
+
+    missing_fields, changed_validation = get_missing_schema_fields.get_missing_fields(
+        changed_schema, complete_data, validation
+    )
+    assert missing_fields == ["tags.projectId"]
+    assert changed_validation["validatedUnitCount"] == len(changed_validation["units"])
+
+
+def test_handler_keeps_the_validation_per_portal_run_id(get_missing_schema_fields, complete_data):
+    draft = deepcopy(complete_data)
+    del draft["tags"]["tumorLibraryId"]
+
+    response = get_missing_schema_fields.handler({"data": draft, "portalRunId": PORTAL_RUN_ID}, None)
+    assert response["missingFields"] == ["tags.tumorLibraryId"]
+
+    response = get_missing_schema_fields.handler({"data": draft, "portalRunId": PORTAL_RUN_ID}, None)
+    assert response["missingFields"] == ["tags.tumorLibraryId"]
+    assert response["validation"]["validatedUnitCount"] == 0
+
+    # Another run is validated in full
+    response = get_missing_schema_fields.handler({"data": draft, "portalRunId": "SBJ00002sash"}, None)
+    assert response["validation"]["validatedUnitCount"] == len(response["validation"]["units"])
@@ -12,6 +12,9 @@ from pathlib import Path
 # Layer imports
 from orcabus_api_tools.filemanager import get_file_manager_request_response_results
 from orcabus_api_tools.filemanager.models import FileObject
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 # Globals
 DRAGEN_WGTS_DNA_WORKFLOW_RUN_NAME = "dragen-wgts-dna"
@@ -19,6 +22,9 @@ Phenotype = Literal["TUMOR", "NORMAL"]
 PHENOTYPE_LIST: List[Phenotype] = ["TUMOR", "NORMAL"]
 
 
+bootstrap()
+
+
 def get_redux_bam_from_oncoanalyser_workflow(portal_run_id: str) -> Optional[FileObject]:
     bam_file: FileObject = next(filter(
         lambda file_iter: file_iter['key'].endswith("redux.bam"),
@@ -33,6 +39,8 @@ def get_redux_bam_from_oncoanalyser_workflow(portal_run_id: str) -> Optional[Fil
     return bam_file
 
 
+@trace_handler
+@profile_handler
 def handler(event, context):
     """
     Given a portal run id, get the output directory for the oncoanalyser workflow
@@ -10,8 +10,16 @@ from typing import Dict
 # Layer imports
 from orcabus_api_tools.workflow import get_workflow_run_from_portal_run_id
 from orcabus_api_tools.workflow.models import WorkflowRunDetail
+from sash_tools.bootstrap import bootstrap
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 
+bootstrap()
+
+
+@trace_handler
+@profile_handler
 def handler(event, context) -> Dict[str, WorkflowRunDetail]:
     """
     Given a portal run id, return the workflow run object
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+Index the run of a WorkflowRunStateChange event
+
+Targeted by the wrscIndex event rule, for every state change of the sash, DRAGEN and oncoanalyser workflows,
+so the workflow run index (see sash_tools.workflow_run_index) that find_latest_workflow answers from
+has the latest status of each run.
+
+Events that carry a payload also invalidate the cached run of their portal run id if the payload
+has changed (see sash_tools.run_payload_cache).
+
+The libraries of sash DRAFT events are added to the draft library filter until its next rebuild
+(see sash_tools.draft_library_filter).
+"""
+
+# Standard imports
+from os import environ
+
+# Layer imports
+from sash_tools.draft_library_filter import DraftLibraryFilter
+from sash_tools.run_payload_cache import RunPayloadCache
+from sash_tools.workflow_run_index import (
+    get_workflow_run_from_event_detail,
+    get_workflow_run_index
+)
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+# Globals
+DRAFT_STATUS = "DRAFT"
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Index the workflow run of the event detail
+
+    Input:
+      The WorkflowRunStateChange event detail
+      {
+        "orcabusId": "wfr.xxx",
+        "portalRunId": "20250101abcd1234",
+        "workflow": {"name": "dragen-wgts-dna", "version": "4.4.4"},
+        "status": "SUCCEEDED",
+        "timestamp": "2025-01-01T00:00:00Z",
+        "libraries": [{"libraryId": "L1234", "orcabusId": "lib.xxx"}],
+        "payload": {"version": "2025.08.05", "data": {...}}  (optional)
+      }
+
+    Output:
+      {
+        "isIndexed": true | false,  # false if the index already has a later state of the run
+        "isPayloadCacheInvalidated": true | false,
+        "isDraftLibraryFilterUpdated": true | false  # true for sash DRAFT events
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    # New sash drafts are in the draft library filter before its next rebuild
+    is_sash_draft = (
+        event['workflow']['name'] == environ.get('WORKFLOW_NAME') and
+        event['status'] == DRAFT_STATUS
+    )
+    if is_sash_draft:
+        DraftLibraryFilter().add_pending(list(map(
+            lambda library_iter_: library_iter_['libraryId'],
+            event.get('libraries') or []
+        )))
+
+    return {
+        "isIndexed": get_workflow_run_index().put_run(get_workflow_run_from_event_detail(event)),
+        "isPayloadCacheInvalidated": (
+            RunPayloadCache().invalidate_if_changed(event['portalRunId'], event['payload'])
+            if event.get('payload') else False
+        ),
+        "isDraftLibraryFilterUpdated": is_sash_draft,
+    }
+
+
+# if __name__ == "__main__":
+#     import json
+#     from os import environ
+#     environ['WORKFLOW_RUN_INDEX_BACKEND'] = 'sqlite'
+#     environ['WORKFLOW_RUN_INDEX_SQLITE_PATH'] = '.sash-workflow-run-index.sqlite'
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "orcabusId": "wfr.01JBMVHM2D5GCDT8Z9T5XVD1MS",
+#                 "portalRunId": "20250101abcd1234",
+#                 "workflowRunName": "umccr--automated--dragen-wgts-dna--20250101abcd1234",
+#                 "workflow": {
+#                     "name": "dragen-wgts-dna",
+#                     "version": "4.4.4"
+#                 },
+#                 "status": "SUCCEEDED",
+#                 "timestamp": "2025-01-01T00:00:00Z",
+#                 "libraries": [
+#                     {
+#                         "libraryId": "L2401540",
+#                         "orcabusId": "lib.01JBMVHM2D5GCDT8Z9T5XVD1MS"
+#                     }
+#                 ]
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "isIndexed": true,
+#     #     "isPayloadCacheInvalidated": false,
+#     #     "isDraftLibraryFilterUpdated": false
+#     # }
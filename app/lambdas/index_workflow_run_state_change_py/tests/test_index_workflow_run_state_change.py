@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the index_workflow_run_state_change handler invalidating the cached run of a changed payload
+"""
+
+# Standard imports
+from copy import deepcopy
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.run_payload_cache import RunPayloadCache
+
+
+@pytest.fixture
+def index_workflow_run_state_change(import_lambda_module):
+    return import_lambda_module("index_workflow_run_state_change")
+
+
+@pytest.fixture
+def ready_event_detail(orcabus_fixture):
+    from tools import local_stand_ins
+
+    ready_event_detail = next(filter(
+        lambda event_iter_: event_iter_[1]["status"] == "READY", local_stand_ins.get_subject_events()
+    ))[1]
+    assert RunPayloadCache().put_from_event_detail(ready_event_detail)
+    return ready_event_detail
+
+
+def test_own_running_event_keeps_the_cached_run(index_workflow_run_state_change, ready_event_detail):
+    running_event_detail = deepcopy({**ready_event_detail, "status": "RUNNING", "timestamp": "2025-01-01T01:00:00Z"})
+    running_event_detail["payload"]["data"]["engineParameters"]["analysisId"] = "00000000-0000-0000-0000-000000000000"
+
+    response = index_workflow_run_state_change.handler(running_event_detail, None)
+    assert response["isPayloadCacheInvalidated"] is False
+    assert RunPayloadCache().get(ready_event_detail["portalRunId"]) is not None
+
+
+def test_changed_payload_drops_the_cached_run(index_workflow_run_state_change, ready_event_detail):
+    changed_event_detail = deepcopy({**ready_event_detail, "timestamp": "2025-01-01T01:00:00Z"})
+    changed_event_detail["payload"]["data"]["inputs"]["groupId"] = "SBJ00002"
+
+    response = index_workflow_run_state_change.handler(changed_event_detail, None)
+    assert response["isPayloadCacheInvalidated"] is True
+    assert RunPayloadCache().get(ready_event_detail["portalRunId"]) is None
+
+
+def test_event_without_a_payload_keeps_the_cached_run(index_workflow_run_state_change, ready_event_detail):
+    event_detail = {key: value for key, value in ready_event_detail.items() if key != "payload"}
+    assert index_workflow_run_state_change.handler(event_detail, None)["isPayloadCacheInvalidated"] is False
+    assert RunPayloadCache().get(ready_event_detail["portalRunId"]) is not None
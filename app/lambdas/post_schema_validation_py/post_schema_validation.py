@@ -14,30 +14,33 @@ Performs the following steps:
   - Confirm pipelineId is accessible in the specified projectId
 * Validate inputs:
   - Confirm ALL input URIs exist via Filemanager (files and folders)
+  - Confirm the DRAGEN and oncoanalyser input dirs hold the artifacts sash reads (see EXPECTED_ARTIFACTS_BY_INPUT_KEY),
+    from the same single listing of each dir
+  - The filepaths of the additionalSamples rows are checked the same way, by their filetype
   - For URIs not in reference/test/project-prefix: validate linked to project via ICA API
 * On failure: write descriptive comments to workflow run record, return {"isValid": false}
 * On success: return {"isValid": true}
 """
 # Imports
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Dict, Tuple, List
+from typing import Dict, Iterable, Tuple, List, Pattern
 import logging
+import re
 from os import environ
 from time import sleep
 from urllib.parse import urlparse
 
-# Wrapica imports
-from libica.openapi.v3 import ApiException
-from wrapica.project_data import coerce_data_id_or_uri_to_project_data_obj, get_project_data_obj_by_id
-from wrapica.storage_configuration import get_s3_key_prefix_by_project_id
-from wrapica.project_pipelines import get_project_pipeline_obj
-from wrapica.project import get_project_obj_from_project_id
-
 # Layer imports
 from orcabus_api_tools.workflow import add_comment_to_workflow_run, get_workflow_run
 from orcabus_api_tools.filemanager import get_s3_object_id_from_s3_uri, list_files_recursively
 from orcabus_api_tools.filemanager.errors import S3FileNotFoundError
-from icav2_tools import set_icav2_env_vars
+from sash_tools.orcabus_client import run_concurrently
+from sash_tools.bootstrap import bootstrap, ensure_icav2_env_vars
+from sash_tools.comment_ledger import CommentLedger
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 # Globals
 WORKFLOW_NAME_ENV_VAR = "WORKFLOW_NAME"
@@ -49,6 +52,7 @@ REF_DATA_BUCKET = environ[REF_DATA_BUCKET_ENV_VAR]
 # Get workflow env vars as values
 WORKFLOW_NAME = environ[WORKFLOW_NAME_ENV_VAR]
 COMMENT_AUTHOR = f"{WORKFLOW_NAME}-workflow-validation-service"
+COMMENT_TYPE = "post_schema_validation_failed"
 # Midfixes
 ANALYSIS_MIDFIXES = ["analysis", "output", "outputs"]
 LOGS_MIDFIX = "logs"
@@ -56,11 +60,53 @@ LOGS_MIDFIX = "logs"
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+
+@dataclass(frozen=True)
+class ExpectedArtifact:
+    """
+    An artifact sash reads from an input dir
+    """
+    description: str
+    # Matched against the keys under the input dir, relative to the dir
+    pattern: Pattern[str]
+
+
+# Artifacts that must be under each input dir, incomplete DRAGEN or oncoanalyser outputs otherwise only fail
+# once the ICAv2 analysis reaches them
+EXPECTED_ARTIFACTS_BY_INPUT_KEY: Dict[str, Tuple[ExpectedArtifact, ...]] = {
+    "dragenSomaticDir": (
+        ExpectedArtifact("somatic small variant VCF (*.hard-filtered.vcf.gz)", re.compile(r"(^|/)[^/]+\.hard-filtered\.vcf\.gz$")),
+        ExpectedArtifact("somatic structural variant VCF (*.sv.vcf.gz)", re.compile(r"(^|/)[^/]+\.sv\.vcf\.gz$")),
+    ),
+    "dragenGermlineDir": (
+        ExpectedArtifact("germline small variant VCF (*.hard-filtered.vcf.gz)", re.compile(r"(^|/)[^/]+\.hard-filtered\.vcf\.gz$")),
+    ),
+    "oncoanalyserDnaDir": (
+        ExpectedArtifact("amber/ directory", re.compile(r"(^|/)amber/")),
+        ExpectedArtifact("cobalt/ directory", re.compile(r"(^|/)cobalt/")),
+        ExpectedArtifact("sage somatic calls (sage/somatic/ or sage_calling/somatic/)", re.compile(r"(^|/)sage(_calling)?/somatic/")),
+    ),
+}
+
+# Extra samplesheet rows of the inputs, their filepaths are checked as the input key of the same filetype
+ADDITIONAL_SAMPLES_INPUT_KEY = "additionalSamples"
+INPUT_KEY_BY_SAMPLESHEET_FILETYPE: Dict[str, str] = {
+    "dragen_somatic_dir": "dragenSomaticDir",
+    "dragen_germline_dir": "dragenGermlineDir",
+    "oncoanalyser_dir": "oncoanalyserDnaDir",
+}
+
 # Comment formatting constants
 MAX_COMMENT_LENGTH = 1024
 TRUNCATION_SUFFIX = "\n... [truncated, see execution ARN for full detail]"
 
 
+# The ICAv2 env vars are set on first use in the handler (ensure_icav2_env_vars), not in the init phase,
+# so a failed secret lookup fails the invocation (and is retried) rather than the cold start,
+# and icav2_tools is only imported by the invocations that need it
+bootstrap()
+
+
 def _format_comment_with_arn(body: str, execution_arn: str) -> str:
     """
     Append the execution ARN footer to a comment and enforce the 1024 char limit.
@@ -87,6 +133,11 @@ def validate_engine_parameters(
     :param project_prefix: The project prefix
     :return: A tuple of (is_valid, list of failure comments)
     """
+    # Wrapica imports, deferred as wrapica is slow to import
+    from libica.openapi.v3 import ApiException
+    from wrapica.project_pipelines import get_project_pipeline_obj
+    from wrapica.project import get_project_obj_from_project_id
+
     failures: List[str] = []
 
     # Get the project id
@@ -153,6 +204,70 @@ def validate_engine_parameters(
     return True, []
 
 
+def get_missing_artifacts(expected_artifacts: Iterable[ExpectedArtifact], relative_keys: Iterable[str]) -> List[ExpectedArtifact]:
+    """
+    Get the expected artifacts that match none of the keys, in one pass over the keys
+    :param expected_artifacts: The artifacts expected under the dir
+    :param relative_keys: The keys under the dir, relative to the dir
+    :return: The missing artifacts, in expected order
+    """
+    missing_artifacts = list(expected_artifacts)
+    for relative_key in relative_keys:
+        if not missing_artifacts:
+            break
+        missing_artifacts = list(filter(
+            lambda artifact_iter_: artifact_iter_.pattern.search(relative_key) is None,
+            missing_artifacts
+        ))
+    return missing_artifacts
+
+
+def get_filemanager_failures(
+        data_uri_and_input_keys: Tuple[str, List[str]],
+        expected_artifacts_by_input_key: Dict[str, Tuple[ExpectedArtifact, ...]] = EXPECTED_ARTIFACTS_BY_INPUT_KEY
+) -> List[str]:
+    """
+    Confirm a data uri exists in the Filemanager, and that a folder holds the artifacts expected for its input keys
+    :param data_uri_and_input_keys: A file uri, or a folder uri ending with /, and the input keys set to it
+    :param expected_artifacts_by_input_key: The artifacts expected under a folder, by input key
+    :return: The failure comments, empty if the uri exists and is complete
+    """
+    data_uri, input_keys = data_uri_and_input_keys
+
+    # Check if it's a folder URI (ends with /)
+    if data_uri.endswith("/"):
+        # For folder URIs, verify at least 1 file exists under that prefix
+        parsed = urlparse(data_uri)
+        bucket = parsed.netloc
+        prefix = str(Path(parsed.path)).lstrip("/") + "/"
+        files = list_files_recursively(bucket, prefix)
+        if not (len(files) > 0):
+            return [f"Folder URI '{data_uri}' has no files found under that prefix in the Filemanager"]
+
+        # Then check the expected artifacts against the same listing, no calls per file
+        missing_artifacts = get_missing_artifacts(
+            [
+                expected_artifact
+                for input_key in input_keys
+                for expected_artifact in expected_artifacts_by_input_key.get(input_key, ())
+            ],
+            map(lambda file_iter_: file_iter_['key'][len(prefix):], files)
+        )
+        return list(map(
+            lambda artifact_iter_: (
+                f"Folder URI '{data_uri}' ({', '.join(input_keys)}) is missing the {artifact_iter_.description}"
+            ),
+            missing_artifacts
+        ))
+
+    # For file URIs, confirm the file exists
+    try:
+        get_s3_object_id_from_s3_uri(data_uri)
+    except S3FileNotFoundError:
+        return [f"Data URI '{data_uri}' cannot be found by the Filemanager, are you sure it exists?"]
+    return []
+
+
 def validate_inputs(
         inputs: Dict,
         project_id: str,
@@ -162,7 +277,8 @@ def validate_inputs(
     Validate the inputs.
 
     Performs two-phase validation:
-    1. Filemanager existence check — confirms file/folder URIs exist at the S3 level
+    1. Filemanager existence check — confirms file/folder URIs exist at the S3 level,
+       and that the input dirs hold their expected artifacts (see EXPECTED_ARTIFACTS_BY_INPUT_KEY)
        (excludes reference data bucket URIs since they are not indexed by the Filemanager)
     2. ICA project context check — confirms URIs outside of ref/test/project-prefix
        are linked to the project
@@ -172,6 +288,10 @@ def validate_inputs(
     :param project_prefix: The ICAv2 project prefix
     :return: A tuple of (is_valid, list of failure comments)
     """
+    # Wrapica imports, deferred as wrapica is slow to import
+    from libica.openapi.v3 import ApiException
+    from wrapica.project_data import coerce_data_id_or_uri_to_project_data_obj, get_project_data_obj_by_id
+
     failures: List[str] = []
 
     # Get all data URIs from the inputs
@@ -180,8 +300,7 @@ def validate_inputs(
     #   - dragenSomaticDir (directory)
     #   - dragenGermlineDir (directory)
     #   - oncoanalyserDnaDir (directory)
-    data_uris: List[str] = []
-
+    #   - additionalSamples[].filepath (directory)
     input_keys_to_validate = [
         "refDataPath",
         "dragenSomaticDir",
@@ -189,45 +308,37 @@ def validate_inputs(
         "oncoanalyserDnaDir",
     ]
 
+    # The input keys set to each URI, URIs are listed once and in input order
+    input_keys_by_uri: Dict[str, List[str]] = {}
     for key in input_keys_to_validate:
         uri = inputs.get(key)
         if uri:
-            data_uris.append(uri)
-
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_uris = []
-    for uri in data_uris:
-        if uri not in seen:
-            seen.add(uri)
-            unique_uris.append(uri)
-    data_uris = unique_uris
-
-    # Phase 1: Filemanager existence check — ALL URIs except refdata bucket
+            input_keys_by_uri.setdefault(uri, []).append(key)
+
+    # The additional sample filepaths are named by their row, and expect the artifacts of their filetype
+    expected_artifacts_by_input_key = dict(EXPECTED_ARTIFACTS_BY_INPUT_KEY)
+    for idx, additional_sample in enumerate(inputs.get(ADDITIONAL_SAMPLES_INPUT_KEY, [])):
+        uri = additional_sample.get("filepath")
+        if not uri:
+            continue
+        key = f"{ADDITIONAL_SAMPLES_INPUT_KEY}[{idx}].filepath"
+        input_keys_by_uri.setdefault(uri, []).append(key)
+        expected_artifacts_by_input_key[key] = EXPECTED_ARTIFACTS_BY_INPUT_KEY.get(
+            INPUT_KEY_BY_SAMPLESHEET_FILETYPE.get(additional_sample.get("filetype"), ""), ()
+        )
+    data_uris = list(input_keys_by_uri.keys())
+
+    # Phase 1: Filemanager existence and expected content check — ALL URIs except refdata bucket
     non_reference_data_uris = list(filter(
         lambda uri: not uri.startswith(f"s3://{REF_DATA_BUCKET}/"),
         data_uris
     ))
-    for data_uri in non_reference_data_uris:
-        # Check if it's a folder URI (ends with /)
-        if data_uri.endswith("/"):
-            # For folder URIs, verify at least 1 file exists under that prefix
-            parsed = urlparse(data_uri)
-            bucket = parsed.netloc
-            prefix = str(Path(parsed.path)).lstrip("/") + "/"
-            files = list_files_recursively(bucket, prefix)
-            if not (len(files) > 0):
-                failures.append(
-                    f"Folder URI '{data_uri}' has no files found under that prefix in the Filemanager"
-                )
-        else:
-            # For file URIs, confirm the file exists
-            try:
-                get_s3_object_id_from_s3_uri(data_uri)
-            except S3FileNotFoundError:
-                failures.append(
-                    f"Data URI '{data_uri}' cannot be found by the Filemanager, are you sure it exists?"
-                )
+    # Run the checks concurrently, failures are kept in input order
+    for uri_failures in run_concurrently(
+        partial(get_filemanager_failures, expected_artifacts_by_input_key=expected_artifacts_by_input_key),
+        map(lambda uri_iter_: (uri_iter_, input_keys_by_uri[uri_iter_]), non_reference_data_uris)
+    ):
+        failures.extend(uri_failures)
 
     # If Filemanager checks failed, return early
     if failures:
@@ -269,6 +380,8 @@ def validate_inputs(
     return True, []
 
 
+@trace_handler
+@profile_handler
 def handler(event, context) -> Dict[str, bool]:
     """
     Given a draft schema, validate it against the current schema and print the results.
@@ -294,8 +407,8 @@ def handler(event, context) -> Dict[str, bool]:
       {"isValid": true}   — all checks pass
       {"isValid": false}  — at least one check failed (comment written)
     """
-    # Set env vars for ICAv2 access
-    set_icav2_env_vars()
+    # Set env vars for ICAv2 access, only if the access token is close to expiry
+    ensure_icav2_env_vars()
 
     # Get the event data
     payload_data = event.get('data')
@@ -319,6 +432,10 @@ def handler(event, context) -> Dict[str, bool]:
         )
         return {"isValid": False}
 
+    # Wrapica imports, deferred until we know we need to talk to ICAv2
+    from libica.openapi.v3 import ApiException
+    from wrapica.storage_configuration import get_s3_key_prefix_by_project_id
+
     try:
         project_prefix = get_s3_key_prefix_by_project_id(project_id)
     except ApiException:
@@ -367,6 +484,13 @@ def handler(event, context) -> Dict[str, bool]:
 
     # Write failure comments
     if all_failures:
+        # The failure comments are skipped together if the run already has the same failures,
+        # i.e. from a retried execution
+        comment_ledger = CommentLedger()
+        failures_body = "\n".join(all_failures)
+        if comment_ledger.is_suppressed(workflow_run_id, COMMENT_TYPE, failures_body):
+            return {"isValid": False}
+
         if len(all_failures) == 1:
             add_comment_to_workflow_run(
                 workflow_run_orcabus_id=workflow_run_id,
@@ -398,6 +522,7 @@ def handler(event, context) -> Dict[str, bool]:
                 )
                 sleep(1)
 
+        comment_ledger.record(workflow_run_id, COMMENT_TYPE, failures_body)
         return {"isValid": False}
 
     return {"isValid": True}
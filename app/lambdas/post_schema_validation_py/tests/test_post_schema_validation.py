@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the post_schema_validation handler
+"""
+
+# Standard imports
+import sys
+import types
+
+# Test imports
+import pytest
+
+
+@pytest.fixture
+def post_schema_validation(import_lambda_module):
+    return import_lambda_module("post_schema_validation")
+
+
+def test_import_does_not_set_the_icav2_env_vars(import_lambda_module, monkeypatch):
+    # A fresh import, with icav2_tools failing to import
+    monkeypatch.delitem(sys.modules, "post_schema_validation", raising=False)
+    monkeypatch.setitem(sys.modules, "icav2_tools", None)
+    monkeypatch.delenv("ICAV2_ACCESS_TOKEN", raising=False)
+    import_lambda_module("post_schema_validation")
+
+
+def test_icav2_env_vars_are_set_on_first_use(post_schema_validation, monkeypatch):
+    def _ensure_icav2_env_vars():
+        raise ConnectionError("Secrets Manager is unavailable")
+
+    monkeypatch.setattr(post_schema_validation, "ensure_icav2_env_vars", _ensure_icav2_env_vars)
+    # The invocation fails, and is retried by the state machine
+    with pytest.raises(ConnectionError):
+        post_schema_validation.handler({"workflowRunId": "wfr.01J", "data": {}}, None)
+
+
+def test_missing_artifacts_in_expected_order(post_schema_validation):
+    expected_artifacts = post_schema_validation.EXPECTED_ARTIFACTS_BY_INPUT_KEY["oncoanalyserDnaDir"]
+    assert post_schema_validation.get_missing_artifacts(expected_artifacts, []) == list(expected_artifacts)
+    assert post_schema_validation.get_missing_artifacts(
+        expected_artifacts,
+        ["SBJ00001/amber/L2400002.amber.baf.tsv.gz", "SBJ00001/sage_calling/somatic/L2400002.sage.somatic.vcf.gz"]
+    ) == [expected_artifacts[1]]
+    assert post_schema_validation.get_missing_artifacts(
+        expected_artifacts,
+        ["amber/a.tsv", "cobalt/b.tsv", "sage/somatic/c.vcf.gz", "purple/d.tsv"]
+    ) == []
+
+
+def test_missing_artifacts_match_anywhere_under_the_dir(post_schema_validation):
+    expected_artifacts = post_schema_validation.EXPECTED_ARTIFACTS_BY_INPUT_KEY["dragenSomaticDir"]
+    assert post_schema_validation.get_missing_artifacts(
+        expected_artifacts,
+        ["L2400002__L2400001/L2400002.hard-filtered.vcf.gz", "L2400002.sv.vcf.gz.tbi", "notamber/x"]
+    ) == [expected_artifacts[1]]
+
+
+def add_files(orcabus_fixture, bucket: str, keys):
+    orcabus_fixture.files["post_schema_validation"] = list(map(
+        lambda key_iter_: {"bucket": bucket, "key": key_iter_}, keys
+    ))
+
+
+def test_filemanager_failures_of_a_complete_dir(post_schema_validation, orcabus_fixture):
+    add_files(orcabus_fixture, "analysis-bucket", [
+        "dragen/L2400002__L2400001/L2400002.hard-filtered.vcf.gz",
+        "dragen/L2400002__L2400001/L2400002.sv.vcf.gz",
+    ])
+    assert post_schema_validation.get_filemanager_failures(
+        ("s3://analysis-bucket/dragen/L2400002__L2400001/", ["dragenSomaticDir"])
+    ) == []
+    # One listing for the dir, no call per artifact
+    assert orcabus_fixture.api_calls["list_files_recursively"] == 1
+    assert orcabus_fixture.api_calls["get_s3_object_id_from_s3_uri"] == 0
+
+
+def test_filemanager_failures_of_an_incomplete_dir(post_schema_validation, orcabus_fixture):
+    add_files(orcabus_fixture, "analysis-bucket", ["dragen/L2400001/L2400001.hard-filtered.vcf.gz"])
+    # The same dir for both input keys, each missing artifact is reported once
+    assert post_schema_validation.get_filemanager_failures(
+        ("s3://analysis-bucket/dragen/L2400001/", ["dragenSomaticDir", "dragenGermlineDir"])
+    ) == [
+        "Folder URI 's3://analysis-bucket/dragen/L2400001/' (dragenSomaticDir, dragenGermlineDir) "
+        "is missing the somatic structural variant VCF (*.sv.vcf.gz)"
+    ]
+
+
+def test_filemanager_failures_of_an_empty_dir(post_schema_validation, orcabus_fixture):
+    add_files(orcabus_fixture, "analysis-bucket", ["dragen/L2400001/L2400001.hard-filtered.vcf.gz"])
+    # A sibling dir with the same prefix is not under the dir
+    assert post_schema_validation.get_filemanager_failures(
+        ("s3://analysis-bucket/dragen/L24/", ["dragenGermlineDir"])
+    ) == ["Folder URI 's3://analysis-bucket/dragen/L24/' has no files found under that prefix in the Filemanager"]
+
+
+def test_filemanager_failures_of_a_file(post_schema_validation, orcabus_fixture):
+    add_files(orcabus_fixture, "analysis-bucket", ["ref/genome.fa"])
+    assert post_schema_validation.get_filemanager_failures(("s3://analysis-bucket/ref/genome.fa", [])) == []
+    assert post_schema_validation.get_filemanager_failures(("s3://analysis-bucket/ref/missing.fa", [])) == [
+        "Data URI 's3://analysis-bucket/ref/missing.fa' cannot be found by the Filemanager, are you sure it exists?"
+    ]
+
+
+@pytest.fixture
+def wrapica_modules(monkeypatch):
+    # validate_inputs imports wrapica before its Filemanager checks, which return before any ICAv2 call
+    for module_name in ["libica", "libica.openapi", "libica.openapi.v3", "wrapica", "wrapica.project_data"]:
+        monkeypatch.setitem(sys.modules, module_name, types.ModuleType(module_name))
+    sys.modules["libica.openapi.v3"].ApiException = Exception
+    sys.modules["wrapica.project_data"].coerce_data_id_or_uri_to_project_data_obj = None
+    sys.modules["wrapica.project_data"].get_project_data_obj_by_id = None
+
+
+def test_additional_sample_filepaths_are_checked(post_schema_validation, orcabus_fixture, wrapica_modules):
+    add_files(orcabus_fixture, "analysis-bucket", [
+        "dragen/L2400002/L2400002.hard-filtered.vcf.gz",
+        "dragen/L2400002/L2400002.sv.vcf.gz",
+        "dragen/L2400001/L2400001.hard-filtered.vcf.gz",
+        "oncoanalyser/SBJ00001/amber/a.tsv",
+        "oncoanalyser/SBJ00001/cobalt/b.tsv",
+        "oncoanalyser/SBJ00001/sage/somatic/c.vcf.gz",
+        "dragen/L2400003/L2400003.hard-filtered.vcf.gz",
+    ])
+    is_valid, failures = post_schema_validation.validate_inputs(
+        {
+            "dragenSomaticDir": "s3://analysis-bucket/dragen/L2400002/",
+            "dragenGermlineDir": "s3://analysis-bucket/dragen/L2400001/",
+            "oncoanalyserDnaDir": "s3://analysis-bucket/oncoanalyser/SBJ00001/",
+            "additionalSamples": [
+                # Checked as a somatic dir, so missing its structural variant VCF
+                {"sampleName": "L2400003", "filetype": "dragen_somatic_dir", "filepath": "s3://analysis-bucket/dragen/L2400003/"},
+                {"sampleName": "L2400004", "filetype": "oncoanalyser_dir", "filepath": "s3://analysis-bucket/oncoanalyser/missing/"},
+            ],
+        },
+        project_id="project-id",
+        project_prefix="s3://analysis-bucket/",
+    )
+    assert not is_valid
+    assert failures == [
+        "Folder URI 's3://analysis-bucket/dragen/L2400003/' (additionalSamples[0].filepath) "
+        "is missing the somatic structural variant VCF (*.sv.vcf.gz)",
+        "Folder URI 's3://analysis-bucket/oncoanalyser/missing/' has no files found under that prefix in the Filemanager",
+    ]
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+Rebuild the draft library filter from the sash DRAFT runs
+
+Targeted by the draftLibraryFilterRebuild schedule rule, replaces the Bloom filter of the library ids
+of the open sash drafts that the glue state machine checks upstream SUCCEEDED events against
+(see sash_tools.draft_library_filter).
+
+The runs are queried by their current status, so each rebuild only pages over the open drafts,
+not every sash run ever created.
+"""
+
+# Standard imports
+from os import environ
+
+# Layer imports
+from orcabus_api_tools.workflow import get_workflow_request_response_results
+from sash_tools.bootstrap import bootstrap
+from sash_tools.draft_library_filter import DraftLibraryFilter
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+# Globals
+DRAFT_STATUS = "DRAFT"
+WORKFLOW_RUN_ENDPOINT = "api/v1/workflowrun"
+
+
+bootstrap()
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    List the sash runs still in DRAFT, and rebuild the filter from their libraries
+
+    Input:
+      {}
+
+    Output:
+      {
+        "draftCount": 12,
+        "libraryCount": 24,
+        "bitCount": 1024,
+        "hashCount": 7,
+        "estimatedFalsePositiveRate": 1.7e-06
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    # A run may leave DRAFT while the pages are listed
+    draft_workflow_run_list = list(filter(
+        lambda workflow_run_iter_: workflow_run_iter_['currentState']['status'] == DRAFT_STATUS,
+        get_workflow_request_response_results(
+            endpoint=WORKFLOW_RUN_ENDPOINT,
+            params={
+                "workflow__name": environ['WORKFLOW_NAME'],
+                "status": DRAFT_STATUS,
+            }
+        )
+    ))
+
+    return DraftLibraryFilter().rebuild(
+        library_id_list=[
+            library_iter_['libraryId']
+            for workflow_run_iter_ in draft_workflow_run_list
+            for library_iter_ in workflow_run_iter_['libraries']
+        ],
+        draft_count=len(draft_workflow_run_list),
+    )
+
+
+# if __name__ == "__main__":
+#     import json
+#     from os import environ
+#     environ['AWS_PROFILE'] = 'umccr-development'
+#     environ['AWS_REGION'] = 'ap-southeast-2'
+#     environ['HOSTNAME_SSM_PARAMETER_NAME'] = '/hosted_zone/umccr/name'
+#     environ['ORCABUS_TOKEN_SECRET_ID'] = 'orcabus/token-service-jwt'
+#     environ['WORKFLOW_NAME'] = 'sash'
+#     environ['STATE_STORE_BACKEND'] = 'local'
+#     print(json.dumps(
+#         handler({}, None),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "draftCount": 12,
+#     #     "libraryCount": 24,
+#     #     "bitCount": 1024,
+#     #     "hashCount": 7,
+#     #     "estimatedFalsePositiveRate": 1.7e-06
+#     # }
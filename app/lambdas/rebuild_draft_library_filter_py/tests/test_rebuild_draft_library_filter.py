@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the rebuild_draft_library_filter handler
+"""
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.draft_library_filter import DraftLibraryFilter
+
+
+@pytest.fixture
+def rebuild_draft_library_filter(import_lambda_module):
+    return import_lambda_module("rebuild_draft_library_filter")
+
+
+def test_filter_is_rebuilt_from_the_open_drafts(rebuild_draft_library_filter, orcabus_fixture):
+    summary = rebuild_draft_library_filter.handler({}, None)
+    # The fixture's sash DRAFT run, not its READY run
+    assert summary["draftCount"] == 1
+    assert summary["libraryCount"] == 2
+    assert DraftLibraryFilter().check(["L2400001"]) is True
+
+    # Only the DRAFT runs are listed, not every sash run
+    assert orcabus_fixture.api_calls["get_workflow_request_response_results"] == 1
+    assert orcabus_fixture.api_calls["get_workflow_runs_from_metadata"] == 0
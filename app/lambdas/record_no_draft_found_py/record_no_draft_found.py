@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+"""
+Count an upstream SUCCEEDED event for which the glue state machine found no sash draft
+
+The last step of the glue state machine when the draft lookup finds no draft.
+An event that passed the draft library filter as a member, but has no draft, is a false positive
+of the filter, and is logged as the NoDraftFound metric (see sash_tools.draft_library_filter).
+"""
+
+# Layer imports
+from sash_tools.draft_library_filter import put_no_draft_found_metric
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+# Globals
+MEMBER_FILTER_STATUS = "member"
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Log the NoDraftFound metric if the event was a member of the draft library filter
+
+    Input:
+      {
+        "filterStatus": "member" | "unavailable",  # of the last draft library filter check of the event
+        "libraries": [{"libraryId": "L1234"}]
+      }
+
+    Output:
+      {
+        "isFalsePositive": true | false
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    # Without a current filter every event passes, those are not false positives
+    is_false_positive = event.get('filterStatus') == MEMBER_FILTER_STATUS
+    if is_false_positive:
+        put_no_draft_found_metric()
+
+    return {
+        "isFalsePositive": is_false_positive,
+    }
+
+
+# if __name__ == "__main__":
+#     import json
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "filterStatus": "member",
+#                 "libraries": [
+#                     {
+#                         "libraryId": "L2401540",
+#                         "orcabusId": "lib.01JBMVHM2D5GCDT8Z9T5XVD1MS"
+#                     }
+#                 ]
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "isFalsePositive": true
+#     # }
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the record_no_draft_found handler, and of the glue state machine finding no draft for a filter member
+"""
+
+# Standard imports
+import json
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.draft_library_filter import DraftLibraryFilter
+
+# Globals
+STATE_MACHINE_NAME = "glue_succeeded_events_to_draft_update"
+
+
+@pytest.fixture
+def record_no_draft_found(import_lambda_module):
+    return import_lambda_module("record_no_draft_found")
+
+
+def get_metric_names(capsys):
+    return [
+        metric_iter_["Name"]
+        for line_iter_ in capsys.readouterr().out.splitlines() if line_iter_.startswith('{"_aws"')
+        for metric_iter_ in json.loads(line_iter_)["_aws"]["CloudWatchMetrics"][0]["Metrics"]
+    ]
+
+
+def test_member_without_a_draft_is_a_false_positive(record_no_draft_found, capsys):
+    assert record_no_draft_found.handler(
+        {"filterStatus": "member", "libraries": [{"libraryId": "L2400001"}]}, None
+    ) == {"isFalsePositive": True}
+    assert get_metric_names(capsys) == ["NoDraftFound"]
+
+
+def test_unfiltered_event_is_not_a_false_positive(record_no_draft_found, capsys):
+    assert record_no_draft_found.handler(
+        {"filterStatus": "unavailable", "libraries": [{"libraryId": "L2400001"}]}, None
+    ) == {"isFalsePositive": False}
+    assert get_metric_names(capsys) == []
+
+
+def test_glue_state_machine_records_the_false_positive(orcabus_fixture, capsys):
+    pytest.importorskip("jsonata")
+    pytest.importorskip("requests")
+    from tools import local_stand_ins
+    from tools.asl_executor import LocalStateMachineExecutor, get_template_path, load_definition, load_lambda_handlers
+
+    _, dragen_succeeded_event = local_stand_ins.get_subject_events()[0]
+    # The libraries are in the filter, but their draft is gone
+    DraftLibraryFilter().rebuild(["L2400001", "L2400002"], draft_count=1)
+    orcabus_fixture.workflow_runs = list(filter(
+        lambda workflow_run_iter_: workflow_run_iter_['currentState']['status'] != "DRAFT",
+        orcabus_fixture.workflow_runs
+    ))
+
+    result = LocalStateMachineExecutor(
+        load_definition(get_template_path(STATE_MACHINE_NAME)),
+        load_lambda_handlers(local_stand_ins),
+        dict(local_stand_ins.SSM_PARAMETERS),
+        STATE_MACHINE_NAME,
+    ).start_execution(dragen_succeeded_event)
+    assert result.status == "SUCCEEDED", result.error
+    assert result.stats.lambda_invocations["record_no_draft_found"] == 1
+    assert result.put_events == []
+    assert get_metric_names(capsys).count("NoDraftFound") == 1
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""
+Release the claim on the run of an ICAv2 WES event whose WRSC event was not pushed
+
+Called by the state machine when the execution fails after convert_icav2_wes_event_to_wrsc_event
+claimed the run, so a redelivery of the event is processed rather than taken for a duplicate,
+and other events of the run are not held up until the claim expires (see sash_tools.wes_status_guard).
+"""
+
+# Layer imports
+from sash_tools.wes_status_guard import WesStatusGuard
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Release the claim of the execution, the last accepted status of the run is unchanged
+
+    Input:
+      {
+        "portalRunId": "20250101abcd1234",
+        "executionArn": "arn:aws:states:...:execution:..."
+      }
+
+    Output:
+      {
+        "isReleased": true
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    return {
+        "isReleased": WesStatusGuard().release(event['portalRunId'], event['executionArn']),
+    }
+
+
+# if __name__ == "__main__":
+#     import json
+#     from os import environ
+#     environ['STATE_STORE_BACKEND'] = 'local'
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "portalRunId": "20250101abcd1234",
+#                 "executionArn": "arn:aws:states:ap-southeast-2:123456789012:execution:icav2WesEventToWrscEvent:abcd"
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "isReleased": false
+#     # }
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the release_icav2_wes_status handler
+"""
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.wes_status_guard import WesStatusGuard
+
+# Globals
+PORTAL_RUN_ID = "20250101abcd1234"
+EXECUTION_ARN = "arn:aws:states:local:000000000000:execution:icav2WesEventToWrscEvent:{}"
+
+
+@pytest.fixture
+def release_icav2_wes_status(import_lambda_module):
+    return import_lambda_module("release_icav2_wes_status")
+
+
+def test_claim_is_released(release_icav2_wes_status):
+    assert WesStatusGuard().claim(PORTAL_RUN_ID, "RUNNING", "analysis", EXECUTION_ARN.format("1")) is None
+    event = {"portalRunId": PORTAL_RUN_ID, "executionArn": EXECUTION_ARN.format("1")}
+    assert release_icav2_wes_status.handler(event, None) == {"isReleased": True}
+    # A redelivery of the event claims the run
+    assert WesStatusGuard().claim(PORTAL_RUN_ID, "RUNNING", "analysis", EXECUTION_ARN.format("2")) is None
+
+
+def test_claim_of_another_execution_is_kept(release_icav2_wes_status):
+    assert WesStatusGuard().claim(PORTAL_RUN_ID, "RUNNING", "analysis", EXECUTION_ARN.format("1")) is None
+    event = {"portalRunId": PORTAL_RUN_ID, "executionArn": EXECUTION_ARN.format("2")}
+    assert release_icav2_wes_status.handler(event, None) == {"isReleased": False}
+    assert WesStatusGuard().store.get(PORTAL_RUN_ID)["claim"]["executionArn"] == EXECUTION_ARN.format("1")
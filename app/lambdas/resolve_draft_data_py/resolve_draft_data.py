@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+
+"""
+Resolve the missing tags, library readsets and inputs of a sash draft in one invocation
+
+Each draft field is mapped to a resolver with declared dependencies (see sash_tools.field_resolver),
+only the resolvers for missing target fields (and the missing fields they depend on) run,
+concurrently in dependency order.
+
+Resolvers reuse the handlers of the single purpose lambdas they replace in the populate draft data
+state machine, the function is deployed with every handler directory (as the sash dispatcher is).
+
+Fields
+  tags.fastqRgidList, tags.tumorFastqRgidList  <- get_fastq_rgids_from_library_id
+  tags.subjectId, tags.individualId            <- get_metadata_tags, always refreshed
+  libraries (readsets)                         <- get_fastq_id_list_from_rgid_list, per rgid
+  inputs.dragenGermlineDir, dragenSomaticDir   <- find_latest_workflow + get_dragen_outputs_from_portal_run_id
+  inputs.oncoanalyserDnaDir                    <- find_latest_workflow + get_oncoanalyser_dir_from_portal_run_id
+  inputs.normalDnaSampleId, tumorDnaSampleId   <- tags, always refreshed
+  inputs.groupId, inputs.subjectId             <- tags
+  inputs.refDataPath                           <- default reference data path SSM parameter for the workflow version
+
+The latest upstream workflow runs only depend on the library ids, so they are looked up
+while the readsets are still being resolved.
+
+Output fields listed in checkIn are returned as claim checks if they are large (see sash_tools.claim_check),
+the state machine only passes them on to a lambda that resolves them.
+"""
+
+# Standard imports
+import json
+import logging
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from os import environ
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Layer imports
+from sash_tools.claim_check import check_in
+from sash_tools.field_resolver import FieldResolverGraph, is_missing
+from sash_tools.bootstrap import bootstrap
+from sash_tools.sibling_handlers import SiblingHandlers
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
+
+if typing.TYPE_CHECKING:
+    from mypy_boto3_ssm import SSMClient
+
+# Globals
+LAMBDAS_DIR = Path(__file__).absolute().parent.parent
+REFERENCE_DATA_SSM_PARAMETER_PREFIX_ENV_VAR = "DEFAULT_REF_DATA_PATH_SSM_PARAMETER_PREFIX"
+DRAGEN_WGTS_DNA_WORKFLOW_NAME = "dragen-wgts-dna"
+ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME = "oncoanalyser-wgts-dna"
+SUCCEEDED_STATUS = "SUCCEEDED"
+OUTPUT_FIELDS = ["tags", "libraries", "inputs"]
+MAX_READSET_LOOKUP_WORKERS = 8
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SIBLING_HANDLERS = SiblingHandlers(LAMBDAS_DIR)
+
+RESOLVERS = FieldResolverGraph()
+
+
+bootstrap()
+
+
+def call_handler(lambda_name: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    return SIBLING_HANDLERS.get_handler_module(lambda_name).handler(event, None)
+
+
+def get_ssm_parameter_value(parameter_name: str) -> str:
+    # Only needed when the reference data path is missing, keep boto3 out of the cold start
+    import boto3
+    ssm_client: "SSMClient" = boto3.client("ssm")
+    return ssm_client.get_parameter(Name=parameter_name)["Parameter"]["Value"]
+
+
+def get_latest_succeeded_workflow_run(workflow_name: str, draft: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    workflow_run_list = call_handler(
+        "find_latest_workflow",
+        {
+            "workflowName": workflow_name,
+            # Only the library ids are used, so we don't need to wait for the readsets
+            "libraries": list(map(
+                lambda library_id_iter_: {"libraryId": library_id_iter_},
+                filter(None, [draft["tags"].get("libraryId"), draft["tags"].get("tumorLibraryId")])
+            )),
+            "analysisRunId": draft.get("analysisRunId"),
+            "status": SUCCEEDED_STATUS,
+        }
+    )["workflowRunList"]
+    return workflow_run_list[0] if workflow_run_list else None
+
+
+# Tags
+@RESOLVERS.resolver(provides=["tags.fastqRgidList"], requires=["tags.libraryId"])
+def fastq_rgid_list(draft: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "tags.fastqRgidList": call_handler(
+            "get_fastq_rgids_from_library_id", {"libraryId": draft["tags"]["libraryId"]}
+        )["fastqRgidList"]
+    }
+
+
+@RESOLVERS.resolver(
+    provides=["tags.tumorFastqRgidList"],
+    requires=["tags.tumorLibraryId"],
+    is_needed=lambda draft: (
+        not is_missing(draft, "tags.tumorLibraryId") and
+        is_missing(draft, "tags.tumorFastqRgidList")
+    ),
+)
+def tumor_fastq_rgid_list(draft: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "tags.tumorFastqRgidList": call_handler(
+            "get_fastq_rgids_from_library_id", {"libraryId": draft["tags"]["tumorLibraryId"]}
+        )["fastqRgidList"]
+    }
+
+
+@RESOLVERS.resolver(
+    provides=["tags.subjectId", "tags.individualId"],
+    requires=["tags.libraryId"],
+    # The subject of a library may be changed in the metadata manager
+    is_needed=lambda draft: True,
+)
+def metadata_tags(draft: Dict[str, Any]) -> Dict[str, Any]:
+    subject = call_handler("get_metadata_tags", {"libraryId": draft["tags"]["libraryId"]})["libraryObj"]["subject"]
+    return {
+        "tags.subjectId": subject["subjectId"],
+        "tags.individualId": (
+            subject["individualSet"][0]["individualId"]
+            if len(subject.get("individualSet", [])) > 0
+            else subject["subjectId"]
+        ),
+    }
+
+
+# Libraries
+@RESOLVERS.resolver(
+    provides=["libraries"],
+    requires=["tags.libraryId", "tags.tumorLibraryId", "tags.fastqRgidList", "tags.tumorFastqRgidList"],
+    is_needed=lambda draft: True,
+)
+def libraries(draft: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The normal library, and the tumor library if it has rgids, with a readset for each rgid.
+    Readsets already on the library are kept if they match the rgid list
+    """
+    tags = draft["tags"]
+    library_rgids = [(tags["libraryId"], tags.get("fastqRgidList", []))]
+    if tags.get("tumorLibraryId") and tags.get("tumorFastqRgidList"):
+        library_rgids.append((tags["tumorLibraryId"], tags["tumorFastqRgidList"]))
+
+    def _get_readset(rgid: str) -> Dict[str, Any]:
+        return {
+            "orcabusId": call_handler("get_fastq_id_list_from_rgid_list", {"fastqRgidList": [rgid]})["fastqIdList"][0],
+            "rgid": rgid,
+        }
+
+    resolved_libraries = []
+    with ThreadPoolExecutor(max_workers=MAX_READSET_LOOKUP_WORKERS) as executor:
+        for library_id, rgid_list in library_rgids:
+            library = next(
+                filter(
+                    lambda library_iter_: library_iter_["libraryId"] == library_id,
+                    draft.get("libraries", [])
+                ),
+                None
+            )
+            if library is None:
+                raise ValueError(f"Library '{library_id}' of the draft tags is not linked to the workflow run")
+            existing_readsets = library.get("readsets") or []
+            if sorted(map(lambda readset_iter_: readset_iter_["rgid"], existing_readsets)) != sorted(rgid_list):
+                # Each lookup runs in a copy of the context, to keep the current trace span (see sash_tools.tracing)
+                readset_futures = list(map(
+                    lambda rgid_iter_: executor.submit(copy_context().run, _get_readset, rgid_iter_),
+                    rgid_list
+                ))
+                library = {**library, "readsets": list(map(lambda future_iter_: future_iter_.result(), readset_futures))}
+            resolved_libraries.append(library)
+
+    return {"libraries": resolved_libraries}
+
+
+# Inputs
+@RESOLVERS.resolver(provides=["dragenWgtsDnaWorkflowRun"], requires=["tags.libraryId", "tags.tumorLibraryId"])
+def dragen_wgts_dna_workflow_run(draft: Dict[str, Any]) -> Dict[str, Any]:
+    return {"dragenWgtsDnaWorkflowRun": get_latest_succeeded_workflow_run(DRAGEN_WGTS_DNA_WORKFLOW_NAME, draft)}
+
+
+@RESOLVERS.resolver(provides=["inputs.dragenGermlineDir"], requires=["dragenWgtsDnaWorkflowRun"])
+def dragen_germline_dir(draft: Dict[str, Any]) -> Dict[str, Any]:
+    if draft.get("dragenWgtsDnaWorkflowRun") is None:
+        return {}
+    return {
+        "inputs.dragenGermlineDir": call_handler(
+            "get_dragen_outputs_from_portal_run_id",
+            {"portalRunId": draft["dragenWgtsDnaWorkflowRun"]["portalRunId"], "phenotype": "NORMAL"}
+        )["dragenGermlineDir"]
+    }
+
+
+@RESOLVERS.resolver(
+    provides=["inputs.dragenSomaticDir"],
+    requires=["dragenWgtsDnaWorkflowRun", "tags.tumorFastqRgidList"],
+    # Planned before the tumor rgids are resolved, a tumor library without fastqs gets no somatic dir
+    is_needed=lambda draft: (
+        not is_missing(draft, "tags.tumorLibraryId") and
+        is_missing(draft, "inputs.dragenSomaticDir")
+    ),
+)
+def dragen_somatic_dir(draft: Dict[str, Any]) -> Dict[str, Any]:
+    if draft.get("dragenWgtsDnaWorkflowRun") is None or is_missing(draft, "tags.tumorFastqRgidList"):
+        return {}
+    return {
+        "inputs.dragenSomaticDir": call_handler(
+            "get_dragen_outputs_from_portal_run_id",
+            {"portalRunId": draft["dragenWgtsDnaWorkflowRun"]["portalRunId"], "phenotype": "TUMOR"}
+        )["dragenSomaticDir"]
+    }
+
+
+@RESOLVERS.resolver(provides=["oncoanalyserWgtsDnaWorkflowRun"], requires=["tags.libraryId", "tags.tumorLibraryId"])
+def oncoanalyser_wgts_dna_workflow_run(draft: Dict[str, Any]) -> Dict[str, Any]:
+    return {"oncoanalyserWgtsDnaWorkflowRun": get_latest_succeeded_workflow_run(ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME, draft)}
+
+
+@RESOLVERS.resolver(provides=["inputs.oncoanalyserDnaDir"], requires=["oncoanalyserWgtsDnaWorkflowRun"])
+def oncoanalyser_dna_dir(draft: Dict[str, Any]) -> Dict[str, Any]:
+    if draft.get("oncoanalyserWgtsDnaWorkflowRun") is None:
+        return {}
+    return {
+        "inputs.oncoanalyserDnaDir": call_handler(
+            "get_oncoanalyser_dir_from_portal_run_id",
+            {"portalRunId": draft["oncoanalyserWgtsDnaWorkflowRun"]["portalRunId"]}
+        )["oncoanalyserDnaDir"]
+    }
+
+
+@RESOLVERS.resolver(
+    provides=["inputs.normalDnaSampleId", "inputs.tumorDnaSampleId"],
+    requires=["tags.libraryId", "tags.tumorLibraryId"],
+    # The sample ids must always match the library ids
+    is_needed=lambda draft: True,
+)
+def sample_ids(draft: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "inputs.normalDnaSampleId": draft["tags"]["libraryId"],
+        "inputs.tumorDnaSampleId": draft["tags"].get("tumorLibraryId"),
+    }
+
+
+@RESOLVERS.resolver(provides=["inputs.groupId", "inputs.subjectId"], requires=["tags.libraryId", "tags.tumorLibraryId"])
+def group_and_subject_ids(draft: Dict[str, Any]) -> Dict[str, Any]:
+    default_id = (
+        (f"{draft['tags']['tumorLibraryId']}__" if draft["tags"].get("tumorLibraryId") else "") +
+        draft["tags"]["libraryId"]
+    )
+    return {
+        "inputs.groupId": draft.get("inputs", {}).get("groupId") or default_id,
+        "inputs.subjectId": draft.get("inputs", {}).get("subjectId") or default_id,
+    }
+
+
+@RESOLVERS.resolver(provides=["inputs.refDataPath"], requires=["workflowVersion"])
+def ref_data_path(draft: Dict[str, Any]) -> Dict[str, Any]:
+    # The default is per workflow version, don't read the parameter of a 'None' version
+    if is_missing(draft, "workflowVersion"):
+        raise ValueError("No workflow version to get the default reference data path for, and no refDataPath input")
+    # Stored as a json string
+    return {
+        "inputs.refDataPath": json.loads(get_ssm_parameter_value(
+            f"{environ[REFERENCE_DATA_SSM_PARAMETER_PREFIX_ENV_VAR]}/{draft['workflowVersion']}"
+        ))
+    }
+
+
+@trace_handler
+@profile_handler
+def handler(event, context):
+    """
+    Resolve the missing draft fields
+
+    Input:
+      {
+        "targets": ["libraries", "inputs"],  # Optional, defaults to all fields
+        "checkIn": ["libraries", "inputs"],  # Optional, output fields to check in if they are large
+        "tags": {...},
+        "libraries": [...],                  # The libraries linked to the workflow run
+        "inputs": {...},
+        "workflowVersion": "0.7.0",
+        "analysisRunId": "anr.xxx"           # Optional
+      }
+
+    Output:
+      {
+        "tags": {...},
+        "libraries": [...],                  # Or a claim check reference, if checked in
+        "inputs": {...},
+        "resolvers": ["metadata_tags", ...]  # The resolvers that ran, in completion order
+      }
+
+    :param event:
+    :param context:
+    :return:
+    """
+    draft = {
+        "tags": event.get("tags") or {},
+        "libraries": event.get("libraries") or [],
+        "inputs": event.get("inputs") or {},
+        "workflowVersion": event.get("workflowVersion"),
+        "analysisRunId": event.get("analysisRunId"),
+    }
+
+    resolved_draft, resolver_names = RESOLVERS.resolve(draft, targets=event.get("targets"))
+    logger.info(f"Ran resolvers {resolver_names}")
+
+    check_in_fields = event.get("checkIn") or []
+
+    return {
+        **{
+            field_iter_: (
+                check_in(resolved_draft.get(field_iter_, {}))
+                if field_iter_ in check_in_fields
+                else resolved_draft.get(field_iter_, {})
+            )
+            for field_iter_ in OUTPUT_FIELDS
+        },
+        "resolvers": resolver_names,
+    }
+
+
+# if __name__ == "__main__":
+#     from os import environ
+#     import json
+#     environ['AWS_PROFILE'] = 'umccr-development'
+#     environ['HOSTNAME_SSM_PARAMETER_NAME'] = '/hosted_zone/umccr/name'
+#     environ['ORCABUS_TOKEN_SECRET_ID'] = 'orcabus/token-service-jwt'
+#     environ['DEFAULT_REF_DATA_PATH_SSM_PARAMETER_PREFIX'] = '/orcabus/workflows/sash/default-sash-reference-paths-by-workflow-version'
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "targets": ["libraries", "inputs"],
+#                 "tags": {
+#                     "libraryId": "L2401540",
+#                     "tumorLibraryId": "L2401541",
+#                     "fastqRgidList": ["GGACTTGG+CGTCTGCG.2.241024_A00130_0336_BHW7MVDSXC"],
+#                     "tumorFastqRgidList": ["CTCTACTT+TCCTGACA.2.241024_A00130_0336_BHW7MVDSXC"]
+#                 },
+#                 "libraries": [
+#                     {"libraryId": "L2401540", "orcabusId": "lib.01JBB5Y3901PA0X3FBMWBKYNMB"},
+#                     {"libraryId": "L2401541", "orcabusId": "lib.01JBB5Y3QGZSDB9J1G6T2GFW8R"}
+#                 ],
+#                 "inputs": {},
+#                 "workflowVersion": "0.7.0"
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
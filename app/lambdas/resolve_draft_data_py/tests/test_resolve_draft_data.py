@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the resolve_draft_data handler, against the OrcaBus stand-ins
+"""
+
+# Standard imports
+import json
+from typing import Any, Dict
+
+# Test imports
+import pytest
+
+SUBJECT_ID = "SBJ00001"
+NORMAL_LIBRARY_ID = "L2400001"
+TUMOR_LIBRARY_ID = "L2400002"
+WORKFLOW_VERSION = "0.7.0"
+
+
+@pytest.fixture
+def resolve_draft_data(import_lambda_module, orcabus_fixture):
+    return import_lambda_module("resolve_draft_data")
+
+
+@pytest.fixture
+def draft_event(orcabus_fixture) -> Dict[str, Any]:
+    # The tags and linked libraries of a new draft
+    draft = next(filter(
+        lambda workflow_run_iter_: workflow_run_iter_["portalRunId"] == f"{SUBJECT_ID}sash",
+        orcabus_fixture.workflow_runs
+    ))
+    return {
+        "tags": {"libraryId": NORMAL_LIBRARY_ID, "tumorLibraryId": TUMOR_LIBRARY_ID},
+        "libraries": json.loads(json.dumps(draft["libraries"])),
+        "inputs": {},
+        "workflowVersion": WORKFLOW_VERSION,
+    }
+
+
+def test_resolves_every_field(resolve_draft_data, draft_event):
+    response = resolve_draft_data.handler(draft_event, None)
+
+    assert response["tags"]["subjectId"] == SUBJECT_ID
+    assert response["tags"]["individualId"] == SUBJECT_ID
+    assert len(response["tags"]["fastqRgidList"]) == 2
+    assert len(response["tags"]["tumorFastqRgidList"]) == 2
+
+    assert list(map(lambda library_iter_: library_iter_["libraryId"], response["libraries"])) == [
+        NORMAL_LIBRARY_ID, TUMOR_LIBRARY_ID
+    ]
+    assert sorted(map(lambda readset_iter_: readset_iter_["rgid"], response["libraries"][0]["readsets"])) == sorted(
+        response["tags"]["fastqRgidList"]
+    )
+
+    inputs = response["inputs"]
+    assert inputs["normalDnaSampleId"] == NORMAL_LIBRARY_ID
+    assert inputs["tumorDnaSampleId"] == TUMOR_LIBRARY_ID
+    assert inputs["groupId"] == inputs["subjectId"] == f"{TUMOR_LIBRARY_ID}__{NORMAL_LIBRARY_ID}"
+    assert inputs["dragenGermlineDir"].endswith(f"/{NORMAL_LIBRARY_ID}__hg38__graph__dragen_variant_calling/")
+    assert inputs["dragenSomaticDir"].endswith(
+        f"/{TUMOR_LIBRARY_ID}__{NORMAL_LIBRARY_ID}__hg38__linear__dragen_variant_calling/"
+    )
+    assert inputs["oncoanalyserDnaDir"].endswith(f"/{SUBJECT_ID}/")
+    assert inputs["refDataPath"].endswith(f"/{WORKFLOW_VERSION}/")
+
+    # The upstream runs are only resolver intermediates
+    assert set(response) == {"tags", "libraries", "inputs", "resolvers"}
+
+
+def test_checked_in_fields(resolve_draft_data, draft_event, monkeypatch):
+    from sash_tools import claim_check
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_BACKEND_ENV_VAR, "memory")
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_THRESHOLD_BYTES_ENV_VAR, "1")
+
+    response = resolve_draft_data.handler({**draft_event, "checkIn": ["libraries", "inputs"]}, None)
+
+    assert claim_check.is_claim_check(response["libraries"])
+    assert claim_check.is_claim_check(response["inputs"])
+    assert not claim_check.is_claim_check(response["tags"])
+    assert claim_check.check_out(response["inputs"])["normalDnaSampleId"] == NORMAL_LIBRARY_ID
+    assert all(map(
+        lambda library_iter_: len(library_iter_["readsets"]) == 2,
+        claim_check.check_out(response["libraries"])
+    ))
+
+
+def test_missing_workflow_version(resolve_draft_data, draft_event):
+    draft_event["workflowVersion"] = None
+    with pytest.raises(ValueError, match="No workflow version"):
+        resolve_draft_data.handler(draft_event, None)
+
+    # A provided reference data path does not need the workflow version
+    draft_event["inputs"] = {"refDataPath": "s3://reference-data/sash/"}
+    assert resolve_draft_data.handler(draft_event, None)["inputs"]["refDataPath"] == "s3://reference-data/sash/"
+
+
+def test_subject_and_individual_ids_are_always_refreshed(resolve_draft_data, draft_event):
+    draft_event["tags"].update({"subjectId": "SBJ99999", "individualId": "SBJ99999"})
+    response = resolve_draft_data.handler({**draft_event, "targets": ["tags"]}, None)
+    assert response["tags"]["subjectId"] == SUBJECT_ID
+    assert response["tags"]["individualId"] == SUBJECT_ID
+    assert "metadata_tags" in response["resolvers"]
+
+
+def test_present_fields_are_kept(resolve_draft_data, draft_event, orcabus_fixture):
+    draft_event["inputs"] = {"groupId": "custom-group", "dragenGermlineDir": "s3://bucket/custom/germline/"}
+    response = resolve_draft_data.handler({**draft_event, "targets": ["inputs"]}, None)
+    assert response["inputs"]["groupId"] == "custom-group"
+    assert response["inputs"]["dragenGermlineDir"] == "s3://bucket/custom/germline/"
+    assert "dragen_germline_dir" not in response["resolvers"]
+
+
+def test_germline_only_draft(resolve_draft_data, draft_event):
+    del draft_event["tags"]["tumorLibraryId"]
+    draft_event["libraries"] = draft_event["libraries"][:1]
+    response = resolve_draft_data.handler(draft_event, None)
+    assert "tumorDnaSampleId" not in response["inputs"]
+    assert "dragenSomaticDir" not in response["inputs"]
+    assert response["inputs"]["groupId"] == NORMAL_LIBRARY_ID
+
+
+def test_tag_library_not_linked_to_the_run(resolve_draft_data, draft_event):
+    draft_event["libraries"] = draft_event["libraries"][:1]
+    with pytest.raises(ValueError, match=f"Library '{TUMOR_LIBRARY_ID}' of the draft tags is not linked"):
+        resolve_draft_data.handler({**draft_event, "targets": ["libraries"]}, None)
+
+
+def test_readsets_are_kept_if_they_match(resolve_draft_data, draft_event, orcabus_fixture):
+    first_response = resolve_draft_data.handler(draft_event, None)
+    orcabus_fixture.api_calls.clear()
+
+    second_response = resolve_draft_data.handler({**first_response, "workflowVersion": WORKFLOW_VERSION}, None)
+    assert second_response["libraries"] == first_response["libraries"]
+    assert orcabus_fixture.api_calls["get_fastq_by_rgid"] == 0
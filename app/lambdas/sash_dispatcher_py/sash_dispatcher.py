@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Single entry point for all sash lambda handlers
+
+Routes the event to the handler named by its 'action' attribute, the snake case lambda name
+i.e. {"action": "compare_payload", "oldPayload": {...}, "newPayload": {...}}
+is passed (without the action attribute) to compare_payload.handler
+
+Deployed as one function bundling every handler directory (see buildSashDispatcherLambda),
+so that low traffic steps share one warm pool, along with any module level clients and caches.
+Each handler is still deployed as its own function and the state machines only use the
+dispatcher if the stack is configured to.
+
+Handler modules are imported on first use (see sash_tools.sibling_handlers), so a cold dispatcher
+only pays for the imports of the action it is running.
+"""
+
+# Standard imports
+import logging
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Any, List
+
+# Layer imports
+from sash_tools.sibling_handlers import SiblingHandlers
+
+# Globals
+ACTION_KEY = "action"
+LAMBDAS_DIR = Path(__file__).absolute().parent.parent
+DISPATCHER_NAME = "sash_dispatcher"
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Handler modules imported in this container
+SIBLING_HANDLERS = SiblingHandlers(LAMBDAS_DIR, excluded_lambda_names=[DISPATCHER_NAME])
+
+
+def get_actions() -> List[str]:
+    return SIBLING_HANDLERS.get_lambda_names()
+
+
+def get_handler_module(action: str) -> ModuleType:
+    if action not in get_actions():
+        raise ValueError(f"Unknown action '{action}', expected one of {get_actions()}")
+    return SIBLING_HANDLERS.get_handler_module(action)
+
+
+def handler(event: Dict[str, Any], context):
+    """
+    Run the handler for the event action
+
+    Input:
+      {
+        "action": "compare_payload",
+        ...  # the handler event
+      }
+
+    Output:
+      The handler output
+
+    :param event:
+    :param context:
+    :return:
+    """
+    event = dict(event)
+    action = event.pop(ACTION_KEY, None)
+
+    if action is None:
+        raise ValueError(f"Event is missing the '{ACTION_KEY}' attribute")
+
+    return get_handler_module(action).handler(event, context)
+
+
+# if __name__ == "__main__":
+#     import json
+#     print(json.dumps(
+#         handler(
+#             {
+#                 "action": "compare_payload",
+#                 "oldPayload": {"version": "2025.08.05", "data": {}},
+#                 "newPayload": {"version": "2025.08.05", "data": {"tags": {}}}
+#             },
+#             None
+#         ),
+#         indent=4
+#     ))
+#
+#     # {
+#     #     "hasChanged": true
+#     # }
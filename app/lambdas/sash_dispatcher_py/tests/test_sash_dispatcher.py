@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the sash dispatcher routing
+"""
+
+# Test imports
+import pytest
+
+
+@pytest.fixture
+def sash_dispatcher(import_lambda_module):
+    return import_lambda_module("sash_dispatcher")
+
+
+def test_actions(sash_dispatcher):
+    actions = sash_dispatcher.get_actions()
+    assert "compare_payload" in actions
+    assert "resolve_draft_data" in actions
+    assert "sash_dispatcher" not in actions
+    assert actions == sorted(actions)
+
+
+def test_routes_on_action(sash_dispatcher):
+    event = {
+        "action": "compare_payload",
+        "oldPayload": {"version": "2025.08.05", "data": {}},
+        "newPayload": {"version": "2025.08.05", "data": {"tags": {}}},
+    }
+    assert sash_dispatcher.handler(event, None) == {"hasChanged": True}
+    # The caller's event is left as is
+    assert event["action"] == "compare_payload"
+
+
+def test_handler_does_not_see_the_action(sash_dispatcher, monkeypatch):
+    compare_payload = sash_dispatcher.get_handler_module("compare_payload")
+    handler_events = []
+    monkeypatch.setattr(compare_payload, "handler", lambda event, context: handler_events.append(event))
+
+    sash_dispatcher.handler({"action": "compare_payload", "oldPayload": {}, "newPayload": {}}, None)
+    assert handler_events == [{"oldPayload": {}, "newPayload": {}}]
+
+
+def test_handler_modules_are_imported_once(sash_dispatcher):
+    assert sash_dispatcher.get_handler_module("compare_payload") is sash_dispatcher.get_handler_module("compare_payload")
+
+
+def test_unknown_action(sash_dispatcher):
+    with pytest.raises(ValueError, match="Unknown action 'compare_payloads'"):
+        sash_dispatcher.handler({"action": "compare_payloads"}, None)
+
+
+def test_missing_action(sash_dispatcher):
+    with pytest.raises(ValueError, match="missing the 'action' attribute"):
+        sash_dispatcher.handler({"oldPayload": {}, "newPayload": {}}, None)
@@ -17,6 +17,10 @@ from pathlib import Path
 
 # Layer imports
 from orcabus_api_tools.workflow import add_comment_to_workflow_run
+from sash_tools.bootstrap import bootstrap
+from sash_tools.comment_ledger import CommentLedger
+from sash_tools.tracing import trace_handler
+from sash_tools.profiling import profile_handler
 
 # Type checking imports
 if typing.TYPE_CHECKING:
@@ -28,6 +32,7 @@ SSM_REGISTRY_NAME_ENV_VAR = "SSM_REGISTRY_NAME"
 SSM_SCHEMA_PATH_ENV_VAR = "SSM_SCHEMA_PATH"
 WORKFLOW_NAME_ENV_VAR = "WORKFLOW_NAME"
 COMMENT_AUTHOR = "{WORKFLOW_NAME}-workflow-validation-service"
+COMMENT_TYPE = "draft_schema_validation_failed"
 DEFAULT_PAYLOAD_VERSION_ENV_VAR = "DEFAULT_PAYLOAD_VERSION"
 
 # Set up logging
@@ -35,6 +40,9 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
+bootstrap()
+
+
 def get_ssm_parameter_value(parameter_name: str) -> str:
     """
     Get the SSM parameter for the schema.
@@ -98,17 +106,24 @@ def validate_draft_schema(
     except ValidationError as e:
         logger.info(f"Failed validation, {e}")
         if comment_error:
-            add_comment_to_workflow_run(
-                workflow_run_orcabus_id=workflow_run_id,
-                comment=f"Draft schema validation failed: {e.message} at \"{e.json_path}\"",
-                author=COMMENT_AUTHOR.format(
-                    WORKFLOW_NAME=environ.get(WORKFLOW_NAME_ENV_VAR)
+            comment = f"Draft schema validation failed: {e.message} at \"{e.json_path}\""
+            # Skip the comment if the run already has it, i.e. from an earlier validation of the same draft
+            comment_ledger = CommentLedger()
+            if not comment_ledger.is_suppressed(workflow_run_id, COMMENT_TYPE, comment):
+                add_comment_to_workflow_run(
+                    workflow_run_orcabus_id=workflow_run_id,
+                    comment=comment,
+                    author=COMMENT_AUTHOR.format(
+                        WORKFLOW_NAME=environ.get(WORKFLOW_NAME_ENV_VAR)
+                    )
                 )
-            )
+                comment_ledger.record(workflow_run_id, COMMENT_TYPE, comment)
         return False
     return True
 
 
+@trace_handler
+@profile_handler
 def handler(event, context) -> Dict[str, bool]:
     """
     Given a draft schema, validate it against the current schema and print the results.
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+
+"""
+Shared helpers for the sash pipeline manager lambdas.
+
+Deployed as a lambda layer (see infrastructure/stage/lambda/index.ts),
+only standard library imports are allowed at module level so that the
+layer does not add to the cold start of the lambdas that include it.
+"""
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""
+Init phase bootstrap, reuse credentials, hostnames and http sessions across warm invocations.
+
+Called at module level by the handlers (so it runs in the lambda init phase)
+
+    bootstrap()
+
+* The orcabus_api_tools hostname and token getters (orcabus_api_tools.utils.aws_helpers get_hostname
+  and get_orcabus_token, which read HOSTNAME_SSM_PARAMETER_NAME from SSM and the ORCABUS_TOKEN_SECRET_ID
+  secret) are wrapped with a per container cache, in every loaded orcabus_api_tools module that imported them.
+  The hostname is read once, the token is read again only once it is within
+  TOKEN_REFRESH_MARGIN_SECONDS of its JWT expiry (tokens that are not JWTs are never refreshed).
+  Both are then read during the init phase, so warm invocations make no lookups.
+* Connections are kept alive across invocations, see orcabus_client.enable_keep_alive.
+
+Handlers that call ICAv2 call ensure_icav2_env_vars each invocation, which sets the ICAv2 env vars
+(icav2_tools.set_icav2_env_vars) on first use, and again only once ICAV2_ACCESS_TOKEN is close to expiry.
+It is not part of the bootstrap, a failure in the init phase would fail the cold start.
+
+The sash dispatcher does not call bootstrap itself, the handler modules call it as they are imported.
+
+Missing layers or getters are skipped, so the bootstrap is a no-op for local runs against the stand-ins.
+get_lookup_counts returns the number of lookups made in this container, by getter name.
+"""
+
+# Standard imports
+import json
+import logging
+import sys
+import threading
+import time
+from base64 import urlsafe_b64decode
+from functools import wraps
+from importlib import import_module
+from os import environ
+from typing import Callable, Dict, Optional
+
+# Local imports
+from .orcabus_client import enable_keep_alive
+
+# Globals
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+ORCABUS_API_TOOLS_HELPERS_MODULE = "orcabus_api_tools.utils.aws_helpers"
+# Modules that import the getters by name, imported before wrapping so their references are replaced too
+ORCABUS_API_TOOLS_REQUESTS_MODULE = "orcabus_api_tools.utils.requests_helpers"
+HOSTNAME_GETTER_NAME = "get_hostname"
+TOKEN_GETTER_NAME = "get_orcabus_token"
+ICAV2_ACCESS_TOKEN_ENV_VAR = "ICAV2_ACCESS_TOKEN"
+
+logger = logging.getLogger(__name__)
+
+_LOOKUP_COUNTS: Dict[str, int] = {}
+_BOOTSTRAPPED = False
+
+
+def get_jwt_expiry(token: str) -> Optional[float]:
+    """
+    Get the expiry (seconds since the epoch) of a JWT, None if the token is not a JWT or has no expiry
+    """
+    try:
+        payload = token.split(".")[1]
+        return float(json.loads(urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def is_expiring(token: Optional[str]) -> bool:
+    if not token:
+        return True
+    expiry = get_jwt_expiry(token)
+    return expiry is not None and time.time() >= expiry - TOKEN_REFRESH_MARGIN_SECONDS
+
+
+def get_lookup_counts() -> Dict[str, int]:
+    return dict(_LOOKUP_COUNTS)
+
+
+def get_cached_getter(getter: Callable[[], str], is_stale: Callable[[str], bool]) -> Callable[[], str]:
+    """
+    Wrap a getter, the value is kept until is_stale returns True
+    """
+    lock = threading.Lock()
+    cache: Dict[str, str] = {}
+
+    @wraps(getter)
+    def _cached_getter() -> str:
+        with lock:
+            if "value" not in cache or is_stale(cache["value"]):
+                _LOOKUP_COUNTS[getter.__name__] = _LOOKUP_COUNTS.get(getter.__name__, 0) + 1
+                cache["value"] = getter()
+            return cache["value"]
+
+    _cached_getter.is_cached_getter = True
+    return _cached_getter
+
+
+def cache_orcabus_api_tools_getters() -> Dict[str, Callable[[], str]]:
+    """
+    Replace the orcabus_api_tools hostname and token getters with cached getters
+    :return: The cached getters, by name
+    """
+    try:
+        helpers_module = import_module(ORCABUS_API_TOOLS_HELPERS_MODULE)
+        import_module(ORCABUS_API_TOOLS_REQUESTS_MODULE)
+    except ModuleNotFoundError:
+        logger.debug("orcabus_api_tools helpers not found, not caching the hostname or token")
+        return {}
+
+    stale_checks: Dict[str, Callable[[str], bool]] = {
+        HOSTNAME_GETTER_NAME: lambda hostname_iter_: False,
+        TOKEN_GETTER_NAME: is_expiring,
+    }
+
+    cached_getters: Dict[str, Callable[[], str]] = {}
+    for getter_name, is_stale in stale_checks.items():
+        getter = getattr(helpers_module, getter_name, None)
+        if getter is None:
+            logger.debug(f"{ORCABUS_API_TOOLS_HELPERS_MODULE}.{getter_name} not found, not cached")
+            continue
+        if getattr(getter, "is_cached_getter", False):
+            cached_getters[getter_name] = getter
+            continue
+        cached_getter = get_cached_getter(getter, is_stale)
+        # Replace the getter in every module that imported it
+        for module in list(sys.modules.values()):
+            if (
+                getattr(module, "__name__", "").startswith("orcabus_api_tools") and
+                getattr(module, getter_name, None) is getter
+            ):
+                setattr(module, getter_name, cached_getter)
+        cached_getters[getter_name] = cached_getter
+
+    return cached_getters
+
+
+def ensure_icav2_env_vars():
+    """
+    Set the ICAv2 env vars, unless they are set and the access token is not close to expiry
+    """
+    if not is_expiring(environ.get(ICAV2_ACCESS_TOKEN_ENV_VAR)):
+        return
+    from icav2_tools import set_icav2_env_vars
+    _LOOKUP_COUNTS["set_icav2_env_vars"] = _LOOKUP_COUNTS.get("set_icav2_env_vars", 0) + 1
+    set_icav2_env_vars()
+
+
+def bootstrap():
+    """
+    Cache the orcabus_api_tools getters and read them, and keep connections alive. Safe to call more than once
+    """
+    global _BOOTSTRAPPED
+    if not _BOOTSTRAPPED:
+        cached_getters = cache_orcabus_api_tools_getters()
+        if cached_getters:
+            # orcabus_api_tools has imported requests by now
+            enable_keep_alive()
+        # Resolve the values now, in the init phase, a failure is retried on first use in the handler
+        for getter_name, cached_getter in cached_getters.items():
+            try:
+                cached_getter()
+            except Exception as error:
+                logger.warning(f"Could not resolve {getter_name} in the init phase: {error}")
+        _BOOTSTRAPPED = True
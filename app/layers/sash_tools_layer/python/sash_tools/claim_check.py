@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+"""
+Claim checks for large values passed between state machine states.
+
+Step Functions state (and EventBridge events) are limited to 256 KB, and every state transition
+serialises the full state. A handler returning a large value (i.e. a draft payload with many readsets)
+can instead check it in, storing the value in an object store and returning a compact reference
+
+    {"claimCheckUri": "s3://bucket/claim-check/<sha256>.json", "sizeBytes": 301234}
+
+Handlers that receive the value call resolve_claim_checks on their event with the keys the state machine
+may have checked in, which replaces the references under those keys with the stored values.
+Other fields (i.e. user supplied payload data) are never dereferenced.
+
+Only values at or above the size threshold are checked in, smaller values are returned as is.
+The state machine must not read into a value that may be checked in, it can only pass it on to a lambda.
+
+Object keys are the sha256 of the canonical json of the value, so checking in the same value twice
+stores it once. Objects are expired by the bucket lifecycle rule, references are not meant to outlive
+the state machine execution.
+
+Backends:
+* s3     - the claim check bucket (set by the CLAIM_CHECK_BUCKET_NAME env var)
+* local  - one json file per value under CLAIM_CHECK_LOCAL_DIR, used for local runs and tests
+* memory - a module level dictionary, only usable within a single process
+
+The backend for checking in is chosen by the CLAIM_CHECK_BACKEND env var, and otherwise defaults to
+s3 if CLAIM_CHECK_BUCKET_NAME is set, or memory if it is not.
+References are only resolved if they point into the configured store, that is under
+s3://$CLAIM_CHECK_BUCKET_NAME/claim-check/ for the s3 backend, under $CLAIM_CHECK_LOCAL_DIR/claim-check/
+for the local backend, or a memory:///claim-check/ key for the memory backend.
+The size threshold is set by the CLAIM_CHECK_THRESHOLD_BYTES env var, or per call.
+"""
+
+# Standard imports
+import json
+import typing
+from abc import ABC, abstractmethod
+from hashlib import sha256
+from os import environ
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+# Local imports
+from .fingerprint import to_canonical_json
+
+# Type checking imports
+if typing.TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+
+# Globals
+CLAIM_CHECK_BACKEND_ENV_VAR = "CLAIM_CHECK_BACKEND"
+CLAIM_CHECK_BUCKET_NAME_ENV_VAR = "CLAIM_CHECK_BUCKET_NAME"
+CLAIM_CHECK_LOCAL_DIR_ENV_VAR = "CLAIM_CHECK_LOCAL_DIR"
+CLAIM_CHECK_THRESHOLD_BYTES_ENV_VAR = "CLAIM_CHECK_THRESHOLD_BYTES"
+DEFAULT_CLAIM_CHECK_LOCAL_DIR = ".sash-claim-check"
+# Well under the 256 KB state limit, leaves room for the rest of the state
+DEFAULT_CLAIM_CHECK_THRESHOLD_BYTES = 32 * 1024
+
+CLAIM_CHECK_PREFIX = "claim-check"
+CLAIM_CHECK_URI_KEY = "claimCheckUri"
+CLAIM_CHECK_SIZE_KEY = "sizeBytes"
+
+# Memory backend storage
+_MEMORY_OBJECTS: Dict[str, str] = {}
+
+
+class ObjectStore(ABC):
+    """
+    Stores json documents by key, and reads them back by uri
+    """
+    @abstractmethod
+    def put(self, key: str, body: str) -> str:
+        """
+        Store the body under the key and return its uri
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, uri: str) -> str:
+        """
+        Get the body stored at a uri
+        """
+        raise NotImplementedError
+
+
+class MemoryObjectStore(ObjectStore):
+    scheme = "memory"
+
+    def put(self, key: str, body: str) -> str:
+        _MEMORY_OBJECTS[key] = body
+        return f"{self.scheme}:///{key}"
+
+    def get(self, uri: str) -> str:
+        return _MEMORY_OBJECTS[urlparse(uri).path.lstrip("/")]
+
+
+class LocalFileObjectStore(ObjectStore):
+    scheme = "file"
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = Path(root_dir).absolute()
+
+    def put(self, key: str, body: str) -> str:
+        object_path = self.root_dir / key
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        object_path.write_text(body)
+        return object_path.as_uri()
+
+    def get(self, uri: str) -> str:
+        return Path(urlparse(uri).path).read_text()
+
+
+class S3ObjectStore(ObjectStore):
+    scheme = "s3"
+
+    def __init__(self, bucket_name: Optional[str] = None):
+        self.bucket_name = bucket_name
+        self._client: Optional["S3Client"] = None
+
+    @property
+    def client(self) -> "S3Client":
+        # Import boto3 on first use, lambdas that never check in a large value don't pay for it
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("s3")
+        return self._client
+
+    def put(self, key: str, body: str) -> str:
+        self.client.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=body.encode(),
+            ContentType="application/json",
+        )
+        return f"{self.scheme}://{self.bucket_name}/{key}"
+
+    def get(self, uri: str) -> str:
+        uri_obj = urlparse(uri)
+        return self.client.get_object(
+            Bucket=uri_obj.netloc,
+            Key=uri_obj.path.lstrip("/"),
+        )["Body"].read().decode()
+
+
+# One store per scheme, kept at module level so clients survive warm invocations
+_OBJECT_STORES: Dict[str, ObjectStore] = {}
+
+
+def _get_object_store_for_scheme(scheme: str) -> ObjectStore:
+    if scheme not in _OBJECT_STORES:
+        if scheme == S3ObjectStore.scheme:
+            _OBJECT_STORES[scheme] = S3ObjectStore(environ.get(CLAIM_CHECK_BUCKET_NAME_ENV_VAR))
+        elif scheme == LocalFileObjectStore.scheme:
+            _OBJECT_STORES[scheme] = LocalFileObjectStore(
+                Path(environ.get(CLAIM_CHECK_LOCAL_DIR_ENV_VAR, DEFAULT_CLAIM_CHECK_LOCAL_DIR))
+            )
+        elif scheme == MemoryObjectStore.scheme:
+            _OBJECT_STORES[scheme] = MemoryObjectStore()
+        else:
+            raise ValueError(f"Unknown claim check uri scheme '{scheme}', expected one of s3, file or memory")
+    return _OBJECT_STORES[scheme]
+
+
+def get_backend() -> str:
+    return environ.get(
+        CLAIM_CHECK_BACKEND_ENV_VAR,
+        "s3" if environ.get(CLAIM_CHECK_BUCKET_NAME_ENV_VAR) else "memory"
+    )
+
+
+def get_object_store() -> ObjectStore:
+    """
+    Get the object store used to check in values, using the backend configured in the environment
+    :return:
+    """
+    backend = get_backend()
+
+    if backend == "s3":
+        return _get_object_store_for_scheme(S3ObjectStore.scheme)
+    if backend == "local":
+        return _get_object_store_for_scheme(LocalFileObjectStore.scheme)
+    if backend == "memory":
+        return _get_object_store_for_scheme(MemoryObjectStore.scheme)
+
+    raise ValueError(f"Unknown claim check backend '{backend}', expected one of s3, local or memory")
+
+
+def get_claim_check_threshold_bytes() -> int:
+    return int(environ.get(CLAIM_CHECK_THRESHOLD_BYTES_ENV_VAR, DEFAULT_CLAIM_CHECK_THRESHOLD_BYTES))
+
+
+def is_claim_check(value: Any) -> bool:
+    return (
+        isinstance(value, dict) and
+        set(value.keys()) == {CLAIM_CHECK_URI_KEY, CLAIM_CHECK_SIZE_KEY}
+    )
+
+
+def check_in(value: Any, threshold_bytes: Optional[int] = None) -> Any:
+    """
+    Store the value and return a claim check reference, if its json is at least threshold_bytes,
+    otherwise return the value unchanged
+    :param value:
+    :param threshold_bytes: Defaults to CLAIM_CHECK_THRESHOLD_BYTES
+    :return:
+    """
+    if threshold_bytes is None:
+        threshold_bytes = get_claim_check_threshold_bytes()
+
+    body = to_canonical_json(value)
+    size_bytes = len(body.encode())
+    if size_bytes < threshold_bytes:
+        return value
+
+    return {
+        CLAIM_CHECK_URI_KEY: get_object_store().put(
+            f"{CLAIM_CHECK_PREFIX}/{sha256(body.encode()).hexdigest()}.json",
+            body
+        ),
+        CLAIM_CHECK_SIZE_KEY: size_bytes,
+    }
+
+
+def validate_claim_check_uri(uri: str):
+    """
+    Raise a ValueError unless the uri points into the claim check prefix of the configured store,
+    a reference must never be able to read an arbitrary bucket or file
+    :param uri:
+    :return:
+    """
+    uri_obj = urlparse(uri)
+    backend = get_backend()
+
+    if uri_obj.scheme == S3ObjectStore.scheme and backend == "s3":
+        bucket_name = environ.get(CLAIM_CHECK_BUCKET_NAME_ENV_VAR)
+        if (
+            bucket_name and
+            uri_obj.netloc == bucket_name and
+            _is_claim_check_key(uri_obj.path.lstrip("/"))
+        ):
+            return
+    elif uri_obj.scheme == LocalFileObjectStore.scheme and backend == "local":
+        claim_check_dir = (
+            Path(environ.get(CLAIM_CHECK_LOCAL_DIR_ENV_VAR, DEFAULT_CLAIM_CHECK_LOCAL_DIR)) / CLAIM_CHECK_PREFIX
+        ).resolve()
+        if (
+            not uri_obj.netloc and
+            Path(uri_obj.path).resolve().is_relative_to(claim_check_dir)
+        ):
+            return
+    elif uri_obj.scheme == MemoryObjectStore.scheme and backend == "memory":
+        if not uri_obj.netloc and _is_claim_check_key(uri_obj.path.lstrip("/")):
+            return
+    elif uri_obj.scheme not in (S3ObjectStore.scheme, LocalFileObjectStore.scheme, MemoryObjectStore.scheme):
+        raise ValueError(f"Unknown claim check uri scheme '{uri_obj.scheme}', expected one of s3, file or memory")
+
+    raise ValueError(f"Claim check uri '{uri}' is not in the configured '{backend}' claim check store")
+
+
+def _is_claim_check_key(key: str) -> bool:
+    return (
+        key.startswith(f"{CLAIM_CHECK_PREFIX}/") and
+        ".." not in key.split("/")
+    )
+
+
+def check_out(value: Any) -> Any:
+    """
+    Get the stored value of a claim check reference, or the value unchanged if it is not a reference
+    :param value:
+    :return:
+    """
+    if not is_claim_check(value):
+        return value
+
+    uri = value[CLAIM_CHECK_URI_KEY]
+    validate_claim_check_uri(uri)
+    return json.loads(_get_object_store_for_scheme(urlparse(uri).scheme).get(uri))
+
+
+def resolve_claim_checks(event: Dict[str, Any], keys: Iterable[str]) -> Dict[str, Any]:
+    """
+    Replace the claim check references under the given top level keys of a lambda event with their stored values.
+    Only the keys the state machine may have checked in should be given, the rest of the event is left as is
+    :param event:
+    :param keys:
+    :return:
+    """
+    event = event.copy()
+    for key in keys:
+        if key in event:
+            event[key] = check_out(event[key])
+    return event
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Ledger of the comments posted to workflow runs, to skip posting the same comment again.
+
+A stuck draft goes through the populate loop on every event, and retried executions repeat their comments,
+each time adding the same comment to the workflow run. Comment writers check the ledger first
+
+    comment_ledger = CommentLedger()
+    if not comment_ledger.is_suppressed(workflow_run_id, "updating_inputs", body):
+        add_comment_to_workflow_run(...)
+        comment_ledger.record(workflow_run_id, "updating_inputs", body)
+
+Entries are keyed by the workflow run id, the comment type and the sha256 of the comment body.
+The body should not include per execution details (i.e. the execution arn footer),
+so that the same comment from another execution is a duplicate.
+A comment is suppressed if the same comment was recorded within the suppression window
+(COMMENT_SUPPRESSION_WINDOW_SECONDS env var, default 6 hours, 0 to never suppress).
+Suppressed comments are logged, and counted as the Suppressed embedded metric (with a CommentType dimension),
+a suppression only reads the ledger entry.
+
+Entries are kept in the comment-ledger namespace of the state store.
+Two executions checking at the same time may both post, the ledger only removes repeats.
+"""
+
+# Standard imports
+import logging
+from hashlib import sha256
+from os import environ
+from time import time
+from typing import Optional
+
+# Local imports
+from .metrics import put_embedded_metric
+from .state_store import StateStore, get_seconds_from_env, get_state_store
+
+# Globals
+COMMENT_LEDGER_NAMESPACE = "comment-ledger"
+COMMENT_SUPPRESSION_WINDOW_SECONDS_ENV_VAR = "COMMENT_SUPPRESSION_WINDOW_SECONDS"
+DEFAULT_COMMENT_SUPPRESSION_WINDOW_SECONDS = 6 * 60 * 60
+METRICS_NAMESPACE_ENV_VAR = "COMMENT_LEDGER_METRICS_NAMESPACE"
+DEFAULT_METRICS_NAMESPACE = "SashPipelineManager/CommentLedger"
+
+logger = logging.getLogger(__name__)
+
+
+def get_comment_hash(body: str) -> str:
+    return sha256(body.encode()).hexdigest()
+
+
+def put_suppressed_metric(comment_type: str):
+    put_embedded_metric(
+        environ.get(METRICS_NAMESPACE_ENV_VAR, DEFAULT_METRICS_NAMESPACE),
+        {"CommentType": comment_type},
+        {"Suppressed": (1, "Count")}
+    )
+
+
+class CommentLedger:
+    def __init__(self, store: Optional[StateStore] = None, window_seconds: Optional[float] = None):
+        self.store = store if store is not None else get_state_store(COMMENT_LEDGER_NAMESPACE)
+        self.window_seconds = get_seconds_from_env(
+            window_seconds, COMMENT_SUPPRESSION_WINDOW_SECONDS_ENV_VAR, DEFAULT_COMMENT_SUPPRESSION_WINDOW_SECONDS
+        )
+
+    @staticmethod
+    def get_key(workflow_run_id: str, comment_type: str, body: str) -> str:
+        return f"{workflow_run_id}/{comment_type}/{get_comment_hash(body)}"
+
+    def is_suppressed(self, workflow_run_id: str, comment_type: str, body: str) -> bool:
+        """
+        Check if the comment was recorded within the suppression window, counting the suppression if it was
+        """
+        if self.window_seconds <= 0:
+            return False
+        entry = self.store.get(self.get_key(workflow_run_id, comment_type, body))
+        if entry is None:
+            return False
+
+        logger.info(
+            f"Skipping the '{comment_type}' comment for {workflow_run_id}, "
+            f"already posted {time() - entry['postedAt']:.0f}s ago"
+        )
+        put_suppressed_metric(comment_type)
+        return True
+
+    def record(self, workflow_run_id: str, comment_type: str, body: str):
+        """
+        Record a posted comment, starting its suppression window
+        """
+        if self.window_seconds <= 0:
+            return
+        self.store.put(
+            self.get_key(workflow_run_id, comment_type, body),
+            {"postedAt": time()},
+            ttl_seconds=self.window_seconds,
+        )
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+"""
+Membership pre-filter of the libraries with an open sash DRAFT run.
+
+Most upstream (DRAGEN WGTS DNA, oncoanalyser) SUCCEEDED events are for subjects without a sash DRAFT,
+and the glue state machine only finds that out after getting the workflow run object and looking up the drafts.
+Its first step checks the libraries of the event against a Bloom filter of the library ids of the open sash drafts
+
+    draft_library_filter = DraftLibraryFilter()
+    is_member = draft_library_filter.check(library_id_list, is_recheck=is_recheck)
+    if draft_library_filter.needs_recheck(is_member, is_recheck):
+        ...  # check again after DRAFT_LIBRARY_FILTER_SETTLE_SECONDS
+    elif is_member is False:
+        ...  # no sash draft has any of the libraries, the event is dropped
+
+A Bloom filter has no false negatives, a library of an open draft is always a member, but a library without
+a draft is taken for a member at the filter's false positive rate, so its event goes on to the draft lookup as before.
+
+The filter is kept in the state store, as two kinds of keys
+* filter            - rebuilt from the sash DRAFT runs in the Workflow Manager on a schedule
+                      (rebuild_draft_library_filter), sized for DRAFT_LIBRARY_FILTER_FALSE_POSITIVE_RATE (default 1%)
+* pending/<library> - the libraries of the DRAFT events since (index_workflow_run_state_change),
+                      kept for twice DRAFT_LIBRARY_FILTER_MAX_AGE_SECONDS so the next rebuild has them
+
+The pending libraries of a new draft are written by another event rule target than the glue state machine,
+and EventBridge does not order deliveries across rules, so a draft created just before (or by) the upstream
+SUCCEEDED event may not be pending yet when the event is checked. An event that is not a member is therefore
+checked again after DRAFT_LIBRARY_FILTER_SETTLE_SECONDS (default 60 seconds, the glue state machine waits),
+and only dropped if it is still not a member. A draft whose pending libraries are written later than that
+(i.e. index_workflow_run_state_change throttled or retried for longer) is missed by the filter until the next rebuild,
+and the event is dropped. Set DRAFT_LIBRARY_FILTER_SETTLE_SECONDS to 0 to drop on the first check.
+
+Drafts that are no longer open leave the filter at the next rebuild. If the filter is missing or older than
+DRAFT_LIBRARY_FILTER_MAX_AGE_SECONDS (default 1 hour), i.e. the rebuild is failing, check returns None
+and every event goes on to the draft lookup.
+
+Checks are logged as a CloudWatch embedded metric (Passed or Dropped, with the filter's estimated false positive rate),
+once per event, by its last check, Passed events without a current filter are also counted as Unfiltered.
+When the glue state machine finds no draft for an event that was a member, it logs NoDraftFound (record_no_draft_found),
+so the observed false positive rate is NoDraftFound / (Passed - Unfiltered).
+"""
+
+# Standard imports
+import logging
+import math
+import time
+from base64 import b64decode, b64encode
+from hashlib import sha256
+from os import environ
+from typing import Any, Dict, Iterable, List, Optional
+
+# Local imports
+from .metrics import put_embedded_metric
+from .state_store import StateStore, get_seconds_from_env, get_state_store
+
+# Globals
+DRAFT_LIBRARY_FILTER_NAMESPACE = "draft-library-filter"
+FILTER_KEY = "filter"
+PENDING_KEY_PREFIX = "pending/"
+DRAFT_LIBRARY_FILTER_MAX_AGE_SECONDS_ENV_VAR = "DRAFT_LIBRARY_FILTER_MAX_AGE_SECONDS"
+DEFAULT_DRAFT_LIBRARY_FILTER_MAX_AGE_SECONDS = 60 * 60
+DRAFT_LIBRARY_FILTER_SETTLE_SECONDS_ENV_VAR = "DRAFT_LIBRARY_FILTER_SETTLE_SECONDS"
+DEFAULT_DRAFT_LIBRARY_FILTER_SETTLE_SECONDS = 60
+DRAFT_LIBRARY_FILTER_FALSE_POSITIVE_RATE_ENV_VAR = "DRAFT_LIBRARY_FILTER_FALSE_POSITIVE_RATE"
+DEFAULT_DRAFT_LIBRARY_FILTER_FALSE_POSITIVE_RATE = 0.01
+METRICS_NAMESPACE_ENV_VAR = "DRAFT_LIBRARY_FILTER_METRICS_NAMESPACE"
+DEFAULT_METRICS_NAMESPACE = "SashPipelineManager/DraftLibraryFilter"
+
+MIN_BIT_COUNT = 1024
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, bit_count: int, hash_count: int, bits: Optional[bytearray] = None, item_count: int = 0):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray(math.ceil(bit_count / 8))
+        self.item_count = item_count
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilter":
+        """
+        An empty filter sized for the capacity at the false positive rate
+        """
+        bit_count = max(
+            MIN_BIT_COUNT,
+            math.ceil(-max(capacity, 1) * math.log(false_positive_rate) / (math.log(2) ** 2))
+        )
+        # The best hash count for the rate, more bits than needed (MIN_BIT_COUNT) only lower the rate further
+        hash_count = max(1, round(-math.log2(false_positive_rate)))
+        return cls(bit_count, hash_count)
+
+    def _get_bit_indexes(self, item: str) -> Iterable[int]:
+        # One salted digest per hash, derived indexes (double hashing) are too correlated on small filters
+        return map(
+            lambda hash_index_iter_: int.from_bytes(
+                sha256(f"{hash_index_iter_}:{item}".encode()).digest()[:8], "big"
+            ) % self.bit_count,
+            range(self.hash_count)
+        )
+
+    def add(self, item: str):
+        for bit_index in self._get_bit_indexes(item):
+            self.bits[bit_index // 8] |= 1 << (bit_index % 8)
+        self.item_count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(map(
+            lambda bit_index_iter_: self.bits[bit_index_iter_ // 8] & (1 << (bit_index_iter_ % 8)),
+            self._get_bit_indexes(item)
+        ))
+
+    def get_estimated_false_positive_rate(self) -> float:
+        # The chance all k bits of an absent item are set, from the share of set bits
+        set_bit_count = sum(map(lambda byte_iter_: bin(byte_iter_).count("1"), self.bits))
+        return (set_bit_count / self.bit_count) ** self.hash_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bitCount": self.bit_count,
+            "hashCount": self.hash_count,
+            "itemCount": self.item_count,
+            "bits": b64encode(bytes(self.bits)).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, bloom_filter_dict: Dict[str, Any]) -> "BloomFilter":
+        return cls(
+            bit_count=bloom_filter_dict["bitCount"],
+            hash_count=bloom_filter_dict["hashCount"],
+            bits=bytearray(b64decode(bloom_filter_dict["bits"])),
+            item_count=bloom_filter_dict["itemCount"],
+        )
+
+
+def put_check_metric(is_member: Optional[bool], estimated_false_positive_rate: Optional[float]):
+    put_embedded_metric(
+        environ.get(METRICS_NAMESPACE_ENV_VAR, DEFAULT_METRICS_NAMESPACE),
+        {},
+        {
+            ("Dropped" if is_member is False else "Passed"): (1, "Count"),
+            **({"Unfiltered": (1, "Count")} if is_member is None else {}),
+            **(
+                {"EstimatedFalsePositiveRate": (estimated_false_positive_rate, "None")}
+                if estimated_false_positive_rate is not None else {}
+            ),
+        }
+    )
+
+
+def put_no_draft_found_metric():
+    """
+    Log an event that was a member of the filter but has no open draft, a false positive
+    """
+    put_embedded_metric(
+        environ.get(METRICS_NAMESPACE_ENV_VAR, DEFAULT_METRICS_NAMESPACE),
+        {},
+        {"NoDraftFound": (1, "Count")}
+    )
+
+
+class DraftLibraryFilter:
+    def __init__(
+            self,
+            store: Optional[StateStore] = None,
+            max_age_seconds: Optional[float] = None,
+            settle_seconds: Optional[float] = None,
+    ):
+        self.store = store if store is not None else get_state_store(DRAFT_LIBRARY_FILTER_NAMESPACE)
+        self.max_age_seconds = get_seconds_from_env(
+            max_age_seconds, DRAFT_LIBRARY_FILTER_MAX_AGE_SECONDS_ENV_VAR, DEFAULT_DRAFT_LIBRARY_FILTER_MAX_AGE_SECONDS
+        )
+        self.settle_seconds = get_seconds_from_env(
+            settle_seconds, DRAFT_LIBRARY_FILTER_SETTLE_SECONDS_ENV_VAR, DEFAULT_DRAFT_LIBRARY_FILTER_SETTLE_SECONDS
+        )
+
+    def rebuild(self, library_id_list: List[str], draft_count: int) -> Dict[str, Any]:
+        """
+        Replace the filter with one of the library ids of the open drafts
+        :return: The filter summary
+        """
+        library_ids = sorted(set(library_id_list))
+        bloom_filter = BloomFilter.for_capacity(
+            len(library_ids),
+            float(environ.get(
+                DRAFT_LIBRARY_FILTER_FALSE_POSITIVE_RATE_ENV_VAR,
+                DEFAULT_DRAFT_LIBRARY_FILTER_FALSE_POSITIVE_RATE
+            ))
+        )
+        for library_id in library_ids:
+            bloom_filter.add(library_id)
+
+        summary = {
+            "draftCount": draft_count,
+            "libraryCount": len(library_ids),
+            "bitCount": bloom_filter.bit_count,
+            "hashCount": bloom_filter.hash_count,
+            "estimatedFalsePositiveRate": bloom_filter.get_estimated_false_positive_rate(),
+        }
+        self.store.put(
+            FILTER_KEY,
+            {
+                **summary,
+                "bloomFilter": bloom_filter.to_dict(),
+                "builtAt": time.time(),
+            },
+            # Expired filters are not used anyway
+            ttl_seconds=self.max_age_seconds,
+        )
+        return summary
+
+    def add_pending(self, library_id_list: List[str]):
+        """
+        Add the libraries of a new draft until the next rebuild
+        """
+        for library_id in set(library_id_list):
+            self.store.put(
+                f"{PENDING_KEY_PREFIX}{library_id}",
+                {"addedAt": time.time()},
+                ttl_seconds=self.max_age_seconds * 2,
+            )
+
+    def get_filter_entry(self) -> Optional[Dict[str, Any]]:
+        filter_entry = self.store.get(FILTER_KEY)
+        if filter_entry is None or time.time() - filter_entry["builtAt"] > self.max_age_seconds:
+            return None
+        return filter_entry
+
+    def needs_recheck(self, is_member: Optional[bool], is_recheck: bool = False) -> bool:
+        """
+        Check again after settle_seconds before dropping, for the pending libraries of a draft created just before the event
+        """
+        return is_member is False and not is_recheck and self.settle_seconds > 0
+
+    def check(self, library_id_list: List[str], is_recheck: bool = False) -> Optional[bool]:
+        """
+        Check if any of the libraries may have an open draft
+        :param is_recheck: The check after settle_seconds, the metric is only logged for the last check of an event
+        :return: False if none has, None if there is no current filter to check against
+        """
+        filter_entry = self.get_filter_entry()
+        if filter_entry is None:
+            logger.warning("No current draft library filter, not filtering")
+            put_check_metric(None, None)
+            return None
+
+        bloom_filter = BloomFilter.from_dict(filter_entry["bloomFilter"])
+        is_member = (
+            any(map(lambda library_id_iter_: library_id_iter_ in bloom_filter, library_id_list)) or
+            any(map(
+                lambda library_id_iter_: self.store.get(f"{PENDING_KEY_PREFIX}{library_id_iter_}") is not None,
+                library_id_list
+            ))
+        )
+        if not self.needs_recheck(is_member, is_recheck):
+            put_check_metric(is_member, filter_entry["estimatedFalsePositiveRate"])
+        return is_member
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+"""
+Fill in the missing fields of a draft with a graph of field resolvers.
+
+Each resolver declares the fields it provides and the fields it requires, as dotted paths into
+the draft (i.e. "tags.libraryId", "inputs.dragenGermlineDir"). Resolving a set of target fields
+* selects the resolvers that provide a missing target field (or a field under a target, "inputs" covers
+  "inputs.refDataPath"), and, for each selected resolver, the resolvers providing its missing required fields
+* runs each selected resolver once the selected resolvers providing its required fields have finished,
+  on a thread pool, so resolvers that do not depend on each other run concurrently
+* merges the values each resolver returns into the draft, a None value removes the field
+
+A field is missing if it is absent, None, or an empty string, list or object.
+A resolver can instead declare its own is_needed check, i.e. to always refresh a field.
+
+Resolvers are given a copy of the draft taken when they start, and return a {field path: value} dictionary.
+"""
+
+# Standard imports
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Globals
+DEFAULT_MAX_WORKERS = 8
+EMPTY_VALUES = ["", [], {}]
+
+ResolverFunction = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def get_field(draft: Dict[str, Any], field_path: str) -> Any:
+    value: Any = draft
+    for key in field_path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def set_field(draft: Dict[str, Any], field_path: str, value: Any):
+    *parent_keys, key = field_path.split(".")
+    parent = draft
+    for parent_key in parent_keys:
+        if not isinstance(parent.get(parent_key), dict):
+            parent[parent_key] = {}
+        parent = parent[parent_key]
+    if value is None:
+        parent.pop(key, None)
+    else:
+        parent[key] = value
+
+
+def is_missing(draft: Dict[str, Any], field_path: str) -> bool:
+    value = get_field(draft, field_path)
+    return value is None or any(map(lambda empty_value_iter_: value == empty_value_iter_, EMPTY_VALUES))
+
+
+def is_field_covered(field_path: str, target: str) -> bool:
+    # A field is covered by a target if it is the target, or sits under it
+    return field_path == target or field_path.startswith(target + ".")
+
+
+@dataclass
+class FieldResolver:
+    name: str
+    provides: List[str]
+    requires: List[str]
+    func: ResolverFunction
+    is_needed: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+    def is_resolving(self, draft: Dict[str, Any]) -> bool:
+        if self.is_needed is not None:
+            return self.is_needed(draft)
+        return any(map(lambda field_iter_: is_missing(draft, field_iter_), self.provides))
+
+
+class FieldResolverGraph:
+    """
+    A set of resolvers, register with the resolver decorator
+    """
+    def __init__(self):
+        self.resolvers: Dict[str, FieldResolver] = {}
+
+    def resolver(
+            self,
+            provides: List[str],
+            requires: Optional[List[str]] = None,
+            is_needed: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Callable[[ResolverFunction], ResolverFunction]:
+        def _register(func: ResolverFunction) -> ResolverFunction:
+            self.resolvers[func.__name__] = FieldResolver(
+                name=func.__name__,
+                provides=provides,
+                requires=requires or [],
+                func=func,
+                is_needed=is_needed,
+            )
+            return func
+        return _register
+
+    def get_providers(self, field_path: str) -> List[FieldResolver]:
+        return list(filter(
+            lambda resolver_iter_: any(map(
+                lambda provided_iter_: (
+                    is_field_covered(provided_iter_, field_path) or is_field_covered(field_path, provided_iter_)
+                ),
+                resolver_iter_.provides
+            )),
+            self.resolvers.values()
+        ))
+
+    def get_plan(self, draft: Dict[str, Any], targets: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Get the resolvers to run, each mapped to the names of the resolvers it waits for
+        """
+        if targets is None:
+            selected = list(filter(lambda resolver_iter_: resolver_iter_.is_resolving(draft), self.resolvers.values()))
+        else:
+            selected = list(filter(
+                lambda resolver_iter_: (
+                    any(
+                        is_field_covered(provided_iter_, target_iter_)
+                        for provided_iter_ in resolver_iter_.provides
+                        for target_iter_ in targets
+                    ) and
+                    resolver_iter_.is_resolving(draft)
+                ),
+                self.resolvers.values()
+            ))
+
+        # Add the providers of missing required fields, unless they are not needed (i.e. an optional field)
+        planned: Dict[str, FieldResolver] = {}
+        while selected:
+            resolver = selected.pop(0)
+            if resolver.name in planned:
+                continue
+            planned[resolver.name] = resolver
+            for required_field in filter(lambda field_iter_: is_missing(draft, field_iter_), resolver.requires):
+                selected.extend(filter(
+                    lambda provider_iter_: provider_iter_.is_resolving(draft),
+                    self.get_providers(required_field)
+                ))
+
+        # Each resolver waits for the planned resolvers providing its required fields
+        return {
+            name: sorted(set(
+                provider_iter_.name
+                for required_field_iter_ in resolver.requires
+                for provider_iter_ in self.get_providers(required_field_iter_)
+                if provider_iter_.name in planned and provider_iter_.name != name
+            ))
+            for name, resolver in planned.items()
+        }
+
+    def resolve(
+            self,
+            draft: Dict[str, Any],
+            targets: Optional[List[str]] = None,
+            max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Resolve the missing target fields (all fields if targets is None)
+        :return: The resolved draft, and the names of the resolvers that ran, in completion order
+        """
+        draft = deepcopy(draft)
+        plan = self.get_plan(draft, targets)
+        completed: List[str] = []
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while len(completed) < len(plan):
+                for name, dependencies in plan.items():
+                    if (
+                        name not in completed and
+                        name not in running.values() and
+                        all(map(lambda dependency_iter_: dependency_iter_ in completed, dependencies))
+                    ):
+                        # Run in a copy of the context, to keep the current trace span (see tracing)
+                        running[executor.submit(copy_context().run, self.resolvers[name].func, deepcopy(draft))] = name
+
+                if not running:
+                    raise ValueError(f"Resolver dependency cycle between {sorted(set(plan) - set(completed))}")
+
+                done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    for field_path, value in future.result().items():
+                        set_field(draft, field_path, value)
+                    completed.append(name)
+
+        return draft, completed
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""
+Canonical fingerprints of workflow run payloads.
+
+A payload fingerprint is the sha256 of the canonical json (sorted keys, no whitespace)
+of the payload version and data. Workflow manager attributes such as orcabusId and refId
+are not part of the fingerprint, so the payload we emit and the payload echoed back
+to us in the next DRAFT event share the same fingerprint.
+
+The last payload fingerprint emitted for each portal run id is kept in the state store,
+with the schema fields still missing from the payload, so the populate draft data state machine
+can exit before any API calls when it receives a payload it has already populated
+(only commenting on the missing fields, see add_populate_draft_comment).
+"""
+
+# Standard imports
+import json
+from hashlib import sha256
+from typing import Any, Dict, List, Optional
+
+# Local imports
+from .state_store import get_seconds_from_env, get_state_store
+
+# Globals
+PAYLOAD_FINGERPRINT_NAMESPACE = "payload-fingerprint"
+PAYLOAD_FINGERPRINT_TTL_SECONDS_ENV_VAR = "PAYLOAD_FINGERPRINT_TTL_SECONDS"
+# After a day we let a repeated payload through again, in case upstream data has since changed
+DEFAULT_PAYLOAD_FINGERPRINT_TTL_SECONDS = 24 * 60 * 60
+
+
+def to_canonical_json(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def get_payload_fingerprint(payload: Dict[str, Any]) -> str:
+    """
+    Get the fingerprint of a payload, only the version and data attributes are considered
+    :param payload:
+    :return:
+    """
+    return sha256(
+        to_canonical_json({
+            "version": payload.get("version"),
+            "data": payload.get("data", {}),
+        }).encode()
+    ).hexdigest()
+
+
+def get_last_emitted_payload(portal_run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the fingerprint and the missing schema fields of the last payload emitted for the portal run id
+    :return: {"fingerprint": "<sha256>", "missingFields": [...]}, None if no payload was emitted
+    """
+    item = get_state_store(PAYLOAD_FINGERPRINT_NAMESPACE).get(portal_run_id)
+    if item is None:
+        return None
+    return {
+        "fingerprint": item["fingerprint"],
+        "missingFields": item.get("missingFields", []),
+    }
+
+
+def get_last_emitted_payload_fingerprint(portal_run_id: str) -> Optional[str]:
+    last_emitted_payload = get_last_emitted_payload(portal_run_id)
+    if last_emitted_payload is None:
+        return None
+    return last_emitted_payload["fingerprint"]
+
+
+def set_last_emitted_payload_fingerprint(
+        portal_run_id: str,
+        fingerprint: str,
+        missing_fields: Optional[List[str]] = None
+):
+    get_state_store(PAYLOAD_FINGERPRINT_NAMESPACE).put(
+        portal_run_id,
+        {"fingerprint": fingerprint, "missingFields": missing_fields or []},
+        ttl_seconds=get_seconds_from_env(
+            None, PAYLOAD_FINGERPRINT_TTL_SECONDS_ENV_VAR, DEFAULT_PAYLOAD_FINGERPRINT_TTL_SECONDS
+        )
+    )
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+"""
+CloudWatch embedded metric format (EMF) logging.
+
+A metric is logged as one json line on stdout, which CloudWatch extracts from the lambda logs,
+so no CloudWatch client or call is needed.
+
+The sink is set by the METRICS_SINK env var
+* log (default)  - printed to stdout
+* none           - metrics are dropped, i.e. for local benchmarks
+"""
+
+# Standard imports
+import json
+import time
+from os import environ
+from typing import Dict, Tuple
+
+# Globals
+METRICS_SINK_ENV_VAR = "METRICS_SINK"
+LOG_METRICS_SINK = "log"
+NONE_METRICS_SINK = "none"
+DEFAULT_METRICS_SINK = LOG_METRICS_SINK
+
+
+def put_embedded_metric(namespace: str, dimensions: Dict[str, str], metrics: Dict[str, Tuple[float, str]]):
+    """
+    Log the metrics as one embedded metric format line
+    :param namespace: The CloudWatch namespace
+    :param dimensions: The dimension values, by dimension name, may be empty
+    :param metrics: The metric values and units, by metric name
+    """
+    sink_name = environ.get(METRICS_SINK_ENV_VAR, DEFAULT_METRICS_SINK).lower()
+    if sink_name == NONE_METRICS_SINK:
+        return
+    if sink_name != LOG_METRICS_SINK:
+        raise ValueError(
+            f"Unknown {METRICS_SINK_ENV_VAR} '{sink_name}', expected one of {LOG_METRICS_SINK} or {NONE_METRICS_SINK}"
+        )
+
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": namespace,
+                "Dimensions": [list(dimensions.keys())],
+                "Metrics": list(map(
+                    lambda metric_iter_: {"Name": metric_iter_[0], "Unit": metric_iter_[1][1]},
+                    metrics.items()
+                )),
+            }],
+        },
+        **dimensions,
+        **{metric_name: value for metric_name, (value, _) in metrics.items()},
+    }))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+Negative cache of the upstream workflow run lookups that found no SUCCEEDED run.
+
+While a draft waits on its upstream DRAGEN or oncoanalyser run, every populate loop queries the
+Workflow Manager for the same SUCCEEDED run and finds nothing. find_latest_workflow records these misses
+
+    negative_cache = NegativeLookupCache()
+    if negative_cache.is_miss(lookup):
+        return {"workflowRunList": []}
+    looked_up_at = time()
+    ...  # query the Workflow Manager
+    negative_cache.record_miss(lookup, looked_up_at)
+
+Misses are keyed by the workflow name and version, the library ids, the rgid list and the analysis run id
+of the lookup (see get_lookup), and expire after WORKFLOW_LOOKUP_MISS_TTL_SECONDS (default 10 minutes, 0 to disable).
+
+When an upstream SUCCEEDED event arrives, invalidate records the time of the event for the workflow name
+and each of its library ids (and its analysis run id). A miss looked up before the latest event of any of its
+library ids (or its analysis run id) is no longer a miss. The lookup time is taken before the query, so a lookup
+racing the event is not cached past it.
+
+Misses are kept in the workflow-lookup-misses namespace of the state store.
+"""
+
+# Standard imports
+import logging
+from hashlib import sha256
+from time import time
+from typing import Any, Dict, List, Optional
+
+# Local imports
+from .fingerprint import to_canonical_json
+from .state_store import StateStore, get_seconds_from_env, get_state_store
+
+# Globals
+NEGATIVE_CACHE_NAMESPACE = "workflow-lookup-misses"
+WORKFLOW_LOOKUP_MISS_TTL_SECONDS_ENV_VAR = "WORKFLOW_LOOKUP_MISS_TTL_SECONDS"
+DEFAULT_WORKFLOW_LOOKUP_MISS_TTL_SECONDS = 10 * 60
+
+logger = logging.getLogger(__name__)
+
+
+def get_lookup(
+        workflow_name: str,
+        library_id_list: Optional[List[str]] = None,
+        rgid_list: Optional[List[str]] = None,
+        workflow_version: Optional[str] = None,
+        analysis_run_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Get the lookup criteria, in the same form whatever the order of the library ids and rgids
+    """
+    return {
+        "workflowName": workflow_name,
+        "workflowVersion": workflow_version,
+        "libraryIdList": sorted(set(library_id_list or [])),
+        "rgidList": sorted(set(rgid_list)) if rgid_list else None,
+        "analysisRunId": analysis_run_id,
+    }
+
+
+class NegativeLookupCache:
+    def __init__(self, store: Optional[StateStore] = None, ttl_seconds: Optional[float] = None):
+        self.store = store if store is not None else get_state_store(NEGATIVE_CACHE_NAMESPACE)
+        self.ttl_seconds = get_seconds_from_env(
+            ttl_seconds, WORKFLOW_LOOKUP_MISS_TTL_SECONDS_ENV_VAR, DEFAULT_WORKFLOW_LOOKUP_MISS_TTL_SECONDS
+        )
+
+    @staticmethod
+    def get_miss_key(lookup: Dict[str, Any]) -> str:
+        return f"miss/{lookup['workflowName']}/{sha256(to_canonical_json(lookup).encode()).hexdigest()}"
+
+    @staticmethod
+    def get_succeeded_keys(
+            workflow_name: str,
+            library_id_list: List[str],
+            analysis_run_id: Optional[str] = None
+    ) -> List[str]:
+        return (
+            list(map(
+                lambda library_id_iter_: f"succeeded/{workflow_name}/library/{library_id_iter_}",
+                sorted(set(library_id_list))
+            )) +
+            ([f"succeeded/{workflow_name}/analysis-run/{analysis_run_id}"] if analysis_run_id else [])
+        )
+
+    def is_miss(self, lookup: Dict[str, Any]) -> bool:
+        """
+        Check if the lookup found no run, and no SUCCEEDED event for its libraries has arrived since
+        """
+        if self.ttl_seconds <= 0:
+            return False
+        miss_key = self.get_miss_key(lookup)
+        entry = self.store.get(miss_key)
+        if entry is None:
+            return False
+
+        for succeeded_key in self.get_succeeded_keys(
+                lookup["workflowName"], lookup["libraryIdList"], lookup["analysisRunId"]
+        ):
+            succeeded_entry = self.store.get(succeeded_key)
+            if succeeded_entry is not None and succeeded_entry["succeededAt"] >= entry["lookedUpAt"]:
+                self.store.delete(miss_key)
+                return False
+
+        logger.info(
+            f"Skipping the {lookup['workflowName']} lookup for {lookup['libraryIdList']}, "
+            f"no run found {round(time() - entry['lookedUpAt'])} seconds ago"
+        )
+        return True
+
+    def record_miss(self, lookup: Dict[str, Any], looked_up_at: float):
+        """
+        Record a lookup that found no run
+        :param looked_up_at: The time the query was sent, misses older than the latest SUCCEEDED event are ignored
+        """
+        if self.ttl_seconds <= 0:
+            return
+        remaining_seconds = looked_up_at + self.ttl_seconds - time()
+        if remaining_seconds <= 0:
+            return
+        self.store.put(
+            self.get_miss_key(lookup),
+            {"lookedUpAt": looked_up_at},
+            ttl_seconds=remaining_seconds,
+        )
+
+    def invalidate(self, workflow_name: str, library_id_list: List[str], analysis_run_id: Optional[str] = None):
+        """
+        Record a SUCCEEDED event, so the earlier misses of its libraries (or analysis run) are looked up again
+        """
+        if self.ttl_seconds <= 0:
+            return
+        succeeded_at = time()
+        for succeeded_key in self.get_succeeded_keys(workflow_name, library_id_list, analysis_run_id):
+            # Any miss older than the event expires within the ttl
+            self.store.put(succeeded_key, {"succeededAt": succeeded_at}, ttl_seconds=self.ttl_seconds)
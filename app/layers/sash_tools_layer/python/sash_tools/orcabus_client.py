@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+"""
+Asyncio facade for the blocking orcabus_api_tools calls.
+
+The orcabus_api_tools functions make one blocking http request at a time. Handlers that need several
+independent lookups can run them concurrently
+
+    library_obj_list = run_concurrently(get_library_from_library_orcabus_id, library_orcabus_id_list)
+
+or from a coroutine
+
+    library_obj_list = await gather_calls(
+        lambda: get_library_from_library_orcabus_id(library_orcabus_id_iter_)
+        for library_orcabus_id_iter_ in library_orcabus_id_list
+    )
+
+Calls run on a module level thread pool of ORCABUS_MAX_CONCURRENT_REQUESTS workers (default 8),
+kept for the life of the container. Simple handlers keep calling the functions directly.
+Calls must not be nested, a call running on the pool that runs calls concurrently itself would wait on
+workers that are all busy waiting, so call_async raises a RuntimeError when called from a pool worker.
+
+enable_keep_alive (called by bootstrap and on first use of the pool) routes the requests made by the
+loaded orcabus_api_tools modules through a requests.Session per thread, so connections to the
+OrcaBus APIs are kept alive across calls and warm invocations instead of being opened per request.
+Sessions are per thread as requests.Session is not thread safe.
+The requests are also sent through the rate limit and retry policy of their endpoint, see rate_limit.
+Only the orcabus_api_tools references to requests are replaced (with a KeepAliveRequests),
+the requests module itself, and so any other client (boto3, wrapica...), is left as is.
+If the installed orcabus_api_tools package is loaded but none of its modules references requests
+(i.e. a new version sends its requests another way), enable_keep_alive raises a RuntimeError
+rather than silently sending the requests without the sessions and rate limit policies.
+"""
+
+# Standard imports
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from os import environ
+from typing import Any, Callable, Coroutine, Iterable, List, Optional, Tuple, TypeVar
+
+# Local imports
+from .rate_limit import send_with_policy
+
+# Globals
+MAX_CONCURRENT_REQUESTS_ENV_VAR = "ORCABUS_MAX_CONCURRENT_REQUESTS"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+REQUESTS_FUNCTION_NAMES = ["request", "get", "post", "put", "patch", "delete", "head", "options"]
+KEEP_ALIVE_MODULE_PREFIX = "orcabus_api_tools"
+EXECUTOR_THREAD_NAME_PREFIX = "orcabus-client"
+
+T = TypeVar("T")
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+_THREAD_SESSIONS = threading.local()
+_KEEP_ALIVE_LOCK = threading.Lock()
+_KEEP_ALIVE_REQUESTS: Optional["KeepAliveRequests"] = None
+
+
+def get_max_concurrent_requests() -> int:
+    return int(environ.get(MAX_CONCURRENT_REQUESTS_ENV_VAR, DEFAULT_MAX_CONCURRENT_REQUESTS))
+
+
+def get_thread_session():
+    """
+    Get the requests session for the current thread, created on first use
+    """
+    import requests
+    if getattr(_THREAD_SESSIONS, "session", None) is None:
+        _THREAD_SESSIONS.session = requests.Session()
+    return _THREAD_SESSIONS.session
+
+
+def get_request_method_and_url(method: str = "GET", url: str = "", *args, **kwargs) -> Tuple[str, str]:
+    # Arguments of requests.request
+    return method.upper(), url
+
+
+def get_session_function(function_name: str) -> Callable:
+    """
+    A requests module function, sent with the session of the current thread and the policy of its endpoint
+    """
+    def _session_function(*args, **kwargs):
+        if function_name == "request":
+            method, url = get_request_method_and_url(*args, **kwargs)
+        else:
+            method, url = function_name.upper(), (args[0] if args else kwargs.get("url"))
+        return send_with_policy(
+            method, url,
+            lambda: getattr(get_thread_session(), function_name)(*args, **kwargs)
+        )
+
+    _session_function.__name__ = function_name
+    return _session_function
+
+
+class KeepAliveRequests:
+    """
+    Stands in for the requests module in the orcabus_api_tools modules,
+    the request functions go through get_session_function, any other attribute
+    (exceptions, codes, Response...) is that of the requests module
+    """
+    def __init__(self, requests_module):
+        self.requests_module = requests_module
+        for function_name in REQUESTS_FUNCTION_NAMES:
+            setattr(self, function_name, get_session_function(function_name))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.requests_module, name)
+
+
+def enable_keep_alive():
+    """
+    Route the requests of the loaded orcabus_api_tools modules through a session per thread,
+    and the rate limit policies (see rate_limit).
+    Safe to call more than once, modules loaded since the last call are routed too.
+    Does nothing if requests is not installed, raises a RuntimeError if the loaded orcabus_api_tools
+    package does not reference requests
+    """
+    global _KEEP_ALIVE_REQUESTS
+    try:
+        import requests
+    except ModuleNotFoundError:
+        return
+
+    with _KEEP_ALIVE_LOCK:
+        if _KEEP_ALIVE_REQUESTS is None:
+            _KEEP_ALIVE_REQUESTS = KeepAliveRequests(requests)
+
+        api_tools_modules = list(filter(
+            lambda module_iter_: getattr(module_iter_, "__name__", "").startswith(KEEP_ALIVE_MODULE_PREFIX),
+            list(sys.modules.values())
+        ))
+        for module in api_tools_modules:
+            # import requests
+            if getattr(module, "requests", None) is requests:
+                setattr(module, "requests", _KEEP_ALIVE_REQUESTS)
+            # from requests import get, post...
+            for function_name in REQUESTS_FUNCTION_NAMES:
+                if getattr(module, function_name, None) is getattr(requests, function_name):
+                    setattr(module, function_name, getattr(_KEEP_ALIVE_REQUESTS, function_name))
+
+        # Only the installed package, local stand-ins (modules without a file) send no requests
+        if (
+            any(map(lambda module_iter_: getattr(module_iter_, "__file__", None) is not None, api_tools_modules)) and
+            not any(map(is_keep_alive_module, api_tools_modules))
+        ):
+            raise RuntimeError(
+                f"No loaded {KEEP_ALIVE_MODULE_PREFIX} module references requests or its request functions, "
+                f"its requests would not be sent with the thread sessions and rate limit policies"
+            )
+
+
+def is_keep_alive_module(module: Any) -> bool:
+    return (
+        getattr(module, "requests", None) is _KEEP_ALIVE_REQUESTS or
+        any(map(
+            lambda function_name_iter_: (
+                getattr(module, function_name_iter_, None) is getattr(_KEEP_ALIVE_REQUESTS, function_name_iter_)
+            ),
+            REQUESTS_FUNCTION_NAMES
+        ))
+    )
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            enable_keep_alive()
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=get_max_concurrent_requests(),
+                thread_name_prefix=EXECUTOR_THREAD_NAME_PREFIX,
+            )
+    return _EXECUTOR
+
+
+async def call_async(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a blocking call on the shared thread pool, not from a call already running on it (see the module docstring)
+    """
+    if threading.current_thread().name.startswith(EXECUTOR_THREAD_NAME_PREFIX):
+        raise RuntimeError(
+            "Calls on the shared orcabus client thread pool must not be nested, it deadlocks once all workers wait"
+        )
+    # asyncio is only imported by the handlers that run calls concurrently, it is slow to import
+    import asyncio
+    # run_in_executor does not copy the context, run in a copy to keep the current trace span (see tracing)
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(), partial(copy_context().run, func, *args, **kwargs)
+    )
+
+
+async def gather_calls(calls: Iterable[Callable[[], T]]) -> List[T]:
+    """
+    Run blocking calls concurrently, results are in call order, the first exception is raised
+    """
+    import asyncio
+    return list(await asyncio.gather(*map(call_async, calls)))
+
+
+def run_async(coroutine: Coroutine[Any, Any, T]) -> T:
+    # Sync wrapper, lambda handlers are not run in an event loop
+    import asyncio
+    return asyncio.run(coroutine)
+
+
+def run_concurrently(func: Callable[[Any], T], args_list: Iterable[Any]) -> List[T]:
+    """
+    Call func once for each argument, concurrently, results are in argument order.
+    func must not call run_concurrently itself, the calls share one thread pool
+    """
+    args_list = list(args_list)
+    if len(args_list) <= 1:
+        # No need for the event loop or the thread pool
+        return list(map(func, args_list))
+    return run_async(gather_calls(map(lambda args_iter_: partial(func, args_iter_), args_list)))
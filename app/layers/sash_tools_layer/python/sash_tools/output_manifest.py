@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+"""
+Manifest of the key result files of a succeeded sash run.
+
+The WRSC event of a SUCCEEDED run carries the manifest in its outputs, next to sashRelPath,
+so downstream services don't each list the run's output directory again
+
+    "outputs": {
+        "sashRelPath": "SBJ00001/",
+        "outputManifest": {
+            "files": [
+                {"type": "cancerReport", "s3Uri": "s3://bucket/.../SBJ00001.cancer_report.html", "sizeBytes": 12345678},
+                ...
+            ],
+            "fileCount": 2841,            # every file under the output uri
+            "totalSizeBytes": 98765432100,
+            "isTruncated": false          # true if result files were left out for the caps below
+        }
+    }
+
+The manifest is built in one pass over the file objects of the output uri (i.e. the pages of a Filemanager listing,
+consumed as they arrive), so only the listed result files are held in memory, up to
+OUTPUT_MANIFEST_MAX_FILES (default 100) files and OUTPUT_MANIFEST_MAX_BYTES (default 64 KB) of manifest,
+well under the 256 KB EventBridge event limit.
+"""
+
+# Standard imports
+import json
+import re
+from dataclasses import dataclass
+from os import environ
+from typing import Any, Dict, Iterable, List, Optional, Pattern
+
+# Globals
+OUTPUT_MANIFEST_MAX_FILES_ENV_VAR = "OUTPUT_MANIFEST_MAX_FILES"
+DEFAULT_OUTPUT_MANIFEST_MAX_FILES = 100
+OUTPUT_MANIFEST_MAX_BYTES_ENV_VAR = "OUTPUT_MANIFEST_MAX_BYTES"
+DEFAULT_OUTPUT_MANIFEST_MAX_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ResultFileType:
+    name: str
+    pattern: Pattern[str]
+
+
+# The sash reports and final variant calls, matched against the keys relative to the output uri
+RESULT_FILE_TYPES: List[ResultFileType] = [
+    ResultFileType("cancerReport", re.compile(r"\.cancer_report\.html$")),
+    ResultFileType("pcgrReport", re.compile(r"\.pcgr[^/]*\.html$")),
+    ResultFileType("cpsrReport", re.compile(r"\.cpsr[^/]*\.html$")),
+    ResultFileType("multiqcReport", re.compile(r"multiqc[^/]*\.html$")),
+    ResultFileType("purplePurity", re.compile(r"\.purple\.purity\.tsv$")),
+    ResultFileType("somaticSmallVariantsVcf", re.compile(r"smlv_somatic/.*\.pass\.vcf\.gz$")),
+    ResultFileType("somaticStructuralVariantsVcf", re.compile(r"sv_somatic/.*\.vcf\.gz$")),
+]
+
+
+def get_result_file_type(relative_key: str) -> Optional[str]:
+    return next(
+        (
+            result_file_type.name
+            for result_file_type in RESULT_FILE_TYPES
+            if result_file_type.pattern.search(relative_key) is not None
+        ),
+        None
+    )
+
+
+def get_output_manifest(
+        bucket: str,
+        key_prefix: str,
+        file_objects: Iterable[Dict[str, Any]],
+        max_files: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Build the manifest of the result files under the prefix, in one pass over the file objects
+    :param bucket: The bucket of the output uri
+    :param key_prefix: The key prefix of the output uri, ending with /
+    :param file_objects: Filemanager file objects (with bucket, key and size) under the prefix, may be a generator
+    :param max_files: The most result files to list, defaults to OUTPUT_MANIFEST_MAX_FILES
+    :param max_bytes: The largest manifest file list (as json), defaults to OUTPUT_MANIFEST_MAX_BYTES
+    """
+    max_files = max_files if max_files is not None else int(
+        environ.get(OUTPUT_MANIFEST_MAX_FILES_ENV_VAR, DEFAULT_OUTPUT_MANIFEST_MAX_FILES)
+    )
+    max_bytes = max_bytes if max_bytes is not None else int(
+        environ.get(OUTPUT_MANIFEST_MAX_BYTES_ENV_VAR, DEFAULT_OUTPUT_MANIFEST_MAX_BYTES)
+    )
+
+    manifest_files: List[Dict[str, Any]] = []
+    manifest_bytes = 0
+    file_count = 0
+    total_size_bytes = 0
+    is_truncated = False
+
+    for file_object in file_objects:
+        file_count += 1
+        total_size_bytes += file_object.get("size") or 0
+
+        result_file_type = get_result_file_type(file_object["key"][len(key_prefix):])
+        if result_file_type is None:
+            continue
+
+        manifest_file = {
+            "type": result_file_type,
+            "s3Uri": f"s3://{bucket}/{file_object['key']}",
+            "sizeBytes": file_object.get("size"),
+        }
+        # Separators are counted too, the list is capped by its size as json
+        manifest_file_bytes = len(json.dumps(manifest_file)) + 2
+        if len(manifest_files) >= max_files or manifest_bytes + manifest_file_bytes > max_bytes:
+            is_truncated = True
+            continue
+        manifest_files.append(manifest_file)
+        manifest_bytes += manifest_file_bytes
+
+    # Result file type order, then key order, whatever the listing order
+    result_file_type_names = list(map(lambda result_file_type_iter_: result_file_type_iter_.name, RESULT_FILE_TYPES))
+    manifest_files.sort(
+        key=lambda manifest_file_iter_: (
+            result_file_type_names.index(manifest_file_iter_["type"]),
+            manifest_file_iter_["s3Uri"]
+        )
+    )
+
+    return {
+        "files": manifest_files,
+        "fileCount": file_count,
+        "totalSizeBytes": total_size_bytes,
+        "isTruncated": is_truncated,
+    }
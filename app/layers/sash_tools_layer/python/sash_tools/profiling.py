@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+"""
+On demand profiling of handler invocations.
+
+Handlers are wrapped with profile_handler (under trace_handler)
+
+    @trace_handler
+    @profile_handler
+    def handler(event, context):
+        ...
+
+The PROFILE_MODE env var, read as the handler module is imported, sets which invocations are profiled
+* off (default)  - none, profile_handler returns the handler itself so there is no overhead at all
+* event          - the invocations with "profile": true in their event
+* always         - every invocation
+
+A profiled invocation is run under cProfile and tracemalloc. Its summary is logged as one json line
+
+    {
+        "profile": "find_latest_workflow",
+        "durationMs": 812.3,
+        "peakAllocatedKb": 2048.0,       # tracemalloc peak over the invocation
+        "topFunctions": [{"function": "requests/sessions.py:500(request)", "calls": 2, "cumulativeMs": 790.1}, ...],
+        "topAllocations": [{"location": "json/decoder.py:353", "sizeKb": 512.0, "count": 1200}, ...],
+        "profileUri": "s3://bucket/profiles/find_latest_workflow/20250101T000000-<request id>.prof"
+    }
+
+and the full profile (pstats format, open with python -m pstats or snakeviz) is written to the PROFILE_SINK
+directory, a local path (default /tmp/sash-profiles) or an s3://bucket/prefix/ uri.
+The lambda role needs s3:PutObject on an s3 sink.
+
+cProfile only profiles the invocation's thread, work on thread pools (i.e. orcabus_client.run_concurrently)
+shows up as the time spent waiting on it. The allocations are those still held at the end of the invocation.
+Handlers called by a profiled handler (i.e. by resolve_draft_data) are part of its profile, not profiled again.
+tracemalloc is process wide, so profiles of concurrent invocations in one process (as in the local tools,
+not in lambda) share their allocation counts.
+"""
+
+# Standard imports
+import json
+import logging
+import time
+import typing
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from os import environ
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+if typing.TYPE_CHECKING:
+    # The profilers are only imported once an invocation is profiled, so an unprofiled handler pays nothing for them
+    import cProfile
+    import tracemalloc
+
+# Globals
+PROFILE_MODE_ENV_VAR = "PROFILE_MODE"
+PROFILE_SINK_ENV_VAR = "PROFILE_SINK"
+OFF_PROFILE_MODE = "off"
+EVENT_PROFILE_MODE = "event"
+ALWAYS_PROFILE_MODE = "always"
+PROFILE_MODES = [OFF_PROFILE_MODE, EVENT_PROFILE_MODE, ALWAYS_PROFILE_MODE]
+DEFAULT_PROFILE_SINK = "/tmp/sash-profiles"
+PROFILE_EVENT_KEY = "profile"
+S3_URI_PREFIX = "s3://"
+
+TOP_FUNCTIONS_COUNT = 15
+TOP_ALLOCATIONS_COUNT = 10
+
+logger = logging.getLogger(__name__)
+
+_IS_PROFILING: ContextVar[bool] = ContextVar("sash_tools_is_profiling", default=False)
+
+
+def get_profile_mode() -> str:
+    profile_mode = environ.get(PROFILE_MODE_ENV_VAR, OFF_PROFILE_MODE).lower()
+    if profile_mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown {PROFILE_MODE_ENV_VAR} '{profile_mode}', expected one of {', '.join(PROFILE_MODES)}")
+    return profile_mode
+
+
+def get_function_label(function_key) -> str:
+    # pstats keys are (filename, line number, function name), keep the last two path parts of the filename
+    filename, line_number, function_name = function_key
+    return f"{'/'.join(Path(filename).parts[-2:])}:{line_number}({function_name})"
+
+
+def get_top_functions(profiler: "cProfile.Profile") -> List[Dict[str, Any]]:
+    import pstats
+    stats = pstats.Stats(profiler)
+    top_function_keys = sorted(
+        stats.stats.keys(),
+        key=lambda function_key_iter_: stats.stats[function_key_iter_][3],
+        reverse=True
+    )[:TOP_FUNCTIONS_COUNT]
+    return list(map(
+        lambda function_key_iter_: {
+            "function": get_function_label(function_key_iter_),
+            "calls": stats.stats[function_key_iter_][1],
+            "cumulativeMs": round(stats.stats[function_key_iter_][3] * 1000, 1),
+        },
+        top_function_keys
+    ))
+
+
+def get_top_allocations(snapshot: "tracemalloc.Snapshot") -> List[Dict[str, Any]]:
+    return list(map(
+        lambda statistic_iter_: {
+            "location": f"{'/'.join(Path(statistic_iter_.traceback[0].filename).parts[-2:])}:{statistic_iter_.traceback[0].lineno}",
+            "sizeKb": round(statistic_iter_.size / 1024, 1),
+            "count": statistic_iter_.count,
+        },
+        snapshot.statistics("lineno")[:TOP_ALLOCATIONS_COUNT]
+    ))
+
+
+def write_profile(profiler: "cProfile.Profile", handler_name: str, invocation_id: str) -> str:
+    """
+    Write the profile to the sink
+    :return: The path or s3 uri of the profile
+    """
+    profile_sink = environ.get(PROFILE_SINK_ENV_VAR, DEFAULT_PROFILE_SINK)
+    profile_name = f"{handler_name}/{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{invocation_id}.prof"
+
+    if not profile_sink.startswith(S3_URI_PREFIX):
+        profile_path = Path(profile_sink) / profile_name
+        profile_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(profile_path))
+        return str(profile_path)
+
+    # Only imported if an s3 sink is used
+    import boto3
+    import tempfile
+    bucket_name, _, key_prefix = profile_sink[len(S3_URI_PREFIX):].partition("/")
+    key = f"{key_prefix.rstrip('/')}/{profile_name}".lstrip("/")
+    with tempfile.NamedTemporaryFile(suffix=".prof") as profile_file_h:
+        profiler.dump_stats(profile_file_h.name)
+        boto3.client("s3").upload_file(profile_file_h.name, bucket_name, key)
+    return f"{S3_URI_PREFIX}{bucket_name}/{key}"
+
+
+def run_profiled(handler: Callable, handler_name: str, event: Any, context: Any) -> Any:
+    """
+    Run the handler under cProfile and tracemalloc, then log the summary and write the profile
+    """
+    import cProfile
+    import tracemalloc
+
+    invocation_id = getattr(context, "aws_request_id", None) or uuid.uuid4().hex
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Another profiler is active in the process (one at a time from python 3.12)
+        logger.warning(f"Not profiling {handler_name}: {e}")
+        return handler(event, context)
+
+    is_tracing_memory = tracemalloc.is_tracing()
+    if is_tracing_memory:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    token = _IS_PROFILING.set(True)
+    start = time.perf_counter()
+    try:
+        try:
+            return handler(event, context)
+        finally:
+            profiler.disable()
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        _IS_PROFILING.reset(token)
+        # The profile is a diagnostic, the invocation must not fail for it,
+        # the handler's return value or exception is passed on unchanged
+        try:
+            log_profile_summary(profiler, handler_name, invocation_id, duration_ms, is_tracing_memory)
+        except Exception as e:
+            logger.warning(f"Could not summarise the profile of {handler_name}: {e}")
+
+
+def log_profile_summary(
+        profiler: "cProfile.Profile",
+        handler_name: str,
+        invocation_id: str,
+        duration_ms: float,
+        is_tracing_memory: bool
+):
+    """
+    Log the summary of a profiled invocation and write its profile,
+    stopping tracemalloc if it was started for the invocation
+    """
+    import tracemalloc
+
+    try:
+        _, peak_size = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if not is_tracing_memory:
+            tracemalloc.stop()
+
+    summary = {
+        "profile": handler_name,
+        "durationMs": round(duration_ms, 1),
+        "peakAllocatedKb": round(peak_size / 1024, 1),
+        "topFunctions": get_top_functions(profiler),
+        "topAllocations": get_top_allocations(snapshot),
+    }
+    try:
+        summary["profileUri"] = write_profile(profiler, handler_name, invocation_id)
+    except Exception as e:
+        logger.warning(f"Could not write the profile of {handler_name}: {e}")
+    print(json.dumps(summary))
+
+
+def profile_handler(handler: Callable) -> Callable:
+    """
+    Profile the invocations of a lambda handler selected by PROFILE_MODE
+    """
+    profile_mode = get_profile_mode()
+    if profile_mode == OFF_PROFILE_MODE:
+        return handler
+
+    handler_name = handler.__module__
+
+    @wraps(handler)
+    def _profiled_handler(event, context):
+        if _IS_PROFILING.get() or (
+            profile_mode == EVENT_PROFILE_MODE and
+            not (isinstance(event, dict) and event.get(PROFILE_EVENT_KEY) is True)
+        ):
+            return handler(event, context)
+        return run_profiled(handler, handler_name, event, context)
+
+    return _profiled_handler
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+"""
+Client side rate limits and retries for the OrcaBus API calls.
+
+Bursts of executions (i.e. bulk reprocessing) all calling the Workflow Manager get throttled,
+and each throttled lambda then fails into a Step Functions retry. Instead each request is sent through
+the policy of its endpoint
+
+* a token bucket, shared by the threads of the container, limits the request rate.
+  The rate is halved on each throttled (429) response, down to a tenth of the configured rate,
+  and grows back by a tenth of the configured rate per successful response
+* throttled responses are retried, as are 5xx responses and connection errors for idempotent methods,
+  after the Retry-After header delay, or a jittered exponential backoff, up to maxAttempts attempts
+
+Policies are set per endpoint by the ORCABUS_RATE_LIMITS env var, a json object keyed by a substring
+of the request url ("host/path"), the longest matching key wins and the "default" key applies otherwise
+
+    {
+        "default": {"ratePerSecond": 10, "burst": 20},
+        "/comment": {"ratePerSecond": 2, "burst": 2, "maxAttempts": 6}
+    }
+
+Missing keys take the DEFAULT_POLICY values.
+
+The token bucket is per container, so N warm containers send up to N times the configured rate.
+A policy with "shared": true also takes each token from a bucket kept in the state store (the state table
+when STATE_TABLE_NAME is set), shared by every container, at the cost of a read and a conditional write per request.
+It is meant for the write endpoints (i.e. "/comment"), the lambdas sending them need state table access.
+
+Each throttled response and retry is logged as a CloudWatch embedded metric (Throttled, Retried and RetryDelayMs,
+with an Endpoint dimension), get_metrics returns the counts for this container by endpoint.
+
+Requests sent by the orcabus_api_tools modules are routed through the policies by
+orcabus_client.enable_keep_alive, which covers every orcabus_api_tools call.
+Each request is a client span (see tracing), with its attempts and the time spent waiting on
+the token bucket and retry delays (waitMs).
+"""
+
+# Standard imports
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from os import environ
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# Local imports
+from .metrics import put_embedded_metric
+from .state_store import StateStore, get_state_store
+from .tracing import CLIENT_SPAN_KIND, start_span
+
+# Globals
+RATE_LIMITS_ENV_VAR = "ORCABUS_RATE_LIMITS"
+METRICS_NAMESPACE_ENV_VAR = "ORCABUS_CLIENT_METRICS_NAMESPACE"
+DEFAULT_METRICS_NAMESPACE = "SashPipelineManager/OrcabusClient"
+DEFAULT_POLICY_KEY = "default"
+DEFAULT_POLICY = {
+    "ratePerSecond": 10.0,
+    "burst": 20,
+    "maxAttempts": 4,
+    "baseDelaySeconds": 0.5,
+    "maxDelaySeconds": 10.0,
+    "shared": False,
+}
+RATE_LIMIT_NAMESPACE = "orcabus-rate-limit"
+# An idle shared bucket is full again long before it expires
+SHARED_BUCKET_TTL_SECONDS = 60 * 60
+THROTTLED_STATUS_CODE = 429
+RETRYABLE_STATUS_CODES = [500, 502, 503, 504]
+IDEMPOTENT_METHODS = ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+MIN_RATE_FRACTION = 0.1
+RATE_INCREASE_FRACTION = 0.1
+
+_POLICIES: Optional[Dict[str, "EndpointPolicy"]] = None
+_POLICIES_LOCK = threading.Lock()
+_METRICS: Dict[str, Dict[str, float]] = {}
+_METRICS_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket, with an adaptive (additive increase, multiplicative decrease) rate
+    """
+    def __init__(self, rate_per_second: float, burst: int):
+        self.max_rate = rate_per_second
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self) -> float:
+        """
+        Take a token, waiting for one if the bucket is empty
+        :return: The seconds waited
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+            waited += wait_seconds
+
+    def on_throttled(self):
+        with self._lock:
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_INCREASE_FRACTION)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket shared by all containers through the state store, behind the container's own bucket.
+    The container's bucket still adapts its rate to throttled responses,
+    the shared bucket caps the configured rate across containers
+    """
+    def __init__(self, name: str, rate_per_second: float, burst: int, store: Optional[StateStore] = None):
+        super().__init__(rate_per_second, burst)
+        self.name = name
+        self.store = store if store is not None else get_state_store(RATE_LIMIT_NAMESPACE)
+
+    def _acquire_shared(self) -> float:
+        waited = 0.0
+        while True:
+            item, version = self.store.get_with_version(self.name)
+            # Wall clock time, the monotonic clock is not shared between containers
+            now = time.time()
+            tokens = (
+                float(self.burst)
+                if item is None
+                else min(self.burst, item["tokens"] + max(0.0, now - item["updatedAt"]) * self.max_rate)
+            )
+            if tokens >= 1:
+                if self.store.put_if_version(
+                    self.name, {"tokens": tokens - 1, "updatedAt": now}, version,
+                    ttl_seconds=SHARED_BUCKET_TTL_SECONDS
+                ):
+                    return waited
+                # Another container took a token in the meantime
+                continue
+            wait_seconds = (1 - tokens) / self.max_rate
+            time.sleep(wait_seconds)
+            waited += wait_seconds
+
+    def acquire(self) -> float:
+        return super().acquire() + self._acquire_shared()
+
+
+@dataclass
+class EndpointPolicy:
+    name: str
+    bucket: TokenBucket
+    max_attempts: int
+    base_delay_seconds: float
+    max_delay_seconds: float
+
+    def get_backoff_seconds(self, attempt: int) -> float:
+        # Full jitter
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt))
+
+
+def get_policies() -> Dict[str, EndpointPolicy]:
+    global _POLICIES
+    with _POLICIES_LOCK:
+        if _POLICIES is None:
+            config = json.loads(environ.get(RATE_LIMITS_ENV_VAR) or "{}")
+            config.setdefault(DEFAULT_POLICY_KEY, {})
+            _POLICIES = {}
+            for name, policy in config.items():
+                policy = {**DEFAULT_POLICY, **policy}
+                _POLICIES[name] = EndpointPolicy(
+                    name=name,
+                    bucket=(
+                        SharedTokenBucket(name, float(policy["ratePerSecond"]), int(policy["burst"]))
+                        if policy["shared"]
+                        else TokenBucket(float(policy["ratePerSecond"]), int(policy["burst"]))
+                    ),
+                    max_attempts=int(policy["maxAttempts"]),
+                    base_delay_seconds=float(policy["baseDelaySeconds"]),
+                    max_delay_seconds=float(policy["maxDelaySeconds"]),
+                )
+    return _POLICIES
+
+
+def reset_policies():
+    # Re-read ORCABUS_RATE_LIMITS on the next request
+    global _POLICIES
+    with _POLICIES_LOCK:
+        _POLICIES = None
+
+
+def get_endpoint_policy(url: str) -> EndpointPolicy:
+    parsed_url = urlparse(url)
+    endpoint = f"{parsed_url.netloc}{parsed_url.path}"
+    policies = get_policies()
+    matching_names = list(filter(
+        lambda name_iter_: name_iter_ != DEFAULT_POLICY_KEY and name_iter_ in endpoint,
+        policies.keys()
+    ))
+    if not matching_names:
+        return policies[DEFAULT_POLICY_KEY]
+    return policies[max(matching_names, key=len)]
+
+
+def get_retry_after_seconds(response: Any) -> Optional[float]:
+    """
+    Get the Retry-After header delay, in seconds or as an http date
+    """
+    retry_after = getattr(response, "headers", {}).get("Retry-After")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_metrics() -> Dict[str, Dict[str, float]]:
+    with _METRICS_LOCK:
+        return json.loads(json.dumps(_METRICS))
+
+
+def put_metrics(endpoint: str, metrics: Dict[str, Tuple[float, str]]):
+    """
+    Count the metrics for this container, and log them as one embedded metric format line
+    :param endpoint: The policy name
+    :param metrics: The metric values and units, by metric name
+    """
+    with _METRICS_LOCK:
+        endpoint_metrics = _METRICS.setdefault(endpoint, {})
+        for metric_name, (value, _) in metrics.items():
+            endpoint_metrics[metric_name] = endpoint_metrics.get(metric_name, 0) + value
+
+    put_embedded_metric(
+        environ.get(METRICS_NAMESPACE_ENV_VAR, DEFAULT_METRICS_NAMESPACE),
+        {"Endpoint": endpoint},
+        metrics
+    )
+
+
+def send_with_policy(method: str, url: str, send: Callable[[], Any]) -> Any:
+    """
+    Send a request through the policy of its endpoint
+    :param method: The http method
+    :param url: The request url
+    :param send: Sends the request, returns the response
+    :return: The last response, a connection error is raised once the attempts are used up
+    """
+    # Connection errors are requests exceptions, requests is only imported if a request is being sent
+    from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+
+    policy = get_endpoint_policy(url)
+    is_idempotent = method.upper() in IDEMPOTENT_METHODS
+    parsed_url = urlparse(url)
+
+    with start_span(f"{method.upper()} {parsed_url.netloc}{parsed_url.path}", kind=CLIENT_SPAN_KIND, endpoint=policy.name) as span:
+        attempt = 0
+        waited_seconds = 0.0
+        while True:
+            waited_seconds += policy.bucket.acquire()
+            attempt += 1
+            span.set_attributes(attempts=attempt, waitMs=round(waited_seconds * 1000, 1))
+            try:
+                response = send()
+            except (RequestsConnectionError, Timeout):
+                if not is_idempotent or attempt >= policy.max_attempts:
+                    raise
+                delay_seconds = policy.get_backoff_seconds(attempt)
+            else:
+                span.set_attributes(statusCode=response.status_code)
+                is_throttled = response.status_code == THROTTLED_STATUS_CODE
+                if is_throttled:
+                    policy.bucket.on_throttled()
+                    put_metrics(policy.name, {"Throttled": (1, "Count")})
+                if not (is_throttled or (is_idempotent and response.status_code in RETRYABLE_STATUS_CODES)):
+                    policy.bucket.on_success()
+                    return response
+                if attempt >= policy.max_attempts:
+                    return response
+                retry_after_seconds = get_retry_after_seconds(response)
+                response.close()
+                delay_seconds = (
+                    min(policy.max_delay_seconds, retry_after_seconds)
+                    if retry_after_seconds is not None
+                    else policy.get_backoff_seconds(attempt)
+                )
+
+            put_metrics(policy.name, {
+                "Retried": (1, "Count"),
+                "RetryDelayMs": (round(delay_seconds * 1000, 1), "Milliseconds"),
+            })
+            time.sleep(delay_seconds)
+            waited_seconds += delay_seconds
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""
+Cache of the workflow run and payload of each submitted sash run, keyed by portal run id.
+
+A sash run's payload does not change between READY and completion, yet every ICAv2 WES state change
+(QUEUED, INITIALIZING, RUNNING, ...) would look up the workflow run and its latest payload again.
+Instead the READY state machine caches the run from the READY event when it makes the ICAv2 WES request
+(cache_workflow_run_payload), and convert_icav2_wes_event_to_wrsc_event builds the WRSC event of
+an intermediate status from the cache
+
+    run_payload_cache = RunPayloadCache()
+    cached_run = run_payload_cache.get(portal_run_id)
+    if cached_run is None:
+        ...  # look up the workflow run and its latest payload
+
+The entry is dropped once the run reaches a terminal status, and invalidated by index_workflow_run_state_change
+when a WorkflowRunStateChange event of the run carries a different payload. The fields this service sets
+on the payload after READY (engineParameters.analysisId and outputs, see INPUT_FINGERPRINT_EXCLUDED_FIELDS)
+are not considered, so the service's own RUNNING and SUCCEEDED events do not invalidate the entry.
+
+Entries are kept in the run-payloads namespace of the state store for RUN_PAYLOAD_CACHE_TTL_SECONDS (default 7 days).
+Payloads over MAX_CACHED_PAYLOAD_BYTES are not cached.
+"""
+
+# Standard imports
+import logging
+from copy import deepcopy
+from hashlib import sha256
+from typing import Any, Dict, Optional
+
+# Local imports
+from .fingerprint import to_canonical_json
+from .state_store import StateStore, get_seconds_from_env, get_state_store
+
+# Globals
+RUN_PAYLOAD_CACHE_NAMESPACE = "run-payloads"
+RUN_PAYLOAD_CACHE_TTL_SECONDS_ENV_VAR = "RUN_PAYLOAD_CACHE_TTL_SECONDS"
+DEFAULT_RUN_PAYLOAD_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+# Well under the 400 KB DynamoDB item limit
+MAX_CACHED_PAYLOAD_BYTES = 300 * 1024
+
+# Payload data fields set by this service after READY, (parent field, field) pairs
+INPUT_FINGERPRINT_EXCLUDED_FIELDS = [
+    ("engineParameters", "analysisId"),
+    (None, "outputs"),
+]
+WORKFLOW_RUN_KEYS = ["orcabusId", "portalRunId", "workflow", "workflowRunName", "libraries"]
+
+logger = logging.getLogger(__name__)
+
+
+def get_input_fingerprint(payload: Dict[str, Any]) -> str:
+    """
+    Get the fingerprint of a payload, without the fields set by this service after READY
+    """
+    data = deepcopy(payload.get("data") or {})
+    for parent_field, field in INPUT_FINGERPRINT_EXCLUDED_FIELDS:
+        parent = data.get(parent_field) if parent_field is not None else data
+        if isinstance(parent, dict):
+            parent.pop(field, None)
+    return sha256(to_canonical_json({"version": payload.get("version"), "data": data}).encode()).hexdigest()
+
+
+class RunPayloadCache:
+    def __init__(self, store: Optional[StateStore] = None, ttl_seconds: Optional[float] = None):
+        self.store = store if store is not None else get_state_store(RUN_PAYLOAD_CACHE_NAMESPACE)
+        self.ttl_seconds = get_seconds_from_env(
+            ttl_seconds, RUN_PAYLOAD_CACHE_TTL_SECONDS_ENV_VAR, DEFAULT_RUN_PAYLOAD_CACHE_TTL_SECONDS
+        )
+
+    def get(self, portal_run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached run
+        :return: {"workflowRun": {"orcabusId": ..., "workflow": ..., ...}, "payload": {"version": ..., "data": ...}}
+        """
+        if self.ttl_seconds <= 0:
+            return None
+        entry = self.store.get(portal_run_id)
+        if entry is None:
+            return None
+        return {"workflowRun": entry["workflowRun"], "payload": entry["payload"]}
+
+    def put_from_event_detail(self, event_detail: Dict[str, Any]) -> bool:
+        """
+        Cache the run of a WorkflowRunStateChange event detail (i.e. the READY event)
+        :return: False if the payload is too large to cache
+        """
+        if self.ttl_seconds <= 0:
+            return False
+        payload = {
+            "version": event_detail["payload"]["version"],
+            "data": event_detail["payload"]["data"],
+        }
+        if len(to_canonical_json(payload).encode()) > MAX_CACHED_PAYLOAD_BYTES:
+            logger.info(f"Not caching the payload of {event_detail['portalRunId']}, it is over {MAX_CACHED_PAYLOAD_BYTES} bytes")
+            return False
+        self.store.put(
+            event_detail["portalRunId"],
+            {
+                "workflowRun": {
+                    workflow_run_key: event_detail[workflow_run_key]
+                    for workflow_run_key in WORKFLOW_RUN_KEYS
+                    if workflow_run_key in event_detail
+                },
+                "payload": payload,
+                "inputFingerprint": get_input_fingerprint(payload),
+            },
+            ttl_seconds=self.ttl_seconds,
+        )
+        return True
+
+    def invalidate_if_changed(self, portal_run_id: str, payload: Dict[str, Any]) -> bool:
+        """
+        Drop the cached run if the payload differs from the cached payload
+        :return: True if the cached run was dropped
+        """
+        entry = self.store.get(portal_run_id)
+        if entry is None or entry["inputFingerprint"] == get_input_fingerprint(payload):
+            return False
+        logger.info(f"The payload of {portal_run_id} has changed, dropping its cached run")
+        self.store.delete(portal_run_id)
+        return True
+
+    def invalidate(self, portal_run_id: str):
+        self.store.delete(portal_run_id)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+"""
+Handler modules of the sibling lambdas, for functions deployed with every lambda directory
+(the sash dispatcher and resolve_draft_data, see needsSiblingHandlers).
+
+    sibling_handlers = SiblingHandlers(Path(__file__).absolute().parent.parent)
+    sibling_handlers.get_handler_module("compare_payload").handler(event, None)
+
+A lambda directory is <lambda name>_py/<lambda name>.py, the handler modules are imported on first use,
+so a function only pays for the imports of the handlers it calls, and kept for the life of the container.
+Safe to call from several threads.
+"""
+
+# Standard imports
+import logging
+import sys
+import threading
+from importlib import import_module
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional
+
+# Globals
+LAMBDA_DIR_SUFFIX = "_py"
+
+logger = logging.getLogger(__name__)
+
+
+class SiblingHandlers:
+    def __init__(self, lambdas_dir: Path, excluded_lambda_names: Optional[List[str]] = None):
+        self.lambdas_dir = Path(lambdas_dir)
+        self.excluded_lambda_names = excluded_lambda_names or []
+        self._handler_modules: Dict[str, ModuleType] = {}
+        self._import_lock = threading.Lock()
+
+    def get_lambda_names(self) -> List[str]:
+        return sorted(
+            lambda_dir_iter_.name[:-len(LAMBDA_DIR_SUFFIX)]
+            for lambda_dir_iter_ in self.lambdas_dir.iterdir()
+            if (
+                lambda_dir_iter_.is_dir() and
+                lambda_dir_iter_.name.endswith(LAMBDA_DIR_SUFFIX) and
+                lambda_dir_iter_.name[:-len(LAMBDA_DIR_SUFFIX)] not in self.excluded_lambda_names and
+                (lambda_dir_iter_ / f"{lambda_dir_iter_.name[:-len(LAMBDA_DIR_SUFFIX)]}.py").is_file()
+            )
+        )
+
+    def get_handler_module(self, lambda_name: str) -> ModuleType:
+        """
+        Get the handler module of a sibling lambda, importing it on first use
+        :raises ValueError: If there is no such lambda
+        """
+        with self._import_lock:
+            if lambda_name in self._handler_modules:
+                return self._handler_modules[lambda_name]
+
+            lambda_names = self.get_lambda_names()
+            if lambda_name not in lambda_names:
+                raise ValueError(f"Unknown lambda '{lambda_name}', expected one of {lambda_names}")
+
+            logger.info(f"Importing handler of '{lambda_name}' ({len(self._handler_modules)} already imported)")
+            lambda_dir = str(self.lambdas_dir / f"{lambda_name}{LAMBDA_DIR_SUFFIX}")
+            if lambda_dir not in sys.path:
+                sys.path.append(lambda_dir)
+            self._handler_modules[lambda_name] = import_module(lambda_name)
+            return self._handler_modules[lambda_name]
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+"""
+Small key-value state store shared by the sash lambdas.
+
+Values are json-serialisable dictionaries stored under a namespace and key,
+with an optional time-to-live.
+
+Keys that are updated concurrently (i.e. by duplicate deliveries of the same event) are read with
+get_with_version and written with put_if_version, which only writes if the key was not written since it was read
+(a DynamoDB conditional write on the version attribute). put is unconditional and drops the version,
+so a key is written with one or the other, not both.
+
+Backends:
+* dynamodb - the stateful state table (set by the STATE_TABLE_NAME env var)
+* local    - one json file per key under STATE_STORE_LOCAL_DIR, used for local runs and tests
+* memory   - a module level dictionary, only lives as long as the container
+
+The backend is chosen by the STATE_STORE_BACKEND env var, and otherwise defaults to
+dynamodb if STATE_TABLE_NAME is set, or memory if it is not. The modules that keep their entries here
+(i.e. the comment ledger, the negative lookup cache, the WES status guard, the run payload cache and the
+draft library filter) each get their own namespace with get_state_store, so they run locally and in tests
+on the local or memory backends without any changes.
+
+Their entry lifetimes are set per instance, or otherwise by an env var (see get_seconds_from_env).
+"""
+
+# Standard imports
+import json
+import threading
+import typing
+from abc import ABC, abstractmethod
+from hashlib import sha256
+from os import environ
+from pathlib import Path
+from time import time
+from typing import Any, Dict, Optional, Tuple
+
+# Type checking imports
+if typing.TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient
+
+# Globals
+STATE_STORE_BACKEND_ENV_VAR = "STATE_STORE_BACKEND"
+STATE_TABLE_NAME_ENV_VAR = "STATE_TABLE_NAME"
+STATE_STORE_LOCAL_DIR_ENV_VAR = "STATE_STORE_LOCAL_DIR"
+DEFAULT_STATE_STORE_LOCAL_DIR = ".sash-state-store"
+
+# Table attribute names, must match the stateful table definition
+PARTITION_KEY_ATTRIBUTE = "namespace"
+SORT_KEY_ATTRIBUTE = "key"
+VALUE_ATTRIBUTE = "value"
+EXPIRES_AT_ATTRIBUTE = "expiresAt"
+VERSION_ATTRIBUTE = "version"
+
+# Memory backend storage, kept at module level so it survives warm invocations
+_MEMORY_STORE: Dict[Tuple[str, str], Tuple[Dict[str, Any], Optional[float], int]] = {}
+
+# Conditional writes of the memory and local backends are atomic within the process only
+_CONDITIONAL_WRITE_LOCK = threading.Lock()
+
+
+def _get_expires_at(ttl_seconds: Optional[float]) -> Optional[float]:
+    if ttl_seconds is None:
+        return None
+    return time() + ttl_seconds
+
+
+def _is_expired(expires_at: Optional[float]) -> bool:
+    return expires_at is not None and expires_at <= time()
+
+
+class StateStore(ABC):
+    """
+    A namespaced key-value store of json-serialisable dictionaries
+    """
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the value for a key, None if the key is missing or has expired
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        """
+        Set the value for a key, optionally expiring after ttl_seconds
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str):
+        """
+        Remove a key, no-op if the key does not exist
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_with_version(self, key: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Get the value for a key (None if the key is missing or has expired), and the version to pass to put_if_version
+        The version of a missing key is 0, an expired key keeps its version until it is deleted
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_if_version(self, key: str, value: Dict[str, Any], version: int, ttl_seconds: Optional[float] = None) -> bool:
+        """
+        Set the value for a key only if its version is still the version read by get_with_version
+        :return: False if the key was written in the meantime, nothing is written
+        """
+        raise NotImplementedError
+
+
+class MemoryStateStore(StateStore):
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_with_version(key)[0]
+
+    def put(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        _MEMORY_STORE[(self.namespace, key)] = (
+            json.loads(json.dumps(value)),
+            _get_expires_at(ttl_seconds),
+            0
+        )
+
+    def delete(self, key: str):
+        _MEMORY_STORE.pop((self.namespace, key), None)
+
+    def get_with_version(self, key: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        value, expires_at, version = _MEMORY_STORE.get((self.namespace, key), (None, None, 0))
+        if value is None or _is_expired(expires_at):
+            return None, version
+        return json.loads(json.dumps(value)), version
+
+    def put_if_version(self, key: str, value: Dict[str, Any], version: int, ttl_seconds: Optional[float] = None) -> bool:
+        with _CONDITIONAL_WRITE_LOCK:
+            if _MEMORY_STORE.get((self.namespace, key), (None, None, 0))[2] != version:
+                return False
+            _MEMORY_STORE[(self.namespace, key)] = (
+                json.loads(json.dumps(value)),
+                _get_expires_at(ttl_seconds),
+                version + 1
+            )
+        return True
+
+
+class LocalFileStateStore(StateStore):
+    def __init__(self, namespace: str, root_dir: Path):
+        super().__init__(namespace)
+        self.namespace_dir = Path(root_dir) / namespace
+
+    def _get_key_path(self, key: str) -> Path:
+        # Keys may contain characters that are not valid in file names
+        return self.namespace_dir / f"{sha256(key.encode()).hexdigest()}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_with_version(key)[0]
+
+    def put(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        self._write(key, value, ttl_seconds, version=0)
+
+    def _write(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float], version: int):
+        key_path = self._get_key_path(key)
+        key_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so concurrent readers never see a partial file
+        tmp_path = key_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as key_h:
+            json.dump(
+                {
+                    SORT_KEY_ATTRIBUTE: key,
+                    VALUE_ATTRIBUTE: value,
+                    EXPIRES_AT_ATTRIBUTE: _get_expires_at(ttl_seconds),
+                    VERSION_ATTRIBUTE: version,
+                },
+                key_h
+            )
+        tmp_path.replace(key_path)
+
+    def delete(self, key: str):
+        self._get_key_path(key).unlink(missing_ok=True)
+
+    def get_with_version(self, key: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        key_path = self._get_key_path(key)
+        if not key_path.is_file():
+            return None, 0
+        with open(key_path) as key_h:
+            item = json.load(key_h)
+        version = item.get(VERSION_ATTRIBUTE, 0)
+        if _is_expired(item[EXPIRES_AT_ATTRIBUTE]):
+            return None, version
+        return item[VALUE_ATTRIBUTE], version
+
+    def put_if_version(self, key: str, value: Dict[str, Any], version: int, ttl_seconds: Optional[float] = None) -> bool:
+        # Local runs only, not safe across processes
+        with _CONDITIONAL_WRITE_LOCK:
+            if self.get_with_version(key)[1] != version:
+                return False
+            self._write(key, value, ttl_seconds, version=version + 1)
+        return True
+
+
+class DynamoDbStateStore(StateStore):
+    def __init__(self, namespace: str, table_name: str):
+        super().__init__(namespace)
+        self.table_name = table_name
+        self._client: Optional["DynamoDBClient"] = None
+
+    @property
+    def client(self) -> "DynamoDBClient":
+        # Import boto3 on first use, lambdas that never touch the store don't pay for it
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    def _get_key(self, key: str) -> Dict[str, Dict[str, str]]:
+        return {
+            PARTITION_KEY_ATTRIBUTE: {"S": self.namespace},
+            SORT_KEY_ATTRIBUTE: {"S": key},
+        }
+
+    def _get_item(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float]) -> Dict[str, Dict[str, str]]:
+        item = {
+            **self._get_key(key),
+            VALUE_ATTRIBUTE: {"S": json.dumps(value)},
+        }
+        expires_at = _get_expires_at(ttl_seconds)
+        if expires_at is not None:
+            item[EXPIRES_AT_ATTRIBUTE] = {"N": str(int(expires_at))}
+        return item
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_with_version(key)[0]
+
+    def put(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        self.client.put_item(TableName=self.table_name, Item=self._get_item(key, value, ttl_seconds))
+
+    def delete(self, key: str):
+        self.client.delete_item(TableName=self.table_name, Key=self._get_key(key))
+
+    def get_with_version(self, key: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        item = self.client.get_item(
+            TableName=self.table_name,
+            Key=self._get_key(key),
+            ConsistentRead=True,
+        ).get("Item")
+        if item is None:
+            return None, 0
+        version = int(item[VERSION_ATTRIBUTE]["N"]) if VERSION_ATTRIBUTE in item else 0
+        # DynamoDB ttl deletion is lazy, so expired items may still be returned
+        if EXPIRES_AT_ATTRIBUTE in item and _is_expired(float(item[EXPIRES_AT_ATTRIBUTE]["N"])):
+            return None, version
+        return json.loads(item[VALUE_ATTRIBUTE]["S"]), version
+
+    def put_if_version(self, key: str, value: Dict[str, Any], version: int, ttl_seconds: Optional[float] = None) -> bool:
+        item = self._get_item(key, value, ttl_seconds)
+        item[VERSION_ATTRIBUTE] = {"N": str(version + 1)}
+        # version is a DynamoDB reserved word
+        condition_kwargs: Dict[str, Any] = {"ExpressionAttributeNames": {"#version": VERSION_ATTRIBUTE}}
+        if version == 0:
+            condition_kwargs["ConditionExpression"] = "attribute_not_exists(#version)"
+        else:
+            condition_kwargs["ConditionExpression"] = "#version = :version"
+            condition_kwargs["ExpressionAttributeValues"] = {":version": {"N": str(version)}}
+        try:
+            self.client.put_item(TableName=self.table_name, Item=item, **condition_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+
+def get_seconds_from_env(seconds: Optional[float], env_var: str, default_seconds: float) -> float:
+    """
+    Get a duration (i.e. an entry ttl), the given seconds if set, otherwise the env var or the default
+    :param seconds:
+    :param env_var:
+    :param default_seconds:
+    :return:
+    """
+    if seconds is not None:
+        return seconds
+    return float(environ.get(env_var, default_seconds))
+
+
+def get_state_store(namespace: str) -> StateStore:
+    """
+    Get the state store for a namespace, using the backend configured in the environment
+    :param namespace:
+    :return:
+    """
+    backend = environ.get(
+        STATE_STORE_BACKEND_ENV_VAR,
+        "dynamodb" if environ.get(STATE_TABLE_NAME_ENV_VAR) else "memory"
+    )
+
+    if backend == "dynamodb":
+        return DynamoDbStateStore(namespace, table_name=environ[STATE_TABLE_NAME_ENV_VAR])
+    if backend == "local":
+        return LocalFileStateStore(
+            namespace,
+            root_dir=Path(environ.get(STATE_STORE_LOCAL_DIR_ENV_VAR, DEFAULT_STATE_STORE_LOCAL_DIR))
+        )
+    if backend == "memory":
+        return MemoryStateStore(namespace)
+
+    raise ValueError(f"Unknown state store backend '{backend}', expected one of dynamodb, local or memory")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+"""
+Lightweight tracing, a span per handler invocation and a child span per outbound API call.
+
+Handlers are wrapped with trace_handler
+
+    @trace_handler
+    def handler(event, context):
+        ...
+
+which opens the root span of the invocation, named after the handler module.
+Requests to the OrcaBus APIs open a child span each (see rate_limit.send_with_policy),
+as can any other block of work
+
+    with start_span("get readsets", kind=CLIENT_SPAN_KIND, rgidCount=len(rgid_list)):
+        ...
+
+Spans are tagged with the executionArn, portalRunId and workflowRunId of the invocation, read from the
+top level keys of the event (the state machines pass the executionArn to every lambda),
+child spans inherit the tags of their parent, set_trace_tags adds tags found later on (i.e. a looked up portal run id).
+A span is exported as one json line when it ends
+
+    {
+        "traceId": "...",        # shared by the spans of an invocation
+        "spanId": "...",
+        "parentSpanId": "...",   # null for the handler span
+        "name": "GET workflow.umccr.org/api/v1/workflowrun",
+        "kind": "client",        # handler, client or internal
+        "startTime": "2025-01-01T00:00:00.000000+00:00",
+        "durationMs": 123.4,
+        "status": "OK",          # or ERROR, with the exception in "error"
+        "executionArn": "arn:aws:states:...",
+        "portalRunId": "20250101abcd1234",
+        "workflowRunId": "wfr.xxx",
+        "attributes": {"statusCode": 200, "attempts": 1}
+    }
+
+The exporter is set by the TRACE_EXPORTER env var
+* log (default)  - printed to stdout, so the lines land in the lambda's CloudWatch log group
+* file           - appended to TRACE_FILE_PATH (default .sash-traces.jsonl), for local runs
+* none           - spans are not exported
+
+The span context is held in a contextvar, work handed to a thread pool only keeps its parent span
+if it is run in a copy of the context (contextvars.copy_context().run), as orcabus_client does.
+"""
+
+# Standard imports
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import wraps
+from os import environ
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Globals
+TRACE_EXPORTER_ENV_VAR = "TRACE_EXPORTER"
+TRACE_FILE_PATH_ENV_VAR = "TRACE_FILE_PATH"
+LOG_TRACE_EXPORTER = "log"
+FILE_TRACE_EXPORTER = "file"
+NONE_TRACE_EXPORTER = "none"
+DEFAULT_TRACE_EXPORTER = LOG_TRACE_EXPORTER
+DEFAULT_TRACE_FILE_PATH = ".sash-traces.jsonl"
+
+HANDLER_SPAN_KIND = "handler"
+CLIENT_SPAN_KIND = "client"
+INTERNAL_SPAN_KIND = "internal"
+
+# Event keys copied to the span tags
+TRACE_TAG_KEYS = ["executionArn", "portalRunId", "workflowRunId"]
+
+_CURRENT_SPAN: ContextVar[Optional["Span"]] = ContextVar("sash_tools_current_span", default=None)
+_EXPORTER: Optional["SpanExporter"] = None
+_EXPORTER_LOCK = threading.Lock()
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    tags: Dict[str, str] = field(default_factory=dict)
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.time)
+    start_counter: float = field(default_factory=time.perf_counter)
+    status: str = "OK"
+    error: Optional[str] = None
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_record(self, duration_ms: float) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTime": datetime.fromtimestamp(self.start_time, tz=timezone.utc).isoformat(),
+            "durationMs": round(duration_ms, 3),
+            "status": self.status,
+            **({"error": self.error} if self.error is not None else {}),
+            **self.tags,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    def export(self, record: Dict[str, Any]):
+        raise NotImplementedError
+
+
+class LogSpanExporter(SpanExporter):
+    def export(self, record: Dict[str, Any]):
+        print(json.dumps(record, default=str))
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends a json line per span, shared by the threads of the process
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock, open(self.path, "a") as trace_file_h:
+            trace_file_h.write(line)
+
+
+class NoneSpanExporter(SpanExporter):
+    def export(self, record: Dict[str, Any]):
+        pass
+
+
+def get_exporter() -> SpanExporter:
+    global _EXPORTER
+    with _EXPORTER_LOCK:
+        if _EXPORTER is None:
+            exporter_name = environ.get(TRACE_EXPORTER_ENV_VAR, DEFAULT_TRACE_EXPORTER).lower()
+            if exporter_name == LOG_TRACE_EXPORTER:
+                _EXPORTER = LogSpanExporter()
+            elif exporter_name == FILE_TRACE_EXPORTER:
+                _EXPORTER = FileSpanExporter(Path(environ.get(TRACE_FILE_PATH_ENV_VAR, DEFAULT_TRACE_FILE_PATH)))
+            elif exporter_name == NONE_TRACE_EXPORTER:
+                _EXPORTER = NoneSpanExporter()
+            else:
+                raise ValueError(
+                    f"Unknown {TRACE_EXPORTER_ENV_VAR} '{exporter_name}', "
+                    f"expected one of {LOG_TRACE_EXPORTER}, {FILE_TRACE_EXPORTER} or {NONE_TRACE_EXPORTER}"
+                )
+    return _EXPORTER
+
+
+def set_exporter(exporter: Optional[SpanExporter]):
+    # None re-reads TRACE_EXPORTER on the next span
+    global _EXPORTER
+    with _EXPORTER_LOCK:
+        _EXPORTER = exporter
+
+
+def get_current_span() -> Optional[Span]:
+    return _CURRENT_SPAN.get()
+
+
+def get_trace_tags(event: Any) -> Dict[str, str]:
+    """
+    Get the trace tags from the top level keys of an event
+    """
+    if not isinstance(event, dict):
+        return {}
+    return {
+        tag_key: event[tag_key]
+        for tag_key in TRACE_TAG_KEYS
+        if isinstance(event.get(tag_key), str) and event[tag_key]
+    }
+
+
+def set_trace_tags(**tags: Optional[str]):
+    """
+    Tag the current span, and the spans started under it from now on
+    """
+    span = get_current_span()
+    if span is None:
+        return
+    span.tags.update({tag_key: tag_value for tag_key, tag_value in tags.items() if tag_value})
+
+
+@contextmanager
+def start_span(name: str, kind: str = INTERNAL_SPAN_KIND, tags: Optional[Dict[str, str]] = None, **attributes) -> Iterator[Span]:
+    """
+    Open a span under the current span, exported once the block exits
+    :param name: The span name
+    :param kind: handler, client or internal
+    :param tags: Trace tags, on top of those of the parent span
+    :param attributes: Span attributes
+    """
+    parent_span = get_current_span()
+    span = Span(
+        name=name,
+        kind=kind,
+        trace_id=parent_span.trace_id if parent_span is not None else uuid.uuid4().hex,
+        span_id=uuid.uuid4().hex[:16],
+        parent_span_id=parent_span.span_id if parent_span is not None else None,
+        tags={**(parent_span.tags if parent_span is not None else {}), **(tags or {})},
+        attributes=attributes,
+    )
+    token = _CURRENT_SPAN.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "ERROR"
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - span.start_counter) * 1000
+        _CURRENT_SPAN.reset(token)
+        get_exporter().export(span.to_record(duration_ms))
+
+
+def trace_handler(handler: Callable) -> Callable:
+    """
+    Open a handler span for each invocation of a lambda handler, tagged from the event
+    """
+    span_name = handler.__module__
+    is_cold_start = [True]
+
+    @wraps(handler)
+    def _traced_handler(event, context):
+        attributes = {"coldStart": is_cold_start[0]}
+        is_cold_start[0] = False
+        request_id = getattr(context, "aws_request_id", None)
+        if request_id is not None:
+            attributes["requestId"] = request_id
+        with start_span(span_name, kind=HANDLER_SPAN_KIND, tags=get_trace_tags(event), **attributes):
+            return handler(event, context)
+
+    return _traced_handler
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+"""
+Status transition guard for the ICAv2 WES analysis state change events.
+
+EventBridge delivers events at least once and in no particular order, so a sash run can see the same
+RUNNING event twice, or a late RUNNING event after its SUCCEEDED event. The icav2 wes event to wrsc event
+state machine guards each event in three steps
+
+    # convert_icav2_wes_event_to_wrsc_event, before any Workflow Manager call
+    drop_reason = WesStatusGuard().claim(portal_run_id, status, analysis_id, execution_arn)
+    if drop_reason is not None:
+        return ...  # the event is dropped
+
+    # accept_icav2_wes_status, once the WRSC event is pushed
+    WesStatusGuard().accept(portal_run_id, execution_arn)
+
+    # release_icav2_wes_status, if the execution fails before the WRSC event is pushed
+    WesStatusGuard().release(portal_run_id, execution_arn)
+
+The last accepted status of each portal run id is kept in the state store,
+for ICAV2_WES_STATUS_TTL_SECONDS (default 30 days). An event is dropped if
+* duplicate   - its status is the last accepted status
+* regressive  - its status comes before the last accepted status (see STATUS_RANKS),
+                or the run already reached another terminal status
+
+An event of another ICAv2 analysis than the last accepted one (i.e. a resubmitted run) is always accepted,
+as are statuses missing from STATUS_RANKS.
+
+A status is only accepted once its WRSC event is pushed. Until then the execution holds a claim on the run,
+written with a conditional write (see StateStore.put_if_version), so of two executions racing on the same run
+only one claims it. The other raises Icav2WesStatusClaimPendingError, and is retried by the state machine
+until the claim is accepted (its event is then checked against the accepted status) or released.
+Claims expire after ICAV2_WES_STATUS_CLAIM_TTL_SECONDS (default 15 minutes), so an execution that is
+stopped before it releases its claim does not hold up the run. A Step Functions retry of the execution that
+holds the claim is not taken for a duplicate.
+
+Dropped events are counted for this container (get_drop_counts), and logged as a CloudWatch embedded metric
+(Dropped, with a Reason dimension).
+"""
+
+# Standard imports
+import logging
+import threading
+import time
+from os import environ
+from typing import Any, Dict, Optional
+
+# Local imports
+from .metrics import put_embedded_metric
+from .state_store import StateStore, get_seconds_from_env, get_state_store
+
+# Globals
+WES_STATUS_GUARD_NAMESPACE = "icav2-wes-last-status"
+ICAV2_WES_STATUS_TTL_SECONDS_ENV_VAR = "ICAV2_WES_STATUS_TTL_SECONDS"
+DEFAULT_ICAV2_WES_STATUS_TTL_SECONDS = 30 * 24 * 60 * 60
+ICAV2_WES_STATUS_CLAIM_TTL_SECONDS_ENV_VAR = "ICAV2_WES_STATUS_CLAIM_TTL_SECONDS"
+DEFAULT_ICAV2_WES_STATUS_CLAIM_TTL_SECONDS = 15 * 60
+# Conditional write conflicts are retried in the lambda, before falling back to the state machine retry
+MAX_CONDITIONAL_WRITE_ATTEMPTS = 5
+METRICS_NAMESPACE_ENV_VAR = "ICAV2_WES_EVENTS_METRICS_NAMESPACE"
+DEFAULT_METRICS_NAMESPACE = "SashPipelineManager/Icav2WesEvents"
+
+DUPLICATE_DROP_REASON = "duplicate"
+REGRESSIVE_DROP_REASON = "regressive"
+
+# The order of the analysis statuses, the terminal statuses share the last rank
+TERMINAL_STATUSES = ["SUCCEEDED", "FAILED", "ABORTED"]
+STATUS_RANKS = {
+    "SUBMITTED": 0,
+    "QUEUED": 1,
+    "INITIALIZING": 2,
+    "PREPARING_INPUTS": 3,
+    "RUNNING": 4,
+    "GENERATING_OUTPUTS": 5,
+    "ABORTING": 6,
+    **{terminal_status: 7 for terminal_status in TERMINAL_STATUSES},
+}
+
+logger = logging.getLogger(__name__)
+
+_DROP_COUNTS: Dict[str, int] = {}
+_DROP_COUNTS_LOCK = threading.Lock()
+
+
+class Icav2WesStatusClaimPendingError(Exception):
+    """
+    Another execution holds the claim on the run, matched by the state machine Retry
+    """
+    pass
+
+
+def get_drop_counts() -> Dict[str, int]:
+    with _DROP_COUNTS_LOCK:
+        return dict(_DROP_COUNTS)
+
+
+def get_drop_reason(last_accepted: Optional[Dict[str, Any]], status: str, analysis_id: Optional[str]) -> Optional[str]:
+    """
+    Get the reason to drop an event, None if the event is accepted
+    :param last_accepted: The last accepted status entry of the portal run id
+    :param status: The status of the event
+    :param analysis_id: The ICAv2 analysis id of the event
+    """
+    if last_accepted is None:
+        return None
+    if analysis_id and last_accepted.get("analysisId") and analysis_id != last_accepted["analysisId"]:
+        return None
+    if status == last_accepted["status"]:
+        return DUPLICATE_DROP_REASON
+    if status not in STATUS_RANKS or last_accepted["status"] not in STATUS_RANKS:
+        return None
+    if STATUS_RANKS[status] <= STATUS_RANKS[last_accepted["status"]]:
+        return REGRESSIVE_DROP_REASON
+    return None
+
+
+def put_drop_metric(drop_reason: str):
+    with _DROP_COUNTS_LOCK:
+        _DROP_COUNTS[drop_reason] = _DROP_COUNTS.get(drop_reason, 0) + 1
+
+    put_embedded_metric(
+        environ.get(METRICS_NAMESPACE_ENV_VAR, DEFAULT_METRICS_NAMESPACE),
+        {"Reason": drop_reason},
+        {"Dropped": (1, "Count")}
+    )
+
+
+class WesStatusGuard:
+    def __init__(
+            self,
+            store: Optional[StateStore] = None,
+            ttl_seconds: Optional[float] = None,
+            claim_ttl_seconds: Optional[float] = None,
+    ):
+        self.store = store if store is not None else get_state_store(WES_STATUS_GUARD_NAMESPACE)
+        self.ttl_seconds = get_seconds_from_env(
+            ttl_seconds, ICAV2_WES_STATUS_TTL_SECONDS_ENV_VAR, DEFAULT_ICAV2_WES_STATUS_TTL_SECONDS
+        )
+        self.claim_ttl_seconds = get_seconds_from_env(
+            claim_ttl_seconds, ICAV2_WES_STATUS_CLAIM_TTL_SECONDS_ENV_VAR, DEFAULT_ICAV2_WES_STATUS_CLAIM_TTL_SECONDS
+        )
+
+    @staticmethod
+    def _get_live_claim(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        claim = entry.get("claim")
+        if claim is None or claim["expiresAt"] <= time.time():
+            return None
+        return claim
+
+    def claim(
+            self,
+            portal_run_id: str,
+            status: str,
+            analysis_id: Optional[str] = None,
+            execution_arn: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Check an event against the last accepted status of its run, and claim the run for the event if it is not dropped
+        :return: The reason the event is dropped, None if the run is claimed
+        :raises Icav2WesStatusClaimPendingError: If another execution holds the claim on the run
+        """
+        for _ in range(MAX_CONDITIONAL_WRITE_ATTEMPTS):
+            entry, version = self.store.get_with_version(portal_run_id)
+            entry = entry or {}
+            live_claim = self._get_live_claim(entry)
+
+            if live_claim is not None and live_claim["executionArn"] == execution_arn and live_claim["status"] == status:
+                # A retry of the execution that holds the claim
+                return None
+
+            last_accepted = entry if entry.get("status") is not None else None
+            drop_reason = get_drop_reason(last_accepted, status, analysis_id)
+            if drop_reason is not None:
+                logger.info(
+                    f"Dropping the {drop_reason} {status} event of {portal_run_id}, "
+                    f"the last accepted status is {last_accepted['status']}"
+                )
+                put_drop_metric(drop_reason)
+                return drop_reason
+
+            if live_claim is not None:
+                raise Icav2WesStatusClaimPendingError(
+                    f"The {live_claim['status']} event of {portal_run_id} is still being processed by "
+                    f"{live_claim['executionArn']}"
+                )
+
+            if self.store.put_if_version(
+                portal_run_id,
+                {
+                    **entry,
+                    "claim": {
+                        "status": status,
+                        "analysisId": analysis_id,
+                        "executionArn": execution_arn,
+                        "expiresAt": time.time() + self.claim_ttl_seconds,
+                    },
+                },
+                version,
+                ttl_seconds=self.ttl_seconds,
+            ):
+                return None
+
+        raise Icav2WesStatusClaimPendingError(f"The status of {portal_run_id} is being updated by other executions")
+
+    def _update_claim(self, portal_run_id: str, execution_arn: str, is_accepted: bool) -> bool:
+        for _ in range(MAX_CONDITIONAL_WRITE_ATTEMPTS):
+            entry, version = self.store.get_with_version(portal_run_id)
+            entry = entry or {}
+            claim = entry.get("claim")
+            if claim is None or claim["executionArn"] != execution_arn:
+                # Already accepted (i.e. a retry of the accept) or released, or the claim expired and was taken over
+                return is_accepted and entry.get("executionArn") == execution_arn
+
+            if is_accepted:
+                value = {
+                    "status": claim["status"],
+                    "analysisId": claim["analysisId"] if claim["analysisId"] else entry.get("analysisId"),
+                    "executionArn": execution_arn,
+                    "acceptedAt": time.time(),
+                    "claim": None,
+                }
+            else:
+                value = {**entry, "claim": None}
+
+            if self.store.put_if_version(portal_run_id, value, version, ttl_seconds=self.ttl_seconds):
+                return True
+
+        raise Icav2WesStatusClaimPendingError(f"The status of {portal_run_id} is being updated by other executions")
+
+    def accept(self, portal_run_id: str, execution_arn: str) -> bool:
+        """
+        Record the status claimed by the execution as the last accepted status of the run
+        :return: False if the execution no longer holds the claim
+        """
+        is_accepted = self._update_claim(portal_run_id, execution_arn, is_accepted=True)
+        if not is_accepted:
+            logger.warning(f"{execution_arn} no longer holds the claim on {portal_run_id}, its status is not recorded")
+        return is_accepted
+
+    def release(self, portal_run_id: str, execution_arn: str) -> bool:
+        """
+        Release the claim of a failed execution, the last accepted status of the run is unchanged
+        :return: False if the execution no longer holds the claim
+        """
+        return self._update_claim(portal_run_id, execution_arn, is_accepted=False)
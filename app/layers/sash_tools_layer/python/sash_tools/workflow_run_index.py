@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+
+"""
+Read model of the workflow runs this service looks up, indexed by workflow name and library id.
+
+find_latest_workflow looks up the upstream SUCCEEDED runs and the sash DRAFT runs of a set of libraries.
+Rather than querying the Workflow Manager each time, the index keeps the runs, with their latest status,
+up to date from the WorkflowRunStateChange events of the sash, DRAGEN and oncoanalyser workflows
+(see the index_workflow_run_state_change lambda).
+
+Runs that changed state before the index saw an event for them are not in the index, so a lookup is only answered
+from the index once it has been backfilled from the Workflow Manager
+
+    workflow_run_index = get_workflow_run_index()
+    workflow_run_list = workflow_run_index.find_runs(lookup)
+    if workflow_run_list is None:
+        # Cold index
+        workflow_run_list = get_workflow_runs_from_metadata(...)
+        workflow_run_index.backfill(lookup, workflow_run_list)
+
+A backfilled lookup (the same criteria as the negative cache, see negative_cache.get_lookup) is answered from
+the index for WORKFLOW_RUN_INDEX_TTL_SECONDS (default 1 day), after which it is backfilled again,
+so a missed event is only missed for a day. Lookups without library ids always go to the Workflow Manager.
+
+Runs are only replaced by a run with the same or a later state timestamp, so a late event or a stale
+backfill does not roll back a status. The glue state machine also indexes the upstream SUCCEEDED run it was
+started by (see the clear_workflow_lookup_misses lambda), as EventBridge does not deliver the event to the
+index lambda before the lookups of the drafts it updates.
+
+Runs indexed from events often have no readsets, a lookup with an rgid filter that would be answered by such
+a run goes to the Workflow Manager instead. The backfilled runs, with their readsets, then replace them.
+
+In the state table, run items expire RUN_TTL_MULTIPLIER times the ttl after they were last written,
+so the runs of a backfilled lookup outlive the backfill.
+
+Backends:
+* dynamodb - the state table (set by the STATE_TABLE_NAME env var), a partition per workflow name and library id,
+             so a lookup is a single query
+* sqlite   - a sqlite database at WORKFLOW_RUN_INDEX_SQLITE_PATH (default in memory, only lives as long as
+             the container), used for local runs and tests
+
+The backend is chosen by the WORKFLOW_RUN_INDEX_BACKEND env var, and otherwise defaults to
+dynamodb if STATE_TABLE_NAME is set, or sqlite if it is not.
+"""
+
+# Standard imports
+import json
+import threading
+import typing
+from abc import ABC, abstractmethod
+from datetime import datetime
+from hashlib import sha256
+from os import environ
+from time import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Local imports
+from .fingerprint import to_canonical_json
+from .state_store import (
+    EXPIRES_AT_ATTRIBUTE,
+    PARTITION_KEY_ATTRIBUTE,
+    SORT_KEY_ATTRIBUTE,
+    STATE_TABLE_NAME_ENV_VAR,
+    VALUE_ATTRIBUTE,
+    get_seconds_from_env,
+)
+
+# Type checking imports
+if typing.TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient
+
+# Globals
+WORKFLOW_RUN_INDEX_BACKEND_ENV_VAR = "WORKFLOW_RUN_INDEX_BACKEND"
+WORKFLOW_RUN_INDEX_SQLITE_PATH_ENV_VAR = "WORKFLOW_RUN_INDEX_SQLITE_PATH"
+WORKFLOW_RUN_INDEX_TTL_SECONDS_ENV_VAR = "WORKFLOW_RUN_INDEX_TTL_SECONDS"
+DEFAULT_WORKFLOW_RUN_INDEX_SQLITE_PATH = ":memory:"
+DEFAULT_WORKFLOW_RUN_INDEX_TTL_SECONDS = 24 * 60 * 60
+WORKFLOW_RUN_INDEX_NAMESPACE = "workflow-run-index"
+STATE_TIMESTAMP_ATTRIBUTE = "stateTimestamp"
+# Backfilled lookup keys sort before the run orcabus ids in a library partition
+BACKFILLED_KEY_PREFIX = "#backfilled/"
+RUN_TTL_MULTIPLIER = 2
+
+# Index backends, kept at module level so they survive warm invocations
+_WORKFLOW_RUN_INDEXES: Dict[Tuple[str, str], "WorkflowRunIndex"] = {}
+_WORKFLOW_RUN_INDEXES_LOCK = threading.Lock()
+
+
+def get_state_timestamp(workflow_run: Dict[str, Any]) -> float:
+    """
+    Get the timestamp of the current state of the run, 0 if the run has none
+    """
+    timestamp = (workflow_run.get("currentState") or {}).get("timestamp")
+    if not timestamp:
+        return 0.0
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+
+
+def get_workflow_run_from_event_detail(event_detail: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the indexed run from a WorkflowRunStateChange event detail, in the shape of a workflow run detail
+    """
+    return {
+        "orcabusId": event_detail["orcabusId"],
+        "portalRunId": event_detail["portalRunId"],
+        "workflowRunName": event_detail.get("workflowRunName"),
+        "workflow": event_detail["workflow"],
+        "analysisRun": event_detail.get("analysisRun"),
+        "currentState": {
+            "status": event_detail["status"],
+            "timestamp": event_detail.get("timestamp"),
+        },
+        "libraries": event_detail.get("libraries") or [],
+    }
+
+
+def get_library_ids(workflow_run: Dict[str, Any]) -> List[str]:
+    return sorted(set(map(lambda library_iter_: library_iter_["libraryId"], workflow_run.get("libraries") or [])))
+
+
+def get_run_rgids(workflow_run: Dict[str, Any]) -> Set[str]:
+    return set(
+        readset_iter_["rgid"]
+        for library_iter_ in workflow_run.get("libraries") or []
+        for readset_iter_ in library_iter_.get("readsets") or []
+    )
+
+
+def is_lookup_match(workflow_run: Dict[str, Any], lookup: Dict[str, Any]) -> bool:
+    """
+    Check if the run matches the lookup, as the Workflow Manager metadata query would
+    """
+    return (
+        workflow_run["workflow"]["name"] == lookup["workflowName"] and
+        (lookup["workflowVersion"] is None or workflow_run["workflow"]["version"] == lookup["workflowVersion"]) and
+        (
+            lookup["analysisRunId"] is None or
+            (workflow_run.get("analysisRun") or {}).get("orcabusId") == lookup["analysisRunId"]
+        ) and
+        set(lookup["libraryIdList"]).issubset(get_library_ids(workflow_run)) and
+        (not lookup["rgidList"] or set(lookup["rgidList"]).issubset(get_run_rgids(workflow_run)))
+    )
+
+
+def get_lookup_key(lookup: Dict[str, Any]) -> str:
+    return sha256(to_canonical_json(lookup).encode()).hexdigest()
+
+
+class WorkflowRunIndex(ABC):
+    """
+    Workflow runs by workflow name and library id, and the lookups backfilled from the Workflow Manager
+    """
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = get_seconds_from_env(
+            ttl_seconds, WORKFLOW_RUN_INDEX_TTL_SECONDS_ENV_VAR, DEFAULT_WORKFLOW_RUN_INDEX_TTL_SECONDS
+        )
+
+    @abstractmethod
+    def get_library_runs(self, workflow_name: str, library_id: str) -> Tuple[List[Dict[str, Any]], Set[str]]:
+        """
+        Get the runs of a library, and the lookup keys backfilled for the library that have not expired
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_library_run(self, workflow_name: str, library_id: str, workflow_run: Dict[str, Any]) -> bool:
+        """
+        Set the run for a library, unless the indexed run has a later state timestamp
+        :return: True if the run was set
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_backfilled_lookup(self, workflow_name: str, library_id: str, lookup_key: str):
+        """
+        Record a lookup as backfilled for a library, until the ttl expires
+        """
+        raise NotImplementedError
+
+    def put_run(self, workflow_run: Dict[str, Any]) -> bool:
+        """
+        Index a run under each of its libraries
+        :return: True if the run was set for any library
+        """
+        return any(list(map(
+            lambda library_id_iter_: self.put_library_run(
+                workflow_run["workflow"]["name"], library_id_iter_, workflow_run
+            ),
+            get_library_ids(workflow_run)
+        )))
+
+    def find_runs(self, lookup: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the runs matching the lookup, None if the lookup has not been backfilled
+        """
+        if self.ttl_seconds <= 0 or not lookup["libraryIdList"]:
+            return None
+        # Every matching run has the first library, a single partition holds them all
+        workflow_run_list, backfilled_lookup_keys = self.get_library_runs(
+            lookup["workflowName"], lookup["libraryIdList"][0]
+        )
+        if get_lookup_key(lookup) not in backfilled_lookup_keys:
+            return None
+        # A run without readsets can't be matched against the rgids
+        if lookup["rgidList"] and any(map(
+            lambda workflow_run_iter_: (
+                not get_run_rgids(workflow_run_iter_) and
+                is_lookup_match(workflow_run_iter_, {**lookup, "rgidList": None})
+            ),
+            workflow_run_list
+        )):
+            return None
+        return list(filter(lambda workflow_run_iter_: is_lookup_match(workflow_run_iter_, lookup), workflow_run_list))
+
+    def backfill(self, lookup: Dict[str, Any], workflow_run_list: List[Dict[str, Any]]):
+        """
+        Index the runs the Workflow Manager returned for the lookup, and answer the lookup from the index from now on
+        """
+        if self.ttl_seconds <= 0 or not lookup["libraryIdList"]:
+            return
+        for workflow_run in workflow_run_list:
+            self.put_run(workflow_run)
+        self.put_backfilled_lookup(lookup["workflowName"], lookup["libraryIdList"][0], get_lookup_key(lookup))
+
+
+class SqliteWorkflowRunIndex(WorkflowRunIndex):
+    def __init__(self, database_path: str, ttl_seconds: Optional[float] = None):
+        # Only imported for the local backend
+        import sqlite3
+        super().__init__(ttl_seconds)
+        # Shared by the resolver threads of a lambda, access is serialised by the lock
+        self._connection = sqlite3.connect(database_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS workflow_runs (
+                    workflow_name TEXT NOT NULL,
+                    library_id TEXT NOT NULL,
+                    orcabus_id TEXT NOT NULL,
+                    state_timestamp REAL NOT NULL,
+                    workflow_run TEXT NOT NULL,
+                    PRIMARY KEY (workflow_name, library_id, orcabus_id)
+                );
+                CREATE TABLE IF NOT EXISTS backfilled_lookups (
+                    workflow_name TEXT NOT NULL,
+                    library_id TEXT NOT NULL,
+                    lookup_key TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (workflow_name, library_id, lookup_key)
+                );
+                """
+            )
+
+    def get_library_runs(self, workflow_name: str, library_id: str) -> Tuple[List[Dict[str, Any]], Set[str]]:
+        with self._lock:
+            workflow_run_rows = self._connection.execute(
+                "SELECT workflow_run FROM workflow_runs WHERE workflow_name = ? AND library_id = ?",
+                (workflow_name, library_id)
+            ).fetchall()
+            lookup_key_rows = self._connection.execute(
+                "SELECT lookup_key FROM backfilled_lookups "
+                "WHERE workflow_name = ? AND library_id = ? AND expires_at > ?",
+                (workflow_name, library_id, time())
+            ).fetchall()
+        return (
+            list(map(lambda row_iter_: json.loads(row_iter_[0]), workflow_run_rows)),
+            set(map(lambda row_iter_: row_iter_[0], lookup_key_rows)),
+        )
+
+    def put_library_run(self, workflow_name: str, library_id: str, workflow_run: Dict[str, Any]) -> bool:
+        with self._lock:
+            cursor = self._connection.execute(
+                """
+                INSERT INTO workflow_runs (workflow_name, library_id, orcabus_id, state_timestamp, workflow_run)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (workflow_name, library_id, orcabus_id) DO UPDATE SET
+                    state_timestamp = excluded.state_timestamp,
+                    workflow_run = excluded.workflow_run
+                WHERE excluded.state_timestamp >= workflow_runs.state_timestamp
+                """,
+                (
+                    workflow_name, library_id, workflow_run["orcabusId"],
+                    get_state_timestamp(workflow_run), json.dumps(workflow_run)
+                )
+            )
+        return cursor.rowcount > 0
+
+    def put_backfilled_lookup(self, workflow_name: str, library_id: str, lookup_key: str):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO backfilled_lookups (workflow_name, library_id, lookup_key, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (workflow_name, library_id, lookup_key, time() + self.ttl_seconds)
+            )
+
+
+class DynamoDbWorkflowRunIndex(WorkflowRunIndex):
+    def __init__(self, table_name: str, ttl_seconds: Optional[float] = None):
+        super().__init__(ttl_seconds)
+        self.table_name = table_name
+        self._client: Optional["DynamoDBClient"] = None
+
+    @property
+    def client(self) -> "DynamoDBClient":
+        # Import boto3 on first use, lambdas that never touch the index don't pay for it
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    @staticmethod
+    def get_partition(workflow_name: str, library_id: str) -> str:
+        return f"{WORKFLOW_RUN_INDEX_NAMESPACE}/{workflow_name}/{library_id}"
+
+    def get_library_runs(self, workflow_name: str, library_id: str) -> Tuple[List[Dict[str, Any]], Set[str]]:
+        items = []
+        query_kwargs = {
+            "TableName": self.table_name,
+            "KeyConditionExpression": "#namespace = :namespace",
+            "ExpressionAttributeNames": {"#namespace": PARTITION_KEY_ATTRIBUTE},
+            "ExpressionAttributeValues": {":namespace": {"S": self.get_partition(workflow_name, library_id)}},
+            "ConsistentRead": True,
+        }
+        while True:
+            response = self.client.query(**query_kwargs)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        workflow_run_list = []
+        backfilled_lookup_keys = set()
+        for item in items:
+            key = item[SORT_KEY_ATTRIBUTE]["S"]
+            if key.startswith(BACKFILLED_KEY_PREFIX):
+                # DynamoDB ttl deletion is lazy, so expired items may still be returned
+                if float(item[EXPIRES_AT_ATTRIBUTE]["N"]) > time():
+                    backfilled_lookup_keys.add(key[len(BACKFILLED_KEY_PREFIX):])
+            else:
+                workflow_run_list.append(json.loads(item[VALUE_ATTRIBUTE]["S"]))
+        return workflow_run_list, backfilled_lookup_keys
+
+    def put_library_run(self, workflow_name: str, library_id: str, workflow_run: Dict[str, Any]) -> bool:
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    PARTITION_KEY_ATTRIBUTE: {"S": self.get_partition(workflow_name, library_id)},
+                    SORT_KEY_ATTRIBUTE: {"S": workflow_run["orcabusId"]},
+                    VALUE_ATTRIBUTE: {"S": json.dumps(workflow_run)},
+                    STATE_TIMESTAMP_ATTRIBUTE: {"N": str(get_state_timestamp(workflow_run))},
+                    EXPIRES_AT_ATTRIBUTE: {"N": str(int(time() + self.ttl_seconds * RUN_TTL_MULTIPLIER))},
+                },
+                ConditionExpression="attribute_not_exists(#key) OR #stateTimestamp <= :stateTimestamp",
+                ExpressionAttributeNames={
+                    "#key": SORT_KEY_ATTRIBUTE,
+                    "#stateTimestamp": STATE_TIMESTAMP_ATTRIBUTE,
+                },
+                ExpressionAttributeValues={
+                    ":stateTimestamp": {"N": str(get_state_timestamp(workflow_run))},
+                },
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def put_backfilled_lookup(self, workflow_name: str, library_id: str, lookup_key: str):
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                PARTITION_KEY_ATTRIBUTE: {"S": self.get_partition(workflow_name, library_id)},
+                SORT_KEY_ATTRIBUTE: {"S": f"{BACKFILLED_KEY_PREFIX}{lookup_key}"},
+                VALUE_ATTRIBUTE: {"S": "{}"},
+                EXPIRES_AT_ATTRIBUTE: {"N": str(int(time() + self.ttl_seconds))},
+            },
+        )
+
+
+def get_workflow_run_index() -> WorkflowRunIndex:
+    """
+    Get the workflow run index, using the backend configured in the environment
+    :return:
+    """
+    backend = environ.get(
+        WORKFLOW_RUN_INDEX_BACKEND_ENV_VAR,
+        "dynamodb" if environ.get(STATE_TABLE_NAME_ENV_VAR) else "sqlite"
+    )
+
+    if backend == "dynamodb":
+        location = environ[STATE_TABLE_NAME_ENV_VAR]
+    elif backend == "sqlite":
+        location = environ.get(WORKFLOW_RUN_INDEX_SQLITE_PATH_ENV_VAR, DEFAULT_WORKFLOW_RUN_INDEX_SQLITE_PATH)
+    else:
+        raise ValueError(f"Unknown workflow run index backend '{backend}', expected one of dynamodb or sqlite")
+
+    with _WORKFLOW_RUN_INDEXES_LOCK:
+        if (backend, location) not in _WORKFLOW_RUN_INDEXES:
+            _WORKFLOW_RUN_INDEXES[(backend, location)] = (
+                DynamoDbWorkflowRunIndex(table_name=location)
+                if backend == "dynamodb"
+                else SqliteWorkflowRunIndex(database_path=location)
+            )
+        return _WORKFLOW_RUN_INDEXES[(backend, location)]
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+"""
+Shared fixtures of the sash_tools layer tests
+
+The layer is imported from its source dir, as the lambdas import it from /opt/python,
+and every test starts from an empty memory state store.
+"""
+
+# Standard imports
+import sys
+from pathlib import Path
+
+# Test imports
+import pytest
+
+# Globals
+LAYER_PYTHON_DIR = Path(__file__).parent.parent
+
+if str(LAYER_PYTHON_DIR) not in sys.path:
+    sys.path.insert(0, str(LAYER_PYTHON_DIR))
+
+
+@pytest.fixture(autouse=True)
+def memory_state_store(monkeypatch):
+    from sash_tools import state_store
+
+    monkeypatch.setenv(state_store.STATE_STORE_BACKEND_ENV_VAR, "memory")
+    monkeypatch.delenv(state_store.STATE_TABLE_NAME_ENV_VAR, raising=False)
+    state_store._MEMORY_STORE.clear()
+    yield state_store._MEMORY_STORE
+    state_store._MEMORY_STORE.clear()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the init phase bootstrap, the getter caches and the ICAv2 env vars
+"""
+
+# Standard imports
+import json
+import sys
+import time
+from base64 import urlsafe_b64encode
+from types import ModuleType
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import bootstrap
+
+
+def get_jwt(expiry: float) -> str:
+    payload = urlsafe_b64encode(json.dumps({"exp": expiry}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+@pytest.fixture
+def orcabus_api_tools_modules(monkeypatch):
+    """
+    orcabus_api_tools helpers, with getters counting their lookups, and a module importing them by name
+    """
+    lookups = {"get_hostname": 0, "get_orcabus_token": 0}
+    tokens = [get_jwt(time.time() + 3600)]
+
+    def get_hostname() -> str:
+        lookups["get_hostname"] += 1
+        return "orcabus.example.com"
+
+    def get_orcabus_token() -> str:
+        lookups["get_orcabus_token"] += 1
+        return tokens[0]
+
+    helpers_module = ModuleType(bootstrap.ORCABUS_API_TOOLS_HELPERS_MODULE)
+    helpers_module.get_hostname = get_hostname
+    helpers_module.get_orcabus_token = get_orcabus_token
+    requests_module = ModuleType(bootstrap.ORCABUS_API_TOOLS_REQUESTS_MODULE)
+    requests_module.get_hostname = get_hostname
+    requests_module.get_orcabus_token = get_orcabus_token
+
+    for module in [helpers_module, requests_module]:
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+    monkeypatch.setattr(bootstrap, "_BOOTSTRAPPED", False)
+    monkeypatch.setattr(bootstrap, "enable_keep_alive", lambda: None)
+    return lookups, tokens, requests_module
+
+
+def test_jwt_expiry():
+    assert bootstrap.get_jwt_expiry(get_jwt(1_700_000_000)) == 1_700_000_000
+    assert bootstrap.get_jwt_expiry("not-a-jwt") is None
+    assert bootstrap.get_jwt_expiry("header.bm90LWpzb24.signature") is None
+
+
+def test_is_expiring():
+    assert bootstrap.is_expiring(None)
+    assert bootstrap.is_expiring("")
+    assert bootstrap.is_expiring(get_jwt(time.time() + bootstrap.TOKEN_REFRESH_MARGIN_SECONDS - 1))
+    assert not bootstrap.is_expiring(get_jwt(time.time() + bootstrap.TOKEN_REFRESH_MARGIN_SECONDS + 60))
+    # Tokens that are not JWTs are never refreshed
+    assert not bootstrap.is_expiring("opaque-token")
+
+
+def test_bootstrap_caches_the_getters(orcabus_api_tools_modules):
+    lookups, tokens, requests_module = orcabus_api_tools_modules
+    bootstrap.bootstrap()
+
+    # Resolved in the init phase
+    assert lookups == {"get_hostname": 1, "get_orcabus_token": 1}
+    # The references of the modules that imported the getters are replaced too
+    assert requests_module.get_hostname() == "orcabus.example.com"
+    assert requests_module.get_orcabus_token() == tokens[0]
+    assert lookups == {"get_hostname": 1, "get_orcabus_token": 1}
+
+    # No-op once bootstrapped
+    bootstrap.bootstrap()
+    assert lookups == {"get_hostname": 1, "get_orcabus_token": 1}
+
+
+def test_expiring_token_is_read_again(orcabus_api_tools_modules, monkeypatch):
+    lookups, tokens, requests_module = orcabus_api_tools_modules
+    bootstrap.bootstrap()
+    cached_token = tokens[0]
+    tokens[0] = get_jwt(time.time() + 7200)
+
+    # The cached token is kept while it is not close to expiry
+    assert requests_module.get_orcabus_token() == cached_token
+    assert lookups["get_orcabus_token"] == 1
+
+    # And read again within the refresh margin of its expiry
+    later = time.time() + 3600 - bootstrap.TOKEN_REFRESH_MARGIN_SECONDS + 1
+    monkeypatch.setattr(bootstrap.time, "time", lambda: later)
+    assert requests_module.get_orcabus_token() == tokens[0]
+    assert lookups["get_orcabus_token"] == 2
+    # The hostname is never read again
+    assert requests_module.get_hostname() == "orcabus.example.com"
+    assert lookups["get_hostname"] == 1
+
+
+def test_getter_failure_does_not_fail_the_bootstrap(orcabus_api_tools_modules):
+    lookups, tokens, requests_module = orcabus_api_tools_modules
+    failures = [1]
+
+    def get_orcabus_token() -> str:
+        if failures:
+            failures.pop()
+            raise ConnectionError("Secrets Manager is unavailable")
+        return tokens[0]
+
+    sys.modules[bootstrap.ORCABUS_API_TOOLS_HELPERS_MODULE].get_orcabus_token = get_orcabus_token
+    requests_module.get_orcabus_token = get_orcabus_token
+
+    bootstrap.bootstrap()
+    # Retried on first use
+    assert requests_module.get_orcabus_token() == tokens[0]
+
+
+def test_bootstrap_without_orcabus_api_tools(monkeypatch):
+    monkeypatch.setattr(bootstrap, "_BOOTSTRAPPED", False)
+    monkeypatch.setitem(sys.modules, bootstrap.ORCABUS_API_TOOLS_HELPERS_MODULE, None)
+    bootstrap.bootstrap()
+    assert bootstrap._BOOTSTRAPPED
+
+
+def test_bootstrap_does_not_set_the_icav2_env_vars(orcabus_api_tools_modules, monkeypatch):
+    monkeypatch.setitem(sys.modules, "icav2_tools", None)
+    monkeypatch.delenv(bootstrap.ICAV2_ACCESS_TOKEN_ENV_VAR, raising=False)
+    # icav2_tools is not imported
+    bootstrap.bootstrap()
+
+
+def test_ensure_icav2_env_vars(monkeypatch):
+    calls = []
+    icav2_tools = ModuleType("icav2_tools")
+    icav2_tools.set_icav2_env_vars = lambda: calls.append(
+        monkeypatch.setenv(bootstrap.ICAV2_ACCESS_TOKEN_ENV_VAR, get_jwt(time.time() + 3600))
+    )
+    monkeypatch.setitem(sys.modules, "icav2_tools", icav2_tools)
+    monkeypatch.delenv(bootstrap.ICAV2_ACCESS_TOKEN_ENV_VAR, raising=False)
+
+    bootstrap.ensure_icav2_env_vars()
+    bootstrap.ensure_icav2_env_vars()
+    assert len(calls) == 1
+
+    # Set again once the access token is close to expiry
+    monkeypatch.setenv(bootstrap.ICAV2_ACCESS_TOKEN_ENV_VAR, get_jwt(time.time() + 60))
+    bootstrap.ensure_icav2_env_vars()
+    assert len(calls) == 2
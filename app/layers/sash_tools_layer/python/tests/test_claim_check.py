@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the claim check round trip
+"""
+
+# Standard imports
+import io
+from typing import Any, Dict, Tuple
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import claim_check
+from sash_tools.claim_check import (
+    S3ObjectStore,
+    check_in,
+    check_out,
+    is_claim_check,
+    resolve_claim_checks,
+)
+
+LARGE_VALUE = {"data": {"libraries": [{"libraryId": f"L24{library_index:05d}"} for library_index in range(100)]}}
+
+
+class FakeS3Client:
+    """
+    The put_object and get_object calls of an S3 client, over a dictionary
+    """
+    def __init__(self):
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs):
+        self.objects[(Bucket, Key)] = Body
+
+    def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+@pytest.fixture(autouse=True)
+def object_stores(monkeypatch):
+    monkeypatch.delenv(claim_check.CLAIM_CHECK_BUCKET_NAME_ENV_VAR, raising=False)
+    monkeypatch.delenv(claim_check.CLAIM_CHECK_THRESHOLD_BYTES_ENV_VAR, raising=False)
+    monkeypatch.setattr(claim_check, "_OBJECT_STORES", {})
+    monkeypatch.setattr(claim_check, "_MEMORY_OBJECTS", {})
+
+
+@pytest.fixture(params=["memory", "local", "s3"])
+def backend(request, monkeypatch, tmp_path):
+    if request.param == "local":
+        monkeypatch.setenv(claim_check.CLAIM_CHECK_LOCAL_DIR_ENV_VAR, str(tmp_path))
+    if request.param == "s3":
+        monkeypatch.setenv(claim_check.CLAIM_CHECK_BUCKET_NAME_ENV_VAR, "claim-check-bucket")
+        s3_object_store = S3ObjectStore("claim-check-bucket")
+        s3_object_store._client = FakeS3Client()
+        claim_check._OBJECT_STORES[S3ObjectStore.scheme] = s3_object_store
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_BACKEND_ENV_VAR, request.param)
+    return request.param
+
+
+def test_round_trip(backend):
+    reference = check_in(LARGE_VALUE, threshold_bytes=1024)
+    assert is_claim_check(reference)
+    assert reference["claimCheckUri"].startswith({"memory": "memory://", "local": "file://", "s3": "s3://"}[backend])
+    assert reference["sizeBytes"] == len(claim_check.to_canonical_json(LARGE_VALUE).encode())
+    assert check_out(reference) == LARGE_VALUE
+
+
+def test_same_value_is_stored_once(backend):
+    assert check_in(LARGE_VALUE, threshold_bytes=1) == check_in(dict(reversed(list(LARGE_VALUE.items()))), threshold_bytes=1)
+
+
+def test_small_value_is_not_checked_in():
+    small_value = {"tags": {"libraryId": "L2400001"}}
+    assert check_in(small_value, threshold_bytes=1024) is small_value
+    assert claim_check._MEMORY_OBJECTS == {}
+
+
+def test_threshold_from_env(monkeypatch):
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_THRESHOLD_BYTES_ENV_VAR, "10")
+    assert is_claim_check(check_in({"tags": {"libraryId": "L2400001"}}))
+    # Checked in at the 32 KB default
+    monkeypatch.delenv(claim_check.CLAIM_CHECK_THRESHOLD_BYTES_ENV_VAR)
+    assert not is_claim_check(check_in(LARGE_VALUE))
+
+
+def test_resolve_claim_checks_of_given_keys_only():
+    nested_reference = check_in({"a": 1}, threshold_bytes=1)
+    event = {
+        "oldPayload": check_in(LARGE_VALUE, threshold_bytes=1),
+        "newPayload": {"version": "2025.08.05", "data": {"inputs": nested_reference}},
+        "other": nested_reference,
+    }
+    assert resolve_claim_checks(event, ["oldPayload", "missing"]) == {
+        "oldPayload": LARGE_VALUE,
+        # User supplied data is never dereferenced
+        "newPayload": {"version": "2025.08.05", "data": {"inputs": nested_reference}},
+        "other": nested_reference,
+    }
+    # The event itself is not modified
+    assert is_claim_check(event["oldPayload"])
+
+
+@pytest.mark.parametrize(
+    "uri",
+    [
+        # Another bucket
+        "s3://other-bucket/claim-check/abc.json",
+        # Outside of the claim check prefix
+        "s3://claim-check-bucket/private/abc.json",
+        "s3://claim-check-bucket/claim-check/../private/abc.json",
+        # Another backend
+        "file:///etc/passwd",
+        "memory:///claim-check/abc.json",
+    ]
+)
+def test_s3_references_outside_the_store_are_rejected(monkeypatch, uri):
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_BUCKET_NAME_ENV_VAR, "claim-check-bucket")
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_BACKEND_ENV_VAR, "s3")
+    with pytest.raises(ValueError):
+        check_out({"claimCheckUri": uri, "sizeBytes": 1})
+
+
+def test_local_references_outside_the_store_are_rejected(monkeypatch, tmp_path):
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_LOCAL_DIR_ENV_VAR, str(tmp_path / "store"))
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_BACKEND_ENV_VAR, "local")
+    outside_path = tmp_path / "outside.json"
+    outside_path.write_text("{}")
+    for uri in [
+        outside_path.as_uri(),
+        (tmp_path / "store" / "claim-check" / ".." / ".." / "outside.json").as_uri(),
+        "s3://claim-check-bucket/claim-check/abc.json",
+    ]:
+        with pytest.raises(ValueError):
+            check_out({"claimCheckUri": uri, "sizeBytes": 1})
+
+
+def test_values_that_look_like_references():
+    # Only a dict with exactly the reference keys is a reference
+    value = {"claimCheckUri": "s3://bucket/key.json", "sizeBytes": 1, "other": True}
+    assert not is_claim_check(value)
+    assert check_out(value) is value
+
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError):
+        check_out({"claimCheckUri": "gs://bucket/key.json", "sizeBytes": 1})
+
+
+def test_unknown_backend(monkeypatch):
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_BACKEND_ENV_VAR, "gcs")
+    with pytest.raises(ValueError):
+        check_in(LARGE_VALUE, threshold_bytes=1)
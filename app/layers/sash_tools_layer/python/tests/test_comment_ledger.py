@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the workflow run comment ledger
+"""
+
+# Standard imports
+import json
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import comment_ledger, state_store
+from sash_tools.comment_ledger import CommentLedger
+
+# Globals
+WORKFLOW_RUN_ID = "wfr.01J0000000000000000000000"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(comment_ledger, "time", lambda: now[0])
+    monkeypatch.setattr(state_store, "time", lambda: now[0])
+    return now
+
+
+def test_unrecorded_comment_is_not_suppressed(clock):
+    ledger = CommentLedger(window_seconds=60)
+    assert not ledger.is_suppressed(WORKFLOW_RUN_ID, "updating_inputs", "body")
+
+
+def test_recorded_comment_is_suppressed_within_the_window(clock):
+    ledger = CommentLedger(window_seconds=60)
+    ledger.record(WORKFLOW_RUN_ID, "updating_inputs", "body")
+
+    clock[0] += 59
+    assert ledger.is_suppressed(WORKFLOW_RUN_ID, "updating_inputs", "body")
+    clock[0] += 2
+    assert not ledger.is_suppressed(WORKFLOW_RUN_ID, "updating_inputs", "body")
+
+
+def test_suppressions_keep_the_window_of_the_recorded_comment(clock):
+    ledger = CommentLedger(window_seconds=60)
+    ledger.record(WORKFLOW_RUN_ID, "updating_inputs", "body")
+
+    # A suppression does not extend the window
+    clock[0] += 50
+    assert ledger.is_suppressed(WORKFLOW_RUN_ID, "updating_inputs", "body")
+    clock[0] += 11
+    assert not ledger.is_suppressed(WORKFLOW_RUN_ID, "updating_inputs", "body")
+
+
+def test_suppressions_are_counted(clock, capsys):
+    ledger = CommentLedger(window_seconds=60)
+    ledger.record(WORKFLOW_RUN_ID, "updating_inputs", "body")
+    capsys.readouterr()
+    for _ in range(3):
+        assert ledger.is_suppressed(WORKFLOW_RUN_ID, "updating_inputs", "body")
+
+    # Counted as a metric, the ledger entry is only read
+    metric_lines = list(map(json.loads, capsys.readouterr().out.splitlines()))
+    assert list(map(lambda line_iter_: (line_iter_["CommentType"], line_iter_["Suppressed"]), metric_lines)) == [
+        ("updating_inputs", 1)
+    ] * 3
+    entry = ledger.store.get(CommentLedger.get_key(WORKFLOW_RUN_ID, "updating_inputs", "body"))
+    assert entry == {"postedAt": clock[0]}
+
+
+def test_entries_are_keyed_by_run_type_and_body(clock):
+    ledger = CommentLedger(window_seconds=60)
+    ledger.record(WORKFLOW_RUN_ID, "updating_inputs", "body")
+
+    assert not ledger.is_suppressed("wfr.01J0000000000000000000001", "updating_inputs", "body")
+    assert not ledger.is_suppressed(WORKFLOW_RUN_ID, "validation_failure", "body")
+    assert not ledger.is_suppressed(WORKFLOW_RUN_ID, "updating_inputs", "another body")
+
+
+def test_zero_window_never_suppresses(clock):
+    ledger = CommentLedger(window_seconds=0)
+    ledger.record(WORKFLOW_RUN_ID, "updating_inputs", "body")
+    assert not ledger.is_suppressed(WORKFLOW_RUN_ID, "updating_inputs", "body")
+    assert ledger.store.get(CommentLedger.get_key(WORKFLOW_RUN_ID, "updating_inputs", "body")) is None
+
+
+def test_window_from_the_environment(monkeypatch):
+    monkeypatch.setenv(comment_ledger.COMMENT_SUPPRESSION_WINDOW_SECONDS_ENV_VAR, "30")
+    assert CommentLedger().window_seconds == 30
+    monkeypatch.delenv(comment_ledger.COMMENT_SUPPRESSION_WINDOW_SECONDS_ENV_VAR)
+    assert CommentLedger().window_seconds == comment_ledger.DEFAULT_COMMENT_SUPPRESSION_WINDOW_SECONDS
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the draft library Bloom filter, its pending libraries and the settle window of a new draft
+"""
+
+# Standard imports
+import json
+import random
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import draft_library_filter, state_store
+from sash_tools.draft_library_filter import BloomFilter, DraftLibraryFilter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(draft_library_filter.time, "time", lambda: now[0])
+    monkeypatch.setattr(state_store, "time", lambda: now[0])
+    return now
+
+
+def get_library_ids(count: int, seed: int):
+    rng = random.Random(seed)
+    return list(map(lambda _: f"L{rng.randrange(10 ** 7):07d}", range(count)))
+
+
+def get_check_metrics(capsys):
+    return list(map(
+        lambda line_iter_: json.loads(line_iter_),
+        filter(lambda line_iter_: line_iter_.startswith('{"_aws"'), capsys.readouterr().out.splitlines())
+    ))
+
+
+@pytest.mark.parametrize("capacity", [0, 1, 100, 5000])
+@pytest.mark.parametrize("false_positive_rate", [0.1, 0.01, 0.001])
+def test_bloom_filter_has_no_false_negatives(capacity, false_positive_rate):
+    library_ids = get_library_ids(capacity, seed=capacity)
+    bloom_filter = BloomFilter.for_capacity(capacity, false_positive_rate)
+    for library_id in library_ids:
+        bloom_filter.add(library_id)
+
+    # Every added library is a member, before and after a round trip through the state store
+    assert all(map(lambda library_id_iter_: library_id_iter_ in bloom_filter, library_ids))
+    stored_filter = BloomFilter.from_dict(json.loads(json.dumps(bloom_filter.to_dict())))
+    assert all(map(lambda library_id_iter_: library_id_iter_ in stored_filter, library_ids))
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom_filter = BloomFilter.for_capacity(2000, 0.01)
+    for library_id in get_library_ids(2000, seed=1):
+        bloom_filter.add(library_id)
+
+    absent_library_ids = list(map(lambda index_iter_: f"X{index_iter_:07d}", range(20000)))
+    false_positive_count = sum(map(lambda library_id_iter_: library_id_iter_ in bloom_filter, absent_library_ids))
+    assert false_positive_count / len(absent_library_ids) < 0.02
+    assert bloom_filter.get_estimated_false_positive_rate() < 0.02
+
+
+def test_rebuilt_filter_check(clock):
+    library_filter = DraftLibraryFilter(settle_seconds=0)
+    summary = library_filter.rebuild(["L2400001", "L2400002", "L2400001"], draft_count=1)
+    assert (summary["draftCount"], summary["libraryCount"]) == (1, 2)
+
+    assert library_filter.check(["L9999999", "L2400002"]) is True
+    assert library_filter.check(["L9999999"]) is False
+
+
+def test_missing_or_stale_filter_is_not_checked(clock):
+    library_filter = DraftLibraryFilter(max_age_seconds=3600)
+    assert library_filter.check(["L2400001"]) is None
+
+    library_filter.rebuild(["L2400001"], draft_count=1)
+    clock[0] += 3601
+    assert library_filter.check(["L2400001"]) is None
+
+
+def test_pending_libraries_are_members_until_the_next_rebuild(clock):
+    library_filter = DraftLibraryFilter(max_age_seconds=3600, settle_seconds=0)
+    library_filter.rebuild([], draft_count=0)
+    library_filter.add_pending(["L2400003"])
+    assert library_filter.check(["L2400003"]) is True
+
+    # Kept for twice the max age, so the next rebuild has them
+    clock[0] += 3000
+    library_filter.rebuild([], draft_count=0)
+    assert library_filter.check(["L2400003"]) is True
+    clock[0] += 4201
+    library_filter.rebuild([], draft_count=0)
+    assert library_filter.check(["L2400003"]) is False
+
+
+def test_not_a_member_is_checked_again(clock):
+    library_filter = DraftLibraryFilter(settle_seconds=60)
+    library_filter.rebuild(["L2400001"], draft_count=1)
+
+    assert library_filter.check(["L2400001"]) is True
+    assert not library_filter.needs_recheck(True)
+
+    assert library_filter.check(["L2400003"]) is False
+    assert library_filter.needs_recheck(False)
+    assert not library_filter.needs_recheck(False, is_recheck=True)
+    # No filter, no recheck
+    assert not library_filter.needs_recheck(None)
+    assert not DraftLibraryFilter(settle_seconds=0).needs_recheck(False)
+
+
+def test_draft_pending_within_the_settle_window_is_not_dropped(clock):
+    library_filter = DraftLibraryFilter(settle_seconds=60)
+    library_filter.rebuild(["L2400001"], draft_count=1)
+
+    # The upstream event is checked before the DRAFT event of its subject is indexed
+    assert library_filter.check(["L2400003"]) is False
+    clock[0] += 5
+    library_filter.add_pending(["L2400003"])
+    clock[0] += 55
+    assert library_filter.check(["L2400003"], is_recheck=True) is True
+
+
+def test_draft_pending_after_the_settle_window_is_dropped(clock):
+    # The residual window, the DRAFT event is indexed after the recheck
+    library_filter = DraftLibraryFilter(settle_seconds=60)
+    library_filter.rebuild(["L2400001"], draft_count=1)
+
+    assert library_filter.check(["L2400003"]) is False
+    clock[0] += 60
+    assert library_filter.check(["L2400003"], is_recheck=True) is False
+    clock[0] += 1
+    library_filter.add_pending(["L2400003"])
+
+    # Until the next rebuild has the draft, later events of the library are members
+    assert library_filter.check(["L2400003"]) is True
+
+
+def test_metric_is_logged_for_the_last_check_only(clock, capsys):
+    library_filter = DraftLibraryFilter(settle_seconds=60)
+    library_filter.rebuild(["L2400001"], draft_count=1)
+    capsys.readouterr()
+
+    library_filter.check(["L2400003"])
+    assert get_check_metrics(capsys) == []
+
+    library_filter.check(["L2400003"], is_recheck=True)
+    library_filter.check(["L2400001"])
+    metrics = get_check_metrics(capsys)
+    assert list(map(lambda metric_iter_: "Dropped" in metric_iter_, metrics)) == [True, False]
+    assert metrics[1]["Passed"] == 1
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the field resolver graph planning, ordering and failures
+"""
+
+# Standard imports
+import threading
+from typing import Any, Dict
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.field_resolver import (
+    FieldResolverGraph,
+    get_field,
+    is_missing,
+    set_field,
+)
+
+
+def test_field_paths():
+    draft = {"tags": {"libraryId": "L2400001", "emptyList": []}, "inputs": {}}
+    assert get_field(draft, "tags.libraryId") == "L2400001"
+    assert get_field(draft, "tags.libraryId.nested") is None
+    assert get_field(draft, "missing.field") is None
+
+    assert not is_missing(draft, "tags.libraryId")
+    assert is_missing(draft, "tags.emptyList")
+    assert is_missing(draft, "inputs")
+    assert is_missing(draft, "inputs.groupId")
+
+    set_field(draft, "inputs.nested.groupId", "SBJ00001")
+    assert draft["inputs"] == {"nested": {"groupId": "SBJ00001"}}
+    set_field(draft, "tags.libraryId", None)
+    assert "libraryId" not in draft["tags"]
+
+
+@pytest.fixture
+def graph() -> FieldResolverGraph:
+    """
+    a <- b <- c, d independent
+    """
+    graph = FieldResolverGraph()
+
+    @graph.resolver(provides=["tags.a"])
+    def resolve_a(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"tags.a": "a"}
+
+    @graph.resolver(provides=["tags.b"], requires=["tags.a"])
+    def resolve_b(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"tags.b": draft["tags"]["a"] + "b"}
+
+    @graph.resolver(provides=["inputs.c"], requires=["tags.b"])
+    def resolve_c(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"inputs.c": draft["tags"]["b"] + "c"}
+
+    @graph.resolver(provides=["inputs.d"])
+    def resolve_d(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"inputs.d": "d"}
+
+    return graph
+
+
+def test_resolves_in_dependency_order(graph):
+    resolved_draft, resolver_names = graph.resolve({})
+    assert resolved_draft == {"tags": {"a": "a", "b": "ab"}, "inputs": {"c": "abc", "d": "d"}}
+    assert resolver_names.index("resolve_a") < resolver_names.index("resolve_b") < resolver_names.index("resolve_c")
+    assert sorted(resolver_names) == ["resolve_a", "resolve_b", "resolve_c", "resolve_d"]
+
+
+def test_only_missing_fields_are_resolved(graph):
+    draft = {"tags": {"a": "x", "b": "xy"}}
+    resolved_draft, resolver_names = graph.resolve(draft)
+    assert sorted(resolver_names) == ["resolve_c", "resolve_d"]
+    assert resolved_draft["inputs"] == {"c": "xyc", "d": "d"}
+    # The input draft is left as is
+    assert draft == {"tags": {"a": "x", "b": "xy"}}
+
+
+def test_targets_pull_in_missing_requirements(graph):
+    assert graph.get_plan({}, targets=["inputs.c"]) == {
+        "resolve_c": ["resolve_b"],
+        "resolve_b": ["resolve_a"],
+        "resolve_a": [],
+    }
+    # Targets cover the fields under them
+    assert sorted(graph.get_plan({}, targets=["inputs"])) == ["resolve_a", "resolve_b", "resolve_c", "resolve_d"]
+    assert graph.get_plan({"tags": {"b": "xy"}}, targets=["inputs"]) == {"resolve_c": [], "resolve_d": []}
+
+
+def test_is_needed_overrides_the_missing_check():
+    graph = FieldResolverGraph()
+
+    @graph.resolver(provides=["tags.subjectId"], is_needed=lambda draft: True)
+    def refresh_subject_id(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"tags.subjectId": "SBJ00002"}
+
+    resolved_draft, resolver_names = graph.resolve({"tags": {"subjectId": "SBJ00001"}})
+    assert resolved_draft["tags"]["subjectId"] == "SBJ00002"
+    assert resolver_names == ["refresh_subject_id"]
+
+
+def test_independent_resolvers_run_concurrently():
+    graph = FieldResolverGraph()
+    barrier = threading.Barrier(2, timeout=5)
+
+    @graph.resolver(provides=["inputs.left"])
+    def left(draft: Dict[str, Any]) -> Dict[str, Any]:
+        barrier.wait()
+        return {"inputs.left": 1}
+
+    @graph.resolver(provides=["inputs.right"])
+    def right(draft: Dict[str, Any]) -> Dict[str, Any]:
+        barrier.wait()
+        return {"inputs.right": 2}
+
+    # Would raise BrokenBarrierError if the resolvers ran one after the other
+    assert graph.resolve({}, max_workers=2)[0] == {"inputs": {"left": 1, "right": 2}}
+
+
+def test_resolvers_get_a_copy_of_the_draft():
+    graph = FieldResolverGraph()
+
+    @graph.resolver(provides=["inputs.a"])
+    def mutating(draft: Dict[str, Any]) -> Dict[str, Any]:
+        draft["tags"]["libraryId"] = "changed"
+        return {"inputs.a": 1}
+
+    resolved_draft, _ = graph.resolve({"tags": {"libraryId": "L2400001"}})
+    assert resolved_draft["tags"]["libraryId"] == "L2400001"
+
+
+def test_none_removes_a_field():
+    graph = FieldResolverGraph()
+
+    @graph.resolver(provides=["inputs.tumorDnaSampleId"], is_needed=lambda draft: True)
+    def tumor_sample_id(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"inputs.tumorDnaSampleId": None}
+
+    assert graph.resolve({"inputs": {"tumorDnaSampleId": "L2400002"}})[0] == {"inputs": {}}
+
+
+def test_resolver_failure_is_raised(graph):
+    @graph.resolver(provides=["inputs.e"], requires=["tags.a"])
+    def failing(draft: Dict[str, Any]) -> Dict[str, Any]:
+        raise LookupError("No such library")
+
+    with pytest.raises(LookupError, match="No such library"):
+        graph.resolve({}, targets=["inputs.e"])
+
+
+def test_dependency_cycle():
+    graph = FieldResolverGraph()
+
+    @graph.resolver(provides=["tags.a"], requires=["tags.b"])
+    def resolve_a(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"tags.a": "a"}
+
+    @graph.resolver(provides=["tags.b"], requires=["tags.a"])
+    def resolve_b(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"tags.b": "b"}
+
+    with pytest.raises(ValueError, match="dependency cycle"):
+        graph.resolve({})
+
+
+def test_providers_that_are_not_needed_are_not_pulled_in():
+    graph = FieldResolverGraph()
+
+    @graph.resolver(
+        provides=["tags.tumorFastqRgidList"],
+        is_needed=lambda draft: not is_missing(draft, "tags.tumorLibraryId"),
+    )
+    def tumor_fastq_rgid_list(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"tags.tumorFastqRgidList": ["rgid"]}
+
+    @graph.resolver(provides=["libraries"], requires=["tags.tumorFastqRgidList"])
+    def libraries(draft: Dict[str, Any]) -> Dict[str, Any]:
+        return {"libraries": [draft["tags"].get("tumorFastqRgidList", [])]}
+
+    assert graph.resolve({"tags": {}})[0] == {"tags": {}, "libraries": [[]]}
+    assert graph.resolve({"tags": {"tumorLibraryId": "L2400002"}})[0]["libraries"] == [["rgid"]]
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the payload fingerprints
+"""
+
+# Layer imports
+from sash_tools.fingerprint import (
+    get_last_emitted_payload_fingerprint,
+    get_payload_fingerprint,
+    set_last_emitted_payload_fingerprint,
+    to_canonical_json,
+)
+
+
+def test_canonical_json_ignores_key_order():
+    assert to_canonical_json({"b": 1, "a": {"d": 2, "c": 3}}) == '{"a":{"c":3,"d":2},"b":1}'
+
+
+def test_fingerprint_ignores_workflow_manager_attributes():
+    payload = {"version": "2025.08.05", "data": {"tags": {"libraryId": "L2400001"}}}
+    echoed_payload = {
+        "orcabusId": "pld.01J",
+        "refId": "ref.01J",
+        "data": {"tags": {"libraryId": "L2400001"}},
+        "version": "2025.08.05",
+    }
+    assert get_payload_fingerprint(payload) == get_payload_fingerprint(echoed_payload)
+
+
+def test_fingerprint_changes_with_data_and_version():
+    payload = {"version": "2025.08.05", "data": {"tags": {"libraryId": "L2400001"}}}
+    assert get_payload_fingerprint(payload) != get_payload_fingerprint(
+        {**payload, "data": {"tags": {"libraryId": "L2400002"}}}
+    )
+    assert get_payload_fingerprint(payload) != get_payload_fingerprint({**payload, "version": "2025.09.01"})
+    # List order is significant
+    assert get_payload_fingerprint({"data": {"list": [1, 2]}}) != get_payload_fingerprint({"data": {"list": [2, 1]}})
+
+
+def test_last_emitted_payload_fingerprint():
+    assert get_last_emitted_payload_fingerprint("20250101abcd1234") is None
+    set_last_emitted_payload_fingerprint("20250101abcd1234", "abc")
+    assert get_last_emitted_payload_fingerprint("20250101abcd1234") == "abc"
+    assert get_last_emitted_payload_fingerprint("20250101efgh5678") is None
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the embedded metric format lines
+"""
+
+# Standard imports
+import json
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.metrics import METRICS_SINK_ENV_VAR, put_embedded_metric
+
+
+def test_put_embedded_metric(capsys):
+    put_embedded_metric("Sash/Test", {"Endpoint": "default"}, {"Retried": (2, "Count"), "RetryDelayMs": (150.0, "Milliseconds")})
+    line = json.loads(capsys.readouterr().out)
+    assert line.pop("_aws")["CloudWatchMetrics"] == [{
+        "Namespace": "Sash/Test",
+        "Dimensions": [["Endpoint"]],
+        "Metrics": [{"Name": "Retried", "Unit": "Count"}, {"Name": "RetryDelayMs", "Unit": "Milliseconds"}],
+    }]
+    assert line == {"Endpoint": "default", "Retried": 2, "RetryDelayMs": 150.0}
+
+
+def test_put_embedded_metric_without_dimensions(capsys):
+    put_embedded_metric("Sash/Test", {}, {"Passed": (1, "Count")})
+    line = json.loads(capsys.readouterr().out)
+    assert line.pop("_aws")["CloudWatchMetrics"][0]["Dimensions"] == [[]]
+    assert line == {"Passed": 1}
+
+
+def test_none_metrics_sink(capsys, monkeypatch):
+    monkeypatch.setenv(METRICS_SINK_ENV_VAR, "none")
+    put_embedded_metric("Sash/Test", {}, {"Passed": (1, "Count")})
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setenv(METRICS_SINK_ENV_VAR, "cloudwatch")
+    with pytest.raises(ValueError):
+        put_embedded_metric("Sash/Test", {}, {"Passed": (1, "Count")})
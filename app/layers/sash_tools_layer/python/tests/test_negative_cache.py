@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the negative cache of the upstream workflow run lookups
+"""
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import negative_cache, state_store
+from sash_tools.negative_cache import NegativeLookupCache, get_lookup
+
+# Globals
+WORKFLOW_NAME = "dragen-wgts-dna"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(negative_cache, "time", lambda: now[0])
+    monkeypatch.setattr(state_store, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(clock) -> NegativeLookupCache:
+    return NegativeLookupCache(ttl_seconds=600)
+
+
+def test_lookup_ignores_the_order_of_libraries_and_rgids():
+    assert get_lookup(WORKFLOW_NAME, ["L2", "L1", "L1"], ["RG2", "RG1"]) == get_lookup(
+        WORKFLOW_NAME, ["L1", "L2"], ["RG1", "RG2"]
+    )
+    assert get_lookup(WORKFLOW_NAME, ["L1"], []) == get_lookup(WORKFLOW_NAME, ["L1"], None)
+
+
+def test_recorded_miss_expires(cache, clock):
+    lookup = get_lookup(WORKFLOW_NAME, ["L2400001"])
+    assert not cache.is_miss(lookup)
+
+    cache.record_miss(lookup, looked_up_at=clock[0])
+    assert cache.is_miss(lookup)
+    # Keyed by the whole lookup
+    assert not cache.is_miss(get_lookup(WORKFLOW_NAME, ["L2400001", "L2400002"]))
+    assert not cache.is_miss(get_lookup("oncoanalyser-wgts-dna", ["L2400001"]))
+
+    clock[0] += 601
+    assert not cache.is_miss(lookup)
+
+
+def test_ttl_counts_from_the_lookup_time(cache, clock):
+    lookup = get_lookup(WORKFLOW_NAME, ["L2400001"])
+    looked_up_at = clock[0]
+    clock[0] += 500
+    cache.record_miss(lookup, looked_up_at=looked_up_at)
+    clock[0] += 101
+    assert not cache.is_miss(lookup)
+
+    # A lookup older than the ttl is not recorded
+    cache.record_miss(lookup, looked_up_at=clock[0] - 601)
+    assert cache.store.get(NegativeLookupCache.get_miss_key(lookup)) is None
+
+
+def test_succeeded_event_invalidates_the_misses_of_its_libraries(cache, clock):
+    lookup = get_lookup(WORKFLOW_NAME, ["L2400001", "L2400002"])
+    other_lookup = get_lookup(WORKFLOW_NAME, ["L2400003"])
+    cache.record_miss(lookup, looked_up_at=clock[0])
+    cache.record_miss(other_lookup, looked_up_at=clock[0])
+
+    clock[0] += 1
+    # Any one of the libraries of the lookup
+    cache.invalidate(WORKFLOW_NAME, ["L2400002"])
+    assert not cache.is_miss(lookup)
+    assert cache.is_miss(other_lookup)
+    # Only for the same workflow
+    cache.invalidate("oncoanalyser-wgts-dna", ["L2400003"])
+    assert cache.is_miss(other_lookup)
+
+
+def test_lookup_racing_the_event_is_not_cached_past_it(cache, clock):
+    lookup = get_lookup(WORKFLOW_NAME, ["L2400001"])
+    # The query is sent, then the event arrives before the miss is recorded
+    looked_up_at = clock[0]
+    cache.invalidate(WORKFLOW_NAME, ["L2400001"])
+    clock[0] += 1
+    cache.record_miss(lookup, looked_up_at=looked_up_at)
+    assert not cache.is_miss(lookup)
+
+    # A later lookup is cached again
+    cache.record_miss(lookup, looked_up_at=clock[0])
+    assert cache.is_miss(lookup)
+
+
+def test_succeeded_event_invalidates_the_misses_of_its_analysis_run(cache, clock):
+    lookup = get_lookup(WORKFLOW_NAME, analysis_run_id="anr.01J")
+    cache.record_miss(lookup, looked_up_at=clock[0])
+    clock[0] += 1
+    cache.invalidate(WORKFLOW_NAME, [], analysis_run_id="anr.01J")
+    assert not cache.is_miss(lookup)
+
+
+def test_zero_ttl_disables_the_cache(clock):
+    cache = NegativeLookupCache(ttl_seconds=0)
+    lookup = get_lookup(WORKFLOW_NAME, ["L2400001"])
+    cache.record_miss(lookup, looked_up_at=clock[0])
+    assert not cache.is_miss(lookup)
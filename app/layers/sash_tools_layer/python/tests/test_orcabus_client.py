@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the concurrent OrcaBus calls
+"""
+
+# Standard imports
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from types import ModuleType
+from typing import List
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import orcabus_client
+from sash_tools.orcabus_client import (
+    KeepAliveRequests,
+    enable_keep_alive,
+    gather_calls,
+    run_async,
+    run_concurrently,
+)
+
+# Globals
+REQUEST_ID: ContextVar[str] = ContextVar("REQUEST_ID", default="")
+
+
+@pytest.fixture(autouse=True)
+def no_keep_alive(monkeypatch):
+    # The pool routes the requests functions on first use, not under test here
+    monkeypatch.setattr(orcabus_client, "enable_keep_alive", lambda: None)
+
+
+def test_results_are_in_argument_order():
+    def _slow_double(value: int) -> int:
+        # Later arguments finish first
+        time.sleep((5 - value) * 0.01)
+        return value * 2
+
+    assert run_concurrently(_slow_double, range(5)) == [0, 2, 4, 6, 8]
+
+
+def test_calls_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def _wait_for_the_others(value: int) -> int:
+        # Raises BrokenBarrierError if the calls were run one at a time
+        barrier.wait()
+        return value
+
+    assert run_concurrently(_wait_for_the_others, [1, 2, 3]) == [1, 2, 3]
+
+
+def test_single_call_runs_in_the_calling_thread(monkeypatch):
+    monkeypatch.setattr(orcabus_client, "get_executor", lambda: pytest.fail("The pool should not be used"))
+    assert run_concurrently(lambda value: (value, threading.current_thread()), ["a"]) == [
+        ("a", threading.current_thread())
+    ]
+    assert run_concurrently(lambda value: value, []) == []
+
+
+def test_first_exception_is_raised():
+    def _fail_on_odd(value: int) -> int:
+        if value % 2:
+            raise ValueError(f"Odd value {value}")
+        return value
+
+    with pytest.raises(ValueError, match="Odd value 1"):
+        run_concurrently(_fail_on_odd, range(4))
+
+
+def test_calls_run_in_a_copy_of_the_context():
+    def _get_request_id(value: int) -> str:
+        request_id = REQUEST_ID.get()
+        # Not leaked back to the caller
+        REQUEST_ID.set(f"changed-{value}")
+        return request_id
+
+    token = REQUEST_ID.set("req-1")
+    try:
+        assert run_concurrently(_get_request_id, [1, 2]) == ["req-1", "req-1"]
+        assert REQUEST_ID.get() == "req-1"
+    finally:
+        REQUEST_ID.reset(token)
+
+
+def test_gather_calls():
+    assert run_async(gather_calls([lambda: "a", lambda: "b"])) == ["a", "b"]
+
+
+@pytest.fixture
+def orcabus_api_tools_module(monkeypatch):
+    """
+    An orcabus_api_tools module that imports requests, and one of its functions by name
+    """
+    requests = pytest.importorskip("requests")
+    module = ModuleType("orcabus_api_tools.utils.test_requests_module")
+    module.requests = requests
+    module.get = requests.get
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    return module
+
+
+def test_keep_alive_is_scoped_to_orcabus_api_tools(orcabus_api_tools_module, monkeypatch):
+    import requests
+    requests_get, requests_api_get = requests.get, requests.api.get
+    other_module = ModuleType("other_client")
+    other_module.requests = requests
+    monkeypatch.setitem(sys.modules, other_module.__name__, other_module)
+
+    enable_keep_alive()
+    # Safe to call more than once
+    enable_keep_alive()
+
+    assert isinstance(orcabus_api_tools_module.requests, KeepAliveRequests)
+    assert orcabus_api_tools_module.get is orcabus_api_tools_module.requests.get
+    # Other attributes are those of the requests module
+    assert orcabus_api_tools_module.requests.HTTPError is requests.HTTPError
+    assert orcabus_api_tools_module.requests.exceptions is requests.exceptions
+
+    # The requests module, and the other modules, are left as is
+    assert requests.get is requests_get
+    assert requests.api.get is requests_api_get
+    assert other_module.requests is requests
+
+
+def test_keep_alive_requests_use_the_thread_session_and_policy(orcabus_api_tools_module, monkeypatch):
+    sent, session_calls = [], []
+
+    class FakeSession:
+        def get(self, *args, **kwargs):
+            session_calls.append(("get", args, kwargs))
+            return "response"
+
+        def request(self, *args, **kwargs):
+            session_calls.append(("request", args, kwargs))
+            return "response"
+
+    def _send_with_policy(method, url, send):
+        sent.append((method, url))
+        return send()
+
+    monkeypatch.setattr(orcabus_client, "get_thread_session", lambda: FakeSession())
+    monkeypatch.setattr(orcabus_client, "send_with_policy", _send_with_policy)
+    enable_keep_alive()
+
+    assert orcabus_api_tools_module.requests.get("https://orcabus.example.com/api", params={"a": 1}) == "response"
+    assert orcabus_api_tools_module.get(url="https://orcabus.example.com/api") == "response"
+    assert orcabus_api_tools_module.requests.request("post", "https://orcabus.example.com/api", json={}) == "response"
+
+    assert sent == [
+        ("GET", "https://orcabus.example.com/api"),
+        ("GET", "https://orcabus.example.com/api"),
+        ("POST", "https://orcabus.example.com/api"),
+    ]
+    assert session_calls == [
+        ("get", ("https://orcabus.example.com/api",), {"params": {"a": 1}}),
+        ("get", (), {"url": "https://orcabus.example.com/api"}),
+        ("request", ("post", "https://orcabus.example.com/api"), {"json": {}}),
+    ]
+
+
+def test_keep_alive_fails_if_the_package_does_not_reference_requests(monkeypatch):
+    pytest.importorskip("requests")
+    module = ModuleType("orcabus_api_tools.utils.test_session_module")
+    module.__file__ = "orcabus_api_tools/utils/test_session_module.py"
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+
+    with pytest.raises(RuntimeError, match="references requests"):
+        enable_keep_alive()
+
+
+def test_nested_calls_are_rejected():
+    def _nested_call(value: int) -> List[int]:
+        return run_concurrently(lambda value_iter_: value_iter_, [value, value])
+
+    with pytest.raises(RuntimeError, match="must not be nested"):
+        run_concurrently(_nested_call, [1, 2])
+
+
+def test_keep_alive_without_requests(monkeypatch):
+    monkeypatch.setitem(sys.modules, "requests", None)
+    # No-op
+    enable_keep_alive()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the output manifest result file types and caps
+"""
+
+# Standard imports
+import json
+from typing import Any, Dict, Iterator, List
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import output_manifest
+from sash_tools.output_manifest import get_output_manifest, get_result_file_type
+
+# Globals
+BUCKET = "analysis-bucket"
+KEY_PREFIX = "sash/20250101abcd1234/SBJ00001/"
+
+
+def get_file_objects(relative_keys: List[str], size: int = 100) -> List[Dict[str, Any]]:
+    return list(map(
+        lambda relative_key_iter_: {"bucket": BUCKET, "key": f"{KEY_PREFIX}{relative_key_iter_}", "size": size},
+        relative_keys
+    ))
+
+
+@pytest.mark.parametrize(
+    "relative_key, expected_type",
+    [
+        ("cancer_report/SBJ00001.cancer_report.html", "cancerReport"),
+        ("smlv_somatic/report/L2400002.pcgr_acmg.grch38.html", "pcgrReport"),
+        ("smlv_germline/report/L2400001.cpsr.grch38.html", "cpsrReport"),
+        ("multiqc/SBJ00001.multiqc.html", "multiqcReport"),
+        ("purple/L2400002.purple.purity.tsv", "purplePurity"),
+        ("smlv_somatic/filter/L2400002.pass.vcf.gz", "somaticSmallVariantsVcf"),
+        ("sv_somatic/prioritise/L2400002.sv.prioritised.vcf.gz", "somaticStructuralVariantsVcf"),
+        # Not result files
+        ("purple/L2400002.purple.cnv.somatic.tsv", None),
+        ("smlv_somatic/filter/L2400002.pass.vcf.gz.tbi", None),
+        ("smlv_germline/L2400001.pass.vcf.gz", None),
+    ]
+)
+def test_result_file_type(relative_key, expected_type):
+    assert get_result_file_type(relative_key) == expected_type
+
+
+def test_manifest_lists_the_result_files_and_counts_every_file():
+    manifest = get_output_manifest(BUCKET, KEY_PREFIX, get_file_objects([
+        "purple/L2400002.purple.purity.tsv",
+        "purple/L2400002.purple.cnv.somatic.tsv",
+        "cancer_report/SBJ00001.cancer_report.html",
+    ]))
+    assert manifest == {
+        # Result file type order, whatever the listing order
+        "files": [
+            {
+                "type": "cancerReport",
+                "s3Uri": f"s3://{BUCKET}/{KEY_PREFIX}cancer_report/SBJ00001.cancer_report.html",
+                "sizeBytes": 100,
+            },
+            {
+                "type": "purplePurity",
+                "s3Uri": f"s3://{BUCKET}/{KEY_PREFIX}purple/L2400002.purple.purity.tsv",
+                "sizeBytes": 100,
+            },
+        ],
+        "fileCount": 3,
+        "totalSizeBytes": 300,
+        "isTruncated": False,
+    }
+
+
+def test_manifest_is_built_in_one_pass():
+    consumed = []
+
+    def _iter_file_objects() -> Iterator[Dict[str, Any]]:
+        for file_object in get_file_objects(["multiqc/SBJ00001.multiqc.html", "other.txt"]):
+            consumed.append(file_object["key"])
+            yield file_object
+
+    manifest = get_output_manifest(BUCKET, KEY_PREFIX, _iter_file_objects())
+    assert len(consumed) == 2
+    assert manifest["fileCount"] == 2
+
+
+def test_manifest_is_capped_by_the_file_count():
+    relative_keys = list(map(lambda index_iter_: f"smlv_somatic/filter/L{index_iter_:04d}.pass.vcf.gz", range(10)))
+    manifest = get_output_manifest(BUCKET, KEY_PREFIX, get_file_objects(relative_keys), max_files=3)
+
+    assert len(manifest["files"]) == 3
+    assert manifest["isTruncated"]
+    # The counts are of every file
+    assert (manifest["fileCount"], manifest["totalSizeBytes"]) == (10, 1000)
+
+
+def test_manifest_is_capped_by_its_size():
+    relative_keys = list(map(lambda index_iter_: f"smlv_somatic/filter/L{index_iter_:04d}.pass.vcf.gz", range(50)))
+    manifest = get_output_manifest(BUCKET, KEY_PREFIX, get_file_objects(relative_keys), max_bytes=1024)
+
+    assert 0 < len(manifest["files"]) < 50
+    assert manifest["isTruncated"]
+    assert len(json.dumps(manifest["files"])) <= 1024
+
+
+def test_smaller_result_file_fits_after_a_skipped_one():
+    long_relative_key = f"sv_somatic/{'x' * 200}/L2400002.sv.vcf.gz"
+    manifest = get_output_manifest(
+        BUCKET, KEY_PREFIX,
+        get_file_objects([long_relative_key, "purple/L2400002.purple.purity.tsv"]),
+        max_bytes=200,
+    )
+    assert list(map(lambda manifest_file_iter_: manifest_file_iter_["type"], manifest["files"])) == ["purplePurity"]
+    assert manifest["isTruncated"]
+
+
+def test_caps_from_the_environment(monkeypatch):
+    monkeypatch.setenv(output_manifest.OUTPUT_MANIFEST_MAX_FILES_ENV_VAR, "1")
+    manifest = get_output_manifest(BUCKET, KEY_PREFIX, get_file_objects([
+        "multiqc/SBJ00001.multiqc.html",
+        "purple/L2400002.purple.purity.tsv",
+    ]))
+    assert len(manifest["files"]) == 1
+    assert manifest["isTruncated"]
+
+    monkeypatch.setenv(output_manifest.OUTPUT_MANIFEST_MAX_FILES_ENV_VAR, "10")
+    monkeypatch.setenv(output_manifest.OUTPUT_MANIFEST_MAX_BYTES_ENV_VAR, "10")
+    assert get_output_manifest(BUCKET, KEY_PREFIX, get_file_objects(["multiqc/SBJ00001.multiqc.html"]))["files"] == []
+
+
+def test_empty_output_uri():
+    assert get_output_manifest(BUCKET, KEY_PREFIX, []) == {
+        "files": [],
+        "fileCount": 0,
+        "totalSizeBytes": 0,
+        "isTruncated": False,
+    }
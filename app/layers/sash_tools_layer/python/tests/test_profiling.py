@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the on demand handler profiling
+"""
+
+# Standard imports
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import profiling
+from sash_tools.profiling import profile_handler
+
+
+def handler(event, context):
+    return {"total": sum(range(1000))}
+
+
+@pytest.fixture
+def profile_sink(monkeypatch, tmp_path) -> Path:
+    monkeypatch.setenv(profiling.PROFILE_SINK_ENV_VAR, str(tmp_path))
+    return tmp_path
+
+
+def get_summaries(capsys) -> List[Dict[str, Any]]:
+    return list(map(json.loads, filter(None, capsys.readouterr().out.splitlines())))
+
+
+def test_off_returns_the_handler(monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_MODE_ENV_VAR, raising=False)
+    assert profile_handler(handler) is handler
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "OFF")
+    assert profile_handler(handler) is handler
+
+
+def test_unknown_mode(monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "sometimes")
+    with pytest.raises(ValueError):
+        profile_handler(handler)
+
+
+def test_event_mode_profiles_the_flagged_invocations(monkeypatch, profile_sink, capsys):
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "event")
+    profiled_handler = profile_handler(handler)
+
+    assert profiled_handler({}, None) == {"total": 499500}
+    assert profiled_handler({"profile": "yes"}, None) == {"total": 499500}
+    assert get_summaries(capsys) == []
+
+    assert profiled_handler({"profile": True}, SimpleNamespace(aws_request_id="req-1")) == {"total": 499500}
+    summary, = get_summaries(capsys)
+    assert summary["profile"] == __name__
+    assert summary["durationMs"] >= 0
+    assert summary["peakAllocatedKb"] >= 0
+    assert summary["topFunctions"]
+    assert summary["profileUri"].startswith(str(profile_sink / __name__))
+    assert summary["profileUri"].endswith("-req-1.prof")
+    assert Path(summary["profileUri"]).is_file()
+
+
+def test_always_mode_profiles_every_invocation(monkeypatch, profile_sink, capsys):
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "always")
+    profiled_handler = profile_handler(handler)
+    profiled_handler({}, None)
+    profiled_handler(None, None)
+    assert len(get_summaries(capsys)) == 2
+
+
+def test_nested_handlers_are_not_profiled_again(monkeypatch, profile_sink, capsys):
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "always")
+    inner_handler = profile_handler(handler)
+    outer_handler = profile_handler(lambda event, context: inner_handler(event, context))
+    assert outer_handler({}, None) == {"total": 499500}
+    assert len(get_summaries(capsys)) == 1
+
+
+def test_failed_invocation_is_profiled_and_raised(monkeypatch, profile_sink, capsys):
+    def failing_handler(event, context):
+        raise ValueError("Failed")
+
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "always")
+    with pytest.raises(ValueError):
+        profile_handler(failing_handler)({}, None)
+    assert len(get_summaries(capsys)) == 1
+
+
+def test_unwritable_sink_does_not_fail_the_invocation(monkeypatch, tmp_path, capsys):
+    # A file where the sink directory should be
+    sink_path = tmp_path / "sink"
+    sink_path.write_text("")
+    monkeypatch.setenv(profiling.PROFILE_SINK_ENV_VAR, str(sink_path))
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "always")
+
+    assert profile_handler(handler)({}, None) == {"total": 499500}
+    summary, = get_summaries(capsys)
+    assert "profileUri" not in summary
+
+
+@pytest.mark.parametrize("failing_function", ["get_top_functions", "get_top_allocations"])
+def test_failed_summary_does_not_change_the_outcome(monkeypatch, profile_sink, capsys, caplog, failing_function):
+    def _fail(*args, **kwargs):
+        raise RuntimeError("Cannot summarise")
+
+    def failing_handler(event, context):
+        raise ValueError("Failed")
+
+    monkeypatch.setattr(profiling, failing_function, _fail)
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "always")
+
+    assert profile_handler(handler)({}, None) == {"total": 499500}
+    # The handler's own exception is raised, not the summary's
+    with pytest.raises(ValueError):
+        profile_handler(failing_handler)({}, None)
+    assert get_summaries(capsys) == []
+    assert "Could not summarise the profile" in caplog.text
+
+
+def test_failed_snapshot_stops_tracemalloc(monkeypatch, profile_sink, capsys):
+    import tracemalloc
+
+    def _fail():
+        raise RuntimeError("Cannot take a snapshot")
+
+    monkeypatch.setattr(tracemalloc, "take_snapshot", _fail)
+    monkeypatch.setenv(profiling.PROFILE_MODE_ENV_VAR, "always")
+
+    assert profile_handler(handler)({}, None) == {"total": 499500}
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the OrcaBus API rate limits and retries
+"""
+
+# Standard imports
+import json
+import time
+from email.utils import formatdate
+from typing import Dict, List, Optional
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import rate_limit, state_store
+from sash_tools.rate_limit import (
+    SharedTokenBucket,
+    TokenBucket,
+    get_endpoint_policy,
+    get_retry_after_seconds,
+    send_with_policy,
+)
+
+# Globals
+URL = "https://workflow.orcabus.example.com/api/v1/workflowrun/wfr.01J/comment"
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.is_closed = False
+
+    def close(self):
+        self.is_closed = True
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> List[float]:
+    """
+    The sleeps of the retries and the token bucket, on a fake monotonic clock, none are slept
+    """
+    slept: List[float] = []
+    now = [1000.0]
+
+    def _sleep(seconds: float):
+        slept.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(rate_limit.time, "sleep", _sleep)
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    return slept
+
+
+@pytest.fixture(autouse=True)
+def policies(monkeypatch):
+    monkeypatch.setenv(rate_limit.RATE_LIMITS_ENV_VAR, json.dumps({
+        "default": {"ratePerSecond": 1000, "burst": 1000},
+        "/comment": {"ratePerSecond": 1000, "burst": 1000, "maxAttempts": 3, "maxDelaySeconds": 5},
+        "/api": {"ratePerSecond": 1000, "burst": 1000},
+    }))
+    rate_limit.reset_policies()
+    yield
+    rate_limit.reset_policies()
+
+
+def send_responses(method: str, responses: List[object]):
+    """
+    Send through the policy, each attempt returns (or raises) the next response
+    """
+    attempts = iter(responses)
+
+    def _send():
+        response = next(attempts)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return send_with_policy(method, URL, _send)
+
+
+def test_longest_matching_policy_wins():
+    assert get_endpoint_policy(URL).name == "/comment"
+    assert get_endpoint_policy("https://workflow.orcabus.example.com/api/v1/workflowrun/wfr.01J").name == "/api"
+    assert get_endpoint_policy("https://metadata.orcabus.example.com/library").name == "default"
+
+
+def test_missing_policy_keys_take_the_defaults():
+    policy = get_endpoint_policy(URL)
+    assert policy.max_attempts == 3
+    assert policy.max_delay_seconds == 5
+    assert policy.base_delay_seconds == rate_limit.DEFAULT_POLICY["baseDelaySeconds"]
+
+
+def test_backoff_is_capped_full_jitter(monkeypatch):
+    policy = get_endpoint_policy(URL)
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: high)
+    assert policy.get_backoff_seconds(1) == policy.base_delay_seconds * 2
+    assert policy.get_backoff_seconds(2) == policy.base_delay_seconds * 4
+    assert policy.get_backoff_seconds(10) == policy.max_delay_seconds
+
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: low)
+    assert policy.get_backoff_seconds(10) == 0
+
+
+@pytest.mark.parametrize(
+    "headers, expected_seconds",
+    [
+        ({}, None),
+        ({"Retry-After": "3"}, 3.0),
+        ({"Retry-After": "1.5"}, 1.5),
+        ({"Retry-After": "-1"}, 0.0),
+        ({"Retry-After": "soon"}, None),
+    ]
+)
+def test_retry_after_seconds(headers, expected_seconds):
+    assert get_retry_after_seconds(FakeResponse(429, headers)) == expected_seconds
+
+
+def test_retry_after_http_date():
+    retry_after_seconds = get_retry_after_seconds(
+        FakeResponse(429, {"Retry-After": formatdate(time.time() + 30, usegmt=True)})
+    )
+    assert 28 <= retry_after_seconds <= 30
+    assert get_retry_after_seconds(
+        FakeResponse(429, {"Retry-After": formatdate(time.time() - 30, usegmt=True)})
+    ) == 0
+
+
+def test_token_bucket_waits_for_a_token(sleeps):
+    bucket = TokenBucket(rate_per_second=10, burst=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # Empty, waits a tenth of a second for a token to refill
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert sleeps == [pytest.approx(0.1)]
+    # Refills up to the burst
+    rate_limit.time.sleep(10)
+    assert [bucket.acquire(), bucket.acquire()] == [0, 0]
+
+
+def test_shared_token_bucket_caps_the_rate_across_containers(sleeps, monkeypatch):
+    monkeypatch.setenv(state_store.STATE_STORE_BACKEND_ENV_VAR, "memory")
+    state_store._MEMORY_STORE.clear()
+    # Two containers, each with a full bucket of their own
+    buckets = [SharedTokenBucket("/comment", rate_per_second=10, burst=2) for _ in range(2)]
+    assert [buckets[0].acquire(), buckets[1].acquire()] == [0, 0]
+    # The shared bucket is empty, the second container waits for a token to refill
+    assert buckets[1].acquire() == pytest.approx(0.1)
+    assert sleeps == [pytest.approx(0.1)]
+    state_store._MEMORY_STORE.clear()
+
+
+def test_shared_policy(monkeypatch):
+    monkeypatch.setenv(rate_limit.RATE_LIMITS_ENV_VAR, json.dumps({
+        "/comment": {"ratePerSecond": 2, "burst": 2, "shared": True},
+    }))
+    rate_limit.reset_policies()
+    assert isinstance(get_endpoint_policy(URL).bucket, SharedTokenBucket)
+    assert not isinstance(get_endpoint_policy("https://example.com/api").bucket, SharedTokenBucket)
+
+
+def test_token_bucket_rate_adapts():
+    bucket = TokenBucket(rate_per_second=10, burst=2)
+    bucket.on_throttled()
+    assert bucket.rate == 5
+    for _ in range(10):
+        bucket.on_throttled()
+    # Down to a tenth of the configured rate
+    assert bucket.rate == 1
+    bucket.on_success()
+    assert bucket.rate == 2
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+
+def test_throttled_request_waits_for_retry_after(sleeps):
+    pytest.importorskip("requests")
+    throttled = FakeResponse(429, {"Retry-After": "2"})
+    response = send_responses("POST", [throttled, FakeResponse(201)])
+
+    assert response.status_code == 201
+    assert throttled.is_closed
+    assert sleeps == [2.0]
+    assert rate_limit.get_metrics()["/comment"]["Throttled"] >= 1
+
+
+def test_retry_after_is_capped(sleeps):
+    pytest.importorskip("requests")
+    send_responses("POST", [FakeResponse(429, {"Retry-After": "120"}), FakeResponse(201)])
+    assert sleeps == [5.0]
+
+
+def test_throttled_request_backs_off_without_retry_after(sleeps, monkeypatch):
+    pytest.importorskip("requests")
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: high)
+    send_responses("POST", [FakeResponse(429), FakeResponse(429), FakeResponse(201)])
+    policy = get_endpoint_policy(URL)
+    assert sleeps == [policy.base_delay_seconds * 2, policy.base_delay_seconds * 4]
+
+
+def test_last_response_is_returned_once_the_attempts_are_used_up(sleeps):
+    pytest.importorskip("requests")
+    response = send_responses("GET", [FakeResponse(503), FakeResponse(503), FakeResponse(503), FakeResponse(200)])
+    assert response.status_code == 503
+    assert len(sleeps) == 2
+
+
+def test_server_errors_are_only_retried_for_idempotent_methods(sleeps):
+    pytest.importorskip("requests")
+    assert send_responses("GET", [FakeResponse(502), FakeResponse(200)]).status_code == 200
+    assert send_responses("POST", [FakeResponse(502), FakeResponse(201)]).status_code == 502
+    assert len(sleeps) == 1
+
+
+def test_connection_errors_are_only_retried_for_idempotent_methods(sleeps):
+    requests = pytest.importorskip("requests")
+    assert send_responses("GET", [requests.exceptions.ConnectionError(), FakeResponse(200)]).status_code == 200
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        send_responses("POST", [requests.exceptions.ConnectionError(), FakeResponse(201)])
+
+    with pytest.raises(requests.exceptions.Timeout):
+        send_responses("GET", [requests.exceptions.Timeout()] * 3)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the run payload cache and its invalidation
+"""
+
+# Standard imports
+from copy import deepcopy
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import run_payload_cache, state_store
+from sash_tools.run_payload_cache import RunPayloadCache, get_input_fingerprint
+
+# Globals
+PORTAL_RUN_ID = "20250101abcd1234"
+PAYLOAD = {
+    "version": "2025.08.05",
+    "data": {
+        "inputs": {"groupId": "SBJ00001"},
+        "engineParameters": {"outputUri": "s3://analysis-bucket/sash/20250101abcd1234/"},
+        "tags": {"libraryId": "L2400001"},
+    },
+}
+READY_EVENT_DETAIL = {
+    "orcabusId": "wfr.01J0000000000000000000000",
+    "portalRunId": PORTAL_RUN_ID,
+    "workflowRunName": "umccr--automated--sash--0-7-0--20250101abcd1234",
+    "workflow": {"name": "sash", "version": "0.7.0"},
+    "status": "READY",
+    "timestamp": "2025-01-01T00:00:00Z",
+    "libraries": [{"libraryId": "L2400001", "orcabusId": "lib.01J0000000000000000000000"}],
+    "payload": PAYLOAD,
+}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(state_store, "time", lambda: now[0])
+    return now
+
+
+def get_payload_with(**data_updates):
+    payload = deepcopy(PAYLOAD)
+    payload["data"].update(data_updates)
+    return payload
+
+
+def test_fingerprint_ignores_the_fields_set_after_ready():
+    payload = get_payload_with(outputs={"sashRelPath": "SBJ00001/"})
+    payload["data"]["engineParameters"]["analysisId"] = "00000000-0000-0000-0000-000000000000"
+    assert get_input_fingerprint(payload) == get_input_fingerprint(PAYLOAD)
+
+    assert get_input_fingerprint(get_payload_with(inputs={"groupId": "SBJ00002"})) != get_input_fingerprint(PAYLOAD)
+    assert get_input_fingerprint({**PAYLOAD, "version": "2025.09.01"}) != get_input_fingerprint(PAYLOAD)
+
+
+def test_cached_run_of_the_ready_event():
+    cache = RunPayloadCache()
+    assert cache.get(PORTAL_RUN_ID) is None
+    assert cache.put_from_event_detail(READY_EVENT_DETAIL)
+
+    assert cache.get(PORTAL_RUN_ID) == {
+        "workflowRun": {
+            "orcabusId": READY_EVENT_DETAIL["orcabusId"],
+            "portalRunId": PORTAL_RUN_ID,
+            "workflow": READY_EVENT_DETAIL["workflow"],
+            "workflowRunName": READY_EVENT_DETAIL["workflowRunName"],
+            "libraries": READY_EVENT_DETAIL["libraries"],
+        },
+        "payload": PAYLOAD,
+    }
+
+
+def test_cached_run_expires(clock):
+    cache = RunPayloadCache(ttl_seconds=60)
+    cache.put_from_event_detail(READY_EVENT_DETAIL)
+    clock[0] += 59
+    assert cache.get(PORTAL_RUN_ID) is not None
+    clock[0] += 2
+    assert cache.get(PORTAL_RUN_ID) is None
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = RunPayloadCache(ttl_seconds=0)
+    assert not cache.put_from_event_detail(READY_EVENT_DETAIL)
+    assert cache.get(PORTAL_RUN_ID) is None
+
+
+def test_large_payload_is_not_cached(monkeypatch):
+    monkeypatch.setattr(run_payload_cache, "MAX_CACHED_PAYLOAD_BYTES", 64)
+    cache = RunPayloadCache()
+    assert not cache.put_from_event_detail(READY_EVENT_DETAIL)
+    assert cache.get(PORTAL_RUN_ID) is None
+
+
+def test_fields_set_after_ready_do_not_invalidate():
+    cache = RunPayloadCache()
+    cache.put_from_event_detail(READY_EVENT_DETAIL)
+
+    # The service's own RUNNING and SUCCEEDED events
+    payload = get_payload_with(outputs={"sashRelPath": "SBJ00001/"})
+    payload["data"]["engineParameters"]["analysisId"] = "00000000-0000-0000-0000-000000000000"
+    assert not cache.invalidate_if_changed(PORTAL_RUN_ID, PAYLOAD)
+    assert not cache.invalidate_if_changed(PORTAL_RUN_ID, payload)
+    assert cache.get(PORTAL_RUN_ID)["payload"] == PAYLOAD
+
+
+def test_changed_payload_invalidates():
+    cache = RunPayloadCache()
+    cache.put_from_event_detail(READY_EVENT_DETAIL)
+
+    assert cache.invalidate_if_changed(PORTAL_RUN_ID, get_payload_with(tags={"libraryId": "L2400002"}))
+    assert cache.get(PORTAL_RUN_ID) is None
+    # Nothing left to invalidate
+    assert not cache.invalidate_if_changed(PORTAL_RUN_ID, get_payload_with(tags={"libraryId": "L2400003"}))
+
+
+def test_invalidate():
+    cache = RunPayloadCache()
+    cache.put_from_event_detail(READY_EVENT_DETAIL)
+    cache.invalidate(PORTAL_RUN_ID)
+    assert cache.get(PORTAL_RUN_ID) is None
+    # No-op on a missing run
+    cache.invalidate(PORTAL_RUN_ID)
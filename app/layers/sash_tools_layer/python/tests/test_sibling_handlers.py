@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the lazy sibling handler imports
+"""
+
+# Standard imports
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools.sibling_handlers import SiblingHandlers
+
+LAMBDA_NAMES = ["sibling_handlers_test_echo", "sibling_handlers_test_router"]
+
+
+@pytest.fixture
+def lambdas_dir(tmp_path):
+    for lambda_name in LAMBDA_NAMES:
+        lambda_dir = tmp_path / f"{lambda_name}_py"
+        lambda_dir.mkdir()
+        (lambda_dir / f"{lambda_name}.py").write_text(
+            f"IMPORT_COUNT = 1\n\ndef handler(event, context):\n    return {{'lambdaName': '{lambda_name}', **event}}\n"
+        )
+    # Not lambda dirs
+    (tmp_path / "layers").mkdir()
+    (tmp_path / "empty_py").mkdir()
+    (tmp_path / "conftest.py").write_text("")
+    yield tmp_path
+    for lambda_name in LAMBDA_NAMES:
+        sys.modules.pop(lambda_name, None)
+        if str(tmp_path / f"{lambda_name}_py") in sys.path:
+            sys.path.remove(str(tmp_path / f"{lambda_name}_py"))
+
+
+def test_lambda_names(lambdas_dir):
+    assert SiblingHandlers(lambdas_dir).get_lambda_names() == LAMBDA_NAMES
+    assert SiblingHandlers(
+        lambdas_dir, excluded_lambda_names=["sibling_handlers_test_router"]
+    ).get_lambda_names() == ["sibling_handlers_test_echo"]
+
+
+def test_get_handler_module(lambdas_dir):
+    sibling_handlers = SiblingHandlers(lambdas_dir)
+    handler_module = sibling_handlers.get_handler_module("sibling_handlers_test_echo")
+    assert handler_module.handler({"a": 1}, None) == {"lambdaName": "sibling_handlers_test_echo", "a": 1}
+
+
+def test_handler_modules_are_imported_once(lambdas_dir):
+    sibling_handlers = SiblingHandlers(lambdas_dir)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        handler_modules = list(executor.map(
+            lambda _: sibling_handlers.get_handler_module("sibling_handlers_test_echo"), range(8)
+        ))
+    assert all(map(lambda handler_module_iter_: handler_module_iter_ is handler_modules[0], handler_modules))
+    assert sys.path.count(str(lambdas_dir / "sibling_handlers_test_echo_py")) == 1
+
+
+def test_unknown_lambda(lambdas_dir):
+    sibling_handlers = SiblingHandlers(lambdas_dir, excluded_lambda_names=["sibling_handlers_test_router"])
+    with pytest.raises(ValueError, match="Unknown lambda"):
+        sibling_handlers.get_handler_module("sibling_handlers_test_router")
+    with pytest.raises(ValueError, match="Unknown lambda"):
+        sibling_handlers.get_handler_module("empty")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the state store backends and the backend selection
+"""
+
+# Standard imports
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import state_store
+from sash_tools.state_store import (
+    DynamoDbStateStore,
+    LocalFileStateStore,
+    MemoryStateStore,
+    get_seconds_from_env,
+    get_state_store,
+)
+
+
+class FakeDynamoDbClient:
+    """
+    The get_item, put_item (with the version conditions) and delete_item calls of a DynamoDB client, over a dictionary
+    """
+    class exceptions:
+        class ConditionalCheckFailedException(Exception):
+            pass
+
+    def __init__(self):
+        self.items: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    @staticmethod
+    def _get_item_key(table_name: str, key: Dict[str, Dict[str, str]]) -> Tuple[str, str, str]:
+        return (
+            table_name,
+            key[state_store.PARTITION_KEY_ATTRIBUTE]["S"],
+            key[state_store.SORT_KEY_ATTRIBUTE]["S"],
+        )
+
+    def get_item(self, TableName: str, Key: Dict[str, Any], ConsistentRead: bool = False) -> Dict[str, Any]:
+        item = self.items.get(self._get_item_key(TableName, Key))
+        return {"Item": item} if item is not None else {}
+
+    def put_item(
+            self,
+            TableName: str,
+            Item: Dict[str, Any],
+            ConditionExpression: Optional[str] = None,
+            ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+            ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+    ):
+        existing_item = self.items.get(self._get_item_key(TableName, Item)) or {}
+        if ConditionExpression is not None:
+            assert ExpressionAttributeNames == {"#version": state_store.VERSION_ATTRIBUTE}
+            existing_version = existing_item.get(state_store.VERSION_ATTRIBUTE)
+            if ConditionExpression == "attribute_not_exists(#version)":
+                is_met = existing_version is None
+            else:
+                assert ConditionExpression == "#version = :version"
+                is_met = existing_version == ExpressionAttributeValues[":version"]
+            if not is_met:
+                raise self.exceptions.ConditionalCheckFailedException()
+        self.items[self._get_item_key(TableName, Item)] = Item
+
+    def delete_item(self, TableName: str, Key: Dict[str, Any]):
+        self.items.pop(self._get_item_key(TableName, Key), None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(state_store, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=["memory", "local", "dynamodb"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStateStore("test")
+    if request.param == "local":
+        return LocalFileStateStore("test", root_dir=tmp_path)
+    dynamodb_store = DynamoDbStateStore("test", table_name="sash-state")
+    dynamodb_store._client = FakeDynamoDbClient()
+    return dynamodb_store
+
+
+def test_get_missing_key(store):
+    assert store.get("missing") is None
+
+
+def test_put_get_delete(store):
+    store.put("a/key with spaces", {"fingerprint": "abc", "count": 1, "nested": {"list": [1, 2]}})
+    assert store.get("a/key with spaces") == {"fingerprint": "abc", "count": 1, "nested": {"list": [1, 2]}}
+
+    store.delete("a/key with spaces")
+    assert store.get("a/key with spaces") is None
+    # No-op on a missing key
+    store.delete("a/key with spaces")
+
+
+def test_put_overwrites(store):
+    store.put("key", {"value": 1})
+    store.put("key", {"value": 2})
+    assert store.get("key") == {"value": 2}
+
+
+def test_expired_value_is_not_returned(store, clock):
+    store.put("key", {"value": 1}, ttl_seconds=60)
+    clock[0] += 59
+    assert store.get("key") == {"value": 1}
+    clock[0] += 2
+    assert store.get("key") is None
+
+
+def test_missing_key_is_version_zero(store):
+    assert store.get_with_version("missing") == (None, 0)
+
+
+def test_put_if_version(store):
+    assert store.put_if_version("key", {"value": 1}, 0)
+    assert store.get_with_version("key") == ({"value": 1}, 1)
+    assert store.get("key") == {"value": 1}
+
+    assert store.put_if_version("key", {"value": 2}, 1)
+    assert store.get_with_version("key") == ({"value": 2}, 2)
+
+
+def test_put_if_version_after_a_concurrent_write(store):
+    _, version = store.get_with_version("key")
+    assert store.put_if_version("key", {"writer": "first"}, version)
+    # The second writer read the same version, nothing is written
+    assert not store.put_if_version("key", {"writer": "second"}, version)
+    assert store.get_with_version("key") == ({"writer": "first"}, 1)
+    # Nor with a version ahead of the stored version
+    assert not store.put_if_version("key", {"writer": "second"}, 5)
+
+
+def test_expired_value_keeps_its_version(store, clock):
+    assert store.put_if_version("key", {"value": 1}, 0, ttl_seconds=60)
+    clock[0] += 61
+    assert store.get_with_version("key") == (None, 1)
+    assert not store.put_if_version("key", {"value": 2}, 0)
+    assert store.put_if_version("key", {"value": 2}, 1)
+
+
+def test_put_and_delete_drop_the_version(store):
+    assert store.put_if_version("key", {"value": 1}, 0)
+    store.put("key", {"value": 2})
+    assert store.get_with_version("key") == ({"value": 2}, 0)
+    assert not store.put_if_version("key", {"value": 3}, 1)
+
+    assert store.put_if_version("key", {"value": 3}, 0)
+    store.delete("key")
+    assert store.get_with_version("key") == (None, 0)
+
+
+def test_concurrent_conditional_writes():
+    store = MemoryStateStore("test")
+    barrier = threading.Barrier(8, timeout=5)
+    results = []
+
+    def _write(writer: int):
+        _, version = store.get_with_version("key")
+        barrier.wait()
+        results.append(store.put_if_version("key", {"writer": writer}, version))
+
+    threads = [threading.Thread(target=_write, args=(writer,)) for writer in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # All read version 0, one write wins
+    assert results.count(True) == 1
+    assert store.get_with_version("key")[1] == 1
+
+
+def test_namespaces_are_separate(tmp_path):
+    LocalFileStateStore("one", root_dir=tmp_path).put("key", {"value": 1})
+    assert LocalFileStateStore("two", root_dir=tmp_path).get("key") is None
+
+    MemoryStateStore("one").put("key", {"value": 1})
+    assert MemoryStateStore("two").get("key") is None
+
+
+def test_memory_store_returns_copies():
+    store = MemoryStateStore("test")
+    value = {"list": [1]}
+    store.put("key", value)
+    value["list"].append(2)
+    store.get("key")["list"].append(3)
+    assert store.get("key") == {"list": [1]}
+
+
+def test_dynamodb_item_layout():
+    store = DynamoDbStateStore("test", table_name="sash-state")
+    store._client = FakeDynamoDbClient()
+    store.put("key", {"value": 1}, ttl_seconds=60)
+
+    item = store._client.items[("sash-state", "test", "key")]
+    assert item[state_store.VALUE_ATTRIBUTE] == {"S": '{"value": 1}'}
+    # Epoch seconds, as DynamoDB ttl expects
+    assert item[state_store.EXPIRES_AT_ATTRIBUTE]["N"].isdigit()
+    assert state_store.VERSION_ATTRIBUTE not in item
+
+    store.put_if_version("versioned", {"value": 1}, 0)
+    store.put_if_version("versioned", {"value": 2}, 1)
+    assert store._client.items[("sash-state", "test", "versioned")][state_store.VERSION_ATTRIBUTE] == {"N": "2"}
+
+
+@pytest.mark.parametrize(
+    "env, expected_type",
+    [
+        ({}, MemoryStateStore),
+        ({"STATE_TABLE_NAME": "sash-state"}, DynamoDbStateStore),
+        ({"STATE_TABLE_NAME": "sash-state", "STATE_STORE_BACKEND": "memory"}, MemoryStateStore),
+        ({"STATE_STORE_BACKEND": "local"}, LocalFileStateStore),
+    ]
+)
+def test_get_state_store_backend(monkeypatch, env, expected_type):
+    monkeypatch.delenv("STATE_STORE_BACKEND", raising=False)
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    assert isinstance(get_state_store("test"), expected_type)
+
+
+def test_get_state_store_unknown_backend(monkeypatch):
+    monkeypatch.setenv("STATE_STORE_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        get_state_store("test")
+
+
+def test_get_seconds_from_env(monkeypatch):
+    monkeypatch.delenv("TEST_TTL_SECONDS", raising=False)
+    assert get_seconds_from_env(None, "TEST_TTL_SECONDS", 60) == 60.0
+    monkeypatch.setenv("TEST_TTL_SECONDS", "30")
+    assert get_seconds_from_env(None, "TEST_TTL_SECONDS", 60) == 30.0
+    # Set per instance, i.e. in tests
+    assert get_seconds_from_env(0, "TEST_TTL_SECONDS", 60) == 0
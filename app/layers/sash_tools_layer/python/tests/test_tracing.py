@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the handler and client spans
+"""
+
+# Standard imports
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import tracing
+from sash_tools.orcabus_client import run_concurrently
+from sash_tools.tracing import (
+    CLIENT_SPAN_KIND,
+    HANDLER_SPAN_KIND,
+    SpanExporter,
+    get_current_span,
+    set_trace_tags,
+    start_span,
+    trace_handler,
+)
+
+
+class ListSpanExporter(SpanExporter):
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def export(self, record: Dict[str, Any]):
+        self.records.append(record)
+
+
+@pytest.fixture
+def spans() -> List[Dict[str, Any]]:
+    exporter = ListSpanExporter()
+    tracing.set_exporter(exporter)
+    yield exporter.records
+    tracing.set_exporter(None)
+
+
+@pytest.fixture(autouse=True)
+def no_keep_alive(monkeypatch):
+    from sash_tools import orcabus_client
+    monkeypatch.setattr(orcabus_client, "enable_keep_alive", lambda: None)
+
+
+def test_handler_span_is_tagged_from_the_event(spans):
+    @trace_handler
+    def handler(event, context):
+        with start_span("GET workflow", kind=CLIENT_SPAN_KIND, statusCode=200):
+            set_trace_tags(workflowRunId="wfr.01J")
+        return "done"
+
+    event = {"executionArn": "arn:aws:states:execution:sash:1", "portalRunId": "20250101abcd1234", "other": "x"}
+    assert handler(event, SimpleNamespace(aws_request_id="req-1")) == "done"
+
+    client_span, handler_span = spans
+    assert handler_span["kind"] == HANDLER_SPAN_KIND
+    assert handler_span["name"] == __name__
+    assert handler_span["parentSpanId"] is None
+    assert handler_span["attributes"] == {"coldStart": True, "requestId": "req-1"}
+    assert handler_span["executionArn"] == "arn:aws:states:execution:sash:1"
+    assert "other" not in handler_span
+
+    # Child spans share the trace and inherit the tags
+    assert client_span["traceId"] == handler_span["traceId"]
+    assert client_span["parentSpanId"] == handler_span["spanId"]
+    assert client_span["portalRunId"] == "20250101abcd1234"
+    assert client_span["workflowRunId"] == "wfr.01J"
+    assert client_span["attributes"] == {"statusCode": 200}
+
+    # Only the first invocation is a cold start, each invocation is its own trace
+    handler({}, None)
+    assert spans[-1]["attributes"] == {"coldStart": False}
+    assert spans[-1]["traceId"] != handler_span["traceId"]
+
+
+def test_failed_span_records_the_error(spans):
+    @trace_handler
+    def handler(event, context):
+        raise ValueError("Unknown action")
+
+    with pytest.raises(ValueError):
+        handler({}, None)
+    assert spans[0]["status"] == "ERROR"
+    assert spans[0]["error"] == "ValueError: Unknown action"
+    assert get_current_span() is None
+
+
+def test_thread_pool_calls_keep_the_parent_span(spans):
+    def _call(value: int) -> int:
+        with start_span(f"call {value}", kind=CLIENT_SPAN_KIND):
+            return value
+
+    with start_span("handler", kind=HANDLER_SPAN_KIND) as handler_span:
+        assert run_concurrently(_call, [1, 2, 3]) == [1, 2, 3]
+
+    client_spans = list(filter(lambda span_iter_: span_iter_["kind"] == CLIENT_SPAN_KIND, spans))
+    assert len(client_spans) == 3
+    assert all(map(lambda span_iter_: span_iter_["parentSpanId"] == handler_span.span_id, client_spans))
+
+
+def test_file_exporter(tmp_path, monkeypatch):
+    trace_path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv(tracing.TRACE_EXPORTER_ENV_VAR, "file")
+    monkeypatch.setenv(tracing.TRACE_FILE_PATH_ENV_VAR, str(trace_path))
+    tracing.set_exporter(None)
+    try:
+        with start_span("one"):
+            pass
+        with start_span("two"):
+            pass
+    finally:
+        tracing.set_exporter(None)
+
+    assert list(map(lambda line_iter_: json.loads(line_iter_)["name"], trace_path.read_text().splitlines())) == [
+        "one", "two"
+    ]
+
+
+def test_unknown_exporter(monkeypatch):
+    monkeypatch.setenv(tracing.TRACE_EXPORTER_ENV_VAR, "zipkin")
+    tracing.set_exporter(None)
+    try:
+        with pytest.raises(ValueError):
+            tracing.get_exporter()
+    finally:
+        tracing.set_exporter(None)
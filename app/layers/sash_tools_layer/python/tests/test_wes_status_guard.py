@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the ICAv2 WES status guard, its transitions and the claims of concurrent executions
+"""
+
+# Standard imports
+import threading
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import state_store, wes_status_guard
+from sash_tools.state_store import MemoryStateStore
+from sash_tools.wes_status_guard import (
+    DUPLICATE_DROP_REASON,
+    REGRESSIVE_DROP_REASON,
+    Icav2WesStatusClaimPendingError,
+    WesStatusGuard,
+    get_drop_reason,
+)
+
+# Globals
+PORTAL_RUN_ID = "20250101abcd1234"
+ANALYSIS_ID = "00000000-0000-0000-0000-000000000001"
+EXECUTION_ARN = "arn:aws:states:local:000000000000:execution:icav2WesEventToWrscEvent:{}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(wes_status_guard.time, "time", lambda: now[0])
+    monkeypatch.setattr(state_store, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def guard(clock) -> WesStatusGuard:
+    return WesStatusGuard(claim_ttl_seconds=900)
+
+
+def process(guard: WesStatusGuard, status: str, execution: str, analysis_id: str = ANALYSIS_ID):
+    """
+    Claim and accept an event, as an execution that pushes its WRSC event would
+    """
+    drop_reason = guard.claim(PORTAL_RUN_ID, status, analysis_id, EXECUTION_ARN.format(execution))
+    if drop_reason is None:
+        assert guard.accept(PORTAL_RUN_ID, EXECUTION_ARN.format(execution))
+    return drop_reason
+
+
+@pytest.mark.parametrize(
+    "last_status, status, expected_drop_reason",
+    [
+        ("RUNNING", "RUNNING", DUPLICATE_DROP_REASON),
+        ("RUNNING", "QUEUED", REGRESSIVE_DROP_REASON),
+        ("SUCCEEDED", "RUNNING", REGRESSIVE_DROP_REASON),
+        # Terminal statuses share the last rank
+        ("SUCCEEDED", "FAILED", REGRESSIVE_DROP_REASON),
+        ("QUEUED", "RUNNING", None),
+        ("RUNNING", "SUCCEEDED", None),
+        # Unranked statuses are accepted
+        ("RUNNING", "PAUSED", None),
+    ]
+)
+def test_drop_reason(last_status, status, expected_drop_reason):
+    assert get_drop_reason({"status": last_status, "analysisId": ANALYSIS_ID}, status, ANALYSIS_ID) == expected_drop_reason
+
+
+def test_first_event_is_accepted():
+    assert get_drop_reason(None, "RUNNING", ANALYSIS_ID) is None
+
+
+def test_event_of_another_analysis_is_accepted():
+    assert get_drop_reason({"status": "SUCCEEDED", "analysisId": ANALYSIS_ID}, "RUNNING", "another-analysis") is None
+
+
+def test_transitions(guard):
+    assert process(guard, "QUEUED", "1") is None
+    assert process(guard, "RUNNING", "2") is None
+    assert process(guard, "RUNNING", "3") == DUPLICATE_DROP_REASON
+    assert process(guard, "QUEUED", "4") == REGRESSIVE_DROP_REASON
+    assert process(guard, "SUCCEEDED", "5") is None
+    assert process(guard, "RUNNING", "6") == REGRESSIVE_DROP_REASON
+    # A resubmitted run
+    assert process(guard, "RUNNING", "7", analysis_id="another-analysis") is None
+
+    entry = guard.store.get(PORTAL_RUN_ID)
+    assert (entry["status"], entry["analysisId"], entry["claim"]) == ("RUNNING", "another-analysis", None)
+    assert wes_status_guard.get_drop_counts()[DUPLICATE_DROP_REASON] >= 1
+
+
+def test_status_is_not_accepted_until_the_claim_is_accepted(guard):
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("1")) is None
+    assert guard.store.get(PORTAL_RUN_ID).get("status") is None
+
+    # A duplicate delivery waits on the claim, rather than being dropped or converted
+    with pytest.raises(Icav2WesStatusClaimPendingError):
+        guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("2"))
+
+    assert guard.accept(PORTAL_RUN_ID, EXECUTION_ARN.format("1"))
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("2")) == DUPLICATE_DROP_REASON
+
+
+def test_event_behind_the_accepted_status_is_dropped_while_the_run_is_claimed(guard):
+    assert process(guard, "SUCCEEDED", "1") is None
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", "another-analysis", EXECUTION_ARN.format("2")) is None
+    assert guard.claim(PORTAL_RUN_ID, "SUCCEEDED", ANALYSIS_ID, EXECUTION_ARN.format("3")) == DUPLICATE_DROP_REASON
+
+
+def test_retry_of_the_claiming_execution(guard):
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("1")) is None
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("1")) is None
+
+    assert guard.accept(PORTAL_RUN_ID, EXECUTION_ARN.format("1"))
+    # A retry of the accept
+    assert guard.accept(PORTAL_RUN_ID, EXECUTION_ARN.format("1"))
+    assert guard.store.get(PORTAL_RUN_ID)["status"] == "RUNNING"
+
+
+def test_released_claim_is_claimed_again(guard):
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("1")) is None
+    # Not released by another execution
+    assert not guard.release(PORTAL_RUN_ID, EXECUTION_ARN.format("2"))
+    assert guard.release(PORTAL_RUN_ID, EXECUTION_ARN.format("1"))
+
+    # The redelivered event is converted, not taken for a duplicate
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("2")) is None
+    # The released execution can no longer record its status
+    assert not guard.accept(PORTAL_RUN_ID, EXECUTION_ARN.format("1"))
+    assert guard.accept(PORTAL_RUN_ID, EXECUTION_ARN.format("2"))
+
+
+def test_release_keeps_the_accepted_status(guard):
+    assert process(guard, "RUNNING", "1") is None
+    assert guard.claim(PORTAL_RUN_ID, "SUCCEEDED", ANALYSIS_ID, EXECUTION_ARN.format("2")) is None
+    assert guard.release(PORTAL_RUN_ID, EXECUTION_ARN.format("2"))
+
+    entry = guard.store.get(PORTAL_RUN_ID)
+    assert (entry["status"], entry["executionArn"], entry["claim"]) == ("RUNNING", EXECUTION_ARN.format("1"), None)
+
+
+def test_expired_claim_is_taken_over(guard, clock):
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("1")) is None
+    clock[0] += 899
+    with pytest.raises(Icav2WesStatusClaimPendingError):
+        guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("2"))
+
+    clock[0] += 2
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("2")) is None
+    assert not guard.accept(PORTAL_RUN_ID, EXECUTION_ARN.format("1"))
+
+
+def test_conflicting_writes_are_retried(guard, monkeypatch):
+    conflicts = [True, True]
+    put_if_version = guard.store.put_if_version
+
+    def _put_if_version(*args, **kwargs):
+        if conflicts:
+            conflicts.pop()
+            return False
+        return put_if_version(*args, **kwargs)
+
+    monkeypatch.setattr(guard.store, "put_if_version", _put_if_version)
+    assert guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format("1")) is None
+
+    # Left to the state machine retry once the attempts are used up
+    monkeypatch.setattr(guard.store, "put_if_version", lambda *args, **kwargs: False)
+    with pytest.raises(Icav2WesStatusClaimPendingError):
+        guard.accept(PORTAL_RUN_ID, EXECUTION_ARN.format("1"))
+
+
+def test_concurrent_duplicates_are_claimed_once(clock):
+    barrier = threading.Barrier(8, timeout=5)
+    results = []
+
+    def _claim(execution: int):
+        guard = WesStatusGuard(store=MemoryStateStore(wes_status_guard.WES_STATUS_GUARD_NAMESPACE))
+        barrier.wait()
+        try:
+            results.append(guard.claim(PORTAL_RUN_ID, "RUNNING", ANALYSIS_ID, EXECUTION_ARN.format(execution)))
+        except Icav2WesStatusClaimPendingError:
+            results.append("pending")
+
+    threads = [threading.Thread(target=_claim, args=(execution,)) for execution in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(None) == 1
+    assert results.count("pending") == 7
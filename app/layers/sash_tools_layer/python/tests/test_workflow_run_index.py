@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the workflow run index backends, backfills and event updates
+"""
+
+# Standard imports
+from typing import Any, Dict, List, Optional
+
+# Test imports
+import pytest
+
+# Layer imports
+from sash_tools import workflow_run_index
+from sash_tools.negative_cache import get_lookup
+from sash_tools.state_store import EXPIRES_AT_ATTRIBUTE, PARTITION_KEY_ATTRIBUTE, SORT_KEY_ATTRIBUTE
+from sash_tools.workflow_run_index import (
+    RUN_TTL_MULTIPLIER,
+    STATE_TIMESTAMP_ATTRIBUTE,
+    DynamoDbWorkflowRunIndex,
+    SqliteWorkflowRunIndex,
+    get_workflow_run_from_event_detail,
+    get_workflow_run_index,
+)
+
+# Globals
+WORKFLOW_NAME = "dragen-wgts-dna"
+
+
+class FakeDynamoDbClient:
+    """
+    The query and (state timestamp conditional) put_item calls of a DynamoDB client, over a dictionary
+    """
+    class exceptions:
+        class ConditionalCheckFailedException(Exception):
+            pass
+
+    def __init__(self, page_size: int = 2):
+        self.items: Dict[tuple, Dict[str, Any]] = {}
+        self.page_size = page_size
+
+    def query(self, TableName: str, ExpressionAttributeValues: Dict[str, Any], ExclusiveStartKey=None, **kwargs):
+        partition = ExpressionAttributeValues[":namespace"]["S"]
+        items = sorted(
+            (item for (table_name, namespace, _), item in self.items.items() if (table_name, namespace) == (TableName, partition)),
+            key=lambda item_iter_: item_iter_[SORT_KEY_ATTRIBUTE]["S"]
+        )
+        start = ExclusiveStartKey["index"] if ExclusiveStartKey else 0
+        response = {"Items": items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            response["LastEvaluatedKey"] = {"index": start + self.page_size}
+        return response
+
+    def put_item(self, TableName: str, Item: Dict[str, Any], ConditionExpression: Optional[str] = None, **kwargs):
+        key = (TableName, Item[PARTITION_KEY_ATTRIBUTE]["S"], Item[SORT_KEY_ATTRIBUTE]["S"])
+        existing_item = self.items.get(key)
+        if (
+            ConditionExpression is not None and existing_item is not None and
+            float(existing_item[STATE_TIMESTAMP_ATTRIBUTE]["N"]) > float(Item[STATE_TIMESTAMP_ATTRIBUTE]["N"])
+        ):
+            raise self.exceptions.ConditionalCheckFailedException()
+        self.items[key] = Item
+
+
+def get_workflow_run(
+        orcabus_id: str,
+        status: str,
+        timestamp: Optional[str],
+        library_ids: List[str],
+        workflow_name: str = WORKFLOW_NAME,
+        rgids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    return {
+        "orcabusId": orcabus_id,
+        "portalRunId": f"2025{orcabus_id[-4:]}",
+        "workflow": {"name": workflow_name, "version": "4.4.4"},
+        "analysisRun": None,
+        "currentState": {"status": status, "timestamp": timestamp},
+        "libraries": list(map(
+            lambda library_id_iter_: {
+                "libraryId": library_id_iter_,
+                "readsets": list(map(lambda rgid_iter_: {"rgid": rgid_iter_}, rgids or [])),
+            },
+            library_ids
+        )),
+    }
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(workflow_run_index, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=["sqlite", "dynamodb"])
+def index(request, clock):
+    if request.param == "sqlite":
+        return SqliteWorkflowRunIndex(":memory:", ttl_seconds=600)
+    dynamodb_index = DynamoDbWorkflowRunIndex("sash-state", ttl_seconds=600)
+    dynamodb_index._client = FakeDynamoDbClient()
+    return dynamodb_index
+
+
+def test_lookup_is_not_answered_before_a_backfill(index):
+    index.put_run(get_workflow_run("wfr.0001", "SUCCEEDED", "2025-01-01T00:00:00Z", ["L1"]))
+    assert index.find_runs(get_lookup(WORKFLOW_NAME, ["L1"])) is None
+
+
+def test_backfilled_lookup_is_answered_from_the_index(index):
+    lookup = get_lookup(WORKFLOW_NAME, ["L1", "L2"])
+    run = get_workflow_run("wfr.0001", "SUCCEEDED", "2025-01-01T00:00:00Z", ["L1", "L2"])
+    index.backfill(lookup, [run])
+    assert index.find_runs(lookup) == [run]
+    # Lookups with other criteria are backfilled separately
+    assert index.find_runs(get_lookup(WORKFLOW_NAME, ["L1"])) is None
+
+    # Empty backfills are answered too
+    empty_lookup = get_lookup(WORKFLOW_NAME, ["L3"])
+    index.backfill(empty_lookup, [])
+    assert index.find_runs(empty_lookup) == []
+
+
+def test_backfill_expires(index, clock):
+    lookup = get_lookup(WORKFLOW_NAME, ["L1"])
+    index.backfill(lookup, [])
+    clock[0] += 599
+    assert index.find_runs(lookup) == []
+    clock[0] += 2
+    assert index.find_runs(lookup) is None
+
+
+def test_events_update_the_backfilled_runs(index):
+    lookup = get_lookup(WORKFLOW_NAME, ["L1"])
+    index.backfill(lookup, [get_workflow_run("wfr.0001", "RUNNING", "2025-01-01T00:00:00Z", ["L1"])])
+
+    # A new run, and the next state of the backfilled run
+    new_run = get_workflow_run("wfr.0002", "DRAFT", "2025-01-01T01:00:00Z", ["L1"])
+    succeeded_run = get_workflow_run("wfr.0001", "SUCCEEDED", "2025-01-01T02:00:00Z", ["L1"])
+    assert index.put_run(new_run)
+    assert index.put_run(succeeded_run)
+
+    assert sorted(index.find_runs(lookup), key=lambda run_iter_: run_iter_["orcabusId"]) == [succeeded_run, new_run]
+
+
+def test_late_events_do_not_roll_back_a_status(index):
+    lookup = get_lookup(WORKFLOW_NAME, ["L1"])
+    succeeded_run = get_workflow_run("wfr.0001", "SUCCEEDED", "2025-01-01T02:00:00Z", ["L1"])
+    index.backfill(lookup, [succeeded_run])
+
+    assert not index.put_run(get_workflow_run("wfr.0001", "RUNNING", "2025-01-01T00:00:00Z", ["L1"]))
+    # Nor a stale backfill
+    index.backfill(lookup, [get_workflow_run("wfr.0001", "READY", "2025-01-01T01:00:00Z", ["L1"])])
+    assert index.find_runs(lookup) == [succeeded_run]
+
+    # Same timestamp, the event wins
+    resolved_run = get_workflow_run("wfr.0001", "RESOLVED", "2025-01-01T02:00:00Z", ["L1"])
+    assert index.put_run(resolved_run)
+    assert index.find_runs(lookup) == [resolved_run]
+
+
+def test_runs_are_filtered_as_the_workflow_manager_would(index):
+    lookup = get_lookup(WORKFLOW_NAME, ["L1"], rgid_list=["RG1"])
+    runs = [
+        get_workflow_run("wfr.0001", "SUCCEEDED", "2025-01-01T00:00:00Z", ["L1"], rgids=["RG1", "RG2"]),
+        get_workflow_run("wfr.0002", "SUCCEEDED", "2025-01-01T00:00:00Z", ["L1"], rgids=["RG3"]),
+    ]
+    index.backfill(lookup, runs)
+    # An event for another workflow of the same library
+    index.put_run(get_workflow_run("wfr.0004", "SUCCEEDED", "2025-01-01T00:00:00Z", ["L1"], workflow_name="sash"))
+
+    assert list(map(lambda run_iter_: run_iter_["orcabusId"], index.find_runs(lookup))) == ["wfr.0001"]
+
+
+def test_runs_without_readsets_make_an_rgid_lookup_cold(index):
+    lookup = get_lookup(WORKFLOW_NAME, ["L1"], rgid_list=["RG1"])
+    index.backfill(lookup, [])
+    # Indexed from an event without readsets
+    index.put_run(get_workflow_run("wfr.0001", "SUCCEEDED", "2025-01-01T00:00:00Z", ["L1"]))
+    assert index.find_runs(lookup) is None
+    # Lookups without an rgid filter are still answered
+    rgid_free_lookup = get_lookup(WORKFLOW_NAME, ["L1"])
+    index.backfill(rgid_free_lookup, [])
+    assert len(index.find_runs(rgid_free_lookup)) == 1
+
+    # The backfill from the Workflow Manager has the readsets
+    workflow_run = get_workflow_run("wfr.0001", "SUCCEEDED", "2025-01-01T00:00:00Z", ["L1"], rgids=["RG1"])
+    index.backfill(lookup, [workflow_run])
+    assert index.find_runs(lookup) == [workflow_run]
+
+
+def test_run_items_expire_after_the_backfills(clock):
+    index = DynamoDbWorkflowRunIndex("sash-state", ttl_seconds=600)
+    index._client = FakeDynamoDbClient()
+    index.put_run(get_workflow_run("wfr.0001", "SUCCEEDED", "2025-01-01T00:00:00Z", ["L1", "L2"]))
+    assert len(index._client.items) == 2
+    assert all(map(
+        lambda item_iter_: int(item_iter_[EXPIRES_AT_ATTRIBUTE]["N"]) == int(clock[0] + 600 * RUN_TTL_MULTIPLIER),
+        index._client.items.values()
+    ))
+
+
+def test_lookups_without_libraries_are_not_indexed(index):
+    lookup = get_lookup(WORKFLOW_NAME, analysis_run_id="anr.01J")
+    index.backfill(lookup, [])
+    assert index.find_runs(lookup) is None
+
+
+def test_zero_ttl_disables_the_index(clock):
+    index = SqliteWorkflowRunIndex(":memory:", ttl_seconds=0)
+    lookup = get_lookup(WORKFLOW_NAME, ["L1"])
+    index.backfill(lookup, [])
+    assert index.find_runs(lookup) is None
+
+
+def test_workflow_run_from_event_detail():
+    workflow_run = get_workflow_run_from_event_detail({
+        "orcabusId": "wfr.0001",
+        "portalRunId": "20250001",
+        "workflow": {"name": WORKFLOW_NAME, "version": "4.4.4"},
+        "status": "SUCCEEDED",
+        "timestamp": "2025-01-01T00:00:00Z",
+    })
+    assert workflow_run["currentState"] == {"status": "SUCCEEDED", "timestamp": "2025-01-01T00:00:00Z"}
+    assert workflow_run["libraries"] == []
+    assert workflow_run_index.get_state_timestamp(workflow_run) == 1735689600.0
+    assert workflow_run_index.get_state_timestamp({"currentState": {"status": "DRAFT"}}) == 0
+
+
+def test_get_workflow_run_index_backend(monkeypatch):
+    monkeypatch.setattr(workflow_run_index, "_WORKFLOW_RUN_INDEXES", {})
+    monkeypatch.delenv("WORKFLOW_RUN_INDEX_BACKEND", raising=False)
+    assert isinstance(get_workflow_run_index(), SqliteWorkflowRunIndex)
+    # Kept for the life of the container
+    assert get_workflow_run_index() is get_workflow_run_index()
+
+    monkeypatch.setenv("STATE_TABLE_NAME", "sash-state")
+    assert isinstance(get_workflow_run_index(), DynamoDbWorkflowRunIndex)
+
+    monkeypatch.setenv("WORKFLOW_RUN_INDEX_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        get_workflow_run_index()
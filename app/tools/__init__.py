@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+
+"""
+Local development tools for the sash pipeline manager lambdas and state machines.
+
+Run from the app directory, i.e.
+
+    cd app && python3 -m tools.<tool_name> --help
+
+Tools are standard library only and are not deployed.
+"""
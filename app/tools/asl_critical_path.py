@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+
+"""
+Static critical path and parallelism analysis of the state machine templates.
+
+Each template is parsed into a graph of states, Choice states branching to every choice and the default.
+The critical path is the longest chain of states from StartAt to an end state, weighted by
+a latency estimate for each Task state
+* a Parallel state costs its slowest branch
+* a Map state costs its item processor times ceil(items / MaxConcurrency), items set by --map-items
+* a Wait state costs its Seconds, or --wait-seconds where Seconds is a JSONata expression (or a Timestamp)
+* Pass, Choice and Succeed states cost --state-ms (a state transition)
+
+Task latency estimates are looked up by state name, then by snake case lambda name, and otherwise
+default to --lambda-ms for lambda invoke tasks and --sdk-ms for SDK integrations.
+The --latencies file is either a json object of name to milliseconds, or a tools.asl_executor report,
+in which case the median duration of each state is used.
+
+Sequential Task pairs (a Task followed by the next Task, through any Pass and Choice states) are
+flagged as independent when the second Task does not read anything the first produced, directly
+or through the states in between (its assigned variables and its output), the states in between don't
+branch on it, and neither Task assigns a variable the other uses. Independent pairs could run in a
+Parallel state. Variables are found by name in the JSONata expressions, so the check is conservative
+where a variable is reassigned under the same name.
+
+Dataflow does not capture the ordering of side effects (i.e. a status is only recorded once its event
+is pushed), so a Task with side effects is an ordering barrier and is never part of an independent pair.
+Side effects are events:putEvents tasks, and the lambdas granted state table or claim check bucket access
+in the lambdaRequirementsMap of the infrastructure (comment ledger, cache, index and claim check writers),
+so a new lambda is a barrier as soon as it is given access.
+
+The report is json with sorted keys, so reports for two versions of the templates can be diffed.
+
+Usage:
+    cd app && python3 -m tools.asl_critical_path [populate_draft_data ...] [--latencies latencies.json] [--output-json report.json]
+"""
+
+# Standard imports
+import argparse
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+# Local imports
+from .paths import LAMBDA_INTERFACES_PATH, STEP_FUNCTIONS_TEMPLATES_DIR
+
+# Globals
+TEMPLATE_SUFFIX = "_sfn_template.asl.json"
+LAMBDA_INVOKE_RESOURCE = "arn:aws:states:::lambda:invoke"
+LAMBDA_FUNCTION_ARN_SUBSTITUTION_PREFIX = "${__"
+LAMBDA_FUNCTION_ARN_SUBSTITUTION_SUFFIX = "_lambda_function_arn__}"
+
+# Tasks whose order against the tasks around them matters, beyond dataflow
+SIDE_EFFECT_RESOURCES = {
+    "arn:aws:states:::events:putEvents",
+}
+SIDE_EFFECT_LAMBDA_REQUIREMENTS = [
+    "needsStateTableAccess",
+    "needsClaimCheckBucketAccess",
+]
+LAMBDA_REQUIREMENTS_MAP_NAME = "lambdaRequirementsMap"
+# One entry of the lambdaRequirementsMap, i.e. '  comparePayload: {\n    needsStateTableAccess: true,\n  },'
+LAMBDA_REQUIREMENTS_REGEX = re.compile(r"^  (\w+): \{\n(.*?)^  \},?$", re.MULTILINE | re.DOTALL)
+
+DEFAULT_LAMBDA_MS = 500.0
+DEFAULT_SDK_MS = 50.0
+DEFAULT_STATE_MS = 0.0
+DEFAULT_MAP_ITEMS = 1
+DEFAULT_WAIT_SECONDS = 60.0
+
+# JSONata variable references, not function calls, $states is the state context
+VARIABLE_REGEX = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)\b(?!\s*\()")
+STATES_INPUT_REGEX = re.compile(r"\$states\.input\b")
+STATES_VARIABLE = "states"
+# Stands in for the output of a state, read by the next state as $states.input
+OUTPUT_MARKER = "$states.input"
+
+
+@dataclass
+class PathStep:
+    state: str
+    type: str
+    estimate_ms: float
+    lambda_name: Optional[str] = None
+    iterations: int = 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "type": self.type,
+            "estimateMs": self.estimate_ms,
+            **({"lambdaName": self.lambda_name} if self.lambda_name is not None else {}),
+            **({"iterations": self.iterations} if self.iterations != 1 else {}),
+        }
+
+
+@dataclass
+class LatencyModel:
+    latencies_ms: Dict[str, float] = field(default_factory=dict)
+    lambda_ms: float = DEFAULT_LAMBDA_MS
+    sdk_ms: float = DEFAULT_SDK_MS
+    state_ms: float = DEFAULT_STATE_MS
+    map_items: int = DEFAULT_MAP_ITEMS
+    wait_seconds: float = DEFAULT_WAIT_SECONDS
+
+    def get_wait_estimate_ms(self, state: Dict[str, Any]) -> float:
+        # JSONata templates have no SecondsPath, the wait is either a number or an expression
+        if isinstance(state.get("Seconds"), (int, float)):
+            return state["Seconds"] * 1000.0
+        return self.wait_seconds * 1000.0
+
+    def get_task_estimate_ms(self, state_name: str, state: Dict[str, Any]) -> float:
+        if state_name in self.latencies_ms:
+            return self.latencies_ms[state_name]
+        lambda_name = get_lambda_name(state)
+        if lambda_name is not None:
+            return self.latencies_ms.get(lambda_name, self.lambda_ms)
+        return self.sdk_ms
+
+
+def get_lambda_name(state: Dict[str, Any]) -> Optional[str]:
+    function_name = state.get("Arguments", {}).get("FunctionName", "")
+    if (
+        state.get("Resource") == LAMBDA_INVOKE_RESOURCE and
+        function_name.startswith(LAMBDA_FUNCTION_ARN_SUBSTITUTION_PREFIX) and
+        function_name.endswith(LAMBDA_FUNCTION_ARN_SUBSTITUTION_SUFFIX)
+    ):
+        return function_name[len(LAMBDA_FUNCTION_ARN_SUBSTITUTION_PREFIX):-len(LAMBDA_FUNCTION_ARN_SUBSTITUTION_SUFFIX)]
+    return None
+
+
+def camel_case_to_snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)([A-Z])", r"_\1", name).lower()
+
+
+@lru_cache(maxsize=None)
+def get_side_effect_lambda_names(interfaces_path: Path = LAMBDA_INTERFACES_PATH) -> FrozenSet[str]:
+    """
+    Get the snake case names of the lambdas that write to the state table or the claim check bucket,
+    from their requirement flags in the lambdaRequirementsMap
+    :param interfaces_path:
+    :return:
+    """
+    interfaces_text = interfaces_path.read_text()
+    requirements_map_text = interfaces_text[interfaces_text.index(LAMBDA_REQUIREMENTS_MAP_NAME):]
+    return frozenset(map(
+        lambda match_iter_: camel_case_to_snake_case(match_iter_.group(1)),
+        filter(
+            lambda match_iter_: any(map(
+                lambda requirement_iter_: re.search(rf"\b{requirement_iter_}: true\b", match_iter_.group(2)) is not None,
+                SIDE_EFFECT_LAMBDA_REQUIREMENTS
+            )),
+            LAMBDA_REQUIREMENTS_REGEX.finditer(requirements_map_text)
+        )
+    ))
+
+
+def has_side_effects(state: Dict[str, Any]) -> bool:
+    return (
+        state.get("Resource") in SIDE_EFFECT_RESOURCES or
+        get_lambda_name(state) in get_side_effect_lambda_names()
+    )
+
+
+def get_next_state_names(state: Dict[str, Any]) -> List[str]:
+    if state["Type"] == "Choice":
+        return list(dict.fromkeys(
+            list(map(lambda choice_iter_: choice_iter_["Next"], state["Choices"])) +
+            ([state["Default"]] if "Default" in state else [])
+        ))
+    if state["Type"] in ["Succeed", "Fail"] or state.get("End", False):
+        return []
+    return [state["Next"]]
+
+
+def read_latencies(latencies_path: Path) -> Dict[str, float]:
+    latencies = json.loads(latencies_path.read_text())
+    # A tools.asl_executor report
+    if isinstance(latencies.get("states"), dict):
+        return {
+            state_name: state_report["medianMs"]
+            for state_name, state_report in latencies["states"].items()
+        }
+    return {name: float(latency_ms) for name, latency_ms in latencies.items()}
+
+
+# Critical path
+def get_critical_path(
+        states_definition: Dict[str, Any],
+        latency_model: LatencyModel,
+        scope: str = "",
+) -> Tuple[float, List[PathStep]]:
+    """
+    Get the slowest path from StartAt to an end state, as the estimated duration and the states on it
+    Nested states are named by their enclosing states, i.e. 'Get inputs/branch 2/Get dragen dirs'
+    """
+    states = states_definition["States"]
+    memo: Dict[str, Tuple[float, List[PathStep]]] = {}
+    visiting: Set[str] = set()
+
+    def _get_state_steps(state_name: str) -> Tuple[float, List[PathStep]]:
+        state = states[state_name]
+        qualified_name = f"{scope}{state_name}"
+
+        if state["Type"] == "Task":
+            estimate_ms = latency_model.get_task_estimate_ms(state_name, state)
+            return estimate_ms, [PathStep(qualified_name, "Task", estimate_ms, get_lambda_name(state))]
+
+        if state["Type"] == "Parallel":
+            branch_paths = list(map(
+                lambda branch_iter_: get_critical_path(
+                    branch_iter_[1], latency_model, f"{qualified_name}/branch {branch_iter_[0] + 1}/"
+                ),
+                enumerate(state["Branches"])
+            ))
+            branch_ms, branch_steps = max(branch_paths, key=lambda branch_path_iter_: branch_path_iter_[0])
+            return (
+                latency_model.state_ms + branch_ms,
+                [PathStep(qualified_name, "Parallel", latency_model.state_ms), *branch_steps]
+            )
+
+        if state["Type"] == "Map":
+            iterations = math.ceil(latency_model.map_items / (state.get("MaxConcurrency", 0) or latency_model.map_items))
+            item_ms, item_steps = get_critical_path(state["ItemProcessor"], latency_model, f"{qualified_name}/item/")
+            for step in item_steps:
+                step.iterations *= iterations
+            return (
+                latency_model.state_ms + item_ms * iterations,
+                [PathStep(qualified_name, "Map", latency_model.state_ms), *item_steps]
+            )
+
+        if state["Type"] == "Wait":
+            estimate_ms = latency_model.get_wait_estimate_ms(state)
+            return estimate_ms, [PathStep(qualified_name, "Wait", estimate_ms)]
+
+        return latency_model.state_ms, [PathStep(qualified_name, state["Type"], latency_model.state_ms)]
+
+    def _get_longest_path(state_name: str) -> Tuple[float, List[PathStep]]:
+        if state_name in memo:
+            return memo[state_name]
+        if state_name in visiting:
+            raise ValueError(f"Loop through '{scope}{state_name}', the critical path is unbounded")
+        visiting.add(state_name)
+
+        state_ms, state_steps = _get_state_steps(state_name)
+        next_ms, next_steps = max(
+            map(_get_longest_path, get_next_state_names(states[state_name])),
+            key=lambda path_iter_: path_iter_[0],
+            default=(0.0, [])
+        )
+
+        visiting.remove(state_name)
+        memo[state_name] = (state_ms + next_ms, state_steps + next_steps)
+        return memo[state_name]
+
+    return _get_longest_path(states_definition["StartAt"])
+
+
+# Data dependencies
+def get_variable_references(value: Any) -> Set[str]:
+    """
+    Get the variables a state field reads, $states.input is returned as OUTPUT_MARKER
+    """
+    value_str = json.dumps(value)
+    references = set(filter(
+        lambda variable_iter_: variable_iter_ != STATES_VARIABLE,
+        VARIABLE_REGEX.findall(value_str)
+    ))
+    if STATES_INPUT_REGEX.search(value_str):
+        references.add(OUTPUT_MARKER)
+    return references
+
+
+def get_state_reads(state: Dict[str, Any]) -> Set[str]:
+    # Everything a state evaluates, including its Assign and Output
+    return get_variable_references({
+        key: value
+        for key, value in state.items()
+        if key in ["Arguments", "Items", "ItemSelector", "Choices", "Assign", "Output", "Branches", "ItemProcessor"]
+    })
+
+
+def get_state_writes(state: Dict[str, Any]) -> Set[str]:
+    writes = set(state.get("Assign", {}).keys())
+    for choice in state.get("Choices", []):
+        writes.update(choice.get("Assign", {}).keys())
+    return writes
+
+
+def iter_sequential_task_paths(states: Dict[str, Any]) -> Iterator[Tuple[str, List[str], str]]:
+    """
+    Yield (task, states in between, next task) for each path from a Task to the next Task,
+    through Pass and Choice states only. Parallel and Map states end a path
+    """
+    for state_name, state in states.items():
+        if state["Type"] != "Task":
+            continue
+
+        def _iter_paths(next_state_name: str, between: List[str]) -> Iterator[Tuple[str, List[str], str]]:
+            if next_state_name in between:
+                return
+            next_state = states[next_state_name]
+            if next_state["Type"] == "Task":
+                yield state_name, between, next_state_name
+            elif next_state["Type"] in ["Pass", "Choice"]:
+                for following_state_name in get_next_state_names(next_state):
+                    yield from _iter_paths(following_state_name, between + [next_state_name])
+
+        for next_state_name in get_next_state_names(state):
+            yield from _iter_paths(next_state_name, [])
+
+
+def is_data_dependent(states: Dict[str, Any], task_name: str, between: List[str], next_task_name: str) -> bool:
+    """
+    Whether the next task reads (or branches on) anything the task produced, along this path
+    """
+    task, next_task = states[task_name], states[next_task_name]
+    produced = get_state_writes(task) | {OUTPUT_MARKER}
+
+    for state_name in between:
+        state = states[state_name]
+        reads = get_state_reads(state)
+        if state["Type"] == "Choice" and get_variable_references(state["Choices"]) & produced:
+            return True
+        if reads & produced:
+            produced |= get_state_writes(state)
+        # A state without an Output passes its input on
+        if "Output" in state and not (get_variable_references(state["Output"]) & produced):
+            produced.discard(OUTPUT_MARKER)
+
+    return bool(
+        (get_state_reads(next_task) & produced) or
+        # Write conflicts, the tasks can't be reordered or overlapped
+        (get_state_writes(next_task) & (get_state_reads(task) | get_state_writes(task)))
+    )
+
+
+def get_independent_task_pairs(states_definition: Dict[str, Any], scope: str = "") -> List[Dict[str, Any]]:
+    states = states_definition["States"]
+
+    paths_by_pair: Dict[Tuple[str, str], List[List[str]]] = {}
+    for task_name, between, next_task_name in iter_sequential_task_paths(states):
+        paths_by_pair.setdefault((task_name, next_task_name), []).append(between)
+
+    independent_task_pairs = [
+        {
+            "task": f"{scope}{task_name}",
+            "nextTask": f"{scope}{next_task_name}",
+            "between": sorted(set(f"{scope}{name}" for between in paths for name in between)),
+        }
+        for (task_name, next_task_name), paths in sorted(paths_by_pair.items())
+        if not (
+            has_side_effects(states[task_name]) or
+            has_side_effects(states[next_task_name]) or
+            any(map(lambda between_iter_: is_data_dependent(states, task_name, between_iter_, next_task_name), paths))
+        )
+    ]
+
+    for state_name, state in states.items():
+        for branch_index, branch in enumerate(state.get("Branches", [])):
+            independent_task_pairs.extend(
+                get_independent_task_pairs(branch, f"{scope}{state_name}/branch {branch_index + 1}/")
+            )
+        if "ItemProcessor" in state:
+            independent_task_pairs.extend(
+                get_independent_task_pairs(state["ItemProcessor"], f"{scope}{state_name}/item/")
+            )
+
+    return independent_task_pairs
+
+
+def get_state_counts(states_definition: Dict[str, Any]) -> Dict[str, int]:
+    state_counts: Dict[str, int] = {}
+
+    def _count(states: Dict[str, Any]):
+        for state in states.values():
+            state_counts[state["Type"]] = state_counts.get(state["Type"], 0) + 1
+            for branch in state.get("Branches", []):
+                _count(branch["States"])
+            if "ItemProcessor" in state:
+                _count(state["ItemProcessor"]["States"])
+
+    _count(states_definition["States"])
+    return state_counts
+
+
+def analyse_template(template_path: Path, latency_model: LatencyModel) -> Dict[str, Any]:
+    definition = json.loads(template_path.read_text())
+    critical_path_ms, critical_path = get_critical_path(definition, latency_model)
+    critical_path_tasks = list(filter(lambda step_iter_: step_iter_.type == "Task", critical_path))
+    state_counts = get_state_counts(definition)
+
+    return {
+        "stateCounts": state_counts,
+        "predictedDurationMs": critical_path_ms,
+        "criticalPathTaskCount": sum(map(lambda step_iter_: step_iter_.iterations, critical_path_tasks)),
+        "criticalPath": list(map(lambda step_iter_: step_iter_.to_dict(), critical_path)),
+        # Summed estimate of the tasks on the critical path, the rest of predictedDurationMs is waits and state transitions
+        "sequentialTaskMs": sum(map(lambda step_iter_: step_iter_.estimate_ms * step_iter_.iterations, critical_path_tasks)),
+        "independentSequentialTasks": get_independent_task_pairs(definition),
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Critical path and parallelism analysis of the state machine templates")
+    parser.add_argument("state_machine_names", nargs="*", help="Snake case state machine names, defaults to all templates")
+    parser.add_argument("--latencies", type=Path, help="Json of state or lambda name to ms, or a tools.asl_executor report")
+    parser.add_argument("--lambda-ms", type=float, default=DEFAULT_LAMBDA_MS, help="Default lambda task estimate")
+    parser.add_argument("--sdk-ms", type=float, default=DEFAULT_SDK_MS, help="Default SDK integration task estimate")
+    parser.add_argument("--state-ms", type=float, default=DEFAULT_STATE_MS, help="Estimate for every other state")
+    parser.add_argument("--map-items", type=int, default=DEFAULT_MAP_ITEMS, help="Number of items for each Map state")
+    parser.add_argument(
+        "--wait-seconds", type=float, default=DEFAULT_WAIT_SECONDS,
+        help="Estimate for Wait states whose Seconds is a JSONata expression"
+    )
+    parser.add_argument("--output-json", type=Path, help="Write the report to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    latency_model = LatencyModel(
+        latencies_ms=read_latencies(args.latencies) if args.latencies is not None else {},
+        lambda_ms=args.lambda_ms,
+        sdk_ms=args.sdk_ms,
+        state_ms=args.state_ms,
+        map_items=args.map_items,
+        wait_seconds=args.wait_seconds,
+    )
+
+    template_paths = (
+        list(map(lambda name_iter_: STEP_FUNCTIONS_TEMPLATES_DIR / f"{name_iter_}{TEMPLATE_SUFFIX}", args.state_machine_names))
+        if args.state_machine_names
+        else sorted(STEP_FUNCTIONS_TEMPLATES_DIR.glob(f"*{TEMPLATE_SUFFIX}"))
+    )
+
+    report = {
+        template_path_iter_.name[:-len(TEMPLATE_SUFFIX)]: analyse_template(template_path_iter_, latency_model)
+        for template_path_iter_ in template_paths
+    }
+
+    for state_machine_name, template_report in report.items():
+        print(
+            f"{state_machine_name}: predicted {template_report['predictedDurationMs']:.0f} ms, "
+            f"{template_report['criticalPathTaskCount']} tasks on the critical path, "
+            f"{len(template_report['independentSequentialTasks'])} independent sequential task pairs"
+        )
+        for step in template_report["criticalPath"]:
+            if step["type"] in ["Task", "Wait"]:
+                print(f"    {step['estimateMs'] * step.get('iterations', 1):>8.0f} ms  {step['state']}")
+        for task_pair in template_report["independentSequentialTasks"]:
+            print(f"    independent: '{task_pair['task']}' -> '{task_pair['nextTask']}'")
+
+    if args.output_json is not None:
+        args.output_json.write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+
+"""
+Local, in-process executor for the state machine templates in app/step-functions-templates.
+
+Supports the subset of ASL the templates use
+* JSONata query language, with Arguments / Output / Assign / Condition / Items expressions and variables
+* Pass, Choice, Wait (without the wait), Succeed and Fail states
+* Task states for lambda:invoke, aws-sdk:ssm:getParameter and events:putEvents
+* Parallel branches and Map item processors, run on threads, with variable scoping as per Step Functions
+* Retry (without the wait) and Catch
+
+Lambda tasks are bound to the python handlers in app/lambdas, SDK tasks to stand-ins
+(SSM parameters from a dictionary, put events recorded on the execution).
+With the default --stand-ins module (tools.local_stand_ins) the handlers run against an in-memory
+OrcaBus fixture, so no AWS or OrcaBus access is needed. Use --no-stand-ins along with --extra-path
+to run the handlers against the real services instead.
+
+Each execution records, per state, the number of entries and the time spent in the state,
+and the number of transitions between each pair of states. Use --repeats to benchmark a template,
+and --output-json to write the report, i.e. to compare template changes.
+
+JSONata expressions are evaluated with the jsonata-python package (see tools/requirements.txt).
+
+Usage:
+    cd app && python3 -m tools.asl_executor populate_draft_data [--input detail.json] [--repeats 10] [--output-json report.json]
+"""
+
+# Standard imports
+import argparse
+import json
+import logging
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from importlib import import_module
+from pathlib import Path
+from statistics import median
+from threading import Lock
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Local imports
+from .paths import SASH_TOOLS_LAYER_DIR, STEP_FUNCTIONS_TEMPLATES_DIR, get_lambda_dirs
+
+# Globals
+DEFAULT_STAND_INS_MODULE = "tools.local_stand_ins"
+TEMPLATE_SUFFIX = "_sfn_template.asl.json"
+
+LAMBDA_INVOKE_RESOURCE = "arn:aws:states:::lambda:invoke"
+SSM_GET_PARAMETER_RESOURCE = "arn:aws:states:::aws-sdk:ssm:getParameter"
+EVENTS_PUT_EVENTS_RESOURCE = "arn:aws:states:::events:putEvents"
+LOCAL_LAMBDA_ARN_PREFIX = "arn:aws:lambda:local:000000000000:function:"
+LAMBDA_FUNCTION_ARN_SUBSTITUTION_SUFFIX = "_lambda_function_arn__"
+
+# Mirrors the definition substitutions in infrastructure/stage/step-functions/index.ts
+DEFAULT_SUBSTITUTIONS = {
+    "__dragen_wgts_dna_workflow_name__": "dragen-wgts-dna",
+    "__oncoanalyser_wgts_dna_workflow_name__": "oncoanalyser-wgts-dna",
+    "__sash_workflow_name__": "sash",
+    "__succeeded_status__": "SUCCEEDED",
+    "__draft_status__": "DRAFT",
+    "__event_bus_name__": "OrcaBusMain",
+    "__workflow_run_update_event_detail_type__": "WorkflowRunUpdate",
+    "__icav2_wes_request_detail_type__": "Icav2WesRequest",
+    "__stack_source__": "orcabus.sash",
+    "__ready_event_status__": "READY",
+    "__draft_event_status__": "DRAFT",
+    "__default_payload_version__": "2025.08.05",
+    "__default_project_id_ssm_parameter_name__": "/orcabus/workflows/sash/icav2-project-id",
+    "__default_output_uri_prefix_ssm_parameter_name__": "/orcabus/workflows/sash/output-prefix",
+    "__default_logs_uri_prefix_ssm_parameter_name__": "/orcabus/workflows/sash/logs-prefix",
+    "__default_cache_uri_prefix_ssm_parameter_name__": "/orcabus/workflows/sash/cache-prefix",
+    "__workflow_id_to_pipeline_id_ssm_parameter_path_prefix__": "/orcabus/workflows/sash/pipeline-ids-by-workflow-version",
+    "__default_ref_data_path_ssm_parameter_prefix__": "/orcabus/workflows/sash/default-sash-reference-paths-by-workflow-version",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class StatesError(Exception):
+    """
+    A Step Functions error, with an error name (matched by Retry and Catch ErrorEquals) and a cause
+    """
+    def __init__(self, error: str, cause: str):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+@dataclass
+class ExecutionStats:
+    state_entries: Counter = field(default_factory=Counter)
+    state_durations_ms: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    transitions: Counter = field(default_factory=Counter)
+    retries: Counter = field(default_factory=Counter)
+    lambda_invocations: Counter = field(default_factory=Counter)
+    lock: Lock = field(default_factory=Lock)
+
+    def record_state(self, state_name: str, duration_ms: float, next_state_name: Optional[str]):
+        with self.lock:
+            self.state_entries[state_name] += 1
+            self.state_durations_ms[state_name].append(duration_ms)
+            if next_state_name is not None:
+                self.transitions[(state_name, next_state_name)] += 1
+
+    def merge(self, other: "ExecutionStats"):
+        with self.lock:
+            self.state_entries.update(other.state_entries)
+            for state_name, durations in other.state_durations_ms.items():
+                self.state_durations_ms[state_name].extend(durations)
+            self.transitions.update(other.transitions)
+            self.retries.update(other.retries)
+            self.lambda_invocations.update(other.lambda_invocations)
+
+
+@dataclass
+class ExecutionResult:
+    execution_id: str
+    status: str
+    output: Any
+    error: Optional[StatesError]
+    duration_ms: float
+    put_events: List[Dict[str, Any]]
+    stats: ExecutionStats
+
+
+# JSONata
+_COMPILED_EXPRESSIONS: Dict[str, Any] = {}
+_COMPILED_EXPRESSIONS_LOCK = Lock()
+_PUT_EVENTS_LOCK = Lock()
+
+
+def _get_jsonata():
+    try:
+        import jsonata
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError(
+            "The asl executor needs the jsonata-python package, pip install -r tools/requirements.txt"
+        )
+    return jsonata
+
+
+def _to_jsonata_value(value: Any) -> Any:
+    # jsonata-python treats None as undefined, json null must be passed as its null value
+    from jsonata.utils import Utils
+    if value is None:
+        return Utils.NULL_VALUE
+    if isinstance(value, dict):
+        return {key: _to_jsonata_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_jsonata_value(item) for item in value]
+    return value
+
+
+def _compile_expression(expression: str):
+    with _COMPILED_EXPRESSIONS_LOCK:
+        if expression not in _COMPILED_EXPRESSIONS:
+            compiled = _get_jsonata().Jsonata(expression)
+            # Step Functions jsonata extensions used by the templates
+            compiled.register_lambda("parse", lambda json_str: json.loads(json_str))
+            compiled.register_lambda("uuid", lambda: str(uuid.uuid4()))
+            _COMPILED_EXPRESSIONS[expression] = compiled
+        return _COMPILED_EXPRESSIONS[expression]
+
+
+def is_jsonata_template(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith("{%") and value.endswith("%}")
+
+
+def evaluate_template(value: Any, bindings: Dict[str, Any]) -> Any:
+    """
+    Evaluate the {% %} expressions in a value, at any depth
+    """
+    if is_jsonata_template(value):
+        return _compile_expression(value[2:-2].strip()).evaluate(None, bindings)
+    if isinstance(value, dict):
+        return {key: evaluate_template(item, bindings) for key, item in value.items()}
+    if isinstance(value, list):
+        return [evaluate_template(item, bindings) for item in value]
+    return value
+
+
+# Definitions
+def get_template_path(state_machine_name: str) -> Path:
+    return STEP_FUNCTIONS_TEMPLATES_DIR / f"{state_machine_name}{TEMPLATE_SUFFIX}"
+
+
+def load_definition(template_path: Path, substitutions: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Load a template, applying the definition substitutions as CDK does.
+    Lambda function arn substitutions are replaced with local arns named after the snake case lambda
+    """
+    substitutions = {**DEFAULT_SUBSTITUTIONS, **(substitutions or {})}
+    definition_str = template_path.read_text()
+
+    for lambda_name in get_lambda_dirs().keys():
+        substitution_key = f"__{lambda_name}{LAMBDA_FUNCTION_ARN_SUBSTITUTION_SUFFIX}"
+        substitutions.setdefault(substitution_key, f"{LOCAL_LAMBDA_ARN_PREFIX}{lambda_name}")
+
+    for key, value in substitutions.items():
+        # Values are substituted into json strings
+        definition_str = definition_str.replace("${" + key + "}", json.dumps(value)[1:-1])
+
+    return json.loads(definition_str)
+
+
+# Lambdas
+def load_lambda_handlers(
+        stand_ins: Optional[ModuleType],
+        extra_paths: Optional[List[Path]] = None
+) -> Dict[str, Callable]:
+    """
+    Get the handler for each lambda, importing the handler modules lazily on first invocation
+    """
+    sys.path[:0] = list(map(str, [SASH_TOOLS_LAYER_DIR, *(extra_paths or [])]))
+
+    if stand_ins is not None:
+        stand_ins.install()
+
+    lambda_handlers: Dict[str, Callable] = {}
+    handler_modules: Dict[str, ModuleType] = {}
+    import_lock = Lock()
+
+    def _get_lazy_handler(lambda_name: str, lambda_dir: Path) -> Callable:
+        def _handler(event, context):
+            with import_lock:
+                if lambda_name not in handler_modules:
+                    sys.path.append(str(lambda_dir))
+                    module = import_module(lambda_name)
+                    if stand_ins is not None and lambda_name in stand_ins.LAMBDA_MODULE_PATCHES:
+                        stand_ins.LAMBDA_MODULE_PATCHES[lambda_name](module)
+                    handler_modules[lambda_name] = module
+            return handler_modules[lambda_name].handler(event, context)
+        return _handler
+
+    for lambda_name, lambda_dir in get_lambda_dirs().items():
+        if stand_ins is not None and lambda_name in stand_ins.LAMBDA_STAND_INS:
+            lambda_handlers[lambda_name] = stand_ins.LAMBDA_STAND_INS[lambda_name]
+        else:
+            lambda_handlers[lambda_name] = _get_lazy_handler(lambda_name, lambda_dir)
+
+    return lambda_handlers
+
+
+class LocalStateMachineExecutor:
+    """
+    Runs a state machine definition in process
+    """
+    def __init__(
+            self,
+            definition: Dict[str, Any],
+            lambda_handlers: Dict[str, Callable],
+            ssm_parameters: Dict[str, str],
+            state_machine_name: str = "local",
+    ):
+        if definition.get("QueryLanguage") != "JSONata":
+            raise ValueError("Only JSONata state machines are supported")
+        self.definition = definition
+        self.lambda_handlers = lambda_handlers
+        self.ssm_parameters = ssm_parameters
+        self.state_machine_arn = f"arn:aws:states:local:000000000000:stateMachine:{state_machine_name}"
+
+    def start_execution(self, execution_input: Any) -> ExecutionResult:
+        execution_id = f"{self.state_machine_arn.replace(':stateMachine:', ':execution:')}:{uuid.uuid4()}"
+        context = {
+            "Execution": {
+                "Id": execution_id,
+                "Input": execution_input,
+                "StartTime": _get_timestamp(),
+                "Name": execution_id.rsplit(":", 1)[-1],
+            },
+            "StateMachine": {"Id": self.state_machine_arn},
+        }
+        stats = ExecutionStats()
+        put_events: List[Dict[str, Any]] = []
+
+        start = time.perf_counter()
+        try:
+            output = self._run_states(self.definition, deepcopy(execution_input), {}, context, stats, put_events)
+            status, error = "SUCCEEDED", None
+        except StatesError as e:
+            output, status, error = None, "FAILED", e
+
+        return ExecutionResult(
+            execution_id=execution_id,
+            status=status,
+            output=output,
+            error=error,
+            duration_ms=(time.perf_counter() - start) * 1000,
+            put_events=put_events,
+            stats=stats,
+        )
+
+    def _run_states(
+            self,
+            states_definition: Dict[str, Any],
+            state_input: Any,
+            variables: Dict[str, Any],
+            context: Dict[str, Any],
+            stats: ExecutionStats,
+            put_events: List[Dict[str, Any]],
+    ) -> Any:
+        """
+        Run the states of a definition, branch or item processor from StartAt to an end state
+        Variables are copied, so assignments are local to this scope, as in Step Functions
+        """
+        variables = dict(variables)
+        state_name = states_definition["StartAt"]
+
+        while True:
+            state = states_definition["States"][state_name]
+            state_context = {
+                **context,
+                "State": {"Name": state_name, "EnteredTime": _get_timestamp(), "RetryCount": 0},
+            }
+
+            start = time.perf_counter()
+            try:
+                next_state_name, state_output = self._run_state(
+                    state_name, state, state_input, variables, state_context, stats, put_events
+                )
+            except StatesError as e:
+                catcher = next(
+                    (
+                        catcher
+                        for catcher in state.get("Catch", [])
+                        if e.error in catcher["ErrorEquals"] or "States.ALL" in catcher["ErrorEquals"]
+                    ),
+                    None
+                )
+                if catcher is None:
+                    raise
+                error_output = {"Error": e.error, "Cause": e.cause}
+                next_state_name, state_output = catcher["Next"], self._apply_assign_and_output(
+                    catcher, state_input, error_output, variables,
+                    _to_jsonata_value({
+                        **variables,
+                        "states": {"input": state_input, "context": state_context, "errorOutput": error_output},
+                    })
+                )
+            stats.record_state(state_name, (time.perf_counter() - start) * 1000, next_state_name)
+
+            if next_state_name is None:
+                return state_output
+            state_name, state_input = next_state_name, state_output
+
+    def _run_state(
+            self,
+            state_name: str,
+            state: Dict[str, Any],
+            state_input: Any,
+            variables: Dict[str, Any],
+            context: Dict[str, Any],
+            stats: ExecutionStats,
+            put_events: List[Dict[str, Any]],
+    ) -> Tuple[Optional[str], Any]:
+        state_type = state["Type"]
+
+        def _get_bindings(**states_attributes) -> Dict[str, Any]:
+            return _to_jsonata_value({
+                **variables,
+                "states": {"input": state_input, "context": context, **states_attributes},
+            })
+
+        if state_type == "Choice":
+            for choice in state["Choices"]:
+                if evaluate_template(choice["Condition"], _get_bindings()) is True:
+                    return choice["Next"], self._apply_assign_and_output(
+                        choice, state_input, state_input, variables, _get_bindings()
+                    )
+            if "Default" not in state:
+                raise StatesError("States.NoChoiceMatched", f"No choice matched in '{state_name}'")
+            return state["Default"], self._apply_assign_and_output(state, state_input, state_input, variables, _get_bindings())
+
+        if state_type == "Fail":
+            raise StatesError(
+                evaluate_template(state.get("Error", "States.Fail"), _get_bindings()),
+                evaluate_template(state.get("Cause", state_name), _get_bindings())
+            )
+
+        if state_type in ["Pass", "Wait", "Succeed"]:
+            result = state_input
+        elif state_type == "Task":
+            result = self._run_task_with_retries(
+                state_name, state, evaluate_template(state.get("Arguments", {}), _get_bindings()), context, stats, put_events
+            )
+        elif state_type == "Parallel":
+            with ThreadPoolExecutor(max_workers=len(state["Branches"])) as executor:
+                result = list(executor.map(
+                    lambda branch_iter_: self._run_states(branch_iter_, state_input, variables, context, stats, put_events),
+                    state["Branches"]
+                ))
+        elif state_type == "Map":
+            items = evaluate_template(state.get("Items", "{% $states.input %}"), _get_bindings())
+            items = items if isinstance(items, list) else ([] if items is None else [items])
+            with ThreadPoolExecutor(max_workers=max(min(state.get("MaxConcurrency", 0) or len(items), 40), 1)) as executor:
+                result = list(executor.map(
+                    lambda item_iter_: self._run_states(
+                        state["ItemProcessor"], item_iter_[1], variables,
+                        {**context, "Map": {"Item": {"Index": item_iter_[0], "Value": item_iter_[1]}}},
+                        stats, put_events
+                    ),
+                    enumerate(items)
+                ))
+        else:
+            raise ValueError(f"Unsupported state type '{state_type}' in '{state_name}'")
+
+        output = self._apply_assign_and_output(
+            state, state_input, result, variables, _get_bindings(result=result)
+        )
+        if state_type == "Succeed" or state.get("End", False):
+            return None, output
+        return state["Next"], output
+
+    @staticmethod
+    def _apply_assign_and_output(
+            state: Dict[str, Any],
+            state_input: Any,
+            result: Any,
+            variables: Dict[str, Any],
+            bindings: Dict[str, Any],
+    ) -> Any:
+        # Assign and Output both see the variable values from before the assignment
+        output = evaluate_template(state["Output"], bindings) if "Output" in state else result
+        if "Assign" in state:
+            variables.update(evaluate_template(state["Assign"], bindings))
+        return output
+
+    def _run_task_with_retries(
+            self,
+            state_name: str,
+            state: Dict[str, Any],
+            arguments: Dict[str, Any],
+            context: Dict[str, Any],
+            stats: ExecutionStats,
+            put_events: List[Dict[str, Any]],
+    ) -> Any:
+        attempts: Counter = Counter()
+        while True:
+            try:
+                return self._run_task(state["Resource"], arguments, context, stats, put_events)
+            except StatesError as e:
+                retrier_index, retrier = next(
+                    (
+                        (index, retrier)
+                        for index, retrier in enumerate(state.get("Retry", []))
+                        if e.error in retrier["ErrorEquals"] or "States.ALL" in retrier["ErrorEquals"]
+                    ),
+                    (None, None)
+                )
+                if retrier is None or attempts[retrier_index] >= retrier.get("MaxAttempts", 3):
+                    raise
+                attempts[retrier_index] += 1
+                with stats.lock:
+                    stats.retries[state_name] += 1
+
+    def _run_task(
+            self,
+            resource: str,
+            arguments: Dict[str, Any],
+            context: Dict[str, Any],
+            stats: ExecutionStats,
+            put_events: List[Dict[str, Any]],
+    ) -> Any:
+        if resource == LAMBDA_INVOKE_RESOURCE:
+            function_name = arguments["FunctionName"]
+            if not function_name.startswith(LOCAL_LAMBDA_ARN_PREFIX):
+                raise ValueError(f"Lambda function '{function_name}' is not a template lambda")
+            lambda_name = function_name[len(LOCAL_LAMBDA_ARN_PREFIX):]
+            with stats.lock:
+                stats.lambda_invocations[lambda_name] += 1
+            try:
+                # Round trip through json, as the payload would be serialised
+                payload = self.lambda_handlers[lambda_name](
+                    json.loads(json.dumps(arguments.get("Payload", {}))), None
+                )
+            except Exception as e:
+                logger.debug(f"Lambda {lambda_name} failed", exc_info=True)
+                raise StatesError(type(e).__name__, str(e)) from e
+            return {
+                "ExecutedVersion": "$LATEST",
+                "Payload": json.loads(json.dumps(payload)),
+                "StatusCode": 200,
+            }
+
+        if resource == SSM_GET_PARAMETER_RESOURCE:
+            parameter_name = arguments["Name"]
+            if parameter_name not in self.ssm_parameters:
+                raise StatesError("Ssm.ParameterNotFoundException", f"Parameter {parameter_name} not found")
+            return {
+                "Parameter": {
+                    "Name": parameter_name,
+                    "Type": "String",
+                    "Value": self.ssm_parameters[parameter_name],
+                    "Version": 1,
+                }
+            }
+
+        if resource == EVENTS_PUT_EVENTS_RESOURCE:
+            entries = arguments["Entries"]
+            with _PUT_EVENTS_LOCK:
+                put_events.extend(deepcopy(entries))
+            return {
+                "Entries": [{"EventId": str(uuid.uuid4())} for _ in entries],
+                "FailedEntryCount": 0,
+            }
+
+        raise ValueError(f"Unsupported task resource '{resource}'")
+
+
+def _get_timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def get_report(state_machine_name: str, results: List[ExecutionResult]) -> Dict[str, Any]:
+    """
+    Summarise the executions, machine readable so template changes can be compared
+    """
+    stats = ExecutionStats()
+    for result in results:
+        stats.merge(result.stats)
+
+    return {
+        "stateMachineName": state_machine_name,
+        "executions": len(results),
+        "statuses": dict(Counter(map(lambda result_iter_: result_iter_.status, results))),
+        "durationMs": {
+            "median": median(map(lambda result_iter_: result_iter_.duration_ms, results)),
+            "max": max(map(lambda result_iter_: result_iter_.duration_ms, results)),
+        },
+        "stateTransitions": sum(stats.state_entries.values()) // len(results),
+        "states": {
+            state_name: {
+                "entries": stats.state_entries[state_name] // len(results),
+                "medianMs": median(durations),
+                "totalMs": sum(durations) / len(results),
+                "retries": stats.retries[state_name] // len(results),
+            }
+            for state_name, durations in sorted(stats.state_durations_ms.items())
+        },
+        "transitions": {
+            f"{from_state} -> {to_state}": count // len(results)
+            for (from_state, to_state), count in sorted(stats.transitions.items())
+        },
+        "lambdaInvocations": {
+            lambda_name: count // len(results)
+            for lambda_name, count in sorted(stats.lambda_invocations.items())
+        },
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Run a state machine template locally")
+    parser.add_argument("state_machine_name", help="Snake case state machine name, i.e. populate_draft_data")
+    parser.add_argument("--input", type=Path, help="State machine input (the event detail), defaults to the stand-ins sample input")
+    parser.add_argument("--template", type=Path, help="Template path, defaults to the template for the state machine name")
+    parser.add_argument("--substitutions", type=Path, help="Json file of extra definition substitutions")
+    parser.add_argument("--stand-ins", default=DEFAULT_STAND_INS_MODULE, help="Stand-ins module")
+    parser.add_argument("--no-stand-ins", action="store_true", help="Run the handlers against the real services")
+    parser.add_argument("--extra-path", action="append", type=Path, default=[], help="Extra sys.path entries, i.e. layer sources")
+    parser.add_argument("--ssm-parameters", type=Path, help="Json file of SSM parameter values, added to the stand-ins values")
+    parser.add_argument("--repeats", type=int, default=1, help="Number of executions")
+    parser.add_argument("--print-output", action="store_true", help="Print the output and put events of the last execution")
+    parser.add_argument("--output-json", type=Path, help="Write the report to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    stand_ins = None if args.no_stand_ins else import_module(args.stand_ins)
+
+    substitutions = {}
+    if args.substitutions is not None:
+        substitutions = json.loads(args.substitutions.read_text())
+
+    ssm_parameters = dict(getattr(stand_ins, "SSM_PARAMETERS", {}))
+    if args.ssm_parameters is not None:
+        ssm_parameters.update(json.loads(args.ssm_parameters.read_text()))
+
+    if args.input is not None:
+        execution_input = json.loads(args.input.read_text())
+    elif stand_ins is not None:
+        execution_input = stand_ins.get_sample_inputs()[args.state_machine_name]
+    else:
+        raise ValueError("--input is required with --no-stand-ins")
+
+    executor = LocalStateMachineExecutor(
+        definition=load_definition(args.template or get_template_path(args.state_machine_name), substitutions),
+        lambda_handlers=load_lambda_handlers(stand_ins, args.extra_path),
+        ssm_parameters=ssm_parameters,
+        state_machine_name=args.state_machine_name,
+    )
+
+    results = list(map(lambda _: executor.start_execution(execution_input), range(args.repeats)))
+    report = get_report(args.state_machine_name, results)
+
+    last_result = results[-1]
+    if last_result.error is not None:
+        print(f"Execution failed, {last_result.error}", file=sys.stderr)
+    if args.print_output:
+        print(json.dumps({"output": last_result.output, "putEvents": last_result.put_events}, indent=2))
+
+    print(f"{args.state_machine_name}: {report['executions']} executions {report['statuses']}, "
+          f"median {report['durationMs']['median']:.1f} ms, {report['stateTransitions']} state transitions")
+    print(f"{'state':<60} {'entries':>8} {'medianMs':>10} {'totalMs':>10} {'retries':>8}")
+    for state_name, state_report in sorted(report['states'].items(), key=lambda kv_iter_: -kv_iter_[1]['totalMs']):
+        print(
+            f"{state_name[:60]:<60} {state_report['entries']:>8} {state_report['medianMs']:>10.2f} "
+            f"{state_report['totalMs']:>10.2f} {state_report['retries']:>8}"
+        )
+
+    if args.output_json is not None:
+        args.output_json.write_text(json.dumps(report, indent=2))
+
+    sys.exit(0 if last_result.status == "SUCCEEDED" else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+
+"""
+Bulk reprocessing driver, generating new sash DRAFT WorkflowRunUpdate events for a cohort.
+
+When the reference data or the sash version changes, the drafts of a cohort are regenerated in one go,
+rather than injecting events one subject at a time. For each subject (a normal and optional tumor library)
+the driver reuses the lambda handlers of the glue state machine
+* find_latest_workflow - the latest sash run of the libraries (the template of the new draft),
+  and the latest SUCCEEDED dragen-wgts-dna and oncoanalyser-wgts-dna runs
+* get_dragen_outputs_from_portal_run_id, get_oncoanalyser_dir_from_portal_run_id - the upstream output directories
+* get_draft_payload, generate_wru_event_object_with_merged_data - the sash payload, merged with the upstream outputs
+The new draft gets a new portal run id, the --workflow-version if given, and the --drop-field fields removed
+(by default the per run engine parameters), so the populate draft data state machine fills them in again.
+
+Subjects are processed on --concurrency threads. Each finished subject is appended to the --checkpoint file
+(json lines), and subjects that already succeeded in the checkpoint are skipped, so an interrupted run resumes
+where it stopped. Failed subjects are retried on the next run. The events are written to --output (json lines),
+and put on the event bus with --put-events. Reports the throughput and the per subject latency.
+
+With the default --stand-ins module (tools.local_stand_ins) the handlers run against the in-memory OrcaBus fixture,
+use --synthetic-subjects to add subjects to the fixture and reprocess them, and --api-latency-ms to emulate
+the OrcaBus API latency. Use --no-stand-ins along with --extra-path to run against the real services.
+
+The cohort is a csv (subjectId, normalLibraryId, tumorLibraryId columns) or a json list of objects with the same keys.
+
+Usage:
+    cd app && python3 -m tools.cohort_reprocessing [--cohort cohort.csv] [--synthetic-subjects 200] \\
+        [--concurrency 8] [--checkpoint checkpoint.jsonl] [--output events.jsonl]
+"""
+
+# Standard imports
+import argparse
+import csv
+import json
+import logging
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from importlib import import_module
+from pathlib import Path
+from statistics import median, quantiles
+from typing import Any, Callable, Dict, List, Optional
+
+# Local imports
+from .asl_executor import DEFAULT_STAND_INS_MODULE, DEFAULT_SUBSTITUTIONS, load_lambda_handlers
+
+# Globals
+SASH_WORKFLOW_NAME = DEFAULT_SUBSTITUTIONS["__sash_workflow_name__"]
+DRAGEN_WGTS_DNA_WORKFLOW_NAME = DEFAULT_SUBSTITUTIONS["__dragen_wgts_dna_workflow_name__"]
+ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME = DEFAULT_SUBSTITUTIONS["__oncoanalyser_wgts_dna_workflow_name__"]
+SUCCEEDED_STATUS = DEFAULT_SUBSTITUTIONS["__succeeded_status__"]
+DRAFT_STATUS = DEFAULT_SUBSTITUTIONS["__draft_status__"]
+EVENT_BUS_NAME = DEFAULT_SUBSTITUTIONS["__event_bus_name__"]
+EVENT_SOURCE = DEFAULT_SUBSTITUTIONS["__stack_source__"]
+WORKFLOW_RUN_UPDATE_DETAIL_TYPE = DEFAULT_SUBSTITUTIONS["__workflow_run_update_event_detail_type__"]
+
+DEFAULT_CONCURRENCY = 8
+# Derived from the portal run id of the template run, resolved again for the new draft
+DEFAULT_DROP_FIELDS = ["engineParameters.outputUri", "engineParameters.logsUri", "engineParameters.cacheUri"]
+# Replaced by the latest upstream outputs
+UPSTREAM_INPUT_FIELDS = ["dragenGermlineDir", "dragenSomaticDir", "oncoanalyserDnaDir"]
+SUCCEEDED_CHECKPOINT_STATUS = "SUCCEEDED"
+FAILED_CHECKPOINT_STATUS = "FAILED"
+
+logger = logging.getLogger(__name__)
+
+
+def get_subject_key(subject: Dict[str, Any]) -> str:
+    return "__".join(filter(None, [subject["normalLibraryId"], subject.get("tumorLibraryId")]))
+
+
+def read_cohort(cohort_path: Path) -> List[Dict[str, Any]]:
+    if cohort_path.suffix == ".csv":
+        with open(cohort_path) as cohort_h:
+            subjects = list(csv.DictReader(cohort_h))
+    else:
+        subjects = json.loads(cohort_path.read_text())
+    return list(map(
+        lambda subject_iter_: {
+            "subjectId": subject_iter_.get("subjectId") or None,
+            "normalLibraryId": subject_iter_["normalLibraryId"],
+            "tumorLibraryId": subject_iter_.get("tumorLibraryId") or None,
+        },
+        subjects
+    ))
+
+
+def read_checkpoint(checkpoint_path: Optional[Path]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the last checkpoint entry of each subject key
+    """
+    if checkpoint_path is None or not checkpoint_path.is_file():
+        return {}
+    checkpoint = {}
+    with open(checkpoint_path) as checkpoint_h:
+        for line in checkpoint_h:
+            if line.strip():
+                entry = json.loads(line)
+                checkpoint[entry["subjectKey"]] = entry
+    return checkpoint
+
+
+def get_portal_run_id() -> str:
+    # Same format as the workflow manager portal run ids, i.e. 20250101abcd1234
+    return datetime.now(timezone.utc).strftime("%Y%m%d") + secrets.token_hex(4)
+
+
+def drop_field(data: Dict[str, Any], field_path: str):
+    *parent_keys, key = field_path.split(".")
+    for parent_key in parent_keys:
+        data = data.get(parent_key) or {}
+    data.pop(key, None)
+
+
+class CohortReprocessor:
+    """
+    Generates the new DRAFT WorkflowRunUpdate event of a subject from the lambda handlers
+    """
+    def __init__(
+            self,
+            lambda_handlers: Dict[str, Callable],
+            workflow_version: Optional[str] = None,
+            drop_fields: Optional[List[str]] = None,
+    ):
+        self.lambda_handlers = lambda_handlers
+        self.workflow_version = workflow_version
+        self.drop_fields = drop_fields if drop_fields is not None else DEFAULT_DROP_FIELDS
+
+    def call_handler(self, lambda_name: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        return self.lambda_handlers[lambda_name](event, None)
+
+    def find_latest_workflow_run(
+            self,
+            workflow_name: str,
+            library_id_list: List[str],
+            status: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        workflow_run_list = self.call_handler(
+            "find_latest_workflow",
+            {
+                "workflowName": workflow_name,
+                "libraries": list(map(lambda library_id_iter_: {"libraryId": library_id_iter_}, library_id_list)),
+                **({"status": status} if status is not None else {}),
+            }
+        )["workflowRunList"]
+        return workflow_run_list[0] if workflow_run_list else None
+
+    def get_upstream_data(self, library_id_list: List[str], has_tumor: bool) -> Dict[str, str]:
+        upstream_data = {}
+
+        dragen_run = self.find_latest_workflow_run(DRAGEN_WGTS_DNA_WORKFLOW_NAME, library_id_list, SUCCEEDED_STATUS)
+        if dragen_run is not None:
+            for phenotype in (["NORMAL", "TUMOR"] if has_tumor else ["NORMAL"]):
+                upstream_data.update(self.call_handler(
+                    "get_dragen_outputs_from_portal_run_id",
+                    {"portalRunId": dragen_run["portalRunId"], "phenotype": phenotype}
+                ))
+
+        oncoanalyser_run = self.find_latest_workflow_run(
+            ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME, library_id_list, SUCCEEDED_STATUS
+        )
+        if oncoanalyser_run is not None:
+            upstream_data.update(self.call_handler(
+                "get_oncoanalyser_dir_from_portal_run_id",
+                {"portalRunId": oncoanalyser_run["portalRunId"]}
+            ))
+
+        return upstream_data
+
+    def get_draft_event_detail(self, subject: Dict[str, Any]) -> Dict[str, Any]:
+        library_id_list = list(filter(None, [subject["normalLibraryId"], subject.get("tumorLibraryId")]))
+
+        # The latest sash run of the libraries is the template of the new draft
+        sash_run = self.find_latest_workflow_run(SASH_WORKFLOW_NAME, library_id_list)
+        if sash_run is None:
+            raise ValueError(f"No {SASH_WORKFLOW_NAME} workflow run found for {library_id_list}")
+
+        payload = self.call_handler("get_draft_payload", {"portalRunId": sash_run["portalRunId"]})["payload"]
+        if not payload:
+            raise ValueError(f"No payload found for {sash_run['portalRunId']}")
+        # Clear the upstream inputs, so the latest upstream outputs are merged in
+        payload = json.loads(json.dumps(payload))
+        for input_name in UPSTREAM_INPUT_FIELDS:
+            drop_field(payload.get("data", {}), f"inputs.{input_name}")
+
+        workflow_run_update = self.call_handler(
+            "generate_wru_event_object_with_merged_data",
+            {
+                "portalRunId": sash_run["portalRunId"],
+                "libraries": sash_run["libraries"],
+                "payload": payload,
+                "upstreamData": self.get_upstream_data(library_id_list, has_tumor=len(library_id_list) > 1),
+            }
+        )["workflowRunUpdate"]
+
+        # A new draft run, rather than an update of the template run
+        portal_run_id = get_portal_run_id()
+        workflow_run_update.pop("orcabusId", None)
+        workflow_run_update["portalRunId"] = portal_run_id
+        workflow_run_update["status"] = DRAFT_STATUS
+        if workflow_run_update.get("workflowRunName"):
+            workflow_run_update["workflowRunName"] = workflow_run_update["workflowRunName"].replace(
+                sash_run["portalRunId"], portal_run_id
+            )
+        if self.workflow_version is not None:
+            workflow_run_update["workflow"] = {**workflow_run_update["workflow"], "version": self.workflow_version}
+        for field_path in self.drop_fields:
+            drop_field(workflow_run_update["payload"]["data"], field_path)
+        workflow_run_update["timestamp"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+        # Remove null attributes, as the glue state machine does
+        return dict(filter(lambda item_iter_: item_iter_[1] is not None, workflow_run_update.items()))
+
+
+def reprocess_cohort(
+        subjects: List[Dict[str, Any]],
+        reprocessor: CohortReprocessor,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        checkpoint_path: Optional[Path] = None,
+        output_path: Optional[Path] = None,
+        put_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Generate the draft events of the subjects not yet succeeded in the checkpoint, appending each
+    finished subject to the checkpoint
+    :return: The pending subjects, skipped count, failures by subject key, per subject latencies and elapsed time
+    """
+    # Resume from the checkpoint
+    checkpoint = read_checkpoint(checkpoint_path)
+    pending_subjects = list(filter(
+        lambda subject_iter_: (
+            checkpoint.get(get_subject_key(subject_iter_), {}).get("status") != SUCCEEDED_CHECKPOINT_STATUS
+        ),
+        subjects
+    ))
+
+    write_lock = threading.Lock()
+    checkpoint_h = open(checkpoint_path, "a") if checkpoint_path is not None else None
+    output_h = open(output_path, "a") if output_path is not None else None
+    latencies_ms: List[float] = []
+    failures: Dict[str, str] = {}
+
+    def _reprocess(subject: Dict[str, Any]):
+        start_time = time.perf_counter()
+        subject_key = get_subject_key(subject)
+        try:
+            event_detail = reprocessor.get_draft_event_detail(subject)
+            if put_event is not None:
+                put_event(event_detail)
+            entry = {"subjectKey": subject_key, "status": SUCCEEDED_CHECKPOINT_STATUS, "portalRunId": event_detail["portalRunId"]}
+        except Exception as e:
+            event_detail = None
+            entry = {"subjectKey": subject_key, "status": FAILED_CHECKPOINT_STATUS, "error": f"{type(e).__name__}: {e}"}
+        duration_ms = (time.perf_counter() - start_time) * 1000
+
+        with write_lock:
+            latencies_ms.append(duration_ms)
+            if event_detail is not None and output_h is not None:
+                output_h.write(json.dumps(event_detail) + "\n")
+                output_h.flush()
+            if entry["status"] == FAILED_CHECKPOINT_STATUS:
+                failures[subject_key] = entry["error"]
+            if checkpoint_h is not None:
+                # Written after the event, so a resumed run never skips a subject without an event
+                checkpoint_h.write(json.dumps(entry) + "\n")
+                checkpoint_h.flush()
+
+    start_time = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="reprocess") as executor:
+            for future in as_completed(list(map(lambda subject_iter_: executor.submit(_reprocess, subject_iter_), pending_subjects))):
+                future.result()
+    finally:
+        for file_h in filter(None, [checkpoint_h, output_h]):
+            file_h.close()
+    elapsed_seconds = time.perf_counter() - start_time
+
+    return {
+        "pendingSubjects": pending_subjects,
+        "skippedCount": len(subjects) - len(pending_subjects),
+        "failures": failures,
+        "latenciesMs": latencies_ms,
+        "elapsedSeconds": elapsed_seconds,
+    }
+
+
+def get_event_putter() -> Callable[[Dict[str, Any]], None]:
+    import boto3
+    events_client = boto3.client("events")
+
+    def _put_event(event_detail: Dict[str, Any]):
+        response = events_client.put_events(Entries=[{
+            "EventBusName": EVENT_BUS_NAME,
+            "Source": EVENT_SOURCE,
+            "DetailType": WORKFLOW_RUN_UPDATE_DETAIL_TYPE,
+            "Detail": json.dumps(event_detail),
+        }])
+        if response.get("FailedEntryCount"):
+            raise ValueError(f"Failed to put the event: {response['Entries']}")
+
+    return _put_event
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Generate new sash DRAFT events for a cohort")
+    parser.add_argument("--cohort", type=Path, help="Cohort csv or json (subjectId, normalLibraryId, tumorLibraryId)")
+    parser.add_argument("--synthetic-subjects", type=int, default=0, help="Add subjects to the stand-ins fixture and reprocess them")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Subjects processed at once")
+    parser.add_argument("--checkpoint", type=Path, help="Checkpoint json lines file, resumed from if it exists")
+    parser.add_argument("--output", type=Path, help="Json lines file of the generated event details")
+    parser.add_argument("--put-events", action="store_true", help="Put the events on the event bus")
+    parser.add_argument("--workflow-version", help="Workflow version of the new drafts")
+    parser.add_argument("--drop-field", action="append", help=f"Payload data field to drop (default {DEFAULT_DROP_FIELDS})")
+    parser.add_argument("--stand-ins", default=DEFAULT_STAND_INS_MODULE, help="Stand-ins module")
+    parser.add_argument("--no-stand-ins", action="store_true", help="Run the handlers against the real services")
+    parser.add_argument("--extra-path", action="append", type=Path, default=[], help="Extra sys.path entries, i.e. layer sources")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="Emulated OrcaBus API latency of the stand-ins")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.cohort is None and not args.synthetic_subjects:
+        parser.error("one of --cohort or --synthetic-subjects is required")
+    if args.synthetic_subjects and args.no_stand_ins:
+        parser.error("--synthetic-subjects needs the stand-ins")
+    return args
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    stand_ins = None if args.no_stand_ins else import_module(args.stand_ins)
+    lambda_handlers = load_lambda_handlers(stand_ins, extra_paths=args.extra_path)
+
+    subjects = read_cohort(args.cohort) if args.cohort is not None else []
+    if stand_ins is not None:
+        fixture = stand_ins.get_fixture()
+        fixture.api_latency_ms = args.api_latency_ms
+        for subject_index in range(args.synthetic_subjects):
+            subject_id = f"SBJ9{subject_index:05d}"
+            fixture.add_subject(
+                subject_id,
+                normal_library_id=f"L9{subject_index:05d}1",
+                tumor_library_id=f"L9{subject_index:05d}2",
+            )
+            subjects.append({
+                "subjectId": subject_id,
+                "normalLibraryId": f"L9{subject_index:05d}1",
+                "tumorLibraryId": f"L9{subject_index:05d}2",
+            })
+
+    reprocessor = CohortReprocessor(
+        lambda_handlers,
+        workflow_version=args.workflow_version,
+        drop_fields=args.drop_field,
+    )
+    summary = reprocess_cohort(
+        subjects,
+        reprocessor,
+        concurrency=args.concurrency,
+        checkpoint_path=args.checkpoint,
+        output_path=args.output,
+        put_event=get_event_putter() if args.put_events else None,
+    )
+    pending_subjects = summary["pendingSubjects"]
+    skipped_count = summary["skippedCount"]
+    latencies_ms = summary["latenciesMs"]
+    failures = summary["failures"]
+    elapsed_seconds = summary["elapsedSeconds"]
+
+    succeeded_count = len(pending_subjects) - len(failures)
+    print(
+        f"{len(subjects)} subjects: {succeeded_count} succeeded, {len(failures)} failed, "
+        f"{skipped_count} skipped (already in the checkpoint)"
+    )
+    if pending_subjects:
+        print(
+            f"{elapsed_seconds:.2f} s at concurrency {args.concurrency}, "
+            f"{len(pending_subjects) / elapsed_seconds:.1f} subjects/s, "
+            f"latency median {median(latencies_ms):.1f} ms, "
+            f"p95 {quantiles(latencies_ms, n=20)[-1] if len(latencies_ms) > 1 else latencies_ms[0]:.1f} ms"
+        )
+    if stand_ins is not None:
+        api_calls = stand_ins.get_fixture().api_calls
+        print(f"{sum(api_calls.values())} OrcaBus API calls: {json.dumps(dict(sorted(api_calls.items())))}")
+    for subject_key, error in sorted(failures.items()):
+        print(f"FAILED {subject_key}: {error}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
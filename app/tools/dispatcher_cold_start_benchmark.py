@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+"""
+Compare lambda cold starts of the individual handler deployment against the single sash dispatcher,
+by replaying a trace of lambda invocations through a simple model of the lambda container pool.
+
+Model, per function
+* an invocation reuses the most recently used container that is idle,
+  and has been idle for less than --idle-timeout seconds
+* otherwise a new container is started (a cold start), busy for --cold-start-ms plus the invocation duration
+
+For the dispatcher, all actions share the one function, a container that has not yet run an action
+still imports that action's handler module on first use, reported as 'first action imports'.
+
+The trace is a json lines file of invocations, in time order
+    {"timestamp": 1754380800.0, "action": "compare_payload", "durationMs": 250}
+where timestamp is in epoch seconds (or an iso 8601 string), and durationMs is optional.
+
+Without --trace a synthetic trace is generated, executions of the state machines arrive at random
+(exponential inter-arrival times) and run the lambda tasks of their template one after the other.
+
+Usage:
+    cd app && python3 -m tools.dispatcher_cold_start_benchmark [--trace invocations.jsonl] [--idle-timeout 600]
+"""
+
+# Standard imports
+import argparse
+import json
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+# Local imports
+from .paths import STEP_FUNCTIONS_TEMPLATES_DIR
+
+# Globals
+DISPATCHER_NAME = "sash_dispatcher"
+LAMBDA_INVOKE_RESOURCE = "arn:aws:states:::lambda:invoke"
+LAMBDA_FUNCTION_ARN_SUBSTITUTION_PREFIX = "${__"
+LAMBDA_FUNCTION_ARN_SUBSTITUTION_SUFFIX = "_lambda_function_arn__}"
+
+DEFAULT_IDLE_TIMEOUT_SECONDS = 600
+DEFAULT_COLD_START_MS = 800
+DEFAULT_DURATION_MS = 500
+DEFAULT_EXECUTIONS = 200
+DEFAULT_MEAN_INTERARRIVAL_SECONDS = 300
+DEFAULT_SEED = 1
+
+
+@dataclass
+class Invocation:
+    timestamp: float
+    action: str
+    duration_ms: float
+
+
+@dataclass
+class Container:
+    busy_until: float
+    imported_actions: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class PoolStats:
+    invocations: int = 0
+    cold_starts: int = 0
+    first_action_imports: int = 0
+    cold_starts_by_action: Counter = field(default_factory=Counter)
+
+
+def get_template_actions(template_path: Path) -> List[str]:
+    """
+    Get the snake case lambda names of the lambda invoke tasks of a template, in definition order
+    Parallel branches and map item processors are flattened in place
+    """
+    def _iter_states(states: Dict) -> Iterator[str]:
+        for state in states.values():
+            function_name = state.get("Arguments", {}).get("FunctionName", "")
+            if (
+                state.get("Resource") == LAMBDA_INVOKE_RESOURCE and
+                function_name.startswith(LAMBDA_FUNCTION_ARN_SUBSTITUTION_PREFIX) and
+                function_name.endswith(LAMBDA_FUNCTION_ARN_SUBSTITUTION_SUFFIX)
+            ):
+                yield function_name[len(LAMBDA_FUNCTION_ARN_SUBSTITUTION_PREFIX):-len(LAMBDA_FUNCTION_ARN_SUBSTITUTION_SUFFIX)]
+            for branch in state.get("Branches", []):
+                yield from _iter_states(branch["States"])
+            if "ItemProcessor" in state:
+                yield from _iter_states(state["ItemProcessor"]["States"])
+
+    with open(template_path) as template_h:
+        return list(_iter_states(json.load(template_h)["States"]))
+
+
+def generate_synthetic_trace(
+        executions: int,
+        mean_interarrival_seconds: float,
+        duration_ms: float,
+        seed: int
+) -> List[Invocation]:
+    rng = random.Random(seed)
+    template_actions = list(filter(
+        lambda actions_iter_: len(actions_iter_) > 0,
+        map(get_template_actions, sorted(STEP_FUNCTIONS_TEMPLATES_DIR.glob("*.asl.json")))
+    ))
+
+    invocations = []
+    start_time = 0.0
+    for _ in range(executions):
+        start_time += rng.expovariate(1 / mean_interarrival_seconds)
+        timestamp = start_time
+        for action in rng.choice(template_actions):
+            invocations.append(Invocation(timestamp=timestamp, action=action, duration_ms=duration_ms))
+            timestamp += duration_ms / 1000
+
+    return sorted(invocations, key=lambda invocation_iter_: invocation_iter_.timestamp)
+
+
+def read_trace(trace_path: Path, default_duration_ms: float) -> List[Invocation]:
+    def _get_timestamp(timestamp) -> float:
+        if isinstance(timestamp, str):
+            return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+        return float(timestamp)
+
+    with open(trace_path) as trace_h:
+        return sorted(
+            map(
+                lambda line_iter_: Invocation(
+                    timestamp=_get_timestamp(line_iter_['timestamp']),
+                    action=line_iter_['action'],
+                    duration_ms=float(line_iter_.get('durationMs', default_duration_ms)),
+                ),
+                map(json.loads, filter(lambda line_iter_: line_iter_.strip(), trace_h))
+            ),
+            key=lambda invocation_iter_: invocation_iter_.timestamp
+        )
+
+
+def replay_trace(
+        invocations: List[Invocation],
+        use_dispatcher: bool,
+        idle_timeout_seconds: float,
+        cold_start_ms: float,
+) -> PoolStats:
+    pools: Dict[str, List[Container]] = {}
+    stats = PoolStats()
+
+    for invocation in invocations:
+        pool = pools.setdefault(DISPATCHER_NAME if use_dispatcher else invocation.action, [])
+
+        # Drop containers that have been idle for too long
+        pool[:] = list(filter(
+            lambda container_iter_: invocation.timestamp - container_iter_.busy_until <= idle_timeout_seconds,
+            pool
+        ))
+
+        # Reuse the most recently used idle container
+        idle_containers = list(filter(
+            lambda container_iter_: container_iter_.busy_until <= invocation.timestamp,
+            pool
+        ))
+        container: Optional[Container] = max(
+            idle_containers, key=lambda container_iter_: container_iter_.busy_until, default=None
+        )
+
+        stats.invocations += 1
+        init_ms = 0.0
+        if container is None:
+            container = Container(busy_until=invocation.timestamp)
+            pool.append(container)
+            stats.cold_starts += 1
+            stats.cold_starts_by_action[invocation.action] += 1
+            init_ms = cold_start_ms
+        elif invocation.action not in container.imported_actions:
+            stats.first_action_imports += 1
+
+        container.imported_actions.add(invocation.action)
+        container.busy_until = invocation.timestamp + (init_ms + invocation.duration_ms) / 1000
+
+    return stats
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Compare cold starts of the individual lambdas against the sash dispatcher")
+    parser.add_argument("--trace", type=Path, help="Json lines trace of lambda invocations, synthetic if not set")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT_SECONDS, help="Seconds an idle container is kept warm")
+    parser.add_argument("--cold-start-ms", type=float, default=DEFAULT_COLD_START_MS, help="Init time added to a cold invocation")
+    parser.add_argument("--duration-ms", type=float, default=DEFAULT_DURATION_MS, help="Invocation duration if not in the trace")
+    parser.add_argument("--executions", type=int, default=DEFAULT_EXECUTIONS, help="Synthetic trace state machine executions")
+    parser.add_argument("--mean-interarrival", type=float, default=DEFAULT_MEAN_INTERARRIVAL_SECONDS, help="Synthetic trace mean seconds between executions")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output-json", type=Path, help="Write the results to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    if args.trace is not None:
+        invocations = read_trace(args.trace, args.duration_ms)
+    else:
+        invocations = generate_synthetic_trace(args.executions, args.mean_interarrival, args.duration_ms, args.seed)
+
+    results = {
+        deployment_iter_: replay_trace(
+            invocations,
+            use_dispatcher=(deployment_iter_ == DISPATCHER_NAME),
+            idle_timeout_seconds=args.idle_timeout,
+            cold_start_ms=args.cold_start_ms,
+        )
+        for deployment_iter_ in ["individual", DISPATCHER_NAME]
+    }
+
+    print(f"{len(invocations)} invocations of {len(set(map(lambda i_: i_.action, invocations)))} actions, idle timeout {args.idle_timeout:.0f}s")
+    print(f"{'deployment':<20} {'invocations':>12} {'coldStarts':>12} {'coldRate':>10} {'firstActionImports':>20}")
+    for deployment, stats in results.items():
+        print(
+            f"{deployment:<20} {stats.invocations:>12} {stats.cold_starts:>12} "
+            f"{stats.cold_starts / max(stats.invocations, 1):>10.1%} {stats.first_action_imports:>20}"
+        )
+
+    if args.output_json is not None:
+        with open(args.output_json, "w") as output_h:
+            json.dump(
+                {
+                    deployment_iter_: {
+                        "invocations": stats_iter_.invocations,
+                        "coldStarts": stats_iter_.cold_starts,
+                        "firstActionImports": stats_iter_.first_action_imports,
+                        "coldStartsByAction": dict(stats_iter_.cold_starts_by_action),
+                    }
+                    for deployment_iter_, stats_iter_ in results.items()
+                },
+                output_h,
+                indent=2
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+
+"""
+Stage latency analysis of exported Step Functions execution histories.
+
+Reads execution histories, as exported by
+    aws stepfunctions get-execution-history --execution-arn <arn> --output json > history.json
+(a json object with an 'events' list, or the list itself), from files or directories of .json files.
+The state machine of each history is the template that has every state the history entered,
+so histories of several state machines can be analysed together.
+
+For each named state it reports
+* the number of entries and the p50 / p95 / p99 of the time from StateEntered to StateExited
+* retries, Task attempts after the first within one entry of the state
+* for lambda tasks, the time waiting on the lambda (TaskScheduled to TaskSucceeded / TaskFailed / TaskTimedOut)
+  and the part of it spent before the invocation started (TaskScheduled to TaskStarted)
+
+Lambda time is attributed to the handler in app/lambdas that backs the state (by the template's
+FunctionName, or the 'action' of the payload when the state machine uses the sash dispatcher),
+and handlers are ranked by their share of the total lambda time.
+
+Nested states (in Parallel branches and Map iterations) are matched to their entry by following
+the previousEventId links back through the history, so concurrent entries of a state are timed separately.
+
+Usage:
+    cd app && python3 -m tools.execution_history_latency histories/ [--output-json report.json]
+"""
+
+# Standard imports
+import argparse
+import json
+import math
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# Local imports
+from .asl_critical_path import TEMPLATE_SUFFIX, get_lambda_name
+from .paths import APP_DIR, LAMBDAS_DIR, STEP_FUNCTIONS_TEMPLATES_DIR
+
+# Globals
+PERCENTILES = [50, 95, 99]
+DISPATCHER_ACTION_KEY = "action"
+TASK_COMPLETED_EVENT_TYPES = ["TaskSucceeded", "TaskFailed", "TaskTimedOut"]
+EXECUTION_COMPLETED_EVENT_TYPES = {
+    "ExecutionSucceeded": "SUCCEEDED",
+    "ExecutionFailed": "FAILED",
+    "ExecutionTimedOut": "TIMED_OUT",
+    "ExecutionAborted": "ABORTED",
+}
+
+
+@dataclass
+class StateLatencies:
+    lambda_name: Optional[str] = None
+    durations_ms: List[float] = field(default_factory=list)
+    lambda_ms: List[float] = field(default_factory=list)
+    lambda_schedule_ms: List[float] = field(default_factory=list)
+    retries: int = 0
+
+
+@dataclass
+class StateMachineLatencies:
+    statuses: Counter = field(default_factory=Counter)
+    durations_ms: List[float] = field(default_factory=list)
+    states: Dict[str, StateLatencies] = field(default_factory=dict)
+
+
+def get_percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    # Nearest rank percentiles
+    sorted_values = sorted(values)
+    return {
+        f"p{percentile_iter_}": (
+            sorted_values[max(math.ceil(percentile_iter_ / 100 * len(sorted_values)) - 1, 0)]
+            if sorted_values else None
+        )
+        for percentile_iter_ in PERCENTILES
+    }
+
+
+def _get_timestamp_ms(timestamp: Any) -> float:
+    if isinstance(timestamp, str):
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp() * 1000
+    return float(timestamp) * 1000
+
+
+def get_template_task_lambdas() -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Get the state names of each template, mapped to the lambda name of lambda invoke tasks (else None)
+    """
+    def _iter_states(states: Dict[str, Any]) -> Iterable:
+        for state_name, state in states.items():
+            yield state_name, get_lambda_name(state)
+            for branch in state.get("Branches", []):
+                yield from _iter_states(branch["States"])
+            if "ItemProcessor" in state:
+                yield from _iter_states(state["ItemProcessor"]["States"])
+
+    return {
+        template_path_iter_.name[:-len(TEMPLATE_SUFFIX)]: dict(
+            _iter_states(json.loads(template_path_iter_.read_text())["States"])
+        )
+        for template_path_iter_ in sorted(STEP_FUNCTIONS_TEMPLATES_DIR.glob(f"*{TEMPLATE_SUFFIX}"))
+    }
+
+
+def get_history_events(history: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get the events of an exported execution history, None if the json is not an execution history
+    """
+    events = history.get("events") if isinstance(history, dict) else history
+    if not isinstance(events, list) or not all(map(
+        lambda event_iter_: isinstance(event_iter_, dict) and "type" in event_iter_ and "timestamp" in event_iter_,
+        events
+    )):
+        return None
+    return events
+
+
+def read_histories(paths: List[Path]) -> Iterable[List[Dict[str, Any]]]:
+    """
+    Read the histories of the files, and of the .json files under the directories, skipping the
+    .json files under a directory that are not execution histories (i.e. templates)
+    """
+    for path in paths:
+        for history_path in (sorted(path.rglob("*.json")) if path.is_dir() else [path]):
+            events = get_history_events(json.loads(history_path.read_text()))
+            if events is not None:
+                yield events
+            elif path.is_dir():
+                print(f"Skipping {history_path}, not an execution history", file=sys.stderr)
+            else:
+                raise ValueError(
+                    f"{history_path} is not an execution history, expected an object with an 'events' list or the list itself"
+                )
+
+
+class ExecutionHistory:
+    """
+    An execution history, with the events indexed by id
+    """
+    def __init__(self, events: List[Dict[str, Any]]):
+        self.events = sorted(events, key=lambda event_iter_: event_iter_["id"])
+        self.events_by_id = {event["id"]: event for event in self.events}
+
+    def get_timestamp_ms(self, event: Dict[str, Any]) -> float:
+        return _get_timestamp_ms(event["timestamp"])
+
+    def find_ancestor(self, event: Dict[str, Any], event_types: List[str], state_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Follow the previousEventId links back to the nearest event of one of the types,
+        for the named state if set
+        """
+        previous_event_id = event.get("previousEventId")
+        while previous_event_id:
+            previous_event = self.events_by_id.get(previous_event_id)
+            if previous_event is None:
+                return None
+            if previous_event["type"] in event_types and (
+                state_name is None or
+                previous_event.get("stateEnteredEventDetails", {}).get("name") == state_name
+            ):
+                return previous_event
+            previous_event_id = previous_event.get("previousEventId")
+        return None
+
+    def get_entered_state_names(self) -> List[str]:
+        return list(dict.fromkeys(
+            event["stateEnteredEventDetails"]["name"]
+            for event in self.events
+            if "stateEnteredEventDetails" in event
+        ))
+
+
+def get_dispatcher_action(task_scheduled_event: Dict[str, Any]) -> Optional[str]:
+    try:
+        parameters = json.loads(task_scheduled_event["taskScheduledEventDetails"]["parameters"])
+        return parameters.get("Payload", {}).get(DISPATCHER_ACTION_KEY)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+def add_history(
+        latencies: StateMachineLatencies,
+        history: ExecutionHistory,
+        task_lambdas: Dict[str, Optional[str]],
+):
+    execution_started = next(filter(lambda event_iter_: event_iter_["type"] == "ExecutionStarted", history.events), None)
+    execution_completed = next(filter(
+        lambda event_iter_: event_iter_["type"] in EXECUTION_COMPLETED_EVENT_TYPES, history.events
+    ), None)
+    latencies.statuses[
+        EXECUTION_COMPLETED_EVENT_TYPES[execution_completed["type"]] if execution_completed is not None else "RUNNING"
+    ] += 1
+    if execution_started is not None and execution_completed is not None:
+        latencies.durations_ms.append(
+            history.get_timestamp_ms(execution_completed) - history.get_timestamp_ms(execution_started)
+        )
+
+    def _get_state_latencies(state_name: str) -> StateLatencies:
+        return latencies.states.setdefault(state_name, StateLatencies(lambda_name=task_lambdas.get(state_name)))
+
+    # Scheduled tasks by state entered event id
+    task_attempts: Counter = Counter()
+
+    for event in history.events:
+        if "stateExitedEventDetails" in event:
+            state_name = event["stateExitedEventDetails"]["name"]
+            state_entered = history.find_ancestor(event, [event["type"].replace("Exited", "Entered")], state_name)
+            if state_entered is not None:
+                _get_state_latencies(state_name).durations_ms.append(
+                    history.get_timestamp_ms(event) - history.get_timestamp_ms(state_entered)
+                )
+
+        elif event["type"] == "TaskScheduled":
+            state_entered = history.find_ancestor(event, ["TaskStateEntered"])
+            if state_entered is None:
+                continue
+            state_name = state_entered["stateEnteredEventDetails"]["name"]
+            task_attempts[state_entered["id"]] += 1
+            if task_attempts[state_entered["id"]] > 1:
+                _get_state_latencies(state_name).retries += 1
+
+        elif event["type"] in TASK_COMPLETED_EVENT_TYPES:
+            task_scheduled = history.find_ancestor(event, ["TaskScheduled"])
+            state_entered = history.find_ancestor(event, ["TaskStateEntered"])
+            if (
+                task_scheduled is None or state_entered is None or
+                task_scheduled["taskScheduledEventDetails"].get("resourceType") != "lambda"
+            ):
+                continue
+            state_latencies = _get_state_latencies(state_entered["stateEnteredEventDetails"]["name"])
+            state_latencies.lambda_name = get_dispatcher_action(task_scheduled) or state_latencies.lambda_name
+            state_latencies.lambda_ms.append(
+                history.get_timestamp_ms(event) - history.get_timestamp_ms(task_scheduled)
+            )
+            task_started = history.find_ancestor(event, ["TaskStarted"])
+            if task_started is not None and task_started["id"] > task_scheduled["id"]:
+                state_latencies.lambda_schedule_ms.append(
+                    history.get_timestamp_ms(task_started) - history.get_timestamp_ms(task_scheduled)
+                )
+
+
+def get_handler_path(lambda_name: str) -> Optional[str]:
+    handler_path = LAMBDAS_DIR / f"{lambda_name}_py" / f"{lambda_name}.py"
+    return str(handler_path.relative_to(APP_DIR)) if handler_path.is_file() else None
+
+
+def get_report(latencies_by_state_machine: Dict[str, StateMachineLatencies]) -> Dict[str, Any]:
+    report = {}
+    for state_machine_name, latencies in sorted(latencies_by_state_machine.items()):
+        handlers: Dict[str, Dict[str, Any]] = {}
+        for state_name, state_latencies in latencies.states.items():
+            if state_latencies.lambda_name is None or not state_latencies.lambda_ms:
+                continue
+            handler = handlers.setdefault(state_latencies.lambda_name, {
+                "handlerPath": get_handler_path(state_latencies.lambda_name),
+                "states": [],
+                "invocations": 0,
+                "totalLambdaMs": 0.0,
+            })
+            handler["states"].append(state_name)
+            handler["invocations"] += len(state_latencies.lambda_ms)
+            handler["totalLambdaMs"] += sum(state_latencies.lambda_ms)
+
+        total_lambda_ms = sum(map(lambda handler_iter_: handler_iter_["totalLambdaMs"], handlers.values()))
+        for handler in handlers.values():
+            handler["shareOfLambdaMs"] = handler["totalLambdaMs"] / total_lambda_ms if total_lambda_ms else 0.0
+            handler["states"].sort()
+
+        report[state_machine_name] = {
+            "executions": sum(latencies.statuses.values()),
+            "statuses": dict(latencies.statuses),
+            "durationMs": get_percentiles(latencies.durations_ms),
+            "states": {
+                state_name: {
+                    "entries": len(state_latencies.durations_ms),
+                    "durationMs": get_percentiles(state_latencies.durations_ms),
+                    "retries": state_latencies.retries,
+                    **(
+                        {
+                            "lambdaName": state_latencies.lambda_name,
+                            "lambdaMs": get_percentiles(state_latencies.lambda_ms),
+                            "lambdaScheduleMs": get_percentiles(state_latencies.lambda_schedule_ms),
+                            "totalLambdaMs": sum(state_latencies.lambda_ms),
+                        }
+                        if state_latencies.lambda_ms else {}
+                    ),
+                }
+                for state_name, state_latencies in sorted(latencies.states.items())
+            },
+            "handlers": dict(sorted(handlers.items(), key=lambda handler_iter_: -handler_iter_[1]["totalLambdaMs"])),
+        }
+    return report
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Per state latency percentiles from exported execution histories")
+    parser.add_argument("histories", nargs="+", type=Path, help="Execution history json files, or directories of them")
+    parser.add_argument("--state-machine", help="Snake case state machine name, instead of matching histories to templates")
+    parser.add_argument("--output-json", type=Path, help="Write the report to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    template_task_lambdas = get_template_task_lambdas()
+
+    latencies_by_state_machine: Dict[str, StateMachineLatencies] = {}
+    for events in read_histories(args.histories):
+        history = ExecutionHistory(events)
+
+        state_machine_name = args.state_machine
+        if state_machine_name is None:
+            entered_state_names = set(history.get_entered_state_names())
+            state_machine_name = next(
+                (
+                    name_iter_
+                    for name_iter_, task_lambdas_iter_ in template_task_lambdas.items()
+                    if entered_state_names and entered_state_names.issubset(task_lambdas_iter_.keys())
+                ),
+                "unknown"
+            )
+
+        add_history(
+            latencies_by_state_machine.setdefault(state_machine_name, StateMachineLatencies()),
+            history,
+            template_task_lambdas.get(state_machine_name, {}),
+        )
+
+    report = get_report(latencies_by_state_machine)
+
+    for state_machine_name, state_machine_report in report.items():
+        print(
+            f"{state_machine_name}: {state_machine_report['executions']} executions {state_machine_report['statuses']}, "
+            f"p50 {state_machine_report['durationMs']['p50'] or 0:.0f} ms, p95 {state_machine_report['durationMs']['p95'] or 0:.0f} ms"
+        )
+        print(f"    {'state':<60} {'entries':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'retries':>8} {'lambdaP50':>10}")
+        for state_name, state_report in state_machine_report["states"].items():
+            print(
+                f"    {state_name[:60]:<60} {state_report['entries']:>8} "
+                + " ".join(f"{state_report['durationMs'][key_iter_] or 0:>8.0f}" for key_iter_ in ["p50", "p95", "p99"])
+                + f" {state_report['retries']:>8} "
+                + (f"{state_report['lambdaMs']['p50']:>10.0f}" if "lambdaMs" in state_report else f"{'':>10}")
+            )
+        for lambda_name, handler in state_machine_report["handlers"].items():
+            print(f"    {handler['shareOfLambdaMs']:>6.1%} {handler['totalLambdaMs']:>10.0f} ms  {handler['handlerPath'] or lambda_name}")
+
+    if args.output_json is not None:
+        args.output_json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
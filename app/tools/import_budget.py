@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+"""
+Import-time (cold start init) benchmark for the lambda handler modules.
+
+Each handler module is imported in a fresh python process, recording
+* initMs - the wall time to import the handler module, i.e. the init phase of a cold start
+* rssMb  - the peak resident set size of the process after the import
+
+The median of --repeats runs is compared against the checked-in budget in import_budget.json,
+and the tool exits non-zero if any handler is over budget, or has no budget.
+
+Layer modules (orcabus_api_tools, icav2_tools) are not installed locally,
+point --extra-path at a local checkout of the layer source to include them.
+Layer packages that are still missing are replaced with stand-ins in sys.modules (any name imported
+from them is a placeholder class), so every handler is measured. The import time of the layer itself
+is then left out, the handler is reported with the stand-ins it was measured against.
+Handlers that still cannot be imported because of a missing module fail the run,
+unless --allow-unavailable is set.
+
+Usage:
+    cd app && python3 -m tools.import_budget [--python venv/bin/python] [--extra-path ../orcabus-layer/src] [--lambda-name compare_payload]
+"""
+
+# Standard imports
+import argparse
+import json
+import subprocess
+import sys
+from os import environ
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Optional
+
+# Local imports
+from .paths import SASH_TOOLS_LAYER_DIR, get_lambda_dirs
+
+# Globals
+BUDGET_PATH = Path(__file__).absolute().parent / "import_budget.json"
+DEFAULT_REPEATS = 5
+
+# Some handlers read their environment at import time
+PLACEHOLDER_ENV = {
+    "WORKFLOW_NAME": "sash",
+    "TEST_DATA_BUCKET_NAME": "test-data-bucket",
+    "REF_DATA_BUCKET_NAME": "reference-data-bucket",
+    "STATE_STORE_BACKEND": "memory",
+}
+
+# Lambda layers that are replaced with stand-ins if they are not installed
+LAYER_PACKAGES = ["orcabus_api_tools", "icav2_tools"]
+
+# Runs in the child process, prints a single json line
+MEASURE_SNIPPET = """
+import importlib, importlib.abc, importlib.machinery, importlib.util, json, resource, sys, time, types
+sys.path[:0] = json.loads(sys.argv[1])
+
+class LayerStandInModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        # Usable as a function, a type annotation or an exception class
+        placeholder = type(name, (Exception,), {})
+        setattr(self, name, placeholder)
+        return placeholder
+
+class LayerStandInFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def __init__(self, package_names):
+        self.package_names = package_names
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname.split(".")[0] not in self.package_names:
+            return None
+        return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+    def create_module(self, spec):
+        return LayerStandInModule(spec.name)
+    def exec_module(self, module):
+        module.__path__ = []
+
+layer_stand_ins = [
+    package_name for package_name in json.loads(sys.argv[3])
+    if importlib.util.find_spec(package_name) is None
+]
+sys.meta_path.append(LayerStandInFinder(layer_stand_ins))
+
+start = time.perf_counter()
+try:
+    importlib.import_module(sys.argv[2])
+    status, missing_module = "ok", None
+except ModuleNotFoundError as e:
+    status, missing_module = "unavailable", e.name
+init_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({
+    "status": status,
+    "missingModule": missing_module,
+    "layerStandIns": sorted(set(layer_stand_ins) & set(map(lambda name: name.split(".")[0], sys.modules))),
+    "initMs": init_ms,
+    "rssMb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def measure_handler_import(
+        python: str,
+        lambda_name: str,
+        lambda_dir: Path,
+        extra_paths: List[Path],
+        layer_stand_ins: bool,
+) -> Dict:
+    result = subprocess.run(
+        [
+            python, "-c", MEASURE_SNIPPET,
+            json.dumps(list(map(str, [lambda_dir, SASH_TOOLS_LAYER_DIR, *extra_paths]))),
+            lambda_name,
+            json.dumps(LAYER_PACKAGES if layer_stand_ins else []),
+        ],
+        capture_output=True,
+        text=True,
+        env={**environ, **PLACEHOLDER_ENV},
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark_handler(
+        python: str,
+        lambda_name: str,
+        lambda_dir: Path,
+        extra_paths: List[Path],
+        repeats: int,
+        layer_stand_ins: bool = True,
+) -> Dict:
+    runs = [
+        measure_handler_import(python, lambda_name, lambda_dir, extra_paths, layer_stand_ins)
+        for _ in range(repeats)
+    ]
+    if runs[0]['status'] != "ok":
+        return runs[0]
+    return {
+        "status": "ok",
+        "missingModule": None,
+        "layerStandIns": runs[0]['layerStandIns'],
+        "initMs": median(map(lambda run_iter_: run_iter_['initMs'], runs)),
+        "rssMb": median(map(lambda run_iter_: run_iter_['rssMb'], runs)),
+    }
+
+
+def check_budget(measurement: Dict, budget: Optional[Dict], allow_unavailable: bool = False) -> List[str]:
+    """
+    Return the list of budget failures for a measurement
+    """
+    if budget is None:
+        return ["no budget set in import_budget.json"]
+    if measurement['status'] != "ok":
+        return [] if allow_unavailable else [f"cannot import, missing module '{measurement['missingModule']}'"]
+
+    failures = []
+    if measurement['initMs'] > budget['initMs']:
+        failures.append(f"initMs {measurement['initMs']:.0f} > {budget['initMs']}")
+    if measurement['rssMb'] > budget['rssMb']:
+        failures.append(f"rssMb {measurement['rssMb']:.1f} > {budget['rssMb']}")
+    return failures
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Measure the import time and memory of each lambda handler")
+    parser.add_argument("--python", default=sys.executable, help="Python interpreter with the lambda requirements installed")
+    parser.add_argument("--extra-path", action="append", type=Path, default=[], help="Extra sys.path entries, i.e. layer sources")
+    parser.add_argument("--lambda-name", action="append", default=[], help="Only benchmark these lambdas (snake case)")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument(
+        "--no-layer-stand-ins", dest="layer_stand_ins", action="store_false",
+        help="Do not replace missing layer packages with stand-ins"
+    )
+    parser.add_argument(
+        "--allow-unavailable", action="store_true",
+        help="Do not fail if a handler cannot be imported because of a missing module"
+    )
+    parser.add_argument("--output-json", type=Path, help="Write the measurements to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    with open(BUDGET_PATH) as budget_h:
+        budgets: Dict[str, Dict] = json.load(budget_h)
+
+    lambda_dirs = get_lambda_dirs()
+    if args.lambda_name:
+        lambda_dirs = dict(filter(
+            lambda kv_iter_: kv_iter_[0] in args.lambda_name,
+            lambda_dirs.items()
+        ))
+
+    report = {}
+    has_failures = False
+    print(f"{'lambda':<60} {'initMs':>8} {'budget':>8} {'rssMb':>8} {'budget':>8}  result")
+    for lambda_name, lambda_dir in lambda_dirs.items():
+        measurement = benchmark_handler(
+            args.python, lambda_name, lambda_dir, args.extra_path, args.repeats, args.layer_stand_ins
+        )
+        budget = budgets.get(lambda_name)
+        failures = check_budget(measurement, budget, allow_unavailable=args.allow_unavailable)
+        has_failures = has_failures or bool(failures)
+
+        report[lambda_name] = {**measurement, "budget": budget, "failures": failures}
+
+        if measurement['status'] != "ok":
+            result = f"unavailable ({measurement['missingModule']})"
+            print(f"{lambda_name:<60} {'-':>8} {'-':>8} {'-':>8} {'-':>8}  {'; '.join(failures) or result}")
+            continue
+
+        print(
+            f"{lambda_name:<60} "
+            f"{measurement['initMs']:>8.0f} {(budget or {}).get('initMs', '-'):>8} "
+            f"{measurement['rssMb']:>8.1f} {(budget or {}).get('rssMb', '-'):>8}  "
+            f"{'; '.join(failures) or 'ok'}"
+            f"{' (layer stand-ins: ' + ', '.join(measurement['layerStandIns']) + ')' if measurement['layerStandIns'] else ''}"
+        )
+
+    if args.output_json is not None:
+        with open(args.output_json, "w") as output_h:
+            json.dump(report, output_h, indent=2)
+
+    sys.exit(1 if has_failures else 0)
+
+
+if __name__ == "__main__":
+    main()
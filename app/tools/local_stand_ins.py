@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+
+"""
+Offline stand-ins for the services the lambdas and state machines call, used by the local tools.
+
+* install()              - registers an in-memory orcabus_api_tools package in sys.modules, backed by a
+                           LocalOrcabusFixture, so the real lambda handlers run without the OrcaBus APIs.
+                           Must be called before the handler modules are imported.
+* LAMBDA_MODULE_PATCHES  - per lambda, replaces the schema registry and SSM lookups of the handler module
+                           with reads of the local event schemas
+* LAMBDA_STAND_INS       - lambda level stand-ins for the handlers that talk to ICAv2
+* SSM_PARAMETERS         - the SSM parameters read by the state machines
+* get_subject_events()   - the events of a subject, in the order the state machines receive them
+* get_sample_inputs()    - a sample input for each state machine, for the fixture's first subject
+
+The fixture records the number of calls to each API function (api_calls), and can add a fixed latency
+to each call (api_latency_ms) to approximate the real services. Each call is traced as a client span.
+"""
+
+# Standard imports
+import json
+import sys
+from collections import Counter
+from copy import deepcopy
+from dataclasses import dataclass, field
+from functools import wraps
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from time import sleep
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Local imports
+from .paths import APP_DIR
+
+# Globals
+EVENT_SCHEMAS_DIR = APP_DIR / "event-schemas"
+WORKFLOW_NAME = "sash"
+WORKFLOW_VERSION = "0.7.0"
+DEFAULT_PAYLOAD_VERSION = "2025.08.05"
+DRAGEN_WGTS_DNA_WORKFLOW_NAME = "dragen-wgts-dna"
+ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME = "oncoanalyser-wgts-dna"
+SSM_PARAMETER_PATH_PREFIX = f"/orcabus/workflows/{WORKFLOW_NAME}"
+SSM_SCHEMA_ROOT = f"{SSM_PARAMETER_PATH_PREFIX}/schemas"
+ANALYSIS_BUCKET = "pipeline-dev-cache-503977275616-ap-southeast-2"
+LANES = [1, 2]
+
+# Environment the handlers read, as set by CDK
+LAMBDA_ENV = {
+    "WORKFLOW_NAME": WORKFLOW_NAME,
+    "DEFAULT_PAYLOAD_VERSION": DEFAULT_PAYLOAD_VERSION,
+    "SSM_REGISTRY_NAME": f"{SSM_SCHEMA_ROOT}/registry",
+    "SSM_SCHEMA_PATH": f"{SSM_SCHEMA_ROOT}/complete-data-draft",
+    "TEST_DATA_BUCKET_NAME": "test-data-bucket",
+    "REF_DATA_BUCKET_NAME": "reference-data-bucket",
+    "REPOSITORY_GITHUB_URL": "https://github.com/OrcaBus/service-sash-pipeline-manager",
+    "STATE_STORE_BACKEND": "memory",
+    # Set TRACE_EXPORTER=file to write the spans of a local run to TRACE_FILE_PATH
+    "TRACE_EXPORTER": "none",
+    "CLAIM_CHECK_BACKEND": "memory",
+    "DEFAULT_REF_DATA_PATH_SSM_PARAMETER_PREFIX": f"{SSM_PARAMETER_PATH_PREFIX}/default-sash-reference-paths-by-workflow-version",
+}
+
+SSM_PARAMETERS = {
+    f"{SSM_PARAMETER_PATH_PREFIX}/icav2-project-id": "ea19a3f5-ec7c-4940-a474-c31cd91dbad4",
+    f"{SSM_PARAMETER_PATH_PREFIX}/output-prefix": f"s3://{ANALYSIS_BUCKET}/byob-icav2/development/analysis/{WORKFLOW_NAME}/",
+    f"{SSM_PARAMETER_PATH_PREFIX}/logs-prefix": f"s3://{ANALYSIS_BUCKET}/byob-icav2/development/logs/{WORKFLOW_NAME}/",
+    f"{SSM_PARAMETER_PATH_PREFIX}/cache-prefix": f"s3://{ANALYSIS_BUCKET}/byob-icav2/development/cache/{WORKFLOW_NAME}/",
+    f"{SSM_PARAMETER_PATH_PREFIX}/pipeline-ids-by-workflow-version/{WORKFLOW_VERSION}": "e1bfcedb-687b-4191-82ce-c74ac9271270",
+    # Stored as json by CDK, the state machine parses it
+    f"{SSM_PARAMETER_PATH_PREFIX}/default-sash-reference-paths-by-workflow-version/{WORKFLOW_VERSION}": json.dumps(
+        f"s3://reference-data-503977275616-ap-southeast-2/refdata/sash/{WORKFLOW_VERSION}/"
+    ),
+}
+
+
+def _get_id(prefix: str, *parts: str) -> str:
+    # Deterministic orcabus style ids
+    return f"{prefix}.{sha256('/'.join(parts).encode()).hexdigest()[:26].upper()}"
+
+
+def get_complete_payload_data(
+        subject_id: str,
+        normal_library: Dict[str, Any],
+        tumor_library: Dict[str, Any],
+        dragen_portal_run_id: str,
+        oncoanalyser_portal_run_id: str,
+        sash_portal_run_id: str,
+) -> Dict[str, Any]:
+    """
+    Payload data that passes the complete-data-draft schema
+    """
+    def _get_rgids(library: Dict[str, Any]) -> List[str]:
+        return list(map(lambda readset_iter_: readset_iter_['rgid'], library['readsets']))
+
+    analysis_prefix = f"s3://{ANALYSIS_BUCKET}/analysis"
+    return {
+        "tags": {
+            "libraryId": normal_library['libraryId'],
+            "subjectId": subject_id,
+            "individualId": subject_id,
+            "fastqRgidList": _get_rgids(normal_library),
+            "tumorLibraryId": tumor_library['libraryId'],
+            "tumorFastqRgidList": _get_rgids(tumor_library),
+        },
+        "inputs": {
+            "groupId": subject_id,
+            "subjectId": subject_id,
+            "tumorDnaSampleId": tumor_library['libraryId'],
+            "normalDnaSampleId": normal_library['libraryId'],
+            "dragenSomaticDir": f"{analysis_prefix}/{DRAGEN_WGTS_DNA_WORKFLOW_NAME}/{dragen_portal_run_id}/{tumor_library['libraryId']}__{normal_library['libraryId']}__hg38__linear__dragen_variant_calling/",
+            "dragenGermlineDir": f"{analysis_prefix}/{DRAGEN_WGTS_DNA_WORKFLOW_NAME}/{dragen_portal_run_id}/{normal_library['libraryId']}__hg38__graph__dragen_variant_calling/",
+            "oncoanalyserDnaDir": f"{analysis_prefix}/{ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME}/{oncoanalyser_portal_run_id}/{subject_id}/",
+            "refDataPath": json.loads(SSM_PARAMETERS[f"{SSM_PARAMETER_PATH_PREFIX}/default-sash-reference-paths-by-workflow-version/{WORKFLOW_VERSION}"]),
+        },
+        "engineParameters": {
+            "projectId": SSM_PARAMETERS[f"{SSM_PARAMETER_PATH_PREFIX}/icav2-project-id"],
+            "pipelineId": SSM_PARAMETERS[f"{SSM_PARAMETER_PATH_PREFIX}/pipeline-ids-by-workflow-version/{WORKFLOW_VERSION}"],
+            "outputUri": f"{SSM_PARAMETERS[f'{SSM_PARAMETER_PATH_PREFIX}/output-prefix']}{sash_portal_run_id}/",
+            "logsUri": f"{SSM_PARAMETERS[f'{SSM_PARAMETER_PATH_PREFIX}/logs-prefix']}{sash_portal_run_id}/",
+            "cacheUri": f"{SSM_PARAMETERS[f'{SSM_PARAMETER_PATH_PREFIX}/cache-prefix']}{sash_portal_run_id}/",
+        },
+    }
+
+
+@dataclass
+class LocalOrcabusFixture:
+    """
+    In-memory OrcaBus records, queried by the orcabus_api_tools stand-ins
+    """
+    workflow_runs: List[Dict[str, Any]] = field(default_factory=list)
+    payloads: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    libraries: List[Dict[str, Any]] = field(default_factory=list)
+    fastqs: List[Dict[str, Any]] = field(default_factory=list)
+    files: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    comments: List[Dict[str, Any]] = field(default_factory=list)
+    api_calls: Counter = field(default_factory=Counter)
+    api_latency_ms: float = 0.0
+    lock: Lock = field(default_factory=Lock)
+
+    def add_workflow_run(
+            self,
+            workflow_name: str,
+            portal_run_id: str,
+            status: str,
+            libraries: List[Dict[str, Any]],
+            payload_data: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        workflow_run = {
+            "orcabusId": _get_id("wfr", portal_run_id),
+            "portalRunId": portal_run_id,
+            "workflowRunName": f"umccr--automated--{workflow_name}--{portal_run_id}",
+            "workflow": {
+                "orcabusId": _get_id("wfl", workflow_name),
+                "name": workflow_name,
+                "version": WORKFLOW_VERSION,
+                "executionEngine": "ICA",
+                "executionEnginePipelineId": None,
+            },
+            "analysisRun": None,
+            "currentState": {
+                "orcabusId": _get_id("wfs", portal_run_id, status),
+                "status": status,
+            },
+            "libraries": deepcopy(libraries),
+        }
+        self.workflow_runs.append(workflow_run)
+        self.payloads[workflow_run['orcabusId']] = {
+            "orcabusId": _get_id("pld", portal_run_id),
+            "payloadRefId": _get_id("ref", portal_run_id),
+            "version": DEFAULT_PAYLOAD_VERSION,
+            "data": deepcopy(payload_data or {}),
+        }
+        return workflow_run
+
+    def add_subject(
+            self,
+            subject_id: str,
+            normal_library_id: str,
+            tumor_library_id: str,
+            instrument_run_id: str = "250101_A01052_0001_AHXXXXXXXX",
+    ) -> Dict[str, Any]:
+        """
+        Add a subject with a normal and tumor library, succeeded dragen and oncoanalyser runs,
+        and a sash DRAFT workflow run. Returns the sash DRAFT workflow run.
+        """
+        linked_libraries = []
+        for library_id, phenotype in [(normal_library_id, "normal"), (tumor_library_id, "tumor")]:
+            library = {
+                "orcabusId": _get_id("lib", library_id),
+                "libraryId": library_id,
+                "phenotype": phenotype,
+                "type": "WGS",
+                "subject": {
+                    "orcabusId": _get_id("sbj", subject_id),
+                    "subjectId": subject_id,
+                    "individualSet": [{"orcabusId": _get_id("idv", subject_id), "individualId": subject_id}],
+                },
+            }
+            self.libraries.append(library)
+            readsets = []
+            for lane in LANES:
+                index = sha256(library_id.encode()).hexdigest()[:8].upper()
+                fastq = {
+                    "id": _get_id("fqr", library_id, str(lane)),
+                    "index": f"{index[:4]}+{index[4:]}",
+                    "lane": lane,
+                    "instrumentRunId": instrument_run_id,
+                    "library": {"orcabusId": library['orcabusId'], "libraryId": library_id},
+                }
+                self.fastqs.append(fastq)
+                readsets.append({
+                    "orcabusId": fastq['id'],
+                    "rgid": ".".join([fastq['index'], str(lane), instrument_run_id]),
+                })
+            linked_libraries.append({
+                "libraryId": library_id,
+                "orcabusId": library['orcabusId'],
+                "readsets": readsets,
+            })
+
+        # Upstream runs, with the output files the lambdas look for
+        dragen_portal_run_id = f"{subject_id}dragen"
+        self.add_workflow_run(DRAGEN_WGTS_DNA_WORKFLOW_NAME, dragen_portal_run_id, "SUCCEEDED", linked_libraries)
+        self.files[dragen_portal_run_id] = [
+            {
+                "bucket": ANALYSIS_BUCKET,
+                "key": f"analysis/{DRAGEN_WGTS_DNA_WORKFLOW_NAME}/{dragen_portal_run_id}/{normal_library_id}__hg38__graph__dragen_variant_calling/{normal_library_id}.bam",
+            },
+            {
+                "bucket": ANALYSIS_BUCKET,
+                "key": f"analysis/{DRAGEN_WGTS_DNA_WORKFLOW_NAME}/{dragen_portal_run_id}/{tumor_library_id}__{normal_library_id}__hg38__linear__dragen_variant_calling/{tumor_library_id}_tumor.bam",
+            },
+        ]
+        oncoanalyser_portal_run_id = f"{subject_id}oncoanalyser"
+        self.add_workflow_run(ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME, oncoanalyser_portal_run_id, "SUCCEEDED", linked_libraries)
+        self.files[oncoanalyser_portal_run_id] = [
+            {
+                "bucket": ANALYSIS_BUCKET,
+                "key": f"analysis/{ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME}/{oncoanalyser_portal_run_id}/{subject_id}/alignments/dna/{tumor_library_id}.redux.bam",
+            },
+        ]
+
+        sash_libraries = list(map(
+            lambda library_iter_: {"libraryId": library_iter_['libraryId'], "orcabusId": library_iter_['orcabusId']},
+            linked_libraries
+        ))
+
+        # A READY run with complete data, as a draft would be after population and validation,
+        # and the sash outputs the run writes to its outputUri
+        sash_output_prefix = f"byob-icav2/development/analysis/{WORKFLOW_NAME}/{subject_id}sashready/{subject_id}"
+        self.files[f"{subject_id}sashready"] = list(map(
+            lambda relative_key_and_size_iter_: {
+                "bucket": ANALYSIS_BUCKET,
+                "key": f"{sash_output_prefix}/{relative_key_and_size_iter_[0]}",
+                "size": relative_key_and_size_iter_[1],
+            },
+            [
+                (f"cancer_report/{subject_id}.cancer_report.html", 12_582_912),
+                (f"smlv_somatic/report/{tumor_library_id}.pcgr_acmg.grch38.html", 4_194_304),
+                (f"smlv_germline/report/{normal_library_id}.cpsr.grch38.html", 3_145_728),
+                (f"multiqc/{subject_id}.multiqc.html", 2_097_152),
+                (f"purple/{tumor_library_id}.purple.purity.tsv", 1_024),
+                (f"purple/{tumor_library_id}.purple.cnv.somatic.tsv", 524_288),
+                (f"smlv_somatic/filter/{tumor_library_id}.pass.vcf.gz", 67_108_864),
+                (f"sv_somatic/prioritise/{tumor_library_id}.sv.prioritised.vcf.gz", 1_048_576),
+                (f"linx/somatic_annotations/{tumor_library_id}.linx.svs.tsv", 262_144),
+            ]
+        ))
+        self.add_workflow_run(
+            WORKFLOW_NAME, f"{subject_id}sashready", "READY", sash_libraries,
+            payload_data=get_complete_payload_data(
+                subject_id=subject_id,
+                normal_library=linked_libraries[0],
+                tumor_library=linked_libraries[1],
+                dragen_portal_run_id=dragen_portal_run_id,
+                oncoanalyser_portal_run_id=oncoanalyser_portal_run_id,
+                sash_portal_run_id=f"{subject_id}sashready",
+            )
+        )
+
+        return self.add_workflow_run(WORKFLOW_NAME, f"{subject_id}sash", "DRAFT", sash_libraries)
+
+    def record_call(self, api_function_name: str):
+        with self.lock:
+            self.api_calls[api_function_name] += 1
+        if self.api_latency_ms:
+            sleep(self.api_latency_ms / 1000)
+
+
+_FIXTURE = LocalOrcabusFixture()
+_FIXTURE.add_subject("SBJ00001", normal_library_id="L2400001", tumor_library_id="L2400002")
+
+
+def get_fixture() -> LocalOrcabusFixture:
+    return _FIXTURE
+
+
+def set_fixture(fixture: LocalOrcabusFixture):
+    global _FIXTURE
+    _FIXTURE = fixture
+
+
+def _api_function(func: Callable) -> Callable:
+    # Record each call against the current fixture, and return copies so handlers can't edit the fixture
+    # Each call is a client span, as the real api tools requests are (see sash_tools.tracing)
+    @wraps(func)
+    def _wrapper(*args, **kwargs):
+        # The sash tools layer is on the path once the handlers are loaded (see asl_executor.load_lambda_handlers)
+        from sash_tools.tracing import CLIENT_SPAN_KIND, start_span
+        with start_span(func.__name__, kind=CLIENT_SPAN_KIND):
+            get_fixture().record_call(func.__name__)
+            return deepcopy(func(*args, **kwargs))
+    return _wrapper
+
+
+def _not_found(message: str) -> Exception:
+    # The real api tools raise a requests HTTPError on a 404
+    try:
+        from requests import HTTPError
+        return HTTPError(message)
+    except ModuleNotFoundError:
+        return LookupError(message)
+
+
+# Workflow manager
+@_api_function
+def get_workflow_run_from_portal_run_id(portal_run_id: str) -> Dict[str, Any]:
+    try:
+        return next(filter(
+            lambda workflow_run_iter_: workflow_run_iter_['portalRunId'] == portal_run_id,
+            get_fixture().workflow_runs
+        ))
+    except StopIteration:
+        raise _not_found(f"No workflow run with portal run id {portal_run_id}")
+
+
+@_api_function
+def get_workflow_run(workflow_run_orcabus_id: str) -> Dict[str, Any]:
+    try:
+        return next(filter(
+            lambda workflow_run_iter_: workflow_run_iter_['orcabusId'] == workflow_run_orcabus_id,
+            get_fixture().workflow_runs
+        ))
+    except StopIteration:
+        raise _not_found(f"No workflow run {workflow_run_orcabus_id}")
+
+
+@_api_function
+def get_latest_payload_from_workflow_run(workflow_run_orcabus_id: str) -> Dict[str, Any]:
+    if workflow_run_orcabus_id not in get_fixture().payloads:
+        raise _not_found(f"No payload for workflow run {workflow_run_orcabus_id}")
+    return get_fixture().payloads[workflow_run_orcabus_id]
+
+
+@_api_function
+def get_latest_payload_from_portal_run_id(portal_run_id: str) -> Dict[str, Any]:
+    return get_latest_payload_from_workflow_run.__wrapped__(
+        get_workflow_run_from_portal_run_id.__wrapped__(portal_run_id)['orcabusId']
+    )
+
+
+@_api_function
+def get_workflow_runs_from_metadata(
+        analysis_run_id: Optional[str] = None,
+        workflow_name: Optional[str] = None,
+        workflow_version: Optional[str] = None,
+        library_id_list: Optional[List[str]] = None,
+        rgid_list: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    def _is_match(workflow_run: Dict[str, Any]) -> bool:
+        run_library_ids = set(map(lambda library_iter_: library_iter_['libraryId'], workflow_run['libraries']))
+        run_rgids = set(
+            readset_iter_['rgid']
+            for library_iter_ in workflow_run['libraries']
+            for readset_iter_ in library_iter_.get('readsets', [])
+        )
+        return (
+            (workflow_name is None or workflow_run['workflow']['name'] == workflow_name) and
+            (workflow_version is None or workflow_run['workflow']['version'] == workflow_version) and
+            (analysis_run_id is None or (workflow_run['analysisRun'] or {}).get('orcabusId') == analysis_run_id) and
+            set(library_id_list or []).issubset(run_library_ids) and
+            (not rgid_list or not run_rgids or set(rgid_list).issubset(run_rgids))
+        )
+
+    return list(filter(_is_match, get_fixture().workflow_runs))
+
+
+@_api_function
+def get_workflow_request_response_results(endpoint: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # The workflow run list, filtered by workflow name and current status
+    return list(filter(
+        lambda workflow_run_iter_: (
+            params.get("workflow__name") in (None, workflow_run_iter_['workflow']['name']) and
+            params.get("status") in (None, workflow_run_iter_['currentState']['status'])
+        ),
+        get_fixture().workflow_runs
+    ))
+
+
+@_api_function
+def add_comment_to_workflow_run(workflow_run_orcabus_id: str, comment: str, author: str) -> Dict[str, Any]:
+    comment_obj = {"workflowRunId": workflow_run_orcabus_id, "comment": comment, "createdBy": author}
+    get_fixture().comments.append(comment_obj)
+    return comment_obj
+
+
+# Metadata
+@_api_function
+def get_library_from_library_id(library_id: str) -> Dict[str, Any]:
+    try:
+        return next(filter(lambda library_iter_: library_iter_['libraryId'] == library_id, get_fixture().libraries))
+    except StopIteration:
+        raise _not_found(f"No library {library_id}")
+
+
+@_api_function
+def get_library_from_library_orcabus_id(library_orcabus_id: str) -> Dict[str, Any]:
+    try:
+        return next(filter(lambda library_iter_: library_iter_['orcabusId'] == library_orcabus_id, get_fixture().libraries))
+    except StopIteration:
+        raise _not_found(f"No library {library_orcabus_id}")
+
+
+# Fastq manager
+@_api_function
+def get_fastq_sets(library: str, currentFastqSet: bool = True) -> List[Dict[str, Any]]:
+    if not any(map(lambda fastq_iter_: fastq_iter_['library']['libraryId'] == library, get_fixture().fastqs)):
+        return []
+    return [{"id": _get_id("fqs", library), "library": {"libraryId": library}, "isCurrentFastqSet": True}]
+
+
+@_api_function
+def get_fastq_list_rows_in_fastq_set(fastq_set_id: str) -> List[Dict[str, Any]]:
+    return list(filter(
+        lambda fastq_iter_: _get_id("fqs", fastq_iter_['library']['libraryId']) == fastq_set_id,
+        get_fixture().fastqs
+    ))
+
+
+@_api_function
+def get_fastq_by_rgid(rgid: str) -> Dict[str, Any]:
+    try:
+        return next(filter(
+            lambda fastq_iter_: ".".join([fastq_iter_['index'], str(fastq_iter_['lane']), fastq_iter_['instrumentRunId']]) == rgid,
+            get_fixture().fastqs
+        ))
+    except StopIteration:
+        raise _not_found(f"No fastq with rgid {rgid}")
+
+
+# File manager
+@_api_function
+def get_file_manager_request_response_results(endpoint: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return get_fixture().files.get(params.get("portalRunId"), [])
+
+
+@_api_function
+def get_file_manager_request(endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    # One page of the files under a bucket and key prefix (a key ending with *)
+    files = list(filter(
+        lambda file_iter_: (
+            file_iter_['bucket'] == params.get("bucket") and
+            file_iter_['key'].startswith(params.get("key", "").rstrip("*"))
+        ),
+        (file_obj for files in get_fixture().files.values() for file_obj in files)
+    ))
+    page_number = int(params.get("page", 1))
+    rows_per_page = int(params.get("rowsPerPage", 1000))
+    has_next_page = page_number * rows_per_page < len(files)
+    return {
+        "links": {
+            "previous": None,
+            "next": f"{endpoint}?page={page_number + 1}" if has_next_page else None,
+        },
+        "pagination": {"count": len(files), "page": page_number, "rowsPerPage": rows_per_page},
+        "results": files[(page_number - 1) * rows_per_page:page_number * rows_per_page],
+    }
+
+
+class S3FileNotFoundError(Exception):
+    pass
+
+
+def _get_fixture_files() -> List[Dict[str, Any]]:
+    return [file_obj for files in get_fixture().files.values() for file_obj in files]
+
+
+@_api_function
+def list_files_recursively(bucket: str, key: str) -> List[Dict[str, Any]]:
+    return list(filter(
+        lambda file_iter_: file_iter_['bucket'] == bucket and file_iter_['key'].startswith(key),
+        _get_fixture_files()
+    ))
+
+
+@_api_function
+def get_s3_object_id_from_s3_uri(s3_uri: str) -> str:
+    bucket, _, key = s3_uri.removeprefix("s3://").partition("/")
+    file_obj = next(filter(
+        lambda file_iter_: file_iter_['bucket'] == bucket and file_iter_['key'] == key,
+        _get_fixture_files()
+    ), None)
+    if file_obj is None:
+        raise S3FileNotFoundError(f"Could not find file {s3_uri}")
+    return f"s3o.{bucket}/{key}"
+
+
+def install():
+    """
+    Register the in-memory orcabus_api_tools package, and set the lambda environment
+    """
+    from os import environ
+
+    for key, value in LAMBDA_ENV.items():
+        environ.setdefault(key, value)
+
+    modules = {
+        "orcabus_api_tools": {},
+        "orcabus_api_tools.workflow": {
+            "get_workflow_run_from_portal_run_id": get_workflow_run_from_portal_run_id,
+            "get_workflow_run": get_workflow_run,
+            "get_latest_payload_from_workflow_run": get_latest_payload_from_workflow_run,
+            "get_latest_payload_from_portal_run_id": get_latest_payload_from_portal_run_id,
+            "get_workflow_runs_from_metadata": get_workflow_runs_from_metadata,
+            "get_workflow_request_response_results": get_workflow_request_response_results,
+            "add_comment_to_workflow_run": add_comment_to_workflow_run,
+        },
+        "orcabus_api_tools.workflow.models": {"WorkflowRunDetail": Dict, "Payload": Dict},
+        "orcabus_api_tools.metadata": {
+            "get_library_from_library_id": get_library_from_library_id,
+            "get_library_from_library_orcabus_id": get_library_from_library_orcabus_id,
+        },
+        "orcabus_api_tools.metadata.models": {"LibraryBase": Dict},
+        "orcabus_api_tools.fastq": {
+            "get_fastq_sets": get_fastq_sets,
+            "get_fastq_list_rows_in_fastq_set": get_fastq_list_rows_in_fastq_set,
+            "get_fastq_by_rgid": get_fastq_by_rgid,
+        },
+        "orcabus_api_tools.fastq.models": {"Fastq": Dict},
+        "orcabus_api_tools.filemanager": {
+            "get_file_manager_request_response_results": get_file_manager_request_response_results,
+            "get_file_manager_request": get_file_manager_request,
+            "get_s3_object_id_from_s3_uri": get_s3_object_id_from_s3_uri,
+            "list_files_recursively": list_files_recursively,
+        },
+        "orcabus_api_tools.filemanager.models": {"FileObject": Dict},
+        "orcabus_api_tools.filemanager.errors": {"S3FileNotFoundError": S3FileNotFoundError},
+    }
+
+    for module_name, attributes in modules.items():
+        module = ModuleType(module_name)
+        module.__dict__.update(attributes)
+        sys.modules[module_name] = module
+        parent_name, _, child_name = module_name.rpartition(".")
+        if parent_name:
+            setattr(sys.modules[parent_name], child_name, module)
+
+
+def _patch_schema_lookups(module: ModuleType):
+    """
+    The schema validation handlers look up the schema name in SSM, and the schema in the schema registry,
+    read the schema from app/event-schemas instead
+    SSM_SCHEMA_PATH is .../schemas/<schema-name>, the schema is at app/event-schemas/<schema-name>/<version>/
+    """
+    def _get_ssm_parameter_value(parameter_name: str) -> str:
+        if parameter_name == LAMBDA_ENV["SSM_REGISTRY_NAME"]:
+            return "local"
+        version_path = Path(parameter_name)
+        return json.dumps({"schemaName": f"{version_path.parent.name}/{version_path.name}"})
+
+    def _get_schema_from_registry(registry_name: str, schema_name: str) -> str:
+        return next((EVENT_SCHEMAS_DIR / schema_name).glob("*.json")).read_text()
+
+    module.get_ssm_parameter_value = _get_ssm_parameter_value
+    module.get_schema_from_registry = _get_schema_from_registry
+
+
+def _patch_ssm_lookups(module: ModuleType):
+    # Read the SSM parameters the handler looks up from SSM_PARAMETERS
+    module.get_ssm_parameter_value = lambda parameter_name: SSM_PARAMETERS[parameter_name]
+
+
+def _post_schema_validation_stand_in(event: Dict[str, Any], context) -> Dict[str, bool]:
+    # The real handler checks the inputs exist in ICAv2 storage
+    get_fixture().record_call("post_schema_validation")
+    return {"isValid": event.get("data", {}).get("engineParameters", {}).get("projectId") is not None}
+
+
+LAMBDA_MODULE_PATCHES: Dict[str, Callable[[ModuleType], None]] = {
+    "get_missing_schema_fields": _patch_schema_lookups,
+    "validate_draft_data_complete_schema": _patch_schema_lookups,
+    "resolve_draft_data": _patch_ssm_lookups,
+}
+
+LAMBDA_STAND_INS: Dict[str, Callable[[Dict[str, Any], Any], Any]] = {
+    "post_schema_validation": _post_schema_validation_stand_in,
+}
+
+
+def _get_wrsc_detail(workflow_run: Dict[str, Any], status: str, payload: Optional[Dict[str, Any]] = None):
+    return {
+        "orcabusId": workflow_run['orcabusId'],
+        "portalRunId": workflow_run['portalRunId'],
+        "workflowRunName": workflow_run['workflowRunName'],
+        "workflow": workflow_run['workflow'],
+        "status": status,
+        "timestamp": "2025-01-01T00:00:00Z",
+        "libraries": workflow_run['libraries'],
+        **({"payload": payload} if payload is not None else {}),
+    }
+
+
+def _get_icav2_wes_detail(workflow_run: Dict[str, Any], status: str):
+    return {
+        "id": "iwa.local",
+        "name": workflow_run['workflowRunName'],
+        "status": status,
+        "tags": {"portalRunId": workflow_run['portalRunId']},
+        "icav2AnalysisId": "00000000-0000-0000-0000-000000000000",
+    }
+
+
+def get_subject_events(
+        subject_id: Optional[str] = None,
+        fixture: Optional[LocalOrcabusFixture] = None,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    The events of a subject, from the upstream SUCCEEDED events to the ICAv2 WES state changes, in order
+    :param subject_id: A subject added with add_subject, defaults to the fixture's first subject
+    :return: Tuples of the snake case state machine name and its input (the event detail)
+    """
+    fixture = fixture or get_fixture()
+
+    def _get_workflow_run(workflow_name: str, status: str) -> Dict[str, Any]:
+        return next(filter(
+            lambda workflow_run_iter_: (
+                workflow_run_iter_['workflow']['name'] == workflow_name and
+                workflow_run_iter_['currentState']['status'] == status and
+                (subject_id is None or workflow_run_iter_['portalRunId'].startswith(subject_id))
+            ),
+            fixture.workflow_runs
+        ))
+
+    sash_draft = _get_workflow_run(WORKFLOW_NAME, "DRAFT")
+    sash_ready = _get_workflow_run(WORKFLOW_NAME, "READY")
+    dragen_run = _get_workflow_run(DRAGEN_WGTS_DNA_WORKFLOW_NAME, "SUCCEEDED")
+    oncoanalyser_run = _get_workflow_run(ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME, "SUCCEEDED")
+    complete_payload = {
+        "version": DEFAULT_PAYLOAD_VERSION,
+        "data": fixture.payloads[sash_ready['orcabusId']]['data'],
+    }
+
+    return [
+        ("glue_succeeded_events_to_draft_update", _get_wrsc_detail(dragen_run, "SUCCEEDED")),
+        ("glue_succeeded_events_to_draft_update", _get_wrsc_detail(oncoanalyser_run, "SUCCEEDED")),
+        ("populate_draft_data", _get_wrsc_detail(sash_draft, "DRAFT")),
+        ("validate_draft_data_and_put_ready_event", _get_wrsc_detail(sash_draft, "DRAFT", complete_payload)),
+        ("ready_event_to_icav2_wes_request_event", _get_wrsc_detail(sash_ready, "READY", complete_payload)),
+        ("icav2_wes_event_to_wrsc_event", _get_icav2_wes_detail(sash_ready, "RUNNING")),
+        ("icav2_wes_event_to_wrsc_event", _get_icav2_wes_detail(sash_ready, "SUCCEEDED")),
+    ]
+
+
+def get_sample_inputs(fixture: Optional[LocalOrcabusFixture] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Sample state machine inputs (event details) for the first subject of the fixture
+    """
+    # The first event of each state machine
+    sample_inputs = {}
+    for state_machine_name, execution_input in get_subject_events(fixture=fixture):
+        sample_inputs.setdefault(state_machine_name, execution_input)
+    return sample_inputs
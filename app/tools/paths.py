@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+"""
+Paths to the application code, shared by the local tools
+"""
+
+# Standard imports
+from pathlib import Path
+from typing import Dict
+
+# Globals
+APP_DIR = Path(__file__).absolute().parent.parent
+LAMBDAS_DIR = APP_DIR / "lambdas"
+SASH_TOOLS_LAYER_DIR = APP_DIR / "layers" / "sash_tools_layer" / "python"
+STEP_FUNCTIONS_TEMPLATES_DIR = APP_DIR / "step-functions-templates"
+LAMBDA_INTERFACES_PATH = APP_DIR.parent / "infrastructure" / "stage" / "lambda" / "interfaces.ts"
+
+LAMBDA_DIR_SUFFIX = "_py"
+
+
+def get_lambda_dirs() -> Dict[str, Path]:
+    """
+    Get the lambda directories keyed by the snake case lambda name
+    i.e. {"compare_payload": Path("app/lambdas/compare_payload_py")}
+    :return:
+    """
+    return dict(map(
+        lambda lambda_dir_iter_: (lambda_dir_iter_.name[:-len(LAMBDA_DIR_SUFFIX)], lambda_dir_iter_),
+        sorted(filter(
+            lambda lambda_dir_iter_: (
+                lambda_dir_iter_.is_dir() and
+                lambda_dir_iter_.name.endswith(LAMBDA_DIR_SUFFIX)
+            ),
+            LAMBDAS_DIR.iterdir()
+        ))
+    ))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmark of the ready-to-ICAv2-WES samplesheet builder against the previous pandas implementation.
+
+Reports the per-call time of each implementation, and the one-off import cost of pandas,
+and checks both implementations generate the same samplesheet.
+The pandas comparison is skipped if pandas is not installed.
+
+Usage:
+    cd app && python3 -m tools.samplesheet_benchmark [--number 10000]
+"""
+
+# Standard imports
+import argparse
+import subprocess
+import sys
+import timeit
+from typing import Dict, List
+
+# Local imports
+from .paths import SASH_TOOLS_LAYER_DIR, get_lambda_dirs
+
+# Globals
+LAMBDA_NAME = "convert_ready_event_inputs_to_icav2_wes_event_inputs"
+DEFAULT_NUMBER = 10000
+
+READY_EVENT_INPUTS = {
+    "mode": "wgts",
+    "groupId": "SBJ05828",
+    "subjectId": "SBJ05828",
+    "tumorDnaSampleId": "L2401541",
+    "normalDnaSampleId": "L2401540",
+    "dragenSomaticDir": "s3://bucket/analysis/dragen-wgts-dna/20250801fc84a1df/L2401541__L2401540__hg38__linear__dragen_variant_calling/",
+    "dragenGermlineDir": "s3://bucket/analysis/dragen-wgts-dna/20250801fc84a1df/L2401540__hg38__graph__dragen_variant_calling/",
+    "oncoanalyserDnaDir": "s3://bucket/analysis/oncoanalyser-wgts-dna/202508052d182ed9/SBJ05828/",
+    "refDataPath": "s3://bucket/reference-data/sash/",
+}
+
+
+def generate_samplesheet_with_pandas(ready_event_inputs: Dict) -> List[Dict[str, str]]:
+    """
+    The previous implementation, kept here for comparison
+    """
+    import pandas as pd
+
+    return pd.DataFrame(
+        columns=["id", "subject_name", "sample_name", "filetype", "filepath"],
+        data=[
+            {
+                "id": ready_event_inputs["groupId"],
+                "subject_name": ready_event_inputs["subjectId"],
+                "sample_name": ready_event_inputs["tumorDnaSampleId"],
+                "filetype": "dragen_somatic_dir",
+                "filepath": ready_event_inputs["dragenSomaticDir"],
+            },
+            {
+                "id": ready_event_inputs["groupId"],
+                "subject_name": ready_event_inputs["subjectId"],
+                "sample_name": ready_event_inputs["normalDnaSampleId"],
+                "filetype": "dragen_germline_dir",
+                "filepath": ready_event_inputs["dragenGermlineDir"],
+            },
+            {
+                "id": ready_event_inputs["groupId"],
+                "subject_name": ready_event_inputs["subjectId"],
+                "sample_name": ready_event_inputs["tumorDnaSampleId"],
+                "filetype": "oncoanalyser_dir",
+                "filepath": ready_event_inputs["oncoanalyserDnaDir"],
+            }
+        ]
+    ).to_dict(orient='records')
+
+
+def get_pandas_import_ms() -> float:
+    return float(subprocess.run(
+        [
+            sys.executable, "-c",
+            "import time; start = time.perf_counter(); import pandas; print((time.perf_counter() - start) * 1000)"
+        ],
+        capture_output=True, text=True, check=True
+    ).stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the samplesheet builder")
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER, help="Calls per implementation")
+    args = parser.parse_args()
+
+    sys.path[:0] = [str(get_lambda_dirs()[LAMBDA_NAME]), str(SASH_TOOLS_LAYER_DIR)]
+    from convert_ready_event_inputs_to_icav2_wes_event_inputs import generate_samplesheet_from_inputs
+
+    builder_us = timeit.timeit(
+        lambda: generate_samplesheet_from_inputs(READY_EVENT_INPUTS), number=args.number
+    ) / args.number * 1e6
+    print(f"samplesheet builder: {builder_us:10.2f} us/call")
+
+    try:
+        import pandas  # noqa: F401
+    except ModuleNotFoundError:
+        print("pandas is not installed, skipping the pandas comparison")
+        return
+
+    if generate_samplesheet_with_pandas(READY_EVENT_INPUTS) != generate_samplesheet_from_inputs(READY_EVENT_INPUTS):
+        raise ValueError("The samplesheet builder and pandas implementations differ")
+
+    pandas_us = timeit.timeit(
+        lambda: generate_samplesheet_with_pandas(READY_EVENT_INPUTS), number=args.number
+    ) / args.number * 1e6
+    print(f"pandas dataframe:    {pandas_us:10.2f} us/call ({pandas_us / builder_us:.0f}x slower)")
+    print(f"pandas import:       {get_pandas_import_ms():10.2f} ms (once per cold start)")
+
+
+if __name__ == "__main__":
+    main()
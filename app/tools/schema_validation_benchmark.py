@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the incremental draft schema validation in get_missing_schema_fields against a full validation.
+
+A stuck draft is validated again on every populate loop, with one input changed since the last loop.
+The draft schema is widened with --width extra inputs (s3 directory uris, as the real inputs), and for each
+loop one input is changed and the draft validated in full, and incrementally from the previous validation.
+Reports the time per validation and the number of units validated, and checks both give the same missing fields,
+also for --checks random edits (adding, removing and changing fields, and changing their types).
+
+Usage:
+    cd app && python3 -m tools.schema_validation_benchmark [--width 200] [--number 200] [--checks 500]
+"""
+
+# Standard imports
+import argparse
+import json
+import random
+import sys
+import timeit
+from copy import deepcopy
+from typing import Any, Dict, Tuple
+
+# Local imports
+from .paths import APP_DIR, SASH_TOOLS_LAYER_DIR, get_lambda_dirs
+
+# Globals
+LAMBDA_NAME = "get_missing_schema_fields"
+SCHEMA_PATH = APP_DIR / "event-schemas" / "complete-data-draft" / "2025.08.05" / "complete-data-draft-schema.json"
+DEFAULT_WIDTH = 200
+DEFAULT_NUMBER = 200
+DEFAULT_CHECKS = 500
+
+DRAFT_DATA = {
+    "tags": {
+        "libraryId": "L2401540",
+        "subjectId": "9689947",
+        "individualId": "SBJ05828",
+        "fastqRgidList": ["GGACTTGG+CGTCTGCG.2.241024_A00130_0336_BHW7MVDSXC"],
+        "tumorLibraryId": "L2401541",
+        "tumorFastqRgidList": ["AAGTCCAA+TACTCATA.2.241024_A00130_0336_BHW7MVDSXC"],
+    },
+    "inputs": {
+        "mode": "wgts",
+        "groupId": "SBJ05828",
+        "subjectId": "SBJ05828",
+        "tumorDnaSampleId": "L2401541",
+        "normalDnaSampleId": "L2401540",
+        "dragenSomaticDir": "s3://bucket/analysis/dragen-wgts-dna/20250801fc84a1df/L2401541__L2401540/",
+        "dragenGermlineDir": "s3://bucket/analysis/dragen-wgts-dna/20250801fc84a1df/L2401540/",
+        # oncoanalyserDnaDir is missing, the draft is stuck waiting for it
+        "refDataPath": "s3://bucket/reference-data/sash/",
+    },
+    "engineParameters": {
+        "projectId": "ea19a3f5-ec7c-4940-a474-c31cd91dbad4",
+        "pipelineId": "5d4d9c2e-b4b6-4a66-a3b4-b2a1e3d2f2a1",
+        "outputUri": "s3://bucket/analysis/sash/20250801abcdef12/",
+        "logsUri": "s3://bucket/logs/sash/20250801abcdef12/",
+        "cacheUri": "s3://bucket/cache/sash/20250801abcdef12/",
+    },
+}
+
+
+def get_wide_schema_and_data(width: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    schema = json.loads(SCHEMA_PATH.read_text())
+    data = deepcopy(DRAFT_DATA)
+    for input_index in range(width):
+        input_name = f"extraDir{input_index}"
+        schema["$defs"]["inputs"]["properties"][input_name] = {"$ref": "#/$defs/s3UriDirectory"}
+        schema["$defs"]["inputs"]["required"].append(input_name)
+        data["inputs"][input_name] = f"s3://bucket/extra/{input_index}/"
+    return schema, data
+
+
+def get_random_edit(data: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    data = deepcopy(data)
+    section = data.setdefault(rng.choice(["tags", "inputs", "engineParameters"]), {})
+    if not isinstance(section, dict):
+        data[rng.choice(list(data.keys()))] = {}
+        return data
+    field_name = rng.choice(list(section.keys()) + ["oncoanalyserDnaDir", "newField"])
+    edit = rng.choice(["remove", "change", "invalid", "type"])
+    if edit == "remove":
+        section.pop(field_name, None)
+    elif edit == "change":
+        section[field_name] = f"s3://bucket/changed/{rng.randint(0, 9)}/"
+    elif edit == "invalid":
+        section[field_name] = "not-an-s3-uri"
+    else:
+        section[field_name] = rng.choice([1, None, [], {}, ["a"]])
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the incremental draft schema validation")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="Extra inputs in the draft schema")
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER, help="Populate loops to time")
+    parser.add_argument("--checks", type=int, default=DEFAULT_CHECKS, help="Random edits to check")
+    args = parser.parse_args()
+    if args.width < 1:
+        parser.error("--width must be at least 1, each loop changes one extra input")
+
+    sys.path.insert(0, str(SASH_TOOLS_LAYER_DIR))
+    sys.path.insert(0, str(get_lambda_dirs()[LAMBDA_NAME]))
+    from get_missing_schema_fields import get_missing_fields
+
+    schema, data = get_wide_schema_and_data(args.width)
+
+    # Each loop changes one input, validating from the previous loop's validation
+    loop_data_list = []
+    for loop_index in range(args.number):
+        data = deepcopy(data)
+        data["inputs"][f"extraDir{loop_index % args.width}"] = f"s3://bucket/extra/loop-{loop_index}/"
+        loop_data_list.append(data)
+
+    full_seconds = timeit.timeit(
+        lambda: list(map(lambda data_iter_: get_missing_fields(schema, data_iter_), loop_data_list)),
+        number=1
+    )
+
+    validated_unit_counts = []
+    _, previous_validation = get_missing_fields(schema, get_wide_schema_and_data(args.width)[1])
+
+    def _run_incremental():
+        nonlocal previous_validation
+        for data_iter_ in loop_data_list:
+            _, previous_validation = get_missing_fields(schema, data_iter_, previous_validation)
+            validated_unit_counts.append(previous_validation["validatedUnitCount"])
+
+    incremental_seconds = timeit.timeit(_run_incremental, number=1)
+
+    unit_count = len(previous_validation["units"])
+    full_ms = full_seconds / args.number * 1000
+    incremental_ms = incremental_seconds / args.number * 1000
+    print(f"draft schema with {args.width} extra inputs, {unit_count} validation units")
+    print(f"full validation:        {full_ms:8.2f} ms/loop")
+    print(
+        f"incremental validation: {incremental_ms:8.2f} ms/loop ({full_ms / incremental_ms:.1f}x faster, "
+        f"{sum(validated_unit_counts) / len(validated_unit_counts):.1f} units validated per loop)"
+    )
+
+    # The incremental missing fields match a full validation after any edit
+    rng = random.Random(0)
+    data = get_wide_schema_and_data(args.width)[1]
+    _, previous_validation = get_missing_fields(schema, data)
+    for _ in range(args.checks):
+        data = get_random_edit(data, rng)
+        missing_fields, previous_validation = get_missing_fields(schema, data, previous_validation)
+        if missing_fields != get_missing_fields(schema, data)[0]:
+            raise ValueError(f"Incremental and full validation differ for {json.dumps(data)}")
+    print(f"incremental and full validation agree on {args.checks} random edits")
+
+
+if __name__ == "__main__":
+    main()
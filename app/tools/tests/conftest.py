@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+"""
+Shared fixtures of the local tools tests
+
+The tools are imported as the tools package of the app dir, as they are run (cd app && python3 -m tools.<tool>).
+"""
+
+# Standard imports
+import json
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+# Test imports
+import pytest
+
+# Globals
+APP_DIR = Path(__file__).parent.parent.parent
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+
+@pytest.fixture
+def read_fixture() -> Callable[[str], Dict[str, Any]]:
+    """
+    Read a json fixture by file name
+    """
+    def _read_fixture(fixture_name: str) -> Dict[str, Any]:
+        return json.loads((FIXTURES_DIR / fixture_name).read_text())
+
+    return _read_fixture
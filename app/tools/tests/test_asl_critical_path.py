@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the critical path and independent task pair analysis, over a fixture template
+"""
+
+# Standard imports
+from pathlib import Path
+
+# Local imports
+from tools.asl_critical_path import (
+    LatencyModel,
+    analyse_template,
+    get_critical_path,
+    get_independent_task_pairs,
+    get_side_effect_lambda_names,
+)
+
+# Globals
+TEMPLATE_PATH = Path(__file__).parent / "fixtures" / "critical_path_sfn_template.asl.json"
+LATENCY_MODEL = LatencyModel(
+    latencies_ms={
+        "get_workflow_run_object": 100.0,
+        "get_libraries": 200.0,
+        "get_dragen_outputs_from_portal_run_id": 300.0,
+        "Get oncoanalyser dir": 400.0,
+    },
+    lambda_ms=50.0,
+    sdk_ms=10.0,
+    state_ms=1.0,
+)
+
+
+def test_critical_path():
+    report = analyse_template(TEMPLATE_PATH, LATENCY_MODEL)
+    # The Parallel state costs its slowest branch, the oncoanalyser dir
+    assert list(map(lambda step_iter_: (step_iter_["state"], step_iter_["estimateMs"]), report["criticalPath"])) == [
+        ("Get workflow run", 100.0),
+        ("Get libraries", 200.0),
+        ("Get dirs", 1.0),
+        ("Get dirs/branch 2/Get oncoanalyser dir", 400.0),
+        ("Add comment", 50.0),
+        ("Put event", 10.0),
+    ]
+    assert report["predictedDurationMs"] == 761.0
+    assert report["sequentialTaskMs"] == 760.0
+    assert report["criticalPathTaskCount"] == 5
+    assert report["stateCounts"] == {"Parallel": 1, "Task": 6}
+
+
+def test_independent_task_pairs(read_fixture):
+    definition = read_fixture(TEMPLATE_PATH.name)
+    # Get libraries does not read the workflow run, the comment and the event are side effects
+    assert get_independent_task_pairs(definition) == [
+        {"task": "Get workflow run", "nextTask": "Get libraries", "between": []},
+    ]
+
+
+def test_side_effects_are_ordering_barriers(read_fixture):
+    definition = read_fixture(TEMPLATE_PATH.name)
+    # Without the side effect, the event does not read anything the comment produced
+    definition["States"]["Add comment"]["Arguments"]["FunctionName"] = "${__get_libraries_lambda_function_arn__}"
+    assert {"task": "Add comment", "nextTask": "Put event", "between": []} not in get_independent_task_pairs(definition)
+    definition["States"]["Put event"]["Resource"] = "arn:aws:states:::aws-sdk:ssm:getParameter"
+    assert {"task": "Add comment", "nextTask": "Put event", "between": []} in get_independent_task_pairs(definition)
+
+
+def test_wait_states_cost_their_seconds():
+    definition = {
+        "StartAt": "Wait",
+        "States": {
+            "Wait": {"Type": "Wait", "Seconds": 5, "Next": "Wait for expression"},
+            "Wait for expression": {"Type": "Wait", "Seconds": "{% $waitSeconds %}", "End": True},
+        }
+    }
+    critical_path_ms, critical_path = get_critical_path(definition, LatencyModel(wait_seconds=60.0))
+    assert critical_path_ms == 65000.0
+    assert list(map(lambda step_iter_: step_iter_.estimate_ms, critical_path)) == [5000.0, 60000.0]
+
+
+def test_side_effect_lambdas_follow_the_requirement_flags():
+    side_effect_lambda_names = get_side_effect_lambda_names()
+    # Comment ledger, negative cache, validation cache and claim check writers
+    assert {
+        "add_populate_draft_comment",
+        "compare_payload",
+        "find_latest_workflow",
+        "get_missing_schema_fields",
+        "get_draft_payload",
+        "resolve_draft_data",
+        "check_payload_fingerprint",
+        "index_workflow_run_state_change",
+    } <= side_effect_lambda_names
+    assert "get_libraries" not in side_effect_lambda_names
+    assert "record_no_draft_found" not in side_effect_lambda_names
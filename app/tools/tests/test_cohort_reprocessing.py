@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the cohort reprocessing checkpoint and resume, against the local API stand-ins
+"""
+
+# Standard imports
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Test imports
+import pytest
+
+# Local imports
+from tools import local_stand_ins
+from tools.asl_executor import load_lambda_handlers
+from tools.cohort_reprocessing import (
+    FAILED_CHECKPOINT_STATUS,
+    SUCCEEDED_CHECKPOINT_STATUS,
+    CohortReprocessor,
+    get_subject_key,
+    read_checkpoint,
+    reprocess_cohort,
+)
+
+# Globals
+SUBJECTS = [
+    {"subjectId": f"SBJ0000{subject_index}", "normalLibraryId": f"L240000{subject_index}1", "tumorLibraryId": f"L240000{subject_index}2"}
+    for subject_index in range(1, 4)
+]
+# No sash run in the fixture until the retry
+LATE_SUBJECT = {"subjectId": "SBJ00009", "normalLibraryId": "L2400091", "tumorLibraryId": "L2400092"}
+
+pytest.importorskip("requests")
+
+
+class CountingReprocessor(CohortReprocessor):
+    """
+    Records the subjects each run generates a draft for
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.subject_keys: List[str] = []
+
+    def get_draft_event_detail(self, subject: Dict[str, Any]) -> Dict[str, Any]:
+        self.subject_keys.append(get_subject_key(subject))
+        return super().get_draft_event_detail(subject)
+
+
+@pytest.fixture
+def orcabus_fixture(monkeypatch) -> local_stand_ins.LocalOrcabusFixture:
+    default_fixture = local_stand_ins.get_fixture()
+    fixture = local_stand_ins.LocalOrcabusFixture()
+    for subject in SUBJECTS:
+        fixture.add_subject(
+            subject["subjectId"],
+            normal_library_id=subject["normalLibraryId"],
+            tumor_library_id=subject["tumorLibraryId"],
+        )
+    local_stand_ins.set_fixture(fixture)
+    yield fixture
+    local_stand_ins.set_fixture(default_fixture)
+
+
+@pytest.fixture
+def lambda_handlers(monkeypatch, orcabus_fixture):
+    lambda_handlers = load_lambda_handlers(local_stand_ins)
+
+    # The memory state store and an empty workflow run index, as the handlers run in the lambda tests
+    from sash_tools import state_store, workflow_run_index
+    monkeypatch.setenv(state_store.STATE_STORE_BACKEND_ENV_VAR, "memory")
+    monkeypatch.delenv(workflow_run_index.WORKFLOW_RUN_INDEX_BACKEND_ENV_VAR, raising=False)
+    monkeypatch.setattr(workflow_run_index, "_WORKFLOW_RUN_INDEXES", {})
+    state_store._MEMORY_STORE.clear()
+    yield lambda_handlers
+    state_store._MEMORY_STORE.clear()
+
+
+def read_events(output_path: Path) -> List[Dict[str, Any]]:
+    return list(map(json.loads, output_path.read_text().splitlines()))
+
+
+def test_resume_skips_succeeded_and_retries_failed_subjects(lambda_handlers, orcabus_fixture, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.jsonl"
+    output_path = tmp_path / "events.jsonl"
+    subject_keys = list(map(get_subject_key, SUBJECTS))
+    late_subject_key = get_subject_key(LATE_SUBJECT)
+
+    # First run, the late subject has no sash run to reprocess
+    reprocessor = CountingReprocessor(lambda_handlers)
+    summary = reprocess_cohort(
+        [*SUBJECTS, LATE_SUBJECT], reprocessor,
+        concurrency=2, checkpoint_path=checkpoint_path, output_path=output_path,
+    )
+    assert sorted(reprocessor.subject_keys) == sorted([*subject_keys, late_subject_key])
+    assert summary["skippedCount"] == 0
+    assert list(summary["failures"]) == [late_subject_key]
+    checkpoint = read_checkpoint(checkpoint_path)
+    assert {key: entry["status"] for key, entry in checkpoint.items()} == {
+        **{subject_key: SUCCEEDED_CHECKPOINT_STATUS for subject_key in subject_keys},
+        late_subject_key: FAILED_CHECKPOINT_STATUS,
+    }
+    events = read_events(output_path)
+    assert sorted(map(lambda event_iter_: event_iter_["portalRunId"], events)) == sorted(
+        map(lambda subject_key_iter_: checkpoint[subject_key_iter_]["portalRunId"], subject_keys)
+    )
+    assert all(map(lambda event_iter_: event_iter_["status"] == "DRAFT", events))
+
+    # Second run, only the failed subject is reprocessed, and now succeeds.
+    # The new sash run reaches the workflow run index through its state change event, as it does deployed
+    sash_draft = orcabus_fixture.add_subject(
+        LATE_SUBJECT["subjectId"],
+        normal_library_id=LATE_SUBJECT["normalLibraryId"],
+        tumor_library_id=LATE_SUBJECT["tumorLibraryId"],
+    )
+    lambda_handlers["index_workflow_run_state_change"](
+        {
+            "orcabusId": sash_draft["orcabusId"],
+            "portalRunId": sash_draft["portalRunId"],
+            "workflow": sash_draft["workflow"],
+            "status": "DRAFT",
+            "timestamp": "2025-01-01T00:00:00Z",
+            "libraries": sash_draft["libraries"],
+        },
+        None
+    )
+    reprocessor = CountingReprocessor(lambda_handlers)
+    summary = reprocess_cohort(
+        [*SUBJECTS, LATE_SUBJECT], reprocessor,
+        concurrency=2, checkpoint_path=checkpoint_path, output_path=output_path,
+    )
+    assert reprocessor.subject_keys == [late_subject_key]
+    assert summary["skippedCount"] == len(SUBJECTS)
+    assert summary["failures"] == {}
+    assert read_checkpoint(checkpoint_path)[late_subject_key]["status"] == SUCCEEDED_CHECKPOINT_STATUS
+    assert len(read_events(output_path)) == len(SUBJECTS) + 1
+
+    # Third run, nothing left to do
+    reprocessor = CountingReprocessor(lambda_handlers)
+    summary = reprocess_cohort([*SUBJECTS, LATE_SUBJECT], reprocessor, checkpoint_path=checkpoint_path)
+    assert reprocessor.subject_keys == []
+    assert summary["skippedCount"] == len(SUBJECTS) + 1
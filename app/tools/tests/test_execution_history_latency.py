@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the stage latencies of a recorded execution history
+"""
+
+# Standard imports
+import json
+import sys
+from pathlib import Path
+
+# Test imports
+import pytest
+
+# Local imports
+from tools import execution_history_latency
+
+# Globals
+HISTORY_PATH = Path(__file__).parent / "fixtures" / "ready_event_to_icav2_wes_request_event_history.json"
+STATE_MACHINE_NAME = "ready_event_to_icav2_wes_request_event"
+
+
+@pytest.fixture
+def report(monkeypatch, tmp_path):
+    report_path = tmp_path / "report.json"
+    monkeypatch.setattr(sys, "argv", ["execution_history_latency", str(HISTORY_PATH), "--output-json", str(report_path)])
+    execution_history_latency.main()
+    return json.loads(report_path.read_text())
+
+
+def test_history_is_matched_to_its_template(report):
+    assert list(report) == [STATE_MACHINE_NAME]
+    assert report[STATE_MACHINE_NAME]["executions"] == 1
+    assert report[STATE_MACHINE_NAME]["statuses"] == {"SUCCEEDED": 1}
+    assert report[STATE_MACHINE_NAME]["durationMs"]["p50"] == pytest.approx(2070)
+
+
+def test_state_latencies(report):
+    states = report[STATE_MACHINE_NAME]["states"]
+    assert {
+        state_name: (state["entries"], state["durationMs"]["p50"], state["retries"])
+        for state_name, state in states.items()
+    } == {
+        "Save inputs": (1, pytest.approx(10), 0),
+        # Entered to exited, including the failed attempt and the retry interval
+        "Cache workflow run payload": (1, pytest.approx(1320), 1),
+        "Convert Sash Ready Event to ICAv2 WES Event": (1, pytest.approx(620), 0),
+        "Push WES Event": (1, pytest.approx(70), 0),
+    }
+
+    # Each lambda attempt is timed from TaskScheduled to its TaskSucceeded or TaskFailed
+    cache_state = states["Cache workflow run payload"]
+    assert cache_state["lambdaName"] == "cache_workflow_run_payload"
+    assert cache_state["lambdaMs"] == {"p50": pytest.approx(100), "p95": pytest.approx(200), "p99": pytest.approx(200)}
+    assert cache_state["lambdaScheduleMs"]["p50"] == pytest.approx(20)
+    assert cache_state["totalLambdaMs"] == pytest.approx(300)
+    # Not a lambda task
+    assert "lambdaMs" not in states["Push WES Event"]
+
+
+def test_handlers_are_ranked_by_lambda_time(report):
+    handlers = report[STATE_MACHINE_NAME]["handlers"]
+    assert list(handlers) == ["convert_ready_event_inputs_to_icav2_wes_event_inputs", "cache_workflow_run_payload"]
+    assert handlers["convert_ready_event_inputs_to_icav2_wes_event_inputs"]["shareOfLambdaMs"] == pytest.approx(600 / 900)
+    assert handlers["cache_workflow_run_payload"]["invocations"] == 2
+    assert handlers["cache_workflow_run_payload"]["handlerPath"] == (
+        "lambdas/cache_workflow_run_payload_py/cache_workflow_run_payload.py"
+    )
+
+
+def test_percentiles_are_nearest_rank():
+    assert execution_history_latency.get_percentiles([]) == {"p50": None, "p95": None, "p99": None}
+    assert execution_history_latency.get_percentiles([float(value) for value in range(100, 0, -1)]) == {
+        "p50": 50.0, "p95": 95.0, "p99": 99.0,
+    }
+
+
+def test_mixed_directory_skips_files_that_are_not_histories(tmp_path, capsys):
+    (tmp_path / "history.json").write_text(HISTORY_PATH.read_text())
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "template.asl.json").write_text(
+        (Path(__file__).parent / "fixtures" / "critical_path_sfn_template.asl.json").read_text()
+    )
+    (tmp_path / "nested" / "ids.json").write_text(json.dumps(["wfr.01J"]))
+
+    histories = list(execution_history_latency.read_histories([tmp_path]))
+    assert histories == [json.loads(HISTORY_PATH.read_text())["events"]]
+    assert capsys.readouterr().err.count("not an execution history") == 2
+
+    # A file named on the command line must be a history
+    with pytest.raises(ValueError, match="template.asl.json is not an execution history"):
+        list(execution_history_latency.read_histories([tmp_path / "nested" / "template.asl.json"]))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the populate draft data state machine, against the local API stand-ins
+"""
+
+# Standard imports
+from copy import deepcopy
+
+# Test imports
+import pytest
+
+# Local imports
+from tools import local_stand_ins
+from tools.asl_executor import (
+    LocalStateMachineExecutor,
+    get_template_path,
+    load_definition,
+    load_lambda_handlers,
+)
+
+# Globals
+STATE_MACHINE_NAME = "populate_draft_data"
+SUBJECT_ID = "SBJ00001"
+NO_CHANGE_COMMENT_PREFIX = "Draft payload has not changed since last population attempt."
+
+pytest.importorskip("requests")
+pytest.importorskip("jsonschema")
+pytest.importorskip("jsonata")
+
+
+@pytest.fixture
+def orcabus_fixture() -> local_stand_ins.LocalOrcabusFixture:
+    default_fixture = local_stand_ins.get_fixture()
+    fixture = local_stand_ins.LocalOrcabusFixture()
+    fixture.add_subject(SUBJECT_ID, normal_library_id="L2400001", tumor_library_id="L2400002")
+    local_stand_ins.set_fixture(fixture)
+    yield fixture
+    local_stand_ins.set_fixture(default_fixture)
+
+
+@pytest.fixture
+def lambda_handlers(monkeypatch, orcabus_fixture):
+    lambda_handlers = load_lambda_handlers(local_stand_ins)
+
+    from sash_tools import state_store
+    monkeypatch.setenv(state_store.STATE_STORE_BACKEND_ENV_VAR, "memory")
+    state_store._MEMORY_STORE.clear()
+    yield lambda_handlers
+    state_store._MEMORY_STORE.clear()
+
+
+@pytest.fixture
+def executor(lambda_handlers) -> LocalStateMachineExecutor:
+    return LocalStateMachineExecutor(
+        definition=load_definition(get_template_path(STATE_MACHINE_NAME)),
+        lambda_handlers=lambda_handlers,
+        ssm_parameters=dict(local_stand_ins.SSM_PARAMETERS),
+        state_machine_name=STATE_MACHINE_NAME,
+    )
+
+
+def get_no_change_comments(orcabus_fixture: local_stand_ins.LocalOrcabusFixture):
+    return list(filter(
+        lambda comment_iter_: comment_iter_['comment'].startswith(NO_CHANGE_COMMENT_PREFIX),
+        orcabus_fixture.comments
+    ))
+
+
+def test_emitted_complete_payload_exits_without_comment(executor, orcabus_fixture):
+    # Tags and engine parameters, then inputs, then the populated draft comes back
+    execution_input = local_stand_ins.get_sample_inputs(orcabus_fixture)[STATE_MACHINE_NAME]
+    for _ in range(2):
+        result = executor.start_execution(execution_input)
+        assert result.status == "SUCCEEDED"
+        execution_input = result.put_events[-1]['Detail']
+
+    result = executor.start_execution(execution_input)
+    assert result.status == "SUCCEEDED"
+    assert result.put_events == []
+    assert "Payload already populated" in result.stats.state_entries
+    assert "Get workflow object" not in result.stats.state_entries
+    assert "Get missing schema fields" not in result.stats.state_entries
+    assert get_no_change_comments(orcabus_fixture) == []
+
+
+def test_checked_in_libraries_and_inputs_are_emitted_inline(executor, orcabus_fixture, monkeypatch):
+    from sash_tools import claim_check
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_BACKEND_ENV_VAR, "memory")
+    monkeypatch.setenv(claim_check.CLAIM_CHECK_THRESHOLD_BYTES_ENV_VAR, "1")
+
+    # Tags and engine parameters, then the libraries and inputs are resolved through claim checks
+    execution_input = local_stand_ins.get_sample_inputs(orcabus_fixture)[STATE_MACHINE_NAME]
+    for _ in range(2):
+        result = executor.start_execution(execution_input)
+        assert result.status == "SUCCEEDED", result.error
+        execution_input = result.put_events[-1]['Detail']
+
+    assert not claim_check.is_claim_check(execution_input['libraries'])
+    assert all(map(lambda library_iter_: library_iter_['readsets'], execution_input['libraries']))
+    assert execution_input['payload']['data']['inputs']['normalDnaSampleId'] == "L2400001"
+
+
+def test_emitted_incomplete_payload_posts_missing_fields_comment(executor, lambda_handlers, orcabus_fixture):
+    execution_input = local_stand_ins.get_sample_inputs(orcabus_fixture)[STATE_MACHINE_NAME]
+    sash_ready = next(filter(
+        lambda workflow_run_iter_: workflow_run_iter_['portalRunId'] == f"{SUBJECT_ID}sashready",
+        orcabus_fixture.workflow_runs
+    ))
+    # The draft populate emitted while the oncoanalyser run was still in progress
+    incomplete_payload = {
+        "version": local_stand_ins.DEFAULT_PAYLOAD_VERSION,
+        "data": deepcopy(orcabus_fixture.payloads[sash_ready['orcabusId']]['data']),
+    }
+    del incomplete_payload['data']['inputs']['oncoanalyserDnaDir']
+    missing_fields = lambda_handlers["get_missing_schema_fields"]({"data": incomplete_payload['data']}, None)['missingFields']
+    assert missing_fields
+    lambda_handlers["compare_payload"](
+        {
+            "oldPayload": {},
+            "newPayload": incomplete_payload,
+            "portalRunId": execution_input['portalRunId'],
+            "recordFingerprint": True,
+            "missingFields": missing_fields,
+        },
+        None
+    )
+    execution_input = {**execution_input, "payload": incomplete_payload}
+
+    result = executor.start_execution(execution_input)
+    assert result.status == "SUCCEEDED"
+    assert result.put_events == []
+    assert "Add no change comment" in result.stats.state_entries
+    # The missing fields were recorded with the fingerprint, the payload is not validated again
+    assert "Get workflow object" not in result.stats.state_entries
+    assert "Get missing schema fields" not in result.stats.state_entries
+    no_change_comments = get_no_change_comments(orcabus_fixture)
+    assert len(no_change_comments) == 1
+    assert "inputs.oncoanalyserDnaDir" in no_change_comments[0]['comment']
+
+    # The comment ledger keeps the same comment from being posted twice
+    result = executor.start_execution(execution_input)
+    assert result.status == "SUCCEEDED"
+    assert len(get_no_change_comments(orcabus_fixture)) == 1
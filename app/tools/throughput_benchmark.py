@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+"""
+End to end throughput benchmark, from the upstream SUCCEEDED events to the ICAv2 WES request and state changes.
+
+Synthesizes --subjects subjects in the stand-ins fixture (each with DRAGEN and oncoanalyser SUCCEEDED runs
+and a sash draft), and drives the events of each subject (see local_stand_ins.get_subject_events) through the
+state machine templates in process with the asl_executor, in the order the service receives them
+* glue_succeeded_events_to_draft_update    - the DRAGEN and oncoanalyser SUCCEEDED events
+* populate_draft_data                      - the DRAFT event
+* validate_draft_data_and_put_ready_event  - the populated DRAFT event
+* ready_event_to_icav2_wes_request_event   - the READY event
+* icav2_wes_event_to_wrsc_event            - the ICAv2 WES RUNNING and SUCCEEDED events
+
+Subjects are run --concurrency at a time, with the events of a subject run one after the other.
+Each OrcaBus API call of the stand-ins takes --api-latency-ms, to approximate the real services.
+Repeat --concurrency (i.e. --concurrency 1 2 4 8 16 32) to sweep the concurrency, a fresh set of subjects is
+used for each level so the state store caches of a previous level do not help.
+
+Spans and embedded metrics of the handlers are not logged (TRACE_EXPORTER and METRICS_SINK default to none),
+so the report is not buried under their json lines, set either env var to log them.
+
+Reports for each level the subjects per minute, the events per second, the OrcaBus API calls per subject,
+and the median and p95 latency of each stage (state machine) and of a whole subject.
+The saturation point is the first level after which doubling the concurrency adds less than --saturation-gain
+to the throughput.
+
+Usage:
+    cd app && python3 -m tools.throughput_benchmark [--subjects 32] [--concurrency 1 4 16] [--api-latency-ms 20]
+"""
+
+# Standard imports
+import argparse
+import json
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from os import environ
+from pathlib import Path
+from statistics import median, quantiles
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+# Local imports
+from .asl_executor import (
+    DEFAULT_STAND_INS_MODULE,
+    LocalStateMachineExecutor,
+    get_template_path,
+    load_definition,
+    load_lambda_handlers,
+)
+
+# Globals
+DEFAULT_SUBJECTS = 32
+DEFAULT_CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+DEFAULT_API_LATENCY_MS = 20.0
+DEFAULT_SATURATION_GAIN = 0.1
+SUBJECT_STAGE_NAME = "subject"
+# See sash_tools.tracing and sash_tools.metrics
+TRACE_EXPORTER_ENV_VAR = "TRACE_EXPORTER"
+METRICS_SINK_ENV_VAR = "METRICS_SINK"
+QUIET_SINK = "none"
+
+logger = logging.getLogger(__name__)
+
+
+def get_p95(values: List[float]) -> float:
+    return quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+
+
+def get_latency_report(values: List[float]) -> Dict[str, float]:
+    return {"medianMs": median(values), "p95Ms": get_p95(values)}
+
+
+def run_level(
+        stand_ins: Any,
+        executors: Dict[str, LocalStateMachineExecutor],
+        level_index: int,
+        subject_count: int,
+        concurrency: int,
+        api_latency_ms: float,
+) -> Dict[str, Any]:
+    """
+    Run the events of a fresh set of subjects at a concurrency level
+    """
+    fixture = stand_ins.LocalOrcabusFixture(api_latency_ms=api_latency_ms)
+    subject_ids = list(map(lambda subject_index_iter_: f"SBJ{level_index:02d}{subject_index_iter_:04d}", range(subject_count)))
+    for subject_id in subject_ids:
+        fixture.add_subject(
+            subject_id,
+            normal_library_id=f"L{subject_id[3:]}1",
+            tumor_library_id=f"L{subject_id[3:]}2",
+        )
+    stand_ins.set_fixture(fixture)
+    subject_events = dict(map(
+        lambda subject_id_iter_: (subject_id_iter_, stand_ins.get_subject_events(subject_id_iter_, fixture)),
+        subject_ids
+    ))
+
+    latencies_ms: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+    lock = Lock()
+
+    def _run_subject(subject_id: str):
+        subject_start = time.perf_counter()
+        for state_machine_name, execution_input in subject_events[subject_id]:
+            result = executors[state_machine_name].start_execution(execution_input)
+            with lock:
+                latencies_ms[state_machine_name].append(result.duration_ms)
+                statuses[result.status] += 1
+            if result.error is not None:
+                logger.warning(f"{state_machine_name} failed for {subject_id}, {result.error}")
+        with lock:
+            latencies_ms[SUBJECT_STAGE_NAME].append((time.perf_counter() - subject_start) * 1000)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="subject") as executor:
+        list(executor.map(_run_subject, subject_ids))
+    elapsed_seconds = time.perf_counter() - start_time
+
+    event_count = sum(statuses.values())
+    return {
+        "concurrency": concurrency,
+        "subjects": subject_count,
+        "elapsedSeconds": elapsed_seconds,
+        "subjectsPerMinute": subject_count / elapsed_seconds * 60,
+        "eventsPerSecond": event_count / elapsed_seconds,
+        "statuses": dict(statuses),
+        "apiCallsPerSubject": sum(fixture.api_calls.values()) / subject_count,
+        "apiCallsPerSubjectByFunction": {
+            api_function_name: count / subject_count
+            for api_function_name, count in sorted(fixture.api_calls.items())
+        },
+        "stages": {
+            stage_name: get_latency_report(stage_latencies_ms)
+            for stage_name, stage_latencies_ms in latencies_ms.items()
+        },
+    }
+
+
+def get_saturation_concurrency(level_reports: List[Dict[str, Any]], saturation_gain: float) -> Optional[int]:
+    """
+    Get the first concurrency level after which the next level adds less than the saturation gain per doubling
+    """
+    for level_report, next_level_report in zip(level_reports, level_reports[1:]):
+        doublings = math.log2(next_level_report["concurrency"] / level_report["concurrency"])
+        throughput_ratio = next_level_report["subjectsPerMinute"] / level_report["subjectsPerMinute"]
+        if throughput_ratio ** (1 / doublings) - 1 < saturation_gain:
+            return level_report["concurrency"]
+    return None
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="End to end throughput benchmark of the state machines")
+    parser.add_argument("--subjects", type=int, default=DEFAULT_SUBJECTS, help="Subjects per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY_LEVELS, help="Concurrent subjects, one level per value")
+    parser.add_argument("--api-latency-ms", type=float, default=DEFAULT_API_LATENCY_MS, help="Latency of each OrcaBus API call")
+    parser.add_argument("--saturation-gain", type=float, default=DEFAULT_SATURATION_GAIN, help="Throughput gain per doubling below which the service is saturated")
+    parser.add_argument("--stand-ins", default=DEFAULT_STAND_INS_MODULE, help="Stand-ins module")
+    parser.add_argument("--output-json", type=Path, help="Write the report to this file")
+    args = parser.parse_args()
+    if args.subjects < 1 or min(args.concurrency) < 1:
+        parser.error("--subjects and --concurrency must be at least 1")
+    return args
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(level=logging.WARNING)
+    # The handlers set the root logger to INFO on import, keep their logs out of the report
+    for log_handler in logging.getLogger().handlers:
+        log_handler.setLevel(logging.WARNING)
+    # The stand-ins have no draft library filter, every glue event warns that it is not filtered
+    logging.getLogger("sash_tools.draft_library_filter").setLevel(logging.ERROR)
+    # Read by the layer on the first span and metric
+    environ.setdefault(TRACE_EXPORTER_ENV_VAR, QUIET_SINK)
+    environ.setdefault(METRICS_SINK_ENV_VAR, QUIET_SINK)
+
+    stand_ins = import_module(args.stand_ins)
+    lambda_handlers = load_lambda_handlers(stand_ins)
+    state_machine_names = sorted(set(map(
+        lambda event_iter_: event_iter_[0],
+        stand_ins.get_subject_events()
+    )))
+    executors = dict(map(
+        lambda state_machine_name_iter_: (
+            state_machine_name_iter_,
+            LocalStateMachineExecutor(
+                definition=load_definition(get_template_path(state_machine_name_iter_)),
+                lambda_handlers=lambda_handlers,
+                ssm_parameters=dict(stand_ins.SSM_PARAMETERS),
+                state_machine_name=state_machine_name_iter_,
+            )
+        ),
+        state_machine_names
+    ))
+
+    # Import the handlers before the first level, with the fixture's first subject
+    for state_machine_name, execution_input in stand_ins.get_subject_events():
+        executors[state_machine_name].start_execution(execution_input)
+
+    level_reports = []
+    for level_index, concurrency in enumerate(sorted(set(args.concurrency))):
+        level_report = run_level(
+            stand_ins, executors,
+            level_index=level_index,
+            subject_count=args.subjects,
+            concurrency=concurrency,
+            api_latency_ms=args.api_latency_ms,
+        )
+        level_reports.append(level_report)
+        print(
+            f"concurrency {concurrency:>3}: {level_report['subjectsPerMinute']:8.1f} subjects/min, "
+            f"{level_report['eventsPerSecond']:7.1f} events/s, "
+            f"{level_report['apiCallsPerSubject']:.1f} API calls/subject, "
+            f"subject p95 {level_report['stages'][SUBJECT_STAGE_NAME]['p95Ms']:.0f} ms, "
+            f"{level_report['statuses']}"
+        )
+
+    print(f"\n{'stage (p95 ms)':<45}" + "".join(map(lambda level_iter_: f"{level_iter_['concurrency']:>9}", level_reports)))
+    for stage_name in state_machine_names + [SUBJECT_STAGE_NAME]:
+        print(f"{stage_name:<45}" + "".join(map(
+            lambda level_iter_: f"{level_iter_['stages'][stage_name]['p95Ms']:>9.0f}",
+            level_reports
+        )))
+
+    print("\nAPI calls per subject: " + json.dumps(level_reports[-1]["apiCallsPerSubjectByFunction"]))
+
+    saturation_concurrency = get_saturation_concurrency(level_reports, args.saturation_gain)
+    if saturation_concurrency is None:
+        print(f"Throughput did not saturate up to concurrency {level_reports[-1]['concurrency']}")
+    else:
+        peak_report = max(level_reports, key=lambda level_iter_: level_iter_["subjectsPerMinute"])
+        print(
+            f"Throughput saturates at concurrency {saturation_concurrency}, "
+            f"peak {peak_report['subjectsPerMinute']:.1f} subjects/min at concurrency {peak_report['concurrency']}"
+        )
+
+    if args.output_json is not None:
+        args.output_json.write_text(json.dumps({
+            "subjects": args.subjects,
+            "apiLatencyMs": args.api_latency_ms,
+            "saturationConcurrency": saturation_concurrency,
+            "levels": level_reports,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""
+Rebuild the span trees of the traced handlers (see sash_tools.tracing) from exported span lines.
+
+Reads json lines span files (TRACE_EXPORTER=file), or lambda log lines (TRACE_EXPORTER=log,
+i.e. exported from CloudWatch), where any text before the json object is skipped along with lines that are not spans.
+
+Spans are selected by --execution-arn, --portal-run-id or --workflow-run-id, then for each execution
+the handler invocations are printed in start order, with their child spans, i.e.
+
+    arn:aws:states:...:execution:populate-draft-data:xxx  (4 invocations, 2.31 s)
+      1180.2 ms  handler  get_workflow_run_object           OK
+      1179.6 ms    client   GET workflow.umccr.org/api/v1/workflowrun  OK  {"attempts": 3, "waitMs": 1003.1, ...}
+
+followed by the --top slowest client spans of the selection.
+A DRAFT that was slow to populate is looked up with --portal-run-id (or --workflow-run-id) of the draft.
+
+Usage:
+    cd app && python3 -m tools.trace_report .sash-traces.jsonl [--portal-run-id 20250101abcd1234] [--top 10]
+"""
+
+# Standard imports
+import argparse
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# Globals
+DEFAULT_TOP = 10
+NO_EXECUTION_ARN = "(no execution arn)"
+CLIENT_SPAN_KIND = "client"
+
+
+def get_span_records(paths: Iterable[Path]) -> List[Dict[str, Any]]:
+    """
+    Read the span records of json lines or log lines files
+    """
+    span_records = []
+    for path in paths:
+        with open(path) as trace_file_h:
+            for line in trace_file_h:
+                json_start = line.find("{")
+                if json_start == -1:
+                    continue
+                try:
+                    record = json.loads(line[json_start:])
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and "spanId" in record and "traceId" in record:
+                    span_records.append(record)
+    return span_records
+
+
+def filter_span_records(
+        span_records: List[Dict[str, Any]],
+        execution_arn: Optional[str] = None,
+        portal_run_id: Optional[str] = None,
+        workflow_run_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get the spans of the executions (or of the traces, for spans without an execution arn) matching any filter.
+    The portal run id and workflow run id are only on the spans of some of the handlers of an execution,
+    so the whole execution is selected
+    """
+    filters = {"executionArn": execution_arn, "portalRunId": portal_run_id, "workflowRunId": workflow_run_id}
+    filters = {tag_key: tag_value for tag_key, tag_value in filters.items() if tag_value is not None}
+    if not filters:
+        return span_records
+
+    matching_records = list(filter(
+        lambda record_iter_: any(map(
+            lambda filter_iter_: record_iter_.get(filter_iter_[0]) == filter_iter_[1],
+            filters.items()
+        )),
+        span_records
+    ))
+    execution_arns = set(filter(None, map(lambda record_iter_: record_iter_.get("executionArn"), matching_records)))
+    trace_ids = set(map(lambda record_iter_: record_iter_["traceId"], matching_records))
+    return list(filter(
+        lambda record_iter_: record_iter_.get("executionArn") in execution_arns or record_iter_["traceId"] in trace_ids,
+        span_records
+    ))
+
+
+def get_tree_lines(span_records: List[Dict[str, Any]]) -> List[str]:
+    """
+    Get the lines of the span trees, children under their parent, in start order
+    """
+    span_ids = set(map(lambda record_iter_: record_iter_["spanId"], span_records))
+    children: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    for record in span_records:
+        parent_span_id = record.get("parentSpanId")
+        children[parent_span_id if parent_span_id in span_ids else None].append(record)
+
+    lines = []
+
+    def _add_lines(record: Dict[str, Any], depth: int):
+        attributes = record.get("attributes") or {}
+        lines.append(
+            f"  {record['durationMs']:>9.1f} ms  {'  ' * depth}{record['kind']:<8} {record['name']}  "
+            f"{record['status']}"
+            + (f"  {record['error']}" if record.get("error") else "")
+            + (f"  {json.dumps(attributes)}" if attributes else "")
+        )
+        for child_record in sorted(children[record["spanId"]], key=lambda record_iter_: record_iter_["startTime"]):
+            _add_lines(child_record, depth + 1)
+
+    for root_record in sorted(children[None], key=lambda record_iter_: record_iter_["startTime"]):
+        _add_lines(root_record, 0)
+    return lines
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Span trees of the traced handlers")
+    parser.add_argument("trace_files", type=Path, nargs="+", help="Span json lines or lambda log lines files")
+    parser.add_argument("--execution-arn", help="Select the spans of this execution")
+    parser.add_argument("--portal-run-id", help="Select the executions with a span tagged with this portal run id")
+    parser.add_argument("--workflow-run-id", help="Select the executions with a span tagged with this workflow run id")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of slowest client spans to list")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    span_records = filter_span_records(
+        get_span_records(args.trace_files),
+        execution_arn=args.execution_arn,
+        portal_run_id=args.portal_run_id,
+        workflow_run_id=args.workflow_run_id,
+    )
+    if not span_records:
+        print("No matching spans")
+        return
+
+    execution_records: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in span_records:
+        execution_records[record.get("executionArn") or NO_EXECUTION_ARN].append(record)
+
+    for execution_arn, records in sorted(
+            execution_records.items(),
+            key=lambda execution_iter_: min(map(lambda record_iter_: record_iter_["startTime"], execution_iter_[1]))
+    ):
+        handler_records = list(filter(lambda record_iter_: record_iter_.get("parentSpanId") is None, records))
+        print(
+            f"{execution_arn}  ({len(handler_records)} invocations, "
+            f"{sum(map(lambda record_iter_: record_iter_['durationMs'], handler_records)) / 1000:.2f} s)"
+        )
+        print("\n".join(get_tree_lines(records)))
+        print()
+
+    client_records = sorted(
+        filter(lambda record_iter_: record_iter_["kind"] == CLIENT_SPAN_KIND, span_records),
+        key=lambda record_iter_: record_iter_["durationMs"],
+        reverse=True,
+    )[:args.top]
+    span_names = dict(map(lambda record_iter_: (record_iter_["spanId"], record_iter_["name"]), span_records))
+    print(f"Slowest {len(client_records)} client spans")
+    for record in client_records:
+        print(
+            f"  {record['durationMs']:>9.1f} ms  {record['name']}  "
+            f"(in {span_names.get(record.get('parentSpanId'), '?')}, {record.get('executionArn') or NO_EXECUTION_ARN})"
+        )
+
+
+if __name__ == "__main__":
+    main()
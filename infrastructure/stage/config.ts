@@ -2,6 +2,7 @@ import { StageName } from '@orcabus/platform-cdk-constructs/shared-config/accoun
 import { ICAV2_PROJECT_ID } from '@orcabus/platform-cdk-constructs/shared-config/icav2';
 import { StatefulApplicationStackConfig, StatelessApplicationStackConfig } from './interfaces';
 import {
+  CLAIM_CHECK_BUCKET_NAME,
   DEFAULT_PAYLOAD_VERSION,
   EVENT_BUS_NAME,
   SSM_PARAMETER_PATH_CACHE_PREFIX,
@@ -13,6 +14,7 @@ import {
   SSM_PARAMETER_PATH_PREFIX_SASH_REFERENCE_PATHS_BY_WORKFLOW_VERSION,
   SSM_PARAMETER_PATH_PREFIX_PIPELINE_IDS_BY_WORKFLOW_VERSION,
   SSM_PARAMETER_PATH_WORKFLOW_NAME,
+  STATE_TABLE_NAME,
   WORKFLOW_CACHE_PREFIX,
   WORKFLOW_LOGS_PREFIX,
   WORKFLOW_NAME,
@@ -72,6 +74,8 @@ export const getStatefulStackProps = (stage: StageName): StatefulApplicationStac
   return {
     ssmParameterValues: getSsmParameterValues(stage),
     ssmParameterPaths: getSsmParameterPaths(),
+    stateTableName: STATE_TABLE_NAME,
+    claimCheckBucketName: CLAIM_CHECK_BUCKET_NAME,
   };
 };
 
@@ -85,5 +89,12 @@ export const getStatelessStackProps = (stage: StageName): StatelessApplicationSt
 
     // Stage Name
     stageName: stage,
+
+    // Lambda state table
+    stateTableName: STATE_TABLE_NAME,
+    claimCheckBucketName: CLAIM_CHECK_BUCKET_NAME,
+
+    // Individual lambdas per task, set to true to invoke the single sash dispatcher lambda instead
+    useSashDispatcher: false,
   };
 };
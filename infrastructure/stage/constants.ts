@@ -1,5 +1,6 @@
 /* Directory constants */
 import path from 'path';
+import * as cdk from 'aws-cdk-lib';
 import { PayloadVersionType, WorkflowVersionType } from './interfaces';
 import { DATA_SCHEMA_REGISTRY_NAME } from '@orcabus/platform-cdk-constructs/shared-config/event-bridge';
 import {
@@ -9,6 +10,7 @@ import {
 
 export const APP_ROOT = path.join(__dirname, '../../app');
 export const LAMBDA_DIR = path.join(APP_ROOT, 'lambdas');
+export const LAYERS_DIR = path.join(APP_ROOT, 'layers');
 export const STEP_FUNCTIONS_DIR = path.join(APP_ROOT, 'step-functions-templates');
 export const EVENT_SCHEMAS_DIR = path.join(APP_ROOT, 'event-schemas');
 
@@ -108,6 +110,25 @@ export const SSM_SCHEMA_ROOT = path.join(SSM_PARAMETER_PATH_PREFIX, 'schemas');
 // Used to group event rules and step functions
 export const STACK_PREFIX = 'orca-sash';
 
+/* State table */
+// Shared key-value state for the lambdas (payload fingerprints etc), see the sash_tools layer
+export const STATE_TABLE_NAME = 'SashPipelineManagerStateTable';
+export const STATE_TABLE_PARTITION_KEY = 'namespace';
+export const STATE_TABLE_SORT_KEY = 'key';
+export const STATE_TABLE_TTL_ATTRIBUTE = 'expiresAt';
+
+/* Draft library filter */
+// How often the filter of the libraries with an open sash draft is rebuilt, see sash_tools.draft_library_filter
+// Must be well under DRAFT_LIBRARY_FILTER_MAX_AGE_SECONDS (default 1 hour)
+export const DRAFT_LIBRARY_FILTER_REBUILD_INTERVAL_MINUTES = 15;
+
+/* Claim check bucket */
+// Large values passed between state machine states, see sash_tools.claim_check
+export const CLAIM_CHECK_BUCKET_NAME = `${STACK_PREFIX}-claim-check-${cdk.Aws.ACCOUNT_ID}-${cdk.Aws.REGION}`;
+export const CLAIM_CHECK_PREFIX = 'claim-check/';
+// References only need to outlive the state machine execution
+export const CLAIM_CHECK_EXPIRATION_DAYS = 7;
+
 /* Buckets */
 export const TEST_DATA_BUCKET_NAME = TEST_DATA_BUCKET;
 export const REF_DATA_BUCKET_NAME = REFERENCE_DATA_BUCKET;
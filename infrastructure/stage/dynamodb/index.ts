@@ -0,0 +1,33 @@
+import { Construct } from 'constructs';
+import * as cdk from 'aws-cdk-lib';
+import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
+import { BuildStateTableProps } from './interfaces';
+import {
+  STATE_TABLE_PARTITION_KEY,
+  STATE_TABLE_SORT_KEY,
+  STATE_TABLE_TTL_ATTRIBUTE,
+} from '../constants';
+
+export function buildStateTable(scope: Construct, props: BuildStateTableProps): dynamodb.TableV2 {
+  /**
+   * Key-value state shared by the lambdas through the sash_tools layer
+   * Items are keyed by namespace + key, and expire through the ttl attribute
+   */
+  return new dynamodb.TableV2(scope, 'StateTable', {
+    tableName: props.tableName,
+    partitionKey: {
+      name: STATE_TABLE_PARTITION_KEY,
+      type: dynamodb.AttributeType.STRING,
+    },
+    sortKey: {
+      name: STATE_TABLE_SORT_KEY,
+      type: dynamodb.AttributeType.STRING,
+    },
+    billing: dynamodb.Billing.onDemand(),
+    timeToLiveAttribute: STATE_TABLE_TTL_ATTRIBUTE,
+    pointInTimeRecoverySpecification: {
+      pointInTimeRecoveryEnabled: true,
+    },
+    removalPolicy: cdk.RemovalPolicy.RETAIN,
+  });
+}
@@ -7,12 +7,16 @@ import {
   EventBridgeRuleProps,
   EventBridgeRulesProps,
   BuildDraftRuleProps,
+  BuildIndexRuleProps,
+  BuildScheduleRuleProps,
 } from './interfaces';
 import { EventPattern, Rule } from 'aws-cdk-lib/aws-events';
 import * as events from 'aws-cdk-lib/aws-events';
 import { Construct } from 'constructs';
+import { Duration } from 'aws-cdk-lib';
 import {
   DEFAULT_PAYLOAD_VERSION,
+  DRAFT_LIBRARY_FILTER_REBUILD_INTERVAL_MINUTES,
   DRAFT_STATUS,
   DRAGEN_WGTS_DNA_WORKFLOW_NAME,
   ICAV2_WES_EVENT_SOURCE,
@@ -86,6 +90,19 @@ function buildWorkflowManagerReadyEventPattern(): EventPattern {
   };
 }
 
+function buildWorkflowManagerIndexEventPattern(): EventPattern {
+  // Every state change of the runs find_latest_workflow looks up
+  return {
+    detailType: [WORKFLOW_RUN_STATE_CHANGE_DETAIL_TYPE],
+    source: [WORKFLOW_MANAGER_EVENT_SOURCE],
+    detail: {
+      workflow: {
+        name: [WORKFLOW_NAME, DRAGEN_WGTS_DNA_WORKFLOW_NAME, ONCOANALYSER_WGTS_DNA_WORKFLOW_NAME],
+      },
+    },
+  };
+}
+
 function buildEventRule(scope: Construct, props: EventBridgeRuleProps): Rule {
   return new events.Rule(scope, props.ruleName, {
     ruleName: `${STACK_PREFIX}--${props.ruleName}`,
@@ -138,6 +155,28 @@ function buildWorkflowRunStateChangeReadyEventRule(
   });
 }
 
+function buildWorkflowRunStateChangeIndexEventRule(
+  scope: Construct,
+  props: BuildIndexRuleProps
+): Rule {
+  return buildEventRule(scope, {
+    ruleName: props.ruleName,
+    eventPattern: buildWorkflowManagerIndexEventPattern(),
+    eventBus: props.eventBus,
+  });
+}
+
+function buildDraftLibraryFilterRebuildScheduleRule(
+  scope: Construct,
+  props: BuildScheduleRuleProps
+): Rule {
+  // Schedules are only supported on the default event bus
+  return new events.Rule(scope, props.ruleName, {
+    ruleName: `${STACK_PREFIX}--${props.ruleName}`,
+    schedule: events.Schedule.rate(Duration.minutes(DRAFT_LIBRARY_FILTER_REBUILD_INTERVAL_MINUTES)),
+  });
+}
+
 export function buildAllEventRules(
   scope: Construct,
   props: EventBridgeRulesProps
@@ -189,6 +228,28 @@ export function buildAllEventRules(
             eventBus: props.eventBus,
           }),
         });
+        break;
+      }
+      // Workflow run index
+      case 'wrscIndex': {
+        eventBridgeRuleObjects.push({
+          ruleName: ruleName,
+          ruleObject: buildWorkflowRunStateChangeIndexEventRule(scope, {
+            ruleName: ruleName,
+            eventBus: props.eventBus,
+          }),
+        });
+        break;
+      }
+      // Draft library filter
+      case 'draftLibraryFilterRebuild': {
+        eventBridgeRuleObjects.push({
+          ruleName: ruleName,
+          ruleObject: buildDraftLibraryFilterRebuildScheduleRule(scope, {
+            ruleName: ruleName,
+          }),
+        });
+        break;
       }
     }
   }
@@ -11,7 +11,11 @@ export type EventBridgeRuleName =
   // Pre-ready
   | 'wrscReady'
   // Post-submitted
-  | 'icav2WesAnalysisStateChange';
+  | 'icav2WesAnalysisStateChange'
+  // Workflow run index
+  | 'wrscIndex'
+  // Draft library filter
+  | 'draftLibraryFilterRebuild';
 
 export const eventBridgeRuleNameList: EventBridgeRuleName[] = [
   // Pre-draft
@@ -22,6 +26,10 @@ export const eventBridgeRuleNameList: EventBridgeRuleName[] = [
   'wrscReady',
   // Post-submitted
   'icav2WesAnalysisStateChange',
+  // Workflow run index
+  'wrscIndex',
+  // Draft library filter
+  'draftLibraryFilterRebuild',
 ];
 
 export interface EventBridgeRuleProps {
@@ -42,3 +50,5 @@ export interface EventBridgeRuleObject {
 export type BuildIcav2AnalysisStateChangeRuleProps = Omit<EventBridgeRuleProps, 'eventPattern'>;
 export type BuildDraftRuleProps = Omit<EventBridgeRuleProps, 'eventPattern'>;
 export type BuildReadyRuleProps = Omit<EventBridgeRuleProps, 'eventPattern'>;
+export type BuildIndexRuleProps = Omit<EventBridgeRuleProps, 'eventPattern'>;
+export type BuildScheduleRuleProps = Omit<EventBridgeRuleProps, 'eventPattern' | 'eventBus'>;
@@ -1,4 +1,5 @@
 import {
+  AddLambdaAsEventBridgeTargetProps,
   AddSfnAsEventBridgeTargetProps,
   eventBridgeTargetsNameList,
   EventBridgeTargetsProps,
@@ -27,6 +28,24 @@ export function buildIcav2WesEventStateChangeToWrscSfnTarget(
   );
 }
 
+export function buildWrscToLambdaTarget(props: AddLambdaAsEventBridgeTargetProps) {
+  // We take in the event detail from the workflow run state change event
+  props.eventBridgeRuleObj.addTarget(
+    new eventsTargets.LambdaFunction(props.lambdaFunctionObj, {
+      event: events.RuleTargetInput.fromEventPath('$.detail'),
+    })
+  );
+}
+
+export function buildScheduleToLambdaTarget(props: AddLambdaAsEventBridgeTargetProps) {
+  // Scheduled events carry nothing the lambda needs
+  props.eventBridgeRuleObj.addTarget(
+    new eventsTargets.LambdaFunction(props.lambdaFunctionObj, {
+      event: events.RuleTargetInput.fromObject({}),
+    })
+  );
+}
+
 export function buildAllEventBridgeTargets(props: EventBridgeTargetsProps) {
   for (const eventBridgeTargetsName of eventBridgeTargetsNameList) {
     switch (eventBridgeTargetsName) {
@@ -94,6 +113,32 @@ export function buildAllEventBridgeTargets(props: EventBridgeTargetsProps) {
         });
         break;
       }
+
+      // Workflow run state changes to the workflow run index
+      case 'wrscToIndexWorkflowRunLambdaTarget': {
+        buildWrscToLambdaTarget(<AddLambdaAsEventBridgeTargetProps>{
+          eventBridgeRuleObj: props.eventBridgeRuleObjects.find(
+            (eventBridgeObject) => eventBridgeObject.ruleName === 'wrscIndex'
+          )?.ruleObject,
+          lambdaFunctionObj: props.lambdaObjects.find(
+            (lambdaObject) => lambdaObject.lambdaName === 'indexWorkflowRunStateChange'
+          )?.lambdaFunction,
+        });
+        break;
+      }
+
+      // Rebuild the draft library filter on a schedule
+      case 'scheduleToRebuildDraftLibraryFilterLambdaTarget': {
+        buildScheduleToLambdaTarget(<AddLambdaAsEventBridgeTargetProps>{
+          eventBridgeRuleObj: props.eventBridgeRuleObjects.find(
+            (eventBridgeObject) => eventBridgeObject.ruleName === 'draftLibraryFilterRebuild'
+          )?.ruleObject,
+          lambdaFunctionObj: props.lambdaObjects.find(
+            (lambdaObject) => lambdaObject.lambdaName === 'rebuildDraftLibraryFilter'
+          )?.lambdaFunction,
+        });
+        break;
+      }
     }
   }
 }
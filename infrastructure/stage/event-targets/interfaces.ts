@@ -2,6 +2,8 @@ import { StateMachine } from 'aws-cdk-lib/aws-stepfunctions';
 import { Rule } from 'aws-cdk-lib/aws-events';
 import { EventBridgeRuleObject } from '../event-rules/interfaces';
 import { StepFunctionObject } from '../step-functions/interfaces';
+import { LambdaObject } from '../lambda/interfaces';
+import { IFunction } from 'aws-cdk-lib/aws-lambda';
 
 /**
  * EventBridge Target Interfaces
@@ -16,7 +18,11 @@ export type EventBridgeTargetName =
   // Ready to ICAv2 WES Submitted
   | 'readyToIcav2WesSubmittedSfnTarget'
   // Post submission
-  | 'icav2WesAnalysisStateChangeEventToWrscSfnTarget';
+  | 'icav2WesAnalysisStateChangeEventToWrscSfnTarget'
+  // Workflow run index
+  | 'wrscToIndexWorkflowRunLambdaTarget'
+  // Draft library filter
+  | 'scheduleToRebuildDraftLibraryFilterLambdaTarget';
 
 export const eventBridgeTargetsNameList: EventBridgeTargetName[] = [
   // Upstream Succeeded
@@ -29,6 +35,10 @@ export const eventBridgeTargetsNameList: EventBridgeTargetName[] = [
   'readyToIcav2WesSubmittedSfnTarget',
   // Post submission
   'icav2WesAnalysisStateChangeEventToWrscSfnTarget',
+  // Workflow run index
+  'wrscToIndexWorkflowRunLambdaTarget',
+  // Draft library filter
+  'scheduleToRebuildDraftLibraryFilterLambdaTarget',
 ];
 
 export interface AddSfnAsEventBridgeTargetProps {
@@ -36,7 +46,13 @@ export interface AddSfnAsEventBridgeTargetProps {
   eventBridgeRuleObj: Rule;
 }
 
+export interface AddLambdaAsEventBridgeTargetProps {
+  lambdaFunctionObj: IFunction;
+  eventBridgeRuleObj: Rule;
+}
+
 export interface EventBridgeTargetsProps {
   eventBridgeRuleObjects: EventBridgeRuleObject[];
   stepFunctionObjects: StepFunctionObject[];
+  lambdaObjects: LambdaObject[];
 }
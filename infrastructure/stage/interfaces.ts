@@ -18,6 +18,12 @@ export interface StatefulApplicationStackConfig {
 
   // Keys
   ssmParameterPaths: SsmParameterPaths;
+
+  // Lambda state table
+  stateTableName: string;
+
+  // Claim check bucket for large state machine values
+  claimCheckBucketName: string;
 }
 
 /**
@@ -32,6 +38,15 @@ export interface StatelessApplicationStackConfig {
 
   // Stage Name (required for lambdas needing ICAtools)
   stageName: StageName;
+
+  // Lambda state table
+  stateTableName: string;
+
+  // Claim check bucket for large state machine values
+  claimCheckBucketName: string;
+
+  // Route all state machine lambda tasks through the single sash dispatcher lambda
+  useSashDispatcher: boolean;
 }
 
 /* Set versions */
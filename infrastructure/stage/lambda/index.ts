@@ -1,17 +1,33 @@
-import { LambdaInput, lambdaNameList, LambdaObject, lambdaRequirementsMap } from './interfaces';
+import {
+  BuildAllLambdasOutput,
+  BuildAllLambdasProps,
+  BuildLambdaFunctionProps,
+  BuildLambdaProps,
+  lambdaNameList,
+  LambdaObject,
+  LambdaRequirements,
+  lambdaRequirementsMap,
+  LambdaSharedResources,
+  SASH_DISPATCHER_NAME,
+} from './interfaces';
 import { PythonUvFunction } from '@orcabus/platform-cdk-constructs/lambda';
 import {
+  CLAIM_CHECK_PREFIX,
   DEFAULT_PAYLOAD_VERSION,
   LAMBDA_DIR,
+  LAYERS_DIR,
   WORKFLOW_NAME,
   SSM_SCHEMA_ROOT,
   SCHEMA_REGISTRY_NAME,
   TEST_DATA_BUCKET_NAME,
   REF_DATA_BUCKET_NAME,
+  SSM_PARAMETER_PATH_PREFIX_SASH_REFERENCE_PATHS_BY_WORKFLOW_VERSION,
 } from '../constants';
 import { REPO_NAME } from '../../toolchain/constants';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
 import * as iam from 'aws-cdk-lib/aws-iam';
+import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
+import * as s3 from 'aws-cdk-lib/aws-s3';
 import * as cdk from 'aws-cdk-lib';
 import { Duration } from 'aws-cdk-lib';
 import { NagSuppressions } from 'cdk-nag';
@@ -20,22 +36,39 @@ import { camelCaseToKebabCase, camelCaseToSnakeCase } from '../utils';
 import * as path from 'path';
 import { SchemaNames } from '../event-schemas/interfaces';
 
-function buildLambda(scope: Construct, props: LambdaInput): LambdaObject {
-  const lambdaNameToSnakeCase = camelCaseToSnakeCase(props.lambdaName);
-  const lambdaRequirements = lambdaRequirementsMap[props.lambdaName];
+function buildSashToolsLayer(scope: Construct): lambda.LayerVersion {
+  /*
+  Shared python helpers for the lambdas, standard library only so no bundling is required
+  */
+  return new lambda.LayerVersion(scope, 'SashToolsLayer', {
+    code: lambda.Code.fromAsset(path.join(LAYERS_DIR, 'sash_tools_layer'), {
+      exclude: ['python/tests', '**/__pycache__'],
+    }),
+    compatibleRuntimes: [lambda.Runtime.PYTHON_3_14],
+    compatibleArchitectures: [lambda.Architecture.ARM_64],
+    description: 'Shared python helpers for the sash pipeline manager lambdas',
+  });
+}
 
+function buildLambdaFunction(
+  scope: Construct,
+  id: string,
+  props: BuildLambdaFunctionProps
+): PythonUvFunction {
   // Create the lambda function
-  const lambdaFunction = new PythonUvFunction(scope, props.lambdaName, {
-    entry: path.join(LAMBDA_DIR, lambdaNameToSnakeCase + '_py'),
+  const lambdaFunction = new PythonUvFunction(scope, id, {
+    entry: props.entry,
     runtime: lambda.Runtime.PYTHON_3_14,
     architecture: lambda.Architecture.ARM_64,
-    index: lambdaNameToSnakeCase + '.py',
+    index: props.index,
     handler: 'handler',
     timeout: Duration.seconds(60),
     memorySize:
-      lambdaRequirements.needsIcav2Tools || lambdaRequirements.needsHigherMemory ? 1024 : 512,
-    includeOrcabusApiToolsLayer: lambdaRequirements.needsOrcabusApiTools,
-    includeIcav2Layer: lambdaRequirements.needsIcav2Tools,
+      props.lambdaRequirements.needsIcav2Tools || props.lambdaRequirements.needsHigherMemory
+        ? 1024
+        : 512,
+    includeOrcabusApiToolsLayer: props.lambdaRequirements.needsOrcabusApiTools,
+    includeIcav2Layer: props.lambdaRequirements.needsIcav2Tools,
   });
 
   // AwsSolutions-L1 - Python 3.14 is not yet in the cdk-nag approved list but is our target runtime
@@ -57,6 +90,18 @@ function buildLambda(scope: Construct, props: LambdaInput): LambdaObject {
     true
   );
 
+  /* Add in the permissions and environment for the requirements */
+  addLambdaRequirements(lambdaFunction, props);
+
+  return lambdaFunction;
+}
+
+function addLambdaRequirements(
+  lambdaFunction: PythonUvFunction,
+  props: BuildLambdaFunctionProps
+): void {
+  const lambdaRequirements = props.lambdaRequirements;
+
   /*
     Add in SSM permissions for the lambda function
     */
@@ -151,23 +196,150 @@ function buildLambda(scope: Construct, props: LambdaInput): LambdaObject {
     );
   }
 
+  /*
+  Shared sash tools layer
+   */
+  if (lambdaRequirements.needsSashToolsLayer) {
+    lambdaFunction.addLayers(props.sashToolsLayer);
+  }
+
+  /*
+  State table, used by the sash tools layer state store
+   */
+  if (lambdaRequirements.needsStateTableAccess) {
+    props.stateTable.grantReadWriteData(lambdaFunction);
+    lambdaFunction.addEnvironment('STATE_TABLE_NAME', props.stateTable.tableName);
+  }
+
+  /*
+  Claim check bucket, used by the sash tools layer to pass large values between states
+   */
+  if (lambdaRequirements.needsClaimCheckBucketAccess) {
+    props.claimCheckBucket.grantReadWrite(lambdaFunction, CLAIM_CHECK_PREFIX + '*');
+    lambdaFunction.addEnvironment('CLAIM_CHECK_BUCKET_NAME', props.claimCheckBucket.bucketName);
+    NagSuppressions.addResourceSuppressions(
+      lambdaFunction,
+      [
+        {
+          id: 'AwsSolutions-IAM5',
+          reason:
+            'Wildcard covers the claim check objects, object keys are content hashes created at runtime',
+        },
+      ],
+      true
+    );
+  }
+
+  /*
+  Default reference data paths, read by the draft resolver when the draft has no reference data path
+   */
+  if (lambdaRequirements.needsReferenceDataSsmParameterAccess) {
+    lambdaFunction.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: ['ssm:GetParameter'],
+        resources: [
+          `arn:aws:ssm:${cdk.Aws.REGION}:${cdk.Aws.ACCOUNT_ID}:parameter${path.join(SSM_PARAMETER_PATH_PREFIX_SASH_REFERENCE_PATHS_BY_WORKFLOW_VERSION, '/*')}`,
+        ],
+      })
+    );
+    lambdaFunction.addEnvironment(
+      'DEFAULT_REF_DATA_PATH_SSM_PARAMETER_PREFIX',
+      SSM_PARAMETER_PATH_PREFIX_SASH_REFERENCE_PATHS_BY_WORKFLOW_VERSION
+    );
+    NagSuppressions.addResourceSuppressions(
+      lambdaFunction,
+      [
+        {
+          id: 'AwsSolutions-IAM5',
+          reason:
+            'Wildcard covers the reference data path parameters, one per workflow version, read by workflow version at runtime',
+        },
+      ],
+      true
+    );
+  }
+}
+
+function buildLambda(scope: Construct, props: BuildLambdaProps): LambdaObject {
+  const lambdaNameToSnakeCase = camelCaseToSnakeCase(props.lambdaName);
+
+  const lambdaRequirements = lambdaRequirementsMap[props.lambdaName];
+
   /* Return the function */
   return {
     lambdaName: props.lambdaName,
-    lambdaFunction: lambdaFunction,
+    lambdaFunction: buildLambdaFunction(scope, props.lambdaName, {
+      /* Lambdas calling the other handlers are bundled with every lambda directory */
+      entry: lambdaRequirements.needsSiblingHandlers
+        ? LAMBDA_DIR
+        : path.join(LAMBDA_DIR, lambdaNameToSnakeCase + '_py'),
+      index: lambdaRequirements.needsSiblingHandlers
+        ? path.join(lambdaNameToSnakeCase + '_py', lambdaNameToSnakeCase + '.py')
+        : lambdaNameToSnakeCase + '.py',
+      lambdaRequirements: lambdaRequirements,
+      sashToolsLayer: props.sashToolsLayer,
+      stateTable: props.stateTable,
+      claimCheckBucket: props.claimCheckBucket,
+    }),
   };
 }
 
-export function buildAllLambdas(scope: Construct): LambdaObject[] {
+function buildSashDispatcherLambda(
+  scope: Construct,
+  props: LambdaSharedResources
+): PythonUvFunction {
+  /*
+  Single function bundling every lambda directory, routing on the event action attribute.
+  Has the union of the requirements of the individual lambdas.
+  */
+  const lambdaRequirements: LambdaRequirements = {};
+  for (const lambdaName of lambdaNameList) {
+    for (const [requirement, isRequired] of Object.entries(lambdaRequirementsMap[lambdaName])) {
+      if (isRequired) {
+        lambdaRequirements[requirement as keyof LambdaRequirements] = true;
+      }
+    }
+  }
+
+  return buildLambdaFunction(scope, 'sashDispatcher', {
+    entry: LAMBDA_DIR,
+    index: path.join(SASH_DISPATCHER_NAME + '_py', SASH_DISPATCHER_NAME + '.py'),
+    lambdaRequirements: lambdaRequirements,
+    ...props,
+  });
+}
+
+export function buildAllLambdas(
+  scope: Construct,
+  props: BuildAllLambdasProps
+): BuildAllLambdasOutput {
+  // Shared resources
+  const sharedResources: LambdaSharedResources = {
+    sashToolsLayer: buildSashToolsLayer(scope),
+    stateTable: dynamodb.TableV2.fromTableName(scope, 'StateTable', props.stateTableName),
+    claimCheckBucket: s3.Bucket.fromBucketName(
+      scope,
+      'ClaimCheckBucket',
+      props.claimCheckBucketName
+    ),
+  };
+
   // Iterate over lambdaLayerToMapping and create the lambda functions
   const lambdaObjects: LambdaObject[] = [];
   for (const lambdaName of lambdaNameList) {
     lambdaObjects.push(
       buildLambda(scope, {
         lambdaName: lambdaName,
+        ...sharedResources,
       })
     );
   }
 
-  return lambdaObjects;
+  // The individual lambdas are always deployed, the dispatcher is optional
+  return {
+    lambdaObjects: lambdaObjects,
+    sashDispatcher: props.useSashDispatcher
+      ? buildSashDispatcherLambda(scope, sharedResources)
+      : undefined,
+  };
 }
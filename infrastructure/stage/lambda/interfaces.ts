@@ -1,7 +1,12 @@
 import { PythonUvFunction } from '@orcabus/platform-cdk-constructs/lambda';
+import { ILayerVersion } from 'aws-cdk-lib/aws-lambda';
+import { ITableV2 } from 'aws-cdk-lib/aws-dynamodb';
+import { IBucket } from 'aws-cdk-lib/aws-s3';
 
 export type LambdaName =
   // Shared - preready creation lambdas
+  | 'checkPayloadFingerprint'
+  | 'clearWorkflowLookupMisses'
   | 'comparePayload'
   | 'generateWruEventObjectWithMergedData'
   | 'getMissingSchemaFields'
@@ -11,25 +16,36 @@ export type LambdaName =
   // Shared - validation lambdas
   | 'validateDraftDataCompleteSchema'
   // Glue upstream lambdas
+  | 'checkDraftLibraryFilter'
   | 'getWorkflowRunObject'
   | 'getDraftPayload'
+  | 'recordNoDraftFound'
+  // Workflow run index lambdas
+  | 'indexWorkflowRunStateChange'
+  | 'rebuildDraftLibraryFilter'
   // Draft lambdas
   | 'getFastqIdListFromRgidList'
   | 'getFastqRgidsFromLibraryId'
   | 'getLibraries'
   | 'getMetadataTags'
+  | 'resolveDraftData'
   // Post-Draft checks
   | 'postSchemaValidation'
   // Commentary Functions
   | 'addPopulateDraftComment'
   | 'addWesFailureComment'
   // Ready to ICAv2 WES lambdas
+  | 'cacheWorkflowRunPayload'
   | 'convertReadyEventInputsToIcav2WesEventInputs'
   // ICAv2 WES to WRSC Event lambdas
-  | 'convertIcav2WesEventToWrscEvent';
+  | 'convertIcav2WesEventToWrscEvent'
+  | 'acceptIcav2WesStatus'
+  | 'releaseIcav2WesStatus';
 
 export const lambdaNameList: LambdaName[] = [
   // Shared - preready creation lambdas
+  'checkPayloadFingerprint',
+  'clearWorkflowLookupMisses',
   'comparePayload',
   'generateWruEventObjectWithMergedData',
   'getMissingSchemaFields',
@@ -39,21 +55,30 @@ export const lambdaNameList: LambdaName[] = [
   // Shared - validation lambdas
   'validateDraftDataCompleteSchema',
   // Glue upstream lambdas
+  'checkDraftLibraryFilter',
   'getWorkflowRunObject',
   'getDraftPayload',
+  'recordNoDraftFound',
+  // Workflow run index lambdas
+  'indexWorkflowRunStateChange',
+  'rebuildDraftLibraryFilter',
   // Draft lambdas
   'getFastqIdListFromRgidList',
   'getFastqRgidsFromLibraryId',
   'getLibraries',
   'getMetadataTags',
+  'resolveDraftData',
   'postSchemaValidation',
   // Commentary Functions
   'addPopulateDraftComment',
   'addWesFailureComment',
   // Ready to ICAv2 WES lambdas
+  'cacheWorkflowRunPayload',
   'convertReadyEventInputsToIcav2WesEventInputs',
   // ICAv2 WES to WRSC Event lambdas
   'convertIcav2WesEventToWrscEvent',
+  'acceptIcav2WesStatus',
+  'releaseIcav2WesStatus',
 ];
 
 // Requirements interface for Lambda functions
@@ -66,29 +91,52 @@ export interface LambdaRequirements {
   needsExternalBucketInfo?: boolean;
   needsWorkflowInfo?: boolean;
   needsRepoUrl?: boolean;
+  needsSashToolsLayer?: boolean;
+  needsStateTableAccess?: boolean;
+  needsClaimCheckBucketAccess?: boolean;
+  needsReferenceDataSsmParameterAccess?: boolean;
+  needsSiblingHandlers?: boolean;
 }
 
 // Lambda requirements mapping
 export const lambdaRequirementsMap: Record<LambdaName, LambdaRequirements> = {
   // Shared - preready creation lambdas
+  checkPayloadFingerprint: {
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
+  },
+  clearWorkflowLookupMisses: {
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
+  },
   comparePayload: {
-    needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
+    needsClaimCheckBucketAccess: true,
   },
   generateWruEventObjectWithMergedData: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsClaimCheckBucketAccess: true,
   },
   getMissingSchemaFields: {
     needsSchemaRegistryAccess: true,
     needsSsmParametersAccess: true,
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
   },
   getOncoanalyserDirFromPortalRunId: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
   },
   findLatestWorkflow: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
   },
   getDragenOutputsFromPortalRunId: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
   },
   // Shared - validation lambdas
   validateDraftDataCompleteSchema: {
@@ -96,26 +144,65 @@ export const lambdaRequirementsMap: Record<LambdaName, LambdaRequirements> = {
     needsSsmParametersAccess: true,
     needsWorkflowInfo: true,
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
   },
   // Glue upstream lambdas
+  checkDraftLibraryFilter: {
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
+  },
   getWorkflowRunObject: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
   },
   getDraftPayload: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsClaimCheckBucketAccess: true,
+  },
+  recordNoDraftFound: {
+    needsSashToolsLayer: true,
+  },
+  // Workflow run index lambdas
+  indexWorkflowRunStateChange: {
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
+    needsWorkflowInfo: true,
+  },
+  rebuildDraftLibraryFilter: {
+    needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
+    needsWorkflowInfo: true,
   },
   // Draft lambdas
   getFastqIdListFromRgidList: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
   },
   getFastqRgidsFromLibraryId: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
   },
   getLibraries: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
   },
   getMetadataTags: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+  },
+  // Calls the draft lambda handlers above, see app/lambdas/resolve_draft_data_py
+  resolveDraftData: {
+    needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsReferenceDataSsmParameterAccess: true,
+    needsSiblingHandlers: true,
+    // The upstream workflow lookup misses and the workflow run index of find_latest_workflow
+    needsStateTableAccess: true,
+    // The resolved libraries and inputs are checked in
+    needsClaimCheckBucketAccess: true,
   },
   // Post draft lambdas
   postSchemaValidation: {
@@ -124,40 +211,82 @@ export const lambdaRequirementsMap: Record<LambdaName, LambdaRequirements> = {
     needsOrcabusApiTools: true,
     needsWorkflowInfo: true,
     needsExternalBucketInfo: true,
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
   },
   // Commentary Functions
   addPopulateDraftComment: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
     needsWorkflowInfo: true,
     needsRepoUrl: true,
   },
   addWesFailureComment: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
     needsWorkflowInfo: true,
   },
-  // Convert ready to ICAv2 WES Event - no requirements
+  // Caches the READY run and payload for the ICAv2 WES state changes
+  cacheWorkflowRunPayload: {
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
+  },
+  // Convert ready to ICAv2 WES Event - only the tracing helpers
   convertReadyEventInputsToIcav2WesEventInputs: {
-    needsHigherMemory: true,
+    needsSashToolsLayer: true,
   },
   // Needs OrcaBus toolkit to get the wrsc event
   convertIcav2WesEventToWrscEvent: {
     needsOrcabusApiTools: true,
+    needsSashToolsLayer: true,
+    // The last accepted ICAv2 WES status of each run
+    needsStateTableAccess: true,
+  },
+  // Record or release the ICAv2 WES status claimed by the conversion
+  acceptIcav2WesStatus: {
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
+  },
+  releaseIcav2WesStatus: {
+    needsSashToolsLayer: true,
+    needsStateTableAccess: true,
   },
 };
 
+// Snake case name of the optional single entry point lambda, see app/lambdas/sash_dispatcher_py
+export const SASH_DISPATCHER_NAME = 'sash_dispatcher';
+
 export interface BuildAllLambdasProps {
-  refDataBucketName: string;
-  testDataBucketName: string;
+  stateTableName: string;
+  claimCheckBucketName: string;
+  useSashDispatcher: boolean;
 }
 
-export interface BuildLambdaProps extends BuildAllLambdasProps {
+export interface LambdaInput {
   lambdaName: LambdaName;
 }
 
-export interface LambdaInput {
-  lambdaName: LambdaName;
+export interface LambdaSharedResources {
+  sashToolsLayer: ILayerVersion;
+  stateTable: ITableV2;
+  claimCheckBucket: IBucket;
+}
+
+export type BuildLambdaProps = LambdaInput & LambdaSharedResources;
+
+export interface BuildLambdaFunctionProps extends LambdaSharedResources {
+  entry: string;
+  index: string;
+  lambdaRequirements: LambdaRequirements;
 }
 
 export interface LambdaObject extends LambdaInput {
   lambdaFunction: PythonUvFunction;
 }
+
+export interface BuildAllLambdasOutput {
+  lambdaObjects: LambdaObject[];
+  sashDispatcher?: PythonUvFunction;
+}
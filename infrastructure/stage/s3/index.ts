@@ -0,0 +1,40 @@
+import { Construct } from 'constructs';
+import * as cdk from 'aws-cdk-lib';
+import * as s3 from 'aws-cdk-lib/aws-s3';
+import { NagSuppressions } from 'cdk-nag';
+import { BuildClaimCheckBucketProps } from './interfaces';
+import { CLAIM_CHECK_EXPIRATION_DAYS, CLAIM_CHECK_PREFIX } from '../constants';
+
+export function buildClaimCheckBucket(
+  scope: Construct,
+  props: BuildClaimCheckBucketProps
+): s3.Bucket {
+  /**
+   * Large values checked in by the lambdas through the sash_tools layer,
+   * the state machines pass a reference to the object instead of the value
+   */
+  const bucket = new s3.Bucket(scope, 'ClaimCheckBucket', {
+    bucketName: props.bucketName,
+    blockPublicAccess: s3.BlockPublicAccess.BLOCK_ALL,
+    encryption: s3.BucketEncryption.S3_MANAGED,
+    enforceSSL: true,
+    lifecycleRules: [
+      {
+        prefix: CLAIM_CHECK_PREFIX,
+        expiration: cdk.Duration.days(CLAIM_CHECK_EXPIRATION_DAYS),
+      },
+    ],
+    removalPolicy: cdk.RemovalPolicy.RETAIN,
+  });
+
+  // AwsSolutions-S1 - Objects are short-lived intermediate state, access logs add no value
+  NagSuppressions.addResourceSuppressions(bucket, [
+    {
+      id: 'AwsSolutions-S1',
+      reason:
+        'Claim check objects are short-lived intermediate state machine values, server access logs are not required',
+    },
+  ]);
+
+  return bucket;
+}
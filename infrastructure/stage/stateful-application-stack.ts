@@ -3,6 +3,8 @@ import { Construct } from 'constructs';
 import { StatefulApplicationStackConfig } from './interfaces';
 import { buildSsmParameters } from './ssm';
 import { buildSchemas } from './event-schemas';
+import { buildStateTable } from './dynamodb';
+import { buildClaimCheckBucket } from './s3';
 import { GitStack } from '@orcabus/platform-cdk-constructs/deployment-stack-pipeline';
 
 export type StatefulApplicationStackProps = cdk.StackProps & StatefulApplicationStackConfig;
@@ -25,5 +27,15 @@ export class StatefulApplicationStack extends GitStack {
 
     // Add to the schema registry
     buildSchemas(this);
+
+    // Build the lambda state table
+    buildStateTable(this, {
+      tableName: props.stateTableName,
+    });
+
+    // Build the claim check bucket
+    buildClaimCheckBucket(this, {
+      bucketName: props.claimCheckBucketName,
+    });
   }
 }
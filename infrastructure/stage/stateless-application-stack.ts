@@ -32,11 +32,16 @@ export class StatelessApplicationStack extends GitStack {
     );
 
     // Build the lambdas
-    const lambdas = buildAllLambdas(this);
+    const lambdas = buildAllLambdas(this, {
+      stateTableName: props.stateTableName,
+      claimCheckBucketName: props.claimCheckBucketName,
+      useSashDispatcher: props.useSashDispatcher,
+    });
 
     // Build the state machines
     const stateMachines = buildAllStepFunctions(this, {
-      lambdaObjects: lambdas,
+      lambdaObjects: lambdas.lambdaObjects,
+      sashDispatcher: lambdas.sashDispatcher,
       eventBus: orcabusMainEventBus,
       ssmParameterPaths: props.ssmParameterPaths,
     });
@@ -50,6 +55,7 @@ export class StatelessApplicationStack extends GitStack {
     buildAllEventBridgeTargets({
       eventBridgeRuleObjects: eventRules,
       stepFunctionObjects: stateMachines,
+      lambdaObjects: lambdas.lambdaObjects,
     });
   }
 }
@@ -1,5 +1,6 @@
 /** Step Function stuff */
 import {
+  AslState,
   BuildStepFunctionProps,
   BuildStepFunctionsProps,
   stateMachineNameList,
@@ -29,6 +30,10 @@ import * as cdk from 'aws-cdk-lib';
 import * as iam from 'aws-cdk-lib/aws-iam';
 import { Construct } from 'constructs';
 import { camelCaseToSnakeCase } from '../utils';
+import * as fs from 'fs';
+
+const LAMBDA_INVOKE_RESOURCE = 'arn:aws:states:::lambda:invoke';
+const LAMBDA_FUNCTION_ARN_SUBSTITUTION_REGEX = /^\$\{__(\w+)_lambda_function_arn__\}$/;
 
 function createStateMachineDefinitionSubstitutions(props: BuildStepFunctionProps): {
   [key: string]: string;
@@ -42,10 +47,12 @@ function createStateMachineDefinitionSubstitutions(props: BuildStepFunctionProps
   );
 
   /* Substitute lambdas in the state machine definition */
+  /* With the dispatcher, every lambda task invokes the dispatcher with the action in the payload */
   for (const lambdaObject of lambdaFunctions) {
     const sfnSubstitutionKey = `__${camelCaseToSnakeCase(lambdaObject.lambdaName)}_lambda_function_arn__`;
-    definitionSubstitutions[sfnSubstitutionKey] =
-      lambdaObject.lambdaFunction.latestVersion.functionArn;
+    definitionSubstitutions[sfnSubstitutionKey] = (
+      props.sashDispatcher ?? lambdaObject.lambdaFunction
+    ).latestVersion.functionArn;
   }
 
   // Miscellaneous substitutions
@@ -101,8 +108,12 @@ function wireUpStateMachinePermissions(props: WireUpPermissionsProps): void {
   const lambdaFunctions = props.lambdaObjects.filter((lambdaObject) =>
     lambdaFunctionNamesInSfn.includes(lambdaObject.lambdaName)
   );
-  for (const lambdaObject of lambdaFunctions) {
-    lambdaObject.lambdaFunction.grantInvoke(props.sfnObject);
+  if (props.sashDispatcher) {
+    props.sashDispatcher.grantInvoke(props.sfnObject);
+  } else {
+    for (const lambdaObject of lambdaFunctions) {
+      lambdaObject.lambdaFunction.grantInvoke(props.sfnObject);
+    }
   }
   NagSuppressions.addResourceSuppressions(
     props.sfnObject,
@@ -148,15 +159,52 @@ function wireUpStateMachinePermissions(props: WireUpPermissionsProps): void {
   }
 }
 
-function buildStepFunction(scope: Construct, props: BuildStepFunctionProps): StepFunctionObject {
-  const sfnNameToSnakeCase = camelCaseToSnakeCase(props.stateMachineName);
+function addDispatcherActionsToStates(states: Record<string, AslState>): void {
+  /*
+  Set the action attribute on the payload of each lambda invoke task, the snake case lambda name
+  taken from the function name substitution key, i.e. ${__compare_payload_lambda_function_arn__}
+  Recurses into parallel branches and map item processors
+  */
+  for (const state of Object.values(states)) {
+    const taskArguments = state.Arguments;
+    const functionNameMatch = LAMBDA_FUNCTION_ARN_SUBSTITUTION_REGEX.exec(
+      taskArguments?.FunctionName ?? ''
+    );
+    if (state.Resource === LAMBDA_INVOKE_RESOURCE && taskArguments && functionNameMatch) {
+      taskArguments.Payload = {
+        action: functionNameMatch[1],
+        ...taskArguments.Payload,
+      };
+    }
+    for (const branch of state.Branches ?? []) {
+      addDispatcherActionsToStates(branch.States);
+    }
+    if (state.ItemProcessor) {
+      addDispatcherActionsToStates(state.ItemProcessor.States);
+    }
+  }
+}
 
+function getStateMachineDefinitionBody(props: BuildStepFunctionProps): sfn.DefinitionBody {
+  const definitionPath = path.join(
+    STEP_FUNCTIONS_DIR,
+    camelCaseToSnakeCase(props.stateMachineName) + `_sfn_template.asl.json`
+  );
+
+  if (!props.sashDispatcher) {
+    return sfn.DefinitionBody.fromFile(definitionPath);
+  }
+
+  const definition = JSON.parse(fs.readFileSync(definitionPath, 'utf8'));
+  addDispatcherActionsToStates(definition.States);
+  return sfn.DefinitionBody.fromString(JSON.stringify(definition, null, 2));
+}
+
+function buildStepFunction(scope: Construct, props: BuildStepFunctionProps): StepFunctionObject {
   /* Create the state machine definition substitutions */
   const stateMachine = new sfn.StateMachine(scope, props.stateMachineName, {
     stateMachineName: `${STACK_PREFIX}--${props.stateMachineName}`,
-    definitionBody: sfn.DefinitionBody.fromFile(
-      path.join(STEP_FUNCTIONS_DIR, sfnNameToSnakeCase + `_sfn_template.asl.json`)
-    ),
+    definitionBody: getStateMachineDefinitionBody(props),
     definitionSubstitutions: createStateMachineDefinitionSubstitutions(props),
   });
 
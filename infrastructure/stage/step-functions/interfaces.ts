@@ -1,5 +1,6 @@
 import { IEventBus } from 'aws-cdk-lib/aws-events';
 import { StateMachine } from 'aws-cdk-lib/aws-stepfunctions';
+import { PythonUvFunction } from '@orcabus/platform-cdk-constructs/lambda';
 
 import { LambdaName, LambdaObject } from '../lambda/interfaces';
 import { SsmParameterPaths } from '../ssm/interfaces';
@@ -46,10 +47,24 @@ export interface StepFunctionInput {
 
 export interface BuildStepFunctionProps extends StepFunctionInput {
   lambdaObjects: LambdaObject[];
+  // Optional single entry point, invoked in place of the individual lambdas
+  sashDispatcher?: PythonUvFunction;
   eventBus: IEventBus;
   ssmParameterPaths: SsmParameterPaths;
 }
 
+// The parts of an ASL state we inspect when wiring lambda tasks to the dispatcher
+export interface AslState {
+  Type: string;
+  Resource?: string;
+  Arguments?: {
+    FunctionName?: string;
+    Payload?: Record<string, unknown>;
+  };
+  Branches?: { States: Record<string, AslState> }[];
+  ItemProcessor?: { States: Record<string, AslState> };
+}
+
 export interface StepFunctionObject extends StepFunctionInput {
   sfnObject: StateMachine;
 }
@@ -88,26 +103,25 @@ export const stepFunctionToLambdasMap: Record<StateMachineName, LambdaName[]> =
     'getDragenOutputsFromPortalRunId',
     'getWorkflowRunObject',
     // Glue upstream lambdas
+    'checkDraftLibraryFilter',
     'getWorkflowRunObject',
     'getDraftPayload',
+    'clearWorkflowLookupMisses',
+    'recordNoDraftFound',
   ],
   // Populate Draft Data
   populateDraftData: [
     // Shared - preready creation lambdas
+    'checkPayloadFingerprint',
     'comparePayload',
     'generateWruEventObjectWithMergedData',
     'getMissingSchemaFields',
-    'getOncoanalyserDirFromPortalRunId',
-    'findLatestWorkflow',
     'getWorkflowRunObject',
     // Shared - validation lambdas
     'validateDraftDataCompleteSchema',
     // Draft lambdas
-    'getDragenOutputsFromPortalRunId',
-    'getFastqIdListFromRgidList',
-    'getFastqRgidsFromLibraryId',
     'getLibraries',
-    'getMetadataTags',
+    'resolveDraftData',
     // Commentary Functions
     'addPopulateDraftComment',
   ],
@@ -118,7 +132,15 @@ export const stepFunctionToLambdasMap: Record<StateMachineName, LambdaName[]> =
     'postSchemaValidation',
   ],
   // Ready-to-Submitted
-  readyEventToIcav2WesRequestEvent: ['convertReadyEventInputsToIcav2WesEventInputs'],
+  readyEventToIcav2WesRequestEvent: [
+    'cacheWorkflowRunPayload',
+    'convertReadyEventInputsToIcav2WesEventInputs',
+  ],
   // Post-submission event conversion
-  icav2WesEventToWrscEvent: ['convertIcav2WesEventToWrscEvent', 'addWesFailureComment'],
+  icav2WesEventToWrscEvent: [
+    'convertIcav2WesEventToWrscEvent',
+    'addWesFailureComment',
+    'acceptIcav2WesStatus',
+    'releaseIcav2WesStatus',
+  ],
 };